@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Agent transport benchmark
+
+Runs the ShoppingAgent checkout hops (merchant search, payment methods,
+tokenize, charge) against the agents started as separate uvicorn servers
+("http", the four-process setup) and mounted in this process ("asgi",
+httpx.ASGITransport as in python -m src.all_agents). Carts are signed
+locally, so the MCP server is not needed. Reports checkout latency and
+checkouts per second; --concurrency runs that many checkouts at a time.
+
+Usage:
+    python benchmarks/bench_agent_transport.py --checkouts 300
+    python benchmarks/bench_agent_transport.py --checkouts 300 --concurrency 8 --modes asgi
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+AP2_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(AP2_DIR))
+
+SERVERS = {
+    "merchant_url": "src.merchant_agent.server:app",
+    "credentials_provider_url": "src.credentials_provider.server:app",
+    "payment_processor_url": "src.payment_processor.server:app",
+}
+
+
+def prepare(path: Path):
+    """Synthetic catalog with unlimited stock for the benchmark sales"""
+    from sqlalchemy import text
+
+    from src.database import Base, run_migrations
+    from src.database.engine import make_engine
+    from src.database.synthetic import SyntheticDataGenerator
+
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    SyntheticDataGenerator(seed=45).generate(engine, pokemon=151, transactions=1000)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE pokemon SET en_venta = 1, inventario_disponible = 1000000"))
+        catalog = conn.execute(text("SELECT numero, nombre, precio FROM pokemon")).all()
+    engine.dispose()
+    return [tuple(row) for row in catalog]
+
+
+def signed_cart(numero: int, nombre: str, precio: float):
+    """CartMandate for one Pokemon, signed like the MCP server signs it"""
+    from src.common import (
+        CartContents, CartMandate, DisplayItem, PaymentAmount, PaymentDetails,
+        PaymentMethodData, PaymentOptions, PaymentRequest,
+        generate_cart_id, generate_merchant_signature, generate_order_id,
+    )
+
+    cart_id = generate_cart_id()
+    amount = PaymentAmount(currency="USD", value=precio)
+    return CartMandate(
+        contents=CartContents(
+            id=cart_id,
+            user_cart_confirmation_required=False,
+            merchant_name="PokeMart - Primera Generación",
+            payment_request=PaymentRequest(
+                method_data=[PaymentMethodData(supported_methods="CARD", data={})],
+                details=PaymentDetails(
+                    id=generate_order_id(),
+                    displayItems=[DisplayItem(label=f"{nombre.capitalize()} #{numero}", amount=amount)],
+                    total=DisplayItem(label="Total", amount=amount)
+                ),
+                options=PaymentOptions()
+            )
+        ),
+        merchant_signature=generate_merchant_signature(cart_id)
+    ).model_dump()
+
+
+async def checkout(agent, item):
+    """One checkout through the agents; returns its latency in ms"""
+    began = time.perf_counter()
+    async with agent._client(agent.merchant_url) as client:
+        response = await client.post(
+            f"{agent.merchant_url}/a2a/merchant_agent/search",
+            json={"query": item[1], "limit": 5}
+        )
+        response.raise_for_status()
+    methods = await agent.get_payment_methods()
+    token = await agent.tokenize_payment_method(methods[0]["id"])
+    cart = signed_cart(*item)
+    mandate = agent.create_payment_mandate(cart, token, methods[0]["type"])
+    await agent.process_payment(cart, mandate)
+    return (time.perf_counter() - began) * 1000
+
+
+async def run_checkouts(agent, catalog, args):
+    """Latencies (ms) and checkouts per second"""
+    rng = np.random.default_rng(45)
+    items = [catalog[i] for i in rng.integers(0, len(catalog), args.checkouts)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(item):
+        async with semaphore:
+            return await checkout(agent, item)
+
+    for item in items[:args.warmup]:
+        await checkout(agent, item)
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(item) for item in items))
+    return np.array(latencies), len(items) / (time.perf_counter() - start)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_healthy(url: str, timeout: float = 30):
+    """Wait for a server's /health"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def run_http(catalog, args, tmp: Path):
+    """Agents as separate uvicorn servers, called over localhost HTTP"""
+    from src.shopping_agent.agent import ShoppingAgent
+
+    agent = ShoppingAgent(transport="http")
+    servers = []
+    try:
+        for attribute, target in SERVERS.items():
+            port = free_port()
+            servers.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+                cwd=AP2_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            setattr(agent, attribute, f"http://127.0.0.1:{port}")
+            wait_healthy(getattr(agent, attribute))
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(run_checkouts(agent, catalog, args))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+def run_asgi(catalog, args, tmp: Path):
+    """Agent apps mounted in this process, called through ASGITransport"""
+    from src.all_agents.server import agents_lifespan
+    from src.shopping_agent.agent import ShoppingAgent
+
+    async def main():
+        async with agents_lifespan():
+            return await run_checkouts(ShoppingAgent(transport="asgi"), catalog, args)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent transport benchmark (HTTP vs in-process ASGI)")
+    parser.add_argument("--checkouts", type=int, default=300, help="Checkouts per mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="Checkouts in flight at a time")
+    parser.add_argument("--warmup", type=int, default=10, help="Checkouts before measuring")
+    parser.add_argument("--modes", default="http,asgi", help="Comma-separated: http, asgi")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        # Before any src import: servers and in-process apps use this database
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["SALES_EVENT_LOG_DIR"] = str(Path(tmp) / "sales_events")
+        catalog = prepare(path)
+
+        print(f"📦 {args.checkouts} checkouts per mode (4 agent hops each), concurrency {args.concurrency}")
+        print(f"  {'mode':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'checkouts/s':>12}")
+        runners = {"http": run_http, "asgi": run_asgi}
+        for mode in args.modes.split(","):
+            latencies, rate = runners[mode](catalog, args, Path(tmp))
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(f"  {mode:<6} {p50:8.2f} {p95:8.2f} {p99:8.2f} {rate:12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
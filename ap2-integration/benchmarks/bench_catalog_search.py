@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Catalog search benchmark
+
+Runs compound queries against CatalogSearchEngine over synthetic catalogs
+(10k, 1M and 10M SKUs by default) and reports latency per query. Sorted
+queries are compared with a full argsort to show the argpartition top-k
+gain.
+
+Usage:
+    python benchmarks/bench_catalog_search.py --skus 10000,1000000,10000000 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.catalog_search import CatalogSearchEngine, POKEMON_TYPES, STAT_NAMES
+
+
+QUERIES = {
+    "fire+flying, available": dict(types=["fire", "flying"], only_available=True, limit=20),
+    "price 50-200, available": dict(min_price=50, max_price=200, only_available=True, limit=20),
+    "water|ice, top-20 attack": dict(any_types=["water", "ice"], sort_by="-attack", limit=20),
+    "total>=450, cheapest 20": dict(min_stats={"total": 450}, sort_by="precio", limit=20),
+    "all, top-100 speed": dict(sort_by="-speed", limit=100),
+}
+
+
+def make_engine(skus: int, seed: int = 151) -> CatalogSearchEngine:
+    """Synthetic catalog with one or two types per SKU"""
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, len(POKEMON_TYPES), skus)
+    second = rng.integers(0, len(POKEMON_TYPES), skus)
+    dual = rng.random(skus) < 0.4
+    types = (np.uint32(1) << first.astype(np.uint32)) | np.where(
+        dual, np.uint32(1) << second.astype(np.uint32), np.uint32(0)
+    ).astype(np.uint32)
+
+    return CatalogSearchEngine(
+        numero=np.arange(1, skus + 1, dtype=np.int32),
+        precio=rng.integers(10, 1000, skus).astype(np.float64),
+        stock=rng.integers(0, 20, skus, dtype=np.int32),
+        en_venta=rng.random(skus) < 0.9,
+        types=types,
+        stats=rng.integers(5, 160, (skus, len(STAT_NAMES)), dtype=np.int16),
+    )
+
+
+def full_sort(engine: CatalogSearchEngine, query: dict):
+    """Same query but sorting every match (baseline for top-k)"""
+    rows, _ = engine.search(**{**query, "sort_by": None, "limit": len(engine)})
+    key = query["sort_by"].lstrip("-")
+    keys = engine._sort_column(key)[rows].astype(np.float64)
+    if query["sort_by"].startswith("-"):
+        keys = -keys
+    return rows[np.argsort(keys, kind="stable")[:query["limit"]]]
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of several runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog search benchmark")
+    parser.add_argument("--skus", default="10000,1000000,10000000",
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for skus in (int(s) for s in args.skus.split(",")):
+        start = time.perf_counter()
+        engine = make_engine(skus)
+        build = time.perf_counter() - start
+        print(f"\n📦 {skus:,} SKUs (generated in {build:.2f}s)")
+
+        for label, query in QUERIES.items():
+            rows, total = engine.search(**query)
+            elapsed = timed(lambda: engine.search(**query), args.repeat)
+            line = f"  {label:<28} {total:>11,} matches  {elapsed:9.3f} ms"
+
+            if query.get("sort_by"):
+                assert np.array_equal(rows, full_sort(engine, query))
+                baseline = timed(lambda: full_sort(engine, query), args.repeat)
+                line += f"  (full sort {baseline:9.3f} ms, {baseline / elapsed:4.1f}x)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Sales event log throughput benchmark
+
+Measures append throughput of SegmentedLog (batched, with and without
+fsync) and sequential read throughput of LogConsumer, including a seek to
+the middle of the log.
+
+Usage:
+    python benchmarks/bench_event_log.py --events 200000 --batch 500
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.events import SegmentedLog, LogConsumer
+
+
+def make_event(i: int) -> bytes:
+    """Sale event roughly the size of a real outbox payload"""
+    event = {
+        "outbox_id": i,
+        "event_type": "sale.completed",
+        "aggregate_id": f"txn_{i:08x}",
+        "created_at": "2025-10-21T00:00:00+00:00",
+        "payload": {
+            "transaction_id": f"txn_{i:08x}",
+            "cart_id": f"cart_pokemon_{i:08x}",
+            "status": "completed",
+            "total_amount": 25.0 + i % 100,
+            "currency": "USD",
+            "payment_method": "CARD",
+            "merchant_name": "PokeMart - Primera Generación",
+            "completed_at": "2025-10-21T00:00:00+00:00",
+            "items": [
+                {
+                    "pokemon_numero": 1 + i % 151,
+                    "pokemon_name": "pikachu",
+                    "quantity": 1,
+                    "unit_price": 25.0,
+                    "total_price": 25.0,
+                }
+            ],
+        },
+    }
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def bench_append(directory: Path, events: list, batch: int, fsync: bool, segment_mb: int):
+    log = SegmentedLog(directory, max_segment_bytes=segment_mb * 1024 * 1024, fsync=fsync)
+    start = time.perf_counter()
+    for i in range(0, len(events), batch):
+        log.append_batch(events[i:i + batch])
+    elapsed = time.perf_counter() - start
+    segments = len(log.segments())
+    log.close()
+    return elapsed, segments
+
+
+def bench_read(directory: Path, offset: int = 0):
+    consumer = LogConsumer(directory, offset=offset)
+    count = 0
+    size = 0
+    start = time.perf_counter()
+    while True:
+        batch = consumer.poll(5000)
+        if not batch:
+            break
+        count += len(batch)
+        size += sum(len(r.value) for r in batch)
+    elapsed = time.perf_counter() - start
+    consumer.close()
+    return elapsed, count, size
+
+
+def report(label: str, count: int, size: int, elapsed: float):
+    print(
+        f"  {label:<28} {count:>10,} events  {elapsed:8.3f}s  "
+        f"{count / elapsed:>12,.0f} ev/s  {size / elapsed / 1e6:8.1f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales event log benchmark")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--segment-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    events = [make_event(i) for i in range(args.events)]
+    total_bytes = sum(len(e) for e in events)
+    print(f"📦 {args.events:,} events, {total_bytes / 1e6:.1f} MB payload, batch={args.batch}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fsync in (False, True):
+            directory = Path(tmp) / f"log_fsync_{fsync}"
+            elapsed, segments = bench_append(
+                directory, events, args.batch, fsync, args.segment_mb
+            )
+            report(f"append (fsync={fsync}, {segments} seg)", args.events, total_bytes, elapsed)
+
+        directory = Path(tmp) / "log_fsync_True"
+        elapsed, count, size = bench_read(directory)
+        report("read from offset 0", count, size, elapsed)
+
+        elapsed, count, size = bench_read(directory, offset=args.events // 2)
+        report(f"read from offset {args.events // 2:,}", count, size, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the hot paths
+
+Times the per-checkout functions on fixed inputs: mandate hashing, JWT
+signing and validation, cart and transaction writes (temporary SQLite
+database) and CartMandate parsing and serialization. Each case is warmed
+up, calibrated so a round lasts --round-ms, and timed over --rounds
+rounds; the report gives median, IQR, min and mean per call.
+
+Baselines are JSON files (default benchmarks/bench_micro_baseline.json).
+--save writes one; --compare fails (exit 1) when a case's median is
+slower than the baseline by more than --threshold and by more than the
+rounds' spread (IQR), so noise alone does not fail it. Baselines only
+compare on the same machine and Python.
+
+Usage:
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --save
+    python benchmarks/bench_micro.py --compare --threshold 0.25
+    python benchmarks/bench_micro.py --filter jwt --rounds 30
+"""
+
+import argparse
+import contextlib
+import copy
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+BASELINE_PATH = Path(__file__).parent / "bench_micro_baseline.json"
+
+AMOUNT = {"currency": "USD", "value": 25.0}
+
+# Fixed CartMandate (three display items), as the MCP server builds it
+CART_MANDATE = {
+    "contents": {
+        "id": "cart_pokemon_bench",
+        "user_cart_confirmation_required": False,
+        "merchant_name": "PokeMart - Primera Generación",
+        "cart_expiry": "2025-01-01T01:00:00+00:00",
+        "payment_request": {
+            "method_data": [{"supported_methods": "CARD", "data": {}}],
+            "details": {
+                "id": "order_pokemon_bench",
+                "displayItems": [
+                    {"label": "Pikachu #25", "amount": AMOUNT},
+                    {"label": "Charmander #4 (x2)", "amount": {"currency": "USD", "value": 60.0}},
+                    {"label": "Squirtle #7", "amount": {"currency": "USD", "value": 28.0}},
+                ],
+                "total": {"label": "Total", "amount": {"currency": "USD", "value": 113.0}},
+            },
+            "options": {"requestPayerName": False, "requestPayerEmail": True},
+        },
+    },
+    "merchant_signature": "",
+    "timestamp": "2025-01-01T00:00:00+00:00",
+}
+
+
+def crypto_cases() -> Dict[str, Callable[[], object]]:
+    """Hashing, signing and validation"""
+    from src.common import utils
+    from src.common.jwt_validator import JWTValidator
+    from src.shopping_agent.agent import ShoppingAgent
+
+    cart = copy.deepcopy(CART_MANDATE)
+    cart["merchant_signature"] = utils.generate_merchant_signature(cart["contents"]["id"])
+    payment_mandate = ShoppingAgent().create_payment_mandate(cart, "tok_bench", "CARD")
+    contents = payment_mandate["payment_mandate_contents"]
+    cart_hash = utils.hash_cart_mandate(cart)
+    payment_hash = utils.hash_payment_mandate_contents(contents)
+
+    # Verify with the demo merchant key (what generate_merchant_signature signs with)
+    validator = JWTValidator(issuer_resolver=lambda issuer: None)
+    validator.merchant_public_key = utils.MERCHANT_PUBLIC_KEY
+
+    return {
+        "hash_object(cart contents)": lambda: utils.hash_object(cart["contents"]),
+        "hash_object(payment contents)": lambda: utils.hash_object(contents),
+        "generate_merchant_signature": lambda: utils.generate_merchant_signature("cart_pokemon_bench"),
+        "generate_user_authorization": lambda: utils.generate_user_authorization(cart_hash, payment_hash),
+        "JWTValidator.validate_merchant_signature": lambda: validator.validate_merchant_signature(cart),
+        "JWTValidator.validate_user_authorization": lambda: validator.validate_user_authorization(payment_mandate, cart),
+    }
+
+
+def model_cases() -> Dict[str, Callable[[], object]]:
+    """CartMandate parsing and serialization"""
+    from src.common import CartMandate
+
+    mandate = CartMandate(**CART_MANDATE)
+    return {
+        "CartMandate(**dict)": lambda: CartMandate(**CART_MANDATE),
+        "CartMandate.model_dump": mandate.model_dump,
+    }
+
+
+def repository_cases(directory: Path) -> Dict[str, Callable[[], object]]:
+    """Cart and transaction writes on a temporary SQLite database"""
+    from sqlalchemy.orm import Session
+
+    from src.database import Base, CartRepository, Pokemon, TransactionRepository, run_migrations
+    from src.database.engine import make_engine
+
+    engine = make_engine(f"sqlite:///{directory / 'bench_micro.db'}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    with Session(engine) as db:
+        for numero, nombre, precio in ((4, "charmander", 30), (7, "squirtle", 28), (25, "pikachu", 25)):
+            db.add(Pokemon(
+                numero=numero, nombre=nombre, precio=precio, en_venta=True,
+                inventario_total=10**9, inventario_disponible=10**9, inventario_vendido=0
+            ))
+        db.commit()
+
+    cart_db = Session(engine)
+    carts = CartRepository(cart_db)
+    cart = carts.get_or_create_cart("session_bench")
+    pikachu = cart_db.get(Pokemon, 25)
+
+    transaction_db = Session(engine)
+    transactions = TransactionRepository(transaction_db)
+    counter = itertools.count()
+    payment_mandate = {"payment_mandate_contents": {"payment_response": {"method_name": "CARD"}}}
+    items = [
+        {"pokemon_numero": 25, "quantity": 1, "unit_price": 25.0},
+        {"pokemon_numero": 4, "quantity": 2, "unit_price": 30.0},
+        {"pokemon_numero": 7, "quantity": 1, "unit_price": 28.0},
+    ]
+
+    def create_transaction():
+        n = next(counter)
+        return transactions.create(
+            transaction_id=f"txn_bench_{n}", cart_id=f"cart_bench_{n}",
+            cart_mandate=CART_MANDATE, payment_mandate=payment_mandate, items=items
+        )
+
+    return {
+        "CartRepository.add_item": lambda: carts.add_item(cart, pikachu, 1),
+        "TransactionRepository.create": create_transaction,
+    }
+
+
+def measure(fn: Callable[[], object], rounds: int, round_ms: float, warmup_ms: float) -> Dict[str, float]:
+    """Per-call time statistics (microseconds) over `rounds` calibrated rounds"""
+    deadline = time.perf_counter() + warmup_ms / 1000
+    while time.perf_counter() < deadline:
+        fn()
+
+    # Loops per round so that a round lasts about round_ms
+    loops = 1
+    while True:
+        began = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - began
+        if elapsed * 1000 >= round_ms / 2:
+            loops = max(1, int(loops * round_ms / 1000 / elapsed))
+            break
+        loops *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        began = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - began) / loops * 1e6)
+
+    q1, _, q3 = statistics.quantiles(per_call, n=4) if rounds > 1 else (per_call[0],) * 3
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "iqr_us": round(q3 - q1, 3),
+        "min_us": round(min(per_call), 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "rounds": rounds,
+        "loops": loops,
+    }
+
+
+def run_suite(args, directory: Path) -> Dict[str, Dict[str, float]]:
+    """Measure every case whose name contains --filter"""
+    results = {}
+    # The validators and the agent print on every call
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        cases = {**crypto_cases(), **model_cases(), **repository_cases(directory)}
+        for name, fn in cases.items():
+            if args.filter and args.filter.lower() not in name.lower():
+                continue
+            results[name] = measure(fn, args.rounds, args.round_ms, args.warmup_ms)
+            print(f"  {name:<44} {results[name]['median_us']:>10.1f} µs", file=sys.stderr)
+    return results
+
+
+def compare(baseline: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]], threshold: float) -> List[Tuple]:
+    """
+    (case, baseline median, current median, change, regressed) per shared case.
+
+    A case regresses when its median is slower by more than `threshold`
+    (0.25 = 25%) and by more than the larger IQR of the two runs.
+    """
+    rows = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        delta = now["median_us"] - before["median_us"]
+        change = delta / before["median_us"]
+        noise = max(before.get("iqr_us", 0), now.get("iqr_us", 0))
+        rows.append((name, before["median_us"], now["median_us"], change, change > threshold and delta > noise))
+    return rows
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of hashing, signing, validation, repositories and models")
+    parser.add_argument("--rounds", type=int, default=15, help="Timed rounds per case")
+    parser.add_argument("--round-ms", type=float, default=50, help="Target duration of a round")
+    parser.add_argument("--warmup-ms", type=float, default=200, help="Warm-up time per case")
+    parser.add_argument("--filter", help="Only cases whose name contains this")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Write the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail if a case regressed against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown of the median (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    print(f"⏱️  {args.rounds} rounds of ~{args.round_ms:g} ms per case (Python {platform.python_version()})", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix="bench_micro_") as tmp:
+        results = run_suite(args, Path(tmp))
+
+    print(f"\n  {'case':<44} {'median µs':>10} {'iqr':>8} {'min':>10} {'mean':>10} {'ops/s':>10}")
+    for name, r in results.items():
+        print(f"  {name:<44} {r['median_us']:10.1f} {r['iqr_us']:8.1f} {r['min_us']:10.1f} "
+              f"{r['mean_us']:10.1f} {1e6 / r['median_us']:10,.0f}")
+
+    if args.save:
+        baseline = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "environment": environment(),
+            "settings": {"rounds": args.rounds, "round_ms": args.round_ms, "warmup_ms": args.warmup_ms},
+            "results": results,
+        }
+        if args.filter and args.baseline.exists():
+            # Keep the cases this run did not measure
+            baseline["results"] = {**json.loads(args.baseline.read_text())["results"], **results}
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {args.baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())
+        recorded = baseline.get("environment", {}).get("python")
+        if recorded != platform.python_version():
+            print(f"\n⚠️  Baseline was recorded on Python {recorded or 'unknown'}")
+        rows = compare(baseline["results"], results, args.threshold)
+        print(f"\n  {'case':<44} {'baseline':>10} {'now':>10} {'change':>8}")
+        for name, before, now, change, regressed in rows:
+            flag = "  ❌ regressed" if regressed else ""
+            print(f"  {name:<44} {before:10.1f} {now:10.1f} {change:+8.1%}{flag}")
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\n✅ No case slower than the baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
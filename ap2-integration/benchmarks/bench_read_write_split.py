@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Read/write engine split benchmark
+
+Measures checkout write latency (TransactionRepository.create, one commit
+per sale, and the part spent waiting for a pooled connection) alone and under
+--read-ratio times as many read pages (listing, inventory stats, sales
+report), issued at the same pace by that many reader threads. Readers
+either share the writer's engine and pool ("shared") or use the
+read-only engine with its own pool ("split"), as ReadSessionLocal does.
+
+Usage:
+    python benchmarks/bench_read_write_split.py --writes 150 --read-ratio 10
+    python benchmarks/bench_read_write_split.py --pool-size 2 --max-overflow 0
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import (
+    Base,
+    PokemonRepository,
+    SalesRollupRepository,
+    TransactionRepository,
+    run_migrations,
+)
+from src.database.engine import make_engine, make_read_engine
+from src.database.synthetic import SyntheticDataGenerator
+
+
+def prepare(path: Path, transactions: int):
+    """Synthetic database with unlimited stock for the benchmark sales"""
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    SyntheticDataGenerator(seed=43).generate(engine, pokemon=151, transactions=transactions)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE pokemon SET en_venta = 1, inventario_disponible = 1000000"))
+        catalog = conn.execute(text("SELECT numero, nombre, precio FROM pokemon")).all()
+    engine.dispose()
+    return [tuple(row) for row in catalog]
+
+
+def sales(catalog, count: int, first_id: int):
+    """Checkout payloads for TransactionRepository.create"""
+    generator = SyntheticDataGenerator(seed=first_id)
+    for row, items in generator.transaction_rows(count, catalog, first_id=first_id):
+        yield dict(
+            transaction_id=row["transaction_id"],
+            cart_id=row["cart_id"],
+            cart_mandate=row["cart_mandate"],
+            payment_mandate=row["payment_mandate"],
+            items=[
+                {"pokemon_numero": i["pokemon_numero"], "quantity": i["quantity"], "unit_price": i["unit_price"]}
+                for i in items
+            ],
+        )
+
+
+def read_once(db):
+    """One page worth of read-only queries"""
+    TransactionRepository(db).get_all(limit=20)
+    PokemonRepository(db).get_inventory_stats()
+    SalesRollupRepository(db).units_by_pokemon(limit=10)
+
+
+def run(path: Path, catalog, mode: str, args, first_id: int):
+    """Write latencies and pool waits (ms), and reads per second, for one mode"""
+    pool = dict(pool_size=args.pool_size, max_overflow=args.max_overflow)
+    writer = make_engine(f"sqlite:///{path}", **pool)
+    write_factory = sessionmaker(bind=writer, autocommit=False, autoflush=False)
+    if mode == "split":
+        reader = make_read_engine(writer)
+        read_factory = sessionmaker(bind=reader, autocommit=False, autoflush=False)
+    else:
+        reader, read_factory = writer, write_factory
+
+    done = threading.Event()
+    reads = []
+
+    def read_loop():
+        count = 0
+        while not done.wait(args.interval):
+            with read_factory() as db:
+                read_once(db)
+            count += 1
+        reads.append(count)
+
+    threads = [threading.Thread(target=read_loop) for _ in range(args.read_ratio if mode != "alone" else 0)]
+    for thread in threads:
+        thread.start()
+
+    latencies, waits = [], []
+    start = time.perf_counter()
+    for sale in sales(catalog, args.writes, first_id):
+        began = time.perf_counter()
+        with write_factory() as db:
+            db.connection()  # pool checkout
+            waits.append((time.perf_counter() - began) * 1000)
+            TransactionRepository(db).create(**sale)
+        latencies.append((time.perf_counter() - began) * 1000)
+        time.sleep(args.interval)
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    for thread in threads:
+        thread.join()
+    writer.dispose()
+    reader.dispose()
+    return np.array(latencies), np.array(waits), sum(reads) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read/write engine split benchmark")
+    parser.add_argument("--writes", type=int, default=150, help="Sales written per mode")
+    parser.add_argument("--read-ratio", type=int, default=10, help="Read pages per sale (one reader thread each)")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between sales (and between reads of a reader)")
+    parser.add_argument("--transactions", type=int, default=20_000, help="Existing transactions")
+    parser.add_argument("--pool-size", type=int, default=5, help="Writer pool size")
+    parser.add_argument("--max-overflow", type=int, default=10, help="Writer pool overflow")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        catalog = prepare(path, args.transactions)
+        print(
+            f"📦 {args.transactions:,} transactions; {args.writes} sales per mode, "
+            f"{args.read_ratio}x reads, writer pool {args.pool_size}+{args.max_overflow}"
+        )
+        print(
+            f"  {'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+            f"{'wait p99':>9} {'reads/s':>9}"
+        )
+        for n, mode in enumerate(("alone", "shared", "split")):
+            latencies, waits, reads_per_second = run(path, catalog, mode, args, first_id=10_000_000 * (n + 1))
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(
+                f"  {mode:<8} {p50:8.2f} {p95:8.2f} {p99:8.2f} {latencies.max():8.2f} "
+                f"{np.percentile(waits, 99):9.2f} {reads_per_second:9,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
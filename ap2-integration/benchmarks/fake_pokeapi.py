@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Local PokeAPI stand-in
+
+Serves the PokeAPI endpoints the MCP server calls (/api/v2/pokemon/{id or
+name}, /api/v2/type, /api/v2/type/{name}) from the offline species data
+(pokemon-gen1-species.json), so load tests and MCP tests run without the
+network. Point the MCP server at it with POKEAPI_BASE_URL. --latency-ms
+adds a fixed delay per request to mimic the real API.
+
+Usage:
+    python benchmarks/fake_pokeapi.py --port 8765
+    POKEAPI_BASE_URL=http://127.0.0.1:8765/api/v2 python -m src.all_agents
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.catalog import load_species
+
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{variant}{numero}.png"
+
+
+def pokemon_resource(species: dict) -> dict:
+    """/pokemon/{id} response with the fields the MCP server reads"""
+    numero = species["numero"]
+    return {
+        "id": numero,
+        "name": species["nombre"],
+        "height": 0,
+        "weight": 0,
+        "types": [
+            {"slot": slot, "type": {"name": name, "url": f"/api/v2/type/{name}/"}}
+            for slot, name in enumerate(species["types"], start=1)
+        ],
+        "abilities": [],
+        "stats": [
+            {"base_stat": value, "effort": 0, "stat": {"name": name}}
+            for name, value in species["stats"].items()
+        ],
+        "sprites": {
+            "front_default": SPRITE_URL.format(variant="", numero=numero),
+            "front_shiny": SPRITE_URL.format(variant="shiny/", numero=numero),
+        },
+    }
+
+
+def create_app(species: Dict[int, dict] = None, latency_ms: float = 0) -> FastAPI:
+    """PokeAPI stand-in over the given species (default: the offline snapshot)"""
+    species = species if species is not None else load_species()
+    by_name = {entry["nombre"]: entry for entry in species.values()}
+    types = sorted({name for entry in species.values() for name in entry["types"]})
+
+    app = FastAPI(title="Fake PokeAPI")
+
+    @app.middleware("http")
+    async def delay(request, call_next):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return await call_next(request)
+
+    @app.get("/api/v2/pokemon/{identifier}")
+    async def get_pokemon(identifier: str):
+        identifier = identifier.strip("/").lower()
+        entry = species.get(int(identifier)) if identifier.isdigit() else by_name.get(identifier)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return pokemon_resource(entry)
+
+    @app.get("/api/v2/type")
+    async def list_types():
+        return {
+            "count": len(types),
+            "results": [{"name": name, "url": f"/api/v2/type/{name}/"} for name in types],
+        }
+
+    @app.get("/api/v2/type/{name}")
+    async def get_type(name: str):
+        name = name.strip("/").lower()
+        if name not in types:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return {
+            "name": name,
+            "pokemon": [
+                {"slot": entry["types"].index(name) + 1,
+                 "pokemon": {"name": entry["nombre"], "url": f"/api/v2/pokemon/{numero}/"}}
+                for numero, entry in sorted(species.items())
+                if name in entry["types"]
+            ],
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local PokeAPI stand-in (offline species data)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    print(f"🧪 Fake PokeAPI on http://{args.host}:{args.port}/api/v2")
+    uvicorn.run(create_app(latency_ms=args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test
+
+Drives user journeys against the web UI: search -> add to cart -> get
+cart -> checkout, each virtual user with its own session cookie. Arrivals
+are open-loop (--rate journeys per second, Poisson) or closed-loop
+(--rate 0: --users journeys back to back), with at most --users journeys
+in flight either way.
+
+Without --url it starts its own stack, offline: the fake PokeAPI
+(benchmarks/fake_pokeapi.py, wired in with POKEAPI_BASE_URL) and all
+agents in one server (python -m src.all_agents, --workers uvicorn
+workers) on a temporary copy of the catalog with plenty of stock. The
+cart and sprite lookups go through the MCP server, so it must be built
+(make build).
+
+Reports latency percentiles per endpoint and per AP2 checkout step (from
+the checkout's Server-Timing header) and saves them as JSON under
+benchmarks/results/, named with the commit, for --compare and --diff.
+Exits with status 1 when no journey completed.
+
+Not covered: the real PokeAPI (the fake one has no rate limits and a
+fixed --pokeapi-latency-ms), agents on separate hosts (all_agents serves
+them from one process), PostgreSQL (the stack runs on SQLite), sold-out
+items (stock never runs out) and sprite lookups.
+
+Usage:
+    python benchmarks/loadtest.py --journeys 200 --users 8
+    python benchmarks/loadtest.py --duration 60 --rate 5 --users 20 --workers 2
+    python benchmarks/loadtest.py --url http://localhost:8000 --journeys 100
+    python benchmarks/loadtest.py --journeys 200 --compare benchmarks/results/loadtest-<old>.json
+    python benchmarks/loadtest.py --diff benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+AP2_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(AP2_DIR))
+
+RESULTS_DIR = Path(__file__).parent / "results"
+MCP_SERVER_BUILD = AP2_DIR.parent / "mcp-server" / "build" / "index.js"
+CATALOG_JSON = AP2_DIR.parent / "pokemon-gen1.json"
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """{"charge": 40.1, ...} from "charge;dur=40.1, ..." (entries without dur are skipped)"""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if name and key == "dur":
+                timings[name] = float(value)
+    return timings
+
+
+def summarize(latencies: List[float], errors: int = 0) -> Dict[str, float]:
+    """Count, errors, mean, max and percentiles (ms) of a latency sample"""
+    summary = {"count": len(latencies), "errors": errors}
+    if latencies:
+        values = np.array(latencies)
+        summary["mean"] = round(float(values.mean()), 2)
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            summary[f"p{p}"] = round(float(value), 2)
+        summary["max"] = round(float(values.max()), 2)
+    return summary
+
+
+class Recorder:
+    """Latencies per endpoint and per AP2 step"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, List[float]] = defaultdict(list)
+        self.steps: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: List[str] = []
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, path: str, **kwargs):
+        """One request, timed under `endpoint`; None on failure"""
+        began = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.errors[endpoint] += 1
+            if len(self.error_samples) < 5:
+                response = getattr(e, "response", None)
+                detail = f"{response.status_code} {response.text[:200]}" if response is not None else repr(e)
+                self.error_samples.append(f"{endpoint}: {detail}")
+            return None
+        self.endpoints[endpoint].append((time.perf_counter() - began) * 1000)
+        return response
+
+    def report(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return {
+            "endpoints": {
+                name: summarize(self.endpoints.get(name, []), self.errors.get(name, 0))
+                for name in sorted(set(self.endpoints) | set(self.errors))
+            },
+            "ap2_steps": {name: summarize(values) for name, values in self.steps.items()},
+        }
+
+
+async def journey(base_url: str, product: tuple, recorder: Recorder) -> bool:
+    """search -> add to cart -> get cart -> checkout, as a new user"""
+    numero, nombre = product
+    began = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        steps = (
+            ("GET /api/search", "GET", "/api/search", {"params": {"query": nombre[:4], "limit": 10}}),
+            ("POST /api/cart/add", "POST", "/api/cart/add", {"json": {"pokemon_id": str(numero), "quantity": 1}}),
+            ("GET /api/cart", "GET", "/api/cart", {}),
+            ("POST /api/cart/checkout", "POST", "/api/cart/checkout", {}),
+        )
+        for endpoint, method, path, kwargs in steps:
+            response = await recorder.call(client, endpoint, method, path, **kwargs)
+            if response is None:
+                recorder.errors["journey"] += 1
+                return False
+
+    for step, ms in parse_server_timing(response.headers.get("Server-Timing", "")).items():
+        recorder.steps[step].append(ms)
+    recorder.endpoints["journey"].append((time.perf_counter() - began) * 1000)
+    return True
+
+
+async def run_load(base_url: str, products: List[tuple], args) -> Dict:
+    """Run the journeys; returns the report"""
+    rng = np.random.default_rng(args.seed)
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.users)
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def more(started: int) -> bool:
+        if deadline is not None:
+            return time.monotonic() < deadline
+        return started < args.journeys
+
+    def pick() -> tuple:
+        return products[rng.integers(len(products))]
+
+    async def limited(product):
+        async with semaphore:
+            await journey(base_url, product, recorder)
+
+    started = 0
+    began = time.perf_counter()
+    if args.rate > 0:
+        # Open loop: arrivals do not wait for earlier journeys
+        tasks = []
+        while more(started):
+            tasks.append(asyncio.create_task(limited(pick())))
+            started += 1
+            await asyncio.sleep(rng.exponential(1 / args.rate))
+        await asyncio.gather(*tasks)
+    else:
+        # Closed loop: each user starts its next journey when one ends
+        async def user():
+            nonlocal started
+            while more(started):
+                started += 1
+                await journey(base_url, pick(), recorder)
+
+        await asyncio.gather(*(user() for _ in range(args.users)))
+    elapsed = time.perf_counter() - began
+
+    report = recorder.report()
+    completed = len(recorder.endpoints.get("journey", []))
+    report["throughput"] = {
+        "journeys_started": started,
+        "journeys_completed": completed,
+        "seconds": round(elapsed, 2),
+        "journeys_per_second": round(completed / elapsed, 2) if elapsed else 0,
+    }
+    report["error_samples"] = recorder.error_samples
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 60):
+    """Wait until a URL answers 200"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def prepare_catalog(path: Path) -> List[tuple]:
+    """Catalog database for the run; returns the (numero, nombre) on sale"""
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+
+    from src.database import Base, CatalogImporter, read_records, run_migrations
+    from src.database.engine import make_engine
+
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    with Session(engine) as db:
+        CatalogImporter(db).load(read_records(CATALOG_JSON))
+    with engine.begin() as conn:
+        # The MCP server prices and checks carts against pokemon-gen1.json,
+        # so only journeys on Pokemon it sells; the DB stock never runs out
+        products = conn.execute(text(
+            "SELECT numero, nombre FROM pokemon WHERE en_venta AND inventario_disponible > 0"
+        )).all()
+        conn.execute(text("UPDATE pokemon SET inventario_disponible = 1000000"))
+    engine.dispose()
+    return [tuple(row) for row in products]
+
+
+class Stack:
+    """Fake PokeAPI + all agents in one server, on a temporary database"""
+
+    def __init__(self, args):
+        self.args = args
+        self.tmp = tempfile.TemporaryDirectory(prefix="loadtest_")
+        self.processes: List[subprocess.Popen] = []
+        self.url = None
+        self.products: List[tuple] = []
+
+    def __enter__(self):
+        if not MCP_SERVER_BUILD.exists():
+            raise SystemExit(f"❌ MCP server not built ({MCP_SERVER_BUILD}); run make build first")
+        tmp = Path(self.tmp.name)
+        self.products = prepare_catalog(tmp / "loadtest.db")
+
+        pokeapi_port, web_port = free_port(), free_port()
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp / 'loadtest.db'}",
+            SALES_EVENT_LOG_DIR=str(tmp / "sales_events"),
+            POKEAPI_BASE_URL=f"http://127.0.0.1:{pokeapi_port}/api/v2",
+            ALL_AGENTS_PORT=str(web_port),
+            WORKERS=str(self.args.workers),
+        )
+        log = open(tmp / "servers.log", "w")
+        self.processes.append(subprocess.Popen(
+            [sys.executable, str(Path(__file__).parent / "fake_pokeapi.py"),
+             "--port", str(pokeapi_port), "--latency-ms", str(self.args.pokeapi_latency_ms)],
+            cwd=AP2_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        ))
+        self.processes.append(subprocess.Popen(
+            [sys.executable, "-m", "src.all_agents"],
+            cwd=AP2_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        ))
+        try:
+            wait_ready(f"{env['POKEAPI_BASE_URL']}/type")
+            self.url = f"http://127.0.0.1:{web_port}"
+            wait_ready(f"{self.url}/health")
+        except RuntimeError:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        for process in self.processes:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.tmp.cleanup()
+
+
+def git_commit() -> Optional[str]:
+    """Short commit of the tree under test ("+dirty" if modified)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=AP2_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=AP2_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if dirty else commit
+
+
+def print_report(result: Dict):
+    """Percentile tables of a result"""
+    for section in ("endpoints", "ap2_steps"):
+        print(f"\n  {section:<26} {'n':>6} {'err':>5} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+        for name, s in result[section].items():
+            cells = " ".join(f"{s.get(k, float('nan')):9.1f}" for k in ("p50", "p90", "p95", "p99", "max"))
+            print(f"  {name:<26} {s['count']:6d} {s['errors']:5d} {cells}")
+    t = result["throughput"]
+    print(f"\n  {t['journeys_completed']}/{t['journeys_started']} journeys in {t['seconds']}s "
+          f"({t['journeys_per_second']} per second)")
+    for sample in result.get("error_samples", []):
+        print(f"  ⚠️  {sample}")
+
+
+def compare(baseline: Dict, current: Dict) -> List[tuple]:
+    """(section, name, metric, before, after, change %) for the p50/p95/p99 both results have"""
+    rows = []
+    for section in ("endpoints", "ap2_steps"):
+        for name, after in current[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            for metric in ("p50", "p95", "p99"):
+                if metric in before and metric in after and before[metric]:
+                    change = (after[metric] - before[metric]) / before[metric] * 100
+                    rows.append((section, name, metric, before[metric], after[metric], change))
+    before_rate = baseline.get("throughput", {}).get("journeys_per_second")
+    after_rate = current["throughput"]["journeys_per_second"]
+    if before_rate:
+        rows.append(("throughput", "journeys", "per_s", before_rate, after_rate,
+                     (after_rate - before_rate) / before_rate * 100))
+    return rows
+
+
+def print_comparison(baseline: Dict, current: Dict):
+    print(f"\n📊 {baseline.get('commit')} -> {current.get('commit')}")
+    print(f"  {'':<38} {'before':>9} {'after':>9} {'change':>8}")
+    for section, name, metric, before, after, change in compare(baseline, current):
+        print(f"  {section + ' ' + name + ' ' + metric:<38} {before:9.1f} {after:9.1f} {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the web UI checkout journey")
+    parser.add_argument("--url", help="Web UI to test (default: start an offline stack)")
+    parser.add_argument("--journeys", type=int, default=100, help="Journeys to run (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead")
+    parser.add_argument("--users", type=int, default=8, help="Journeys in flight at most")
+    parser.add_argument("--rate", type=float, default=0, help="Arrivals per second (0: closed loop)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started stack")
+    parser.add_argument("--pokeapi-latency-ms", type=float, default=0, help="Delay of the fake PokeAPI")
+    parser.add_argument("--seed", type=int, default=47)
+    parser.add_argument("--output", type=Path, help=f"Result file (default: {RESULTS_DIR.name}/loadtest-<time>-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Saved result to compare this run with")
+    parser.add_argument("--diff", type=Path, nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved results and exit")
+    args = parser.parse_args()
+
+    if args.diff:
+        before, after = (json.loads(path.read_text()) for path in args.diff)
+        print_comparison(before, after)
+        return
+
+    config = {k: v for k, v in vars(args).items() if k in (
+        "url", "journeys", "duration", "users", "rate", "workers", "pokeapi_latency_ms", "seed"
+    )}
+    print(f"🚚 Load test: {config}")
+    if args.url:
+        response = httpx.get(f"{args.url}/api/search", params={"limit": 1000}, timeout=30)
+        response.raise_for_status()
+        products = [(p["number"], p["name"]) for p in response.json()]
+        result = asyncio.run(run_load(args.url, products, args))
+    else:
+        with Stack(args) as stack:
+            result = asyncio.run(run_load(stack.url, stack.products, args))
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+        **result,
+    }
+    print_report(result)
+
+    output = args.output or RESULTS_DIR / (
+        f"loadtest-{datetime.now():%Y%m%d-%H%M%S}-{(result['commit'] or 'nogit').replace('+', '-')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"\n💾 Saved {output}")
+
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text()), result)
+
+    if not result["throughput"]["journeys_completed"]:
+        sys.exit("❌ No journey completed; the run measured only the steps before the first error")
+
+
+if __name__ == "__main__":
+    main()
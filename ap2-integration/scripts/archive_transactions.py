@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Archive old transactions
+
+Moves completed transactions older than a cutoff (and their items) from
+the hot database into monthly archive files (transactions-YYYY-MM.db).
+TransactionRepository.get_by_id still finds them there. Safe to re-run
+or to run from cron.
+
+Usage:
+    python scripts/archive_transactions.py                          # older than TRANSACTION_ARCHIVE_AFTER_DAYS
+    python scripts/archive_transactions.py --older-than-days 90 --vacuum
+    python scripts/archive_transactions.py --before 2025-01-01 --dry-run
+    python scripts/archive_transactions.py --db /tmp/scale.db --archive-dir /tmp/scale_archive
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import engine as default_engine, init_db
+from src.database.archive import (
+    ARCHIVE_AFTER_DAYS,
+    ArchiveMismatchError,
+    TransactionArchive,
+    transaction_archive,
+)
+from src.database.dialect import UnsupportedDatabaseError
+
+
+def parse_before(value: str) -> datetime:
+    """ISO date or datetime, UTC if no offset is given"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old completed transactions to monthly archives")
+    cutoff = parser.add_mutually_exclusive_group()
+    cutoff.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"Archive transactions older than this (default: {ARCHIVE_AFTER_DAYS})")
+    cutoff.add_argument("--before", type=parse_before, help="Archive transactions created before this date")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Transactions per DB transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be moved")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the hot database afterwards")
+    parser.add_argument("--db", type=Path, help="SQLite file (default: the marketplace database)")
+    parser.add_argument("--archive-dir", type=Path, help="Archive directory of this database (default: next to the database)")
+    args = parser.parse_args()
+
+    if args.db:
+        engine = create_engine(f"sqlite:///{args.db}")
+    else:
+        init_db()
+        engine = default_engine
+
+    archive = TransactionArchive(args.archive_dir) if args.archive_dir else transaction_archive(engine)
+    if archive is None:
+        print("❌ This database has no archive directory (use --archive-dir)")
+        sys.exit(1)
+
+    before = args.before or datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    print(f"\n📦 Archiving completed transactions created before {before.isoformat()}")
+    print(f"   into {archive.directory}{' (dry run)' if args.dry_run else ''}")
+
+    start = time.perf_counter()
+    try:
+        moved = archive.archive(engine, before, batch_size=args.batch_size, dry_run=args.dry_run)
+    except (UnsupportedDatabaseError, ArchiveMismatchError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    for month, count in sorted(moved.items()):
+        print(f"   {month}: {count:>8,}")
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"✅ {verb} {sum(moved.values()):,} transactions in {elapsed:.2f}s")
+
+    if args.vacuum and not args.dry_run:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        print("🧹 Hot database vacuumed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Backfill sales rollups
+
+Rebuilds daily_revenue and daily_pokemon_sales from completed transactions,
+hot and archived (monthly archive files). Safe to re-run: the selected range is cleared before it is recomputed.
+
+Usage:
+    python scripts/backfill_sales_rollups.py                      # all history
+    python scripts/backfill_sales_rollups.py --start 2025-10-01 --end 2025-10-31
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import init_db, SessionLocal, SalesRollupRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily sales rollups")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    init_db()
+
+    range_label = f"{args.start or 'beginning'} → {args.end or 'today'}"
+    print(f"\n🔄 Rebuilding sales rollups ({range_label})...")
+
+    start_time = time.perf_counter()
+    with SessionLocal() as db:
+        counts = SalesRollupRepository(db).rebuild(start=args.start, end=args.end)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"✅ daily_revenue rows:       {counts['daily_revenue']}")
+    print(f"✅ daily_pokemon_sales rows: {counts['daily_pokemon_sales']}")
+    print(f"⏱️  Done in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
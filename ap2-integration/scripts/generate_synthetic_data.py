@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator
+
+Writes a seeded synthetic marketplace (Pokemon listings, carts with items,
+historical transactions with AP2 mandates) into a database file with bulk
+inserts, for scale tests and benchmarks. The same --seed and --now give
+the same rows.
+
+Usage:
+    python scripts/generate_synthetic_data.py /tmp/scale.db --pokemon 100000 --carts 200000 --transactions 200000
+    python scripts/generate_synthetic_data.py /tmp/scale.db --transactions 50000 --rollups   # append
+    python scripts/generate_synthetic_data.py /tmp/scale.db --pokemon 1000 --seed 7 --now 2025-10-01 --overwrite
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import Base, run_migrations, SalesRollupRepository
+from src.database.synthetic import SyntheticDataGenerator, DEFAULT_BATCH_SIZE
+
+
+def parse_now(value: str) -> datetime:
+    """ISO date or datetime, UTC if no offset is given"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic marketplace database")
+    parser.add_argument("db", type=Path, help="Target SQLite file (created if missing)")
+    parser.add_argument("--pokemon", type=int, default=0, help="Pokemon listings to add")
+    parser.add_argument("--carts", type=int, default=0, help="Carts (with items) to add")
+    parser.add_argument("--transactions", type=int, default=0, help="Transactions (with items) to add")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--now", type=parse_now, help="Reference time (default: now, UTC)")
+    parser.add_argument("--days", type=int, default=365, help="Days of transaction history")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per executemany batch")
+    parser.add_argument("--rollups", action="store_true",
+                        help="Rebuild daily sales rollups afterwards")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Delete the target file first")
+    args = parser.parse_args()
+
+    if not (args.pokemon or args.carts or args.transactions):
+        parser.error("nothing to generate (use --pokemon, --carts and/or --transactions)")
+
+    if args.overwrite and args.db.exists():
+        args.db.unlink()
+        print(f"🗑️  Removed {args.db}")
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    print(f"🗄️  Target database: {args.db}")
+
+    generator = SyntheticDataGenerator(
+        seed=args.seed, now=args.now, days=args.days, batch_size=args.batch_size
+    )
+
+    def progress(label: str, rows: int, elapsed: float):
+        print(f"   {label:<13} {rows:>12,}  {rows / elapsed if elapsed else 0:>10,.0f} rows/s", end="\r")
+
+    print(f"🎲 seed={args.seed} now={generator.now.isoformat()}")
+    try:
+        stats = generator.generate(
+            engine, pokemon=args.pokemon, carts=args.carts,
+            transactions=args.transactions, progress=progress
+        )
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+    print(" " * 60, end="\r")
+    for table in ("pokemon", "pokemon_types", "carts", "cart_items", "transactions", "transaction_items"):
+        if table in stats:
+            print(f"✅ {table:<18} {stats[table]:>12,}")
+    print(f"⏱️  {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+    if args.rollups:
+        start = time.perf_counter()
+        with sessionmaker(bind=engine)() as db:
+            counts = SalesRollupRepository(db).rebuild()
+        print(f"📊 Rollups: {counts['daily_revenue']:,} daily_revenue, "
+              f"{counts['daily_pokemon_sales']:,} daily_pokemon_sales "
+              f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,191 +1,132 @@
 #!/usr/bin/env python3
 """
-Migration script: JSON to SQLite
+Catalog importer: JSON / NDJSON / CSV to the database
 
-Migrates pokemon-gen1.json data to SQLite database.
-Run this once to populate the database with initial Pokemon catalog.
+Streams a catalog file and upserts it in executemany batches inside a
+single transaction, reporting rows per second. Non-interactive, so it can
+run in CI and provisioning scripts.
+
+Usage:
+    python scripts/migrate_json_to_db.py                          # pokemon-gen1.json
+    python scripts/migrate_json_to_db.py catalog.ndjson --batch-size 5000
+    python scripts/migrate_json_to_db.py catalog.csv --dry-run    # diff only
+    python scripts/migrate_json_to_db.py catalog.json --replace   # drop rows not in file
+    python scripts/migrate_json_to_db.py catalog.json --db /tmp/scale.db
 """
 
-import json
+import argparse
 import sys
+import time
 from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
-from src.database import init_db, SessionLocal, Pokemon
-
-
-def load_pokemon_json():
-    """Load Pokemon data from JSON file"""
-    json_path = Path(__file__).parent.parent.parent / "pokemon-gen1.json"
-    
-    if not json_path.exists():
-        raise FileNotFoundError(f"Pokemon JSON not found: {json_path}")
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    return data
-
-
-def migrate_pokemon_to_db():
-    """Migrate all Pokemon from JSON to database"""
-    print("\n" + "="*60)
-    print("🔄 MIGRATING POKEMON DATA TO DATABASE")
-    print("="*60)
-    
-    # Load JSON data
-    print("\n📂 Loading pokemon-gen1.json...")
-    pokemon_data = load_pokemon_json()
-    print(f"✅ Loaded {len(pokemon_data)} Pokemon from JSON")
-    
-    # Initialize database
-    print("\n🗄️  Initializing database...")
-    init_db()
-    
-    # Create session
-    db = SessionLocal()
-    
-    try:
-        # Check if data already exists
-        existing_count = db.query(Pokemon).count()
-        
-        if existing_count > 0:
-            print(f"\n⚠️  Database already contains {existing_count} Pokemon")
-            response = input("   Clear and re-import? (yes/no): ").strip().lower()
-            
-            if response == "yes":
-                print("   Deleting existing data...")
-                db.query(Pokemon).delete()
-                db.commit()
-                print("   ✅ Existing data cleared")
-            else:
-                print("   ❌ Migration cancelled")
-                return
-        
-        # Insert Pokemon
-        print(f"\n💾 Inserting {len(pokemon_data)} Pokemon into database...")
-        
-        inserted = 0
-        errors = 0
-        
-        for poke_data in pokemon_data:
-            try:
-                pokemon = Pokemon(
-                    numero=poke_data["numero"],
-                    nombre=poke_data["nombre"],
-                    precio=poke_data["precio"],
-                    en_venta=poke_data.get("enVenta", True),
-                    inventario_total=poke_data["inventario"]["total"],
-                    inventario_disponible=poke_data["inventario"]["disponibles"],
-                    inventario_vendido=poke_data["inventario"]["vendidos"],
-                )
-                
-                db.add(pokemon)
-                inserted += 1
-                
-                # Progress indicator
-                if inserted % 10 == 0:
-                    print(f"   Progress: {inserted}/{len(pokemon_data)}", end="\r")
-                
-            except Exception as e:
-                errors += 1
-                print(f"\n   ❌ Error with {poke_data.get('nombre', '???')}: {e}")
-        
-        # Commit all changes
-        print(f"\n   Committing changes...")
-        db.commit()
-        
-        # Summary
-        print("\n" + "="*60)
-        print("✅ MIGRATION COMPLETE")
-        print("="*60)
-        print(f"   • Inserted: {inserted} Pokemon")
-        print(f"   • Errors: {errors}")
-        print(f"   • Total in DB: {db.query(Pokemon).count()}")
-        
-        # Show sample
-        print("\n📊 Sample Pokemon in database:")
-        sample = db.query(Pokemon).limit(5).all()
-        for p in sample:
-            print(f"   • #{p.numero:03d} {p.nombre}: ${p.precio} "
-                  f"({p.inventario_disponible}/{p.inventario_total} available)")
-        
-    except Exception as e:
-        print(f"\n❌ Migration failed: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
-
-
-def verify_migration():
-    """Verify migration was successful"""
-    print("\n" + "="*60)
-    print("🔍 VERIFYING MIGRATION")
-    print("="*60)
-    
-    db = SessionLocal()
-    
-    try:
-        # Count total
-        total = db.query(Pokemon).count()
-        print(f"\n✅ Total Pokemon in database: {total}")
-        
-        # Check inventory
-        available = db.query(Pokemon).filter(Pokemon.en_venta == True).count()
-        print(f"✅ Pokemon available for sale: {available}")
-        
-        # Check total inventory
-        from sqlalchemy import func
-        total_stock = db.query(
-            func.sum(Pokemon.inventario_disponible)
-        ).scalar() or 0
-        print(f"✅ Total stock available: {total_stock} units")
-        
-        # Price range
-        min_price = db.query(func.min(Pokemon.precio)).scalar()
-        max_price = db.query(func.max(Pokemon.precio)).scalar()
-        avg_price = db.query(func.avg(Pokemon.precio)).scalar()
-        print(f"✅ Price range: ${min_price} - ${max_price} (avg: ${avg_price:.2f})")
-        
-        # Most expensive
-        print("\n💎 Most expensive Pokemon:")
-        expensive = db.query(Pokemon).order_by(
-            Pokemon.precio.desc()
-        ).limit(3).all()
-        for p in expensive:
-            print(f"   • {p.nombre}: ${p.precio}")
-        
-        # Cheapest
-        print("\n💰 Cheapest Pokemon:")
-        cheap = db.query(Pokemon).order_by(Pokemon.precio).limit(3).all()
-        for p in cheap:
-            print(f"   • {p.nombre}: ${p.precio}")
-        
-        print("\n" + "="*60)
-        print("✅ VERIFICATION COMPLETE")
-        print("="*60)
-        
-    finally:
-        db.close()
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import init_db, SessionLocal, Base, Pokemon, run_migrations
+from src.database.importer import CatalogImporter, read_records, detect_format, FORMATS
+
+DEFAULT_CATALOG = Path(__file__).parent.parent.parent / "pokemon-gen1.json"
+
+
+def session_factory_for(db_path):
+    """Session factory for the project database or a given SQLite file"""
+    if db_path is None:
+        init_db()
+        return SessionLocal
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    print(f"🗄️  Target database: {db_path}")
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def print_diff(result: dict, replace: bool):
+    """Print dry-run counts and sample changes"""
+    print("\n📋 Dry run (nothing written):")
+    print(f"   • New:       {result['new']:,}")
+    print(f"   • Changed:   {result['changed']:,}")
+    print(f"   • Unchanged: {result['unchanged']:,}")
+    if replace:
+        print(f"   • Deleted:   {result['deleted']:,}")
+
+    for sample in result["samples"]:
+        if sample[0] == "+":
+            row = sample[1]
+            print(f"   + #{row['numero']:03d} {row['nombre']} ${row['precio']} "
+                  f"({row['inventario_disponible']}/{row['inventario_total']})")
+        else:
+            _, numero, changes = sample
+            fields = ", ".join(f"{name}: {old} → {new}" for name, (old, new) in changes.items())
+            print(f"   ~ #{numero:03d} {fields}")
+
+
+def print_summary(db):
+    """Short catalog summary after an import"""
+    total = db.query(Pokemon).count()
+    available = db.query(Pokemon).filter(Pokemon.en_venta == True).count()
+    stock = db.query(func.sum(Pokemon.inventario_disponible)).scalar() or 0
+    print(f"\n📊 Catalog: {total:,} Pokemon, {available:,} for sale, {stock:,} units in stock")
 
 
 def main():
-    """Main migration workflow"""
+    parser = argparse.ArgumentParser(description="Import a Pokemon catalog (JSON, NDJSON or CSV)")
+    parser.add_argument("path", nargs="?", type=Path, default=DEFAULT_CATALOG,
+                        help="Catalog file (default: pokemon-gen1.json)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="File format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Rows per executemany batch")
+    parser.add_argument("--replace", action="store_true",
+                        help="Delete Pokemon that are not in the file")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show what would change without writing")
+    parser.add_argument("--sample", type=int, default=20,
+                        help="Changes listed in a dry run")
+    parser.add_argument("--db", type=Path,
+                        help="Target SQLite file (default: project database)")
+    args = parser.parse_args()
+
+    if not args.path.exists():
+        print(f"❌ Catalog file not found: {args.path}")
+        sys.exit(1)
+
+    fmt = args.format or detect_format(args.path)
+    print(f"📂 {args.path} ({fmt}, batch={args.batch_size})")
+    factory = session_factory_for(args.db)
+
+    last_report = [0.0]
+
+    def progress(rows: int, elapsed: float):
+        if elapsed - last_report[0] >= 1.0:
+            last_report[0] = elapsed
+            print(f"   {rows:>12,} rows  {rows / elapsed:>10,.0f} rows/s", end="\r")
+
     try:
-        migrate_pokemon_to_db()
-        verify_migration()
-        
-        print("\n🎉 Migration successful!")
-        print("   You can now use the database instead of pokemon-gen1.json")
-        print(f"   Database file: pokemon_marketplace.db")
-        
-    except Exception as e:
-        print(f"\n❌ Migration failed: {e}")
-        import traceback
-        traceback.print_exc()
+        with factory() as db:
+            importer = CatalogImporter(db, batch_size=args.batch_size)
+            records = read_records(args.path, fmt)
+
+            if args.dry_run:
+                start = time.perf_counter()
+                result = importer.diff(records, replace=args.replace, sample_size=args.sample)
+                print_diff(result, args.replace)
+                print(f"⏱️  Compared in {time.perf_counter() - start:.2f}s")
+                return
+
+            stats = importer.load(records, replace=args.replace, progress=progress)
+            print(" " * 40, end="\r")
+            print(f"✅ Upserted {stats['rows']:,} rows in {stats['batches']:,} batches "
+                  f"({stats['seconds']:.2f}s, {stats['rows_per_second']:,.0f} rows/s)")
+            if args.replace:
+                print(f"   • Replaced {stats['deleted']:,} existing rows")
+            print(f"   • Type rows added: {stats['type_rows']:,}")
+            print_summary(db)
+    except ValueError as e:
+        print(f"\n❌ Import failed, nothing written: {e}")
         sys.exit(1)
 
 
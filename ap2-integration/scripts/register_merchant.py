@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Register a merchant
+
+Adds a merchant besides the default one: creates its signing key (kept in
+MERCHANT_KEYS_DIR), registers its public key and JWT issuer, opens its
+partition database and optionally loads its catalog. Re-running updates
+the name and key, and re-imports the catalog.
+
+Usage:
+    python scripts/register_merchant.py kanto-shop --name "Kanto Shop"
+    python scripts/register_merchant.py kanto-shop --name "Kanto Shop" --catalog pokemon.ndjson
+    python scripts/register_merchant.py --list
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.common.merchant_keys import get_merchant_keyring
+from src.database import (
+    DEFAULT_MERCHANT_ID,
+    CatalogImporter,
+    MerchantRepository,
+    SessionLocal,
+    UnsupportedDatabaseError,
+    engine,
+    init_db,
+    merchant_router,
+    read_records,
+    validate_merchant_id,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register a merchant with its own partition and signing key")
+    parser.add_argument("merchant_id", nargs="?", help="Merchant ID (lowercase letters, digits, '-' and '_')")
+    parser.add_argument("--name", help="Display name (default: the merchant ID)")
+    parser.add_argument("--issuer", help="JWT issuer of its cart signatures (default: the merchant ID)")
+    parser.add_argument("--catalog", type=Path, help="Catalog file to import (json, ndjson or csv)")
+    parser.add_argument("--replace", action="store_true", help="Replace the current catalog on import")
+    parser.add_argument("--list", action="store_true", help="List registered merchants")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.list:
+        with SessionLocal() as db:
+            for merchant in MerchantRepository(db).get_all():
+                print(f"   {merchant.merchant_id:<20} {merchant.issuer:<20} {merchant.name}")
+        return
+
+    if not args.merchant_id:
+        parser.error("merchant_id is required")
+    try:
+        merchant_id = validate_merchant_id(args.merchant_id)
+    except ValueError as e:
+        parser.error(str(e))
+    if merchant_id == DEFAULT_MERCHANT_ID:
+        parser.error(f"{merchant_id} is the default merchant (the main database)")
+
+    # Check before registering: a merchant whose partition cannot be opened
+    # would stop the agents at startup (MerchantRouter.check_configuration)
+    router = merchant_router(engine)
+    try:
+        router.url_for(merchant_id)
+    except UnsupportedDatabaseError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    keyring = get_merchant_keyring()
+    with SessionLocal() as db:
+        merchant = MerchantRepository(db).register(
+            merchant_id, args.name or merchant_id, keyring.public_key_pem(merchant_id), issuer=args.issuer
+        )
+        print(f"✅ Registered {merchant.merchant_id} (issuer {merchant.issuer})")
+
+    try:
+        partition = router.partition(merchant_id)
+    except UnsupportedDatabaseError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"   Partition: {partition.engine.url.render_as_string(hide_password=True)}")
+    print(f"   Key: {keyring.directory / f'{merchant_id}_private.pem'}")
+
+    if args.catalog:
+        with partition.SessionLocal() as db:
+            stats = CatalogImporter(db).load(read_records(args.catalog), replace=args.replace)
+        print(f"✅ Imported {stats['rows']:,} Pokemon in {stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Critical path of the slowest traces
+
+Reads the JSONL spans written by the agents and the MCP server (TRACE_FILE,
+see src/common/tracing.py), picks the slowest traces whose root span
+matches --name, and prints each one as a tree with its critical path: the
+chain of spans that the root actually waited for, with the time each one
+adds to it. A summary attributes the critical time of all the selected
+traces to service and span, showing which hop makes checkouts slow.
+
+Usage:
+    TRACE_FILE=traces.jsonl python -m src.all_agents
+    python scripts/trace_report.py traces.jsonl                     # slowest checkouts
+    python scripts/trace_report.py traces.jsonl --name "" --top 10  # any trace
+    python scripts/trace_report.py traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add ap2-integration to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.common.tracing import read_spans
+
+Span = Dict
+
+
+def start_ms(span: Span) -> float:
+    return span["start"] * 1000
+
+
+def end_ms(span: Span) -> float:
+    return span["start"] * 1000 + span["duration_ms"]
+
+
+def group_traces(spans: List[Span]) -> Dict[str, List[Span]]:
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+    return traces
+
+
+def find_root(spans: List[Span]) -> Span:
+    """Span without a recorded parent (the longest one if the trace is partial)"""
+    ids = {span["span_id"] for span in spans}
+    roots = [span for span in spans if span.get("parent_id") not in ids]
+    return max(roots, key=lambda span: span["duration_ms"])
+
+
+def children_by_parent(spans: List[Span]) -> Dict[str, List[Span]]:
+    children = defaultdict(list)
+    for span in spans:
+        children[span.get("parent_id")].append(span)
+    for siblings in children.values():
+        siblings.sort(key=start_ms)
+    return children
+
+
+def critical_path(span: Span, children: Dict[str, List[Span]], until: float = None) -> List[Tuple[Span, float]]:
+    """
+    (span, critical ms) along the chain the span waited for, in start order.
+
+    Walks back from the span's end: the child that finished last (before
+    the cursor) is on the path, then the search continues from where that
+    child started. A span's critical ms is its own time between those
+    children. Clock skew between processes is clipped to the parent.
+    """
+    began = start_ms(span)
+    cursor = end_ms(span) if until is None else min(until, end_ms(span))
+    own = 0.0
+    path: List[Tuple[Span, float]] = []
+    for child in sorted(children.get(span["span_id"], []), key=end_ms, reverse=True):
+        if start_ms(child) >= cursor:
+            continue
+        child_end = min(end_ms(child), cursor)
+        own += cursor - child_end
+        path = critical_path(child, children, child_end) + path
+        cursor = max(start_ms(child), began)
+    own += max(cursor - began, 0.0)
+    return [(span, own)] + path
+
+
+def label(span: Span) -> str:
+    status = "" if span.get("status", "ok") == "ok" else f"  ❌ {span['attributes'].get('error', 'error')}"
+    return f"[{span.get('service', '?')}] {span['name']}{status}"
+
+
+def print_tree(span: Span, children: Dict[str, List[Span]], origin: float, on_path: set, depth: int = 0):
+    marker = "★" if span["span_id"] in on_path else " "
+    print(f"  {marker} {start_ms(span) - origin:9.1f} {span['duration_ms']:9.1f}  {'  ' * depth}{label(span)}")
+    for child in children.get(span["span_id"], []):
+        print_tree(child, children, origin, on_path, depth + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical path of the slowest traces")
+    parser.add_argument("trace_file", type=Path, help="JSONL span file (TRACE_FILE)")
+    parser.add_argument("--name", default="/api/cart/checkout",
+                        help="Only traces whose root span name contains this ('' for all)")
+    parser.add_argument("--top", type=int, default=3, help="Slowest traces to show")
+    parser.add_argument("--trace", help="Show this trace id only")
+    parser.add_argument("--no-tree", action="store_true", help="Only the critical paths and the summary")
+    args = parser.parse_args()
+
+    if not args.trace_file.exists():
+        print(f"❌ {args.trace_file} not found (start the agents with TRACE_FILE set)")
+        sys.exit(1)
+
+    traces = group_traces(read_spans(args.trace_file))
+    selected = []
+    for trace_id, spans in traces.items():
+        root = find_root(spans)
+        if args.trace and trace_id != args.trace:
+            continue
+        if not args.trace and args.name and args.name not in root["name"]:
+            continue
+        selected.append((root, spans))
+    if not selected:
+        print(f"❌ No traces matching {args.trace or repr(args.name)} in {args.trace_file} ({len(traces)} traces)")
+        sys.exit(1)
+
+    selected.sort(key=lambda item: item[0]["duration_ms"], reverse=True)
+    durations = sorted(root["duration_ms"] for root, _ in selected)
+    print(f"🔎 {len(selected)} matching traces of {len(traces)} | "
+          f"median {durations[len(durations) // 2]:.1f} ms, max {durations[-1]:.1f} ms")
+
+    by_hop: Dict[Tuple[str, str], float] = defaultdict(float)
+    by_service: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for rank, (root, spans) in enumerate(selected[:args.top], start=1):
+        children = children_by_parent(spans)
+        path = critical_path(root, children)
+        total += root["duration_ms"]
+        for span, ms in path:
+            by_hop[(span.get("service", "?"), span["name"])] += ms
+            by_service[span.get("service", "?")] += ms
+
+        print(f"\n#{rank} trace {root['trace_id']}: {root['name']} {root['duration_ms']:.1f} ms "
+              f"({len(spans)} spans)")
+        if not args.no_tree:
+            print(f"    {'start ms':>9} {'dur ms':>9}  span (★ = critical path)")
+            print_tree(root, children, start_ms(root), {span["span_id"] for span, _ in path})
+        print("  Critical path:")
+        for span, ms in path:
+            if ms >= 0.05:
+                print(f"    {ms:9.1f} ms {ms / max(root['duration_ms'], 1e-9):6.1%}  {label(span)}")
+
+    print(f"\n📊 Critical time over {min(args.top, len(selected))} slowest traces ({total:.1f} ms)")
+    total = max(total, 1e-9)
+    print("  By service:")
+    for service, ms in sorted(by_service.items(), key=lambda item: -item[1]):
+        print(f"    {ms:9.1f} ms {ms / total:6.1%}  {service}")
+    print("  By span:")
+    for (service, name), ms in sorted(by_hop.items(), key=lambda item: -item[1])[:10]:
+        print(f"    {ms:9.1f} ms {ms / total:6.1%}  [{service}] {name}")
+
+
+if __name__ == "__main__":
+    main()
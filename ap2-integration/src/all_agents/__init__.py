@@ -0,0 +1 @@
+"""All agents in one process (in-process ASGI calls between them)"""
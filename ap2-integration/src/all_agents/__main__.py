@@ -0,0 +1,18 @@
+"""All agents entry point (one process, one port)"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    
+    from src.common.launcher import serve
+    
+    port = int(os.getenv("ALL_AGENTS_PORT", 8000))
+    print(f"🚀 All agents in one process on http://localhost:{port} "
+          f"(merchant /merchant, credentials /credentials, processor /processor)")
+    
+    # The web UI's cleanup workers start in its startup hook (every worker)
+    serve("src.all_agents.server:app", port=port)
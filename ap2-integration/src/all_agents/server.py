@@ -0,0 +1,59 @@
+"""
+All agents in one process
+
+Mounts the four FastAPI apps in one ASGI app for demos and dev nodes:
+
+- /            Shopping Web UI
+- /merchant    Merchant Agent
+- /credentials Credentials Provider
+- /processor   Payment Processor
+
+The web UI's ShoppingAgent calls the other agents through
+httpx.ASGITransport (AGENT_TRANSPORT=asgi): requests go straight to the
+apps in this process instead of over localhost HTTP. Distributed
+deployments keep running each agent on its own port (AGENT_TRANSPORT=http).
+"""
+
+import os
+import sys
+from contextlib import AsyncExitStack, asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
+
+from fastapi import FastAPI
+
+from src.credentials_provider.server import app as credentials_app
+from src.merchant_agent.server import app as merchant_app
+from src.payment_processor.server import app as processor_app
+from src.shopping_agent import web_ui
+from src.shopping_agent.agent import ShoppingAgent
+
+# Mount path of each agent app (the web UI is mounted at "/")
+AGENT_APPS = {
+    "/merchant": merchant_app,
+    "/credentials": credentials_app,
+    "/processor": processor_app,
+}
+
+# Module state each uvicorn worker keeps for itself (see src/common/launcher.py)
+WORKER_STATE = {
+    "AGENT_APPS": "fixed mount table",
+}
+
+
+@asynccontextmanager
+async def agents_lifespan(app: FastAPI = None):
+    """Run the startup and shutdown hooks of every mounted app"""
+    async with AsyncExitStack() as stack:
+        for sub_app in (*AGENT_APPS.values(), web_ui.app):
+            await stack.enter_async_context(sub_app.router.lifespan_context(sub_app))
+        yield
+
+
+# The web UI's shopping agent reaches the other agents in-process
+web_ui.agent = ShoppingAgent(transport="asgi")
+
+app = FastAPI(title="Pokemon Marketplace (all agents)", version="1.0.0", lifespan=agents_lifespan)
+for path, agent_app in AGENT_APPS.items():
+    app.mount(path, agent_app)
+app.mount("/", web_ui.app)
@@ -2,8 +2,11 @@
 
 from .ap2_types import *
 from .mcp_client import MCPClient, get_mcp_client
+from .cache import TTLCache
 from .utils import *
+from .merchant_keys import MerchantKeyring, get_merchant_keyring
 from .jwt_validator import (
+    DEFAULT_MERCHANT_ISSUER,
     JWTValidator,
     JWTValidationError,
     get_jwt_validator,
@@ -28,7 +31,15 @@ __all__ = [
     "MCPClient",
     "get_mcp_client",
     
+    # Caching
+    "TTLCache",
+    
+    # Merchant keys
+    "MerchantKeyring",
+    "get_merchant_keyring",
+    
     # JWT Validation
+    "DEFAULT_MERCHANT_ISSUER",
     "JWTValidator",
     "JWTValidationError",
     "get_jwt_validator",
@@ -14,7 +14,7 @@ Security requirements:
 """
 
 import jwt
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
@@ -22,21 +22,57 @@ import requests
 import os
 from pathlib import Path
 
+from .cache import TTLCache
+from .metrics import JWT_SECONDS, register_cache
+from .tracing import span
+
+
+# Issuer of the default merchant's signatures (key from the MCP server)
+DEFAULT_MERCHANT_ISSUER = "PokeMart"
+
 
 class JWTValidationError(Exception):
     """Exception raised when JWT validation fails"""
     pass
 
 
+# Registered merchants by issuer; keys change rarely (rotation re-registers)
+_issuer_keys = TTLCache(max_size=1024, ttl_seconds=60)
+register_cache("issuer_keys", _issuer_keys)
+
+
+def registry_issuer_resolver(issuer: str) -> Optional[Tuple[str, str]]:
+    """(merchant_id, public key PEM) of a registered issuer, or None"""
+    resolved = _issuer_keys.get(issuer)
+    if resolved is None:
+        from src.database import MerchantRepository, ReadSessionLocal
+        
+        with ReadSessionLocal() as db:
+            merchant = MerchantRepository(db).get_by_issuer(issuer)
+            if merchant is None:
+                return None
+            resolved = (merchant.merchant_id, merchant.public_key)
+        _issuer_keys.set(issuer, resolved)
+    return resolved
+
+
 class JWTValidator:
     """Validates JWT tokens for AP2 mandates"""
     
-    def __init__(self):
-        """Initialize validator with public keys"""
+    def __init__(self, issuer_resolver: Optional[Callable[[str], Optional[Tuple[str, str]]]] = None):
+        """
+        Initialize validator with public keys.
+        
+        Args:
+            issuer_resolver: Maps the ``iss`` of other merchants' signatures
+                to (merchant_id, public key PEM), or None if unknown
+                (default: the merchant registry)
+        """
         # Path to MCP server's public keys
         self.mcp_keys_dir = self._get_mcp_keys_directory()
         self.merchant_public_key = None
         self.user_public_key = None
+        self.issuer_resolver = issuer_resolver or registry_issuer_resolver
         
         # Load keys
         self._load_keys()
@@ -121,7 +157,8 @@ class JWTValidator:
             verify_signature: Whether to verify cryptographic signature (default True)
             
         Returns:
-            Decoded JWT payload if valid
+            Decoded JWT payload if valid (registered merchants' signatures
+            carry their ``merchant_id``; the default merchant's do not)
             
         Raises:
             JWTValidationError if validation fails
@@ -143,31 +180,43 @@ class JWTValidator:
             except jwt.DecodeError as e:
                 raise JWTValidationError(f"Failed to decode JWT: {e}")
         
-        # Verify signature with merchant's public key
-        if not self.merchant_public_key:
-            raise JWTValidationError(
-                "Merchant public key not loaded. Cannot verify signature. "
-                "Make sure MCP server has generated keys."
-            )
-        
+        # The issuer picks the key: the default merchant's, or a registered one
         try:
+            issuer = jwt.decode(merchant_sig, options={"verify_signature": False}).get("iss")
+        except jwt.DecodeError as e:
+            raise JWTValidationError(f"Failed to decode JWT: {e}")
+        
+        merchant_id = None
+        if issuer == DEFAULT_MERCHANT_ISSUER:
+            if not self.merchant_public_key:
+                raise JWTValidationError(
+                    "Merchant public key not loaded. Cannot verify signature. "
+                    "Make sure MCP server has generated keys."
+                )
             # Convert public key to PEM format for jwt library
             public_key_pem = self.merchant_public_key.public_bytes(
                 encoding=serialization.Encoding.PEM,
                 format=serialization.PublicFormat.SubjectPublicKeyInfo
             )
-            
+        else:
+            resolved = self.issuer_resolver(issuer) if isinstance(issuer, str) else None
+            if resolved is None:
+                raise JWTValidationError(f"Unexpected issuer: '{issuer}' is not a registered merchant")
+            merchant_id, public_key_pem = resolved
+        
+        try:
             # Decode and verify
-            payload = jwt.decode(
-                merchant_sig,
-                public_key_pem,
-                algorithms=["RS256"],
-                options={
-                    "verify_signature": True,
-                    "verify_exp": True,  # Verify expiration
-                    "verify_iat": True,  # Verify issued-at
-                }
-            )
+            with span("verify merchant signature"), JWT_SECONDS.labels("verify", "cart").time():
+                payload = jwt.decode(
+                    merchant_sig,
+                    public_key_pem,
+                    algorithms=["RS256"],
+                    options={
+                        "verify_signature": True,
+                        "verify_exp": True,  # Verify expiration
+                        "verify_iat": True,  # Verify issued-at
+                    }
+                )
             
             # Validate claims
             cart_id = cart_mandate["contents"]["id"]
@@ -178,11 +227,10 @@ class JWTValidator:
                     f"JWT subject '{payload.get('sub')}' doesn't match cart_id '{cart_id}'"
                 )
             
-            # Check issuer is expected merchant
-            expected_issuer = "PokeMart"
-            if payload.get("iss") != expected_issuer:
+            # Check the signing merchant is the one the key belongs to
+            if merchant_id is not None and payload.get("merchant_id") != merchant_id:
                 raise JWTValidationError(
-                    f"Unexpected issuer: '{payload.get('iss')}', expected '{expected_issuer}'"
+                    f"JWT merchant_id '{payload.get('merchant_id')}' doesn't match issuer '{issuer}'"
                 )
             
             # Check cart_id claim
@@ -279,16 +327,17 @@ class JWTValidator:
             )
             
             # Decode and verify
-            payload = jwt.decode(
-                user_auth,
-                public_key_pem,
-                algorithms=["RS256"],
-                options={
-                    "verify_signature": True,
-                    "verify_exp": True,
-                    "verify_iat": True,
-                }
-            )
+            with span("verify user authorization"), JWT_SECONDS.labels("verify", "user").time():
+                payload = jwt.decode(
+                    user_auth,
+                    public_key_pem,
+                    algorithms=["RS256"],
+                    options={
+                        "verify_signature": True,
+                        "verify_exp": True,
+                        "verify_iat": True,
+                    }
+                )
             
             # Validate hashes match (non-repudiation)
             from .utils import hash_cart_mandate, hash_payment_mandate_contents
@@ -0,0 +1,217 @@
+"""
+Server launcher
+
+Runs an agent app with uvicorn, optionally with several worker processes:
+
+- WORKERS (default 1): worker processes per agent. uvicorn spawns them
+  (it does not fork), so each worker imports the app on its own.
+- UVICORN_LOOP / UVICORN_HTTP (default auto): event loop and HTTP parser.
+  "auto" picks uvloop and httptools when installed (the "fast" extra)
+  and falls back to asyncio and h11.
+
+Before starting the workers, prepare() does in the parent what they would
+otherwise race on: it applies the database migrations and creates the
+demo keys. Each worker then runs warm_up() in its startup hook, so the
+catalog and keys are loaded before it accepts requests.
+
+Workers share nothing but the database and local files (keys, sales log).
+Module-level state of each server is declared in its WORKER_STATE (name ->
+why it is fine per worker); audit_worker_state() reports state that is not.
+"""
+
+import ast
+import importlib
+import importlib.util
+import inspect
+import os
+import sys
+import time
+from collections import deque
+from types import ModuleType
+from typing import Any, Dict, Iterable, Optional
+
+# Server modules checked by the audit
+SERVER_MODULES = (
+    "src.merchant_agent.server",
+    "src.credentials_provider.server",
+    "src.payment_processor.server",
+    "src.shopping_agent.web_ui",
+    "src.all_agents.server",
+)
+
+LOOPS = {"auto", "asyncio", "uvloop"}
+HTTP_PARSERS = {"auto", "h11", "httptools"}
+
+_MUTABLE_TYPES = (dict, list, set, deque, bytearray)
+
+
+def resolve_loop(choice: str = "auto") -> str:
+    """Event loop for uvicorn: uvloop if installed, else asyncio"""
+    if choice not in LOOPS:
+        raise ValueError(f"Unknown event loop {choice!r} (expected one of {sorted(LOOPS)})")
+    if choice == "auto":
+        return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    return choice
+
+
+def resolve_http(choice: str = "auto") -> str:
+    """HTTP parser for uvicorn: httptools if installed, else h11"""
+    if choice not in HTTP_PARSERS:
+        raise ValueError(f"Unknown HTTP parser {choice!r} (expected one of {sorted(HTTP_PARSERS)})")
+    if choice == "auto":
+        return "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return choice
+
+
+def uvicorn_options(
+    workers: Optional[int] = None,
+    loop: Optional[str] = None,
+    http: Optional[str] = None
+) -> Dict[str, Any]:
+    """uvicorn.run() settings from the arguments or WORKERS, UVICORN_LOOP, UVICORN_HTTP"""
+    workers = workers if workers is not None else int(os.getenv("WORKERS", 1))
+    if workers < 1:
+        raise ValueError(f"WORKERS must be at least 1, got {workers}")
+    return {
+        "workers": workers,
+        "loop": resolve_loop(loop or os.getenv("UVICORN_LOOP", "auto")),
+        "http": resolve_http(http or os.getenv("UVICORN_HTTP", "auto")),
+    }
+
+
+def prepare():
+    """Pre-fork setup: migrations and demo keys, once for all workers"""
+    from src.database import init_db
+    from src.common import utils
+
+    init_db()
+    print(f"🔑 Demo keys in {utils.DEMO_KEYS_DIR}")
+
+
+def warm_up(catalog: bool = True, keys: bool = True, signing_keys: bool = False) -> float:
+    """
+    Load what the first requests of a worker would otherwise pay for.
+
+    Args:
+        catalog: Catalog snapshot, search engine and name index
+        keys: JWT validator (MCP and demo public keys)
+        signing_keys: Private keys of the registered merchants
+
+    Returns:
+        Seconds spent
+    """
+    from src.common.jwt_validator import get_jwt_validator
+    from src.common.merchant_keys import get_merchant_keyring
+    from src.database import (
+        MerchantRepository,
+        ReadSessionLocal,
+        catalog_search,
+        catalog_snapshot,
+        name_index,
+    )
+
+    began = time.perf_counter()
+    try:
+        if catalog:
+            with ReadSessionLocal() as db:
+                catalog_snapshot(db)
+                catalog_search(db)
+                name_index(db)
+        if keys:
+            get_jwt_validator()
+        if signing_keys:
+            keyring = get_merchant_keyring()
+            with ReadSessionLocal() as db:
+                for merchant in MerchantRepository(db).get_all():
+                    keyring.private_key_pem(merchant.merchant_id)
+    except Exception as e:
+        # A cold worker is slower, not broken
+        print(f"⚠️  Warm-up incomplete: {e}")
+    elapsed = time.perf_counter() - began
+    print(f"🔥 Worker {os.getpid()} warmed up in {elapsed:.2f}s")
+    return elapsed
+
+
+def _module_state_names(module: ModuleType) -> Dict[str, bool]:
+    """Names assigned at module level -> whether functions rebind them (global)"""
+    tree = ast.parse(inspect.getsource(module))
+    names: Dict[str, bool] = {}
+    for node in tree.body:
+        targets = []
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+            targets = [node.target]
+        for target in targets:
+            for name in ast.walk(target):
+                if isinstance(name, ast.Name):
+                    names.setdefault(name.id, False)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Global):
+            for name in node.names:
+                names[name] = True
+    return names
+
+
+def audit_worker_state(module: ModuleType) -> Dict[str, str]:
+    """
+    Module-level state a server does not declare in WORKER_STATE.
+
+    State is anything assigned at module level that is mutable (containers,
+    objects of this project's classes) or rebound by a function through
+    ``global``. Each worker has its own copy, so it must either be fine per
+    worker (declare it, with the reason) or move to the database.
+
+    Returns:
+        Undeclared name -> type of its value
+    """
+    declared = getattr(module, "WORKER_STATE", {})
+    undeclared = {}
+    for name, rebound in _module_state_names(module).items():
+        if name == "WORKER_STATE" or name in declared:
+            continue
+        value = getattr(module, name, None)
+        owner = getattr(type(value), "__module__", "")
+        if rebound or isinstance(value, _MUTABLE_TYPES) or owner.startswith("src."):
+            undeclared[name] = type(value).__name__
+    return undeclared
+
+
+def audit_servers(modules: Iterable[str] = SERVER_MODULES) -> Dict[str, Dict[str, str]]:
+    """Undeclared state per server module (empty when every server is clean)"""
+    report = {}
+    for name in modules:
+        undeclared = audit_worker_state(importlib.import_module(name))
+        if undeclared:
+            report[name] = undeclared
+    return report
+
+
+def serve(
+    app: str,
+    port: int,
+    host: str = "0.0.0.0",
+    workers: Optional[int] = None,
+    log_level: str = "info"
+):
+    """
+    Run an app ("module:attribute") with the configured workers, loop and parser.
+
+    With more than one worker the app's module must pass the state audit.
+    """
+    import uvicorn
+
+    options = uvicorn_options(workers)
+    if options["workers"] > 1:
+        # The app's module and the servers it mounts (all_agents)
+        importlib.import_module(app.split(":")[0])
+        report = audit_servers(name for name in SERVER_MODULES if name in sys.modules)
+        if report:
+            raise RuntimeError(f"Per-process state not declared in WORKER_STATE: {report}")
+
+    prepare()
+    print(
+        f"🚀 {app} on port {port}: {options['workers']} worker(s), "
+        f"{options['loop']} loop, {options['http']} parser"
+    )
+    uvicorn.run(app, host=host, port=port, log_level=log_level, **options)
@@ -6,11 +6,19 @@ TypeScript MCP server (mcp-server/src/index.ts).
 """
 
 import asyncio
+import inspect
 import json
 import os
+import time
 from typing import Any, Dict, List, Optional
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp.client.stdio import get_default_environment, stdio_client
+
+from .metrics import MCP_CALL_SECONDS
+from .tracing import span
+
+# Older mcp releases cannot send request _meta (trace context)
+CALL_TOOL_META = "meta" in inspect.signature(ClientSession.call_tool).parameters
 
 
 class MCPClient:
@@ -29,10 +37,18 @@ class MCPClient:
         
     async def connect(self):
         """Establish connection to MCP server"""
+        # The server only inherits a safe subset of the environment; pass
+        # POKEAPI_BASE_URL on so it can use a local PokeAPI stand-in, and
+        # TRACE_FILE so it writes its spans next to the agents'
+        env = None
+        passed = {name: os.environ[name] for name in ("POKEAPI_BASE_URL", "TRACE_FILE") if os.getenv(name)}
+        if passed:
+            env = {**get_default_environment(), **passed}
+        
         server_params = StdioServerParameters(
             command="node",
             args=[self.server_script_path],
-            env=None
+            env=env
         )
         
         self._stdio_context = stdio_client(server_params)
@@ -82,7 +98,20 @@ class MCPClient:
         if not self.session:
             raise RuntimeError("Not connected to MCP server. Call connect() first.")
         
-        result = await self.session.call_tool(tool_name, arguments)
+        began = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(f"mcp {tool_name}", tool=tool_name, kind="client") as current:
+                # The server continues the trace from the request's _meta
+                kwargs = {"meta": {"traceparent": current.traceparent}} if current and CALL_TOOL_META else {}
+                result = await self.session.call_tool(tool_name, arguments, **kwargs)
+                # is_error in mcp 2.x, isError before
+                failed = getattr(result, "is_error", getattr(result, "isError", False))
+                outcome = "error" if failed else "ok"
+                if current is not None and failed:
+                    current.status = "error"
+        finally:
+            MCP_CALL_SECONDS.labels(tool_name, outcome).observe(time.perf_counter() - began)
         
         # MCP returns results as a list of content items
         if result.content:
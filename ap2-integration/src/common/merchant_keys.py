@@ -0,0 +1,105 @@
+"""
+Merchant signing keys
+
+Each merchant besides the default one signs its CartMandates with a key
+pair of its own. Private keys are PEM files in MERCHANT_KEYS_DIR (one per
+merchant_id, created on first use); public keys go to the merchant
+registry, where the payment side looks them up by the JWT issuer.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from .metrics import JWT_SECONDS
+from .tracing import span
+
+MERCHANT_KEYS_DIR = Path(os.getenv(
+    "MERCHANT_KEYS_DIR",
+    Path(__file__).resolve().parent.parent.parent.parent / "merchant_keys"
+))
+
+
+class MerchantKeyring:
+    """Private keys of the merchants hosted by this process"""
+
+    def __init__(self, directory: Path = MERCHANT_KEYS_DIR):
+        self.directory = Path(directory)
+        self._keys: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def private_key_pem(self, merchant_id: str) -> bytes:
+        """Load a merchant's private key, generating it the first time"""
+        with self._lock:
+            pem = self._keys.get(merchant_id)
+            if pem is not None:
+                return pem
+
+            path = self.directory / f"{merchant_id}_private.pem"
+            if path.exists():
+                pem = path.read_bytes()
+            else:
+                key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+                pem = key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                )
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(pem)
+                path.chmod(0o600)
+                print(f"🔑 Generated signing key for merchant {merchant_id}")
+            self._keys[merchant_id] = pem
+            return pem
+
+    def public_key_pem(self, merchant_id: str) -> str:
+        """Public key of a merchant (PEM, for the registry)"""
+        key = serialization.load_pem_private_key(self.private_key_pem(merchant_id), password=None)
+        return key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+
+    def sign_cart(
+        self,
+        merchant_id: str,
+        issuer: str,
+        cart_id: str,
+        merchant_name: str,
+        ttl: timedelta = timedelta(hours=1)
+    ) -> str:
+        """Merchant signature of a cart (RS256 JWT, like generate_merchant_signature)"""
+        now = datetime.now(timezone.utc)
+        payload = {
+            "iss": issuer,
+            "sub": cart_id,
+            "iat": int(now.timestamp()),
+            "exp": int((now + ttl).timestamp()),
+            "cart_id": cart_id,
+            "merchant": merchant_name,
+            "merchant_id": merchant_id,
+        }
+        with span("sign cart mandate", merchant_id=merchant_id), JWT_SECONDS.labels("sign", "cart").time():
+            return jwt.encode(
+                payload,
+                self.private_key_pem(merchant_id),
+                algorithm="RS256",
+                headers={"kid": merchant_id}
+            )
+
+
+_keyring = None
+
+
+def get_merchant_keyring() -> MerchantKeyring:
+    """Get the process-wide merchant keyring"""
+    global _keyring
+    if _keyring is None:
+        _keyring = MerchantKeyring()
+    return _keyring
@@ -0,0 +1,349 @@
+"""
+Prometheus metrics
+
+Process-wide histograms and gauges rendered in the Prometheus text format
+(version 0.0.4) by the agents' ``/metrics`` endpoints (see
+src/common/middleware.py):
+
+    ap2_http_request_duration_seconds   per service, method, route and status
+    ap2_http_requests_in_flight         per service
+    ap2_mcp_call_duration_seconds       per MCP tool and outcome
+    ap2_db_statement_duration_seconds   per statement verb (SELECT, INSERT, ...)
+    ap2_jwt_duration_seconds            signing and verification, per token
+    ap2_cache_*                         hits, misses and hit ratio per TTLCache
+
+Updates take no lock: each thread adds into its own shard of plain
+counters and a scrape sums the shards. Histogram buckets are fixed when
+the metric is created, so an observation is one bisect and two additions.
+
+    with JWT_SECONDS.labels("sign", "cart").time():
+        token = jwt.encode(...)
+
+Every uvicorn worker keeps its own registry; a scrape is answered by
+whichever worker accepts the connection.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers in-process calls (sub-millisecond) up to slow checkouts
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Database statements are mostly well under a millisecond
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# (labels, value) samples of one metric, as collectors return them
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class _Shards:
+    """Per-thread lists of numbers; only the owning thread writes its list"""
+
+    __slots__ = ("size", "_local", "_all")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+
+    def mine(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self.size
+            self._local.values = values
+            self._all.append(values)
+            return values
+
+    def clear(self):
+        for values in list(self._all):
+            values[:] = [0] * self.size
+
+    def totals(self) -> List[float]:
+        totals = [0] * self.size
+        for values in list(self._all):
+            for i, value in enumerate(values):
+                totals[i] += value
+        return totals
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Family:
+    """A metric and its children, one per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for these label values (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _children_labels(self) -> Iterator[Tuple[Dict[str, str], Any]]:
+        for values, child in sorted(self._children.items()):
+            yield dict(zip(self.labelnames, values)), child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self._children_labels():
+            lines.extend(child.render(self.name, labels))
+        return lines
+
+    def reset(self):
+        # Children stay (callers may hold them); only their values go
+        for child in list(self._children.values()):
+            child._shards.clear()
+
+
+class _GaugeChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1):
+        self._shards.mine()[0] += amount
+
+    def dec(self, amount: float = 1):
+        self._shards.mine()[0] -= amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def render(self, name: str, labels: Dict[str, str]) -> List[str]:
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Gauge(_Family):
+    """Value that goes up and down (e.g. requests in flight)"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "_shards")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket, one for +Inf, then the sum
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float):
+        values = self._shards.mine()
+        values[bisect_left(self.bounds, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - began)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts, sum and count"""
+        totals = self._shards.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return {"buckets": cumulative, "sum": totals[-1], "count": running}
+
+    def render(self, name: str, labels: Dict[str, str]) -> List[str]:
+        snapshot = self.snapshot()
+        lines = [
+            f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}"
+            for bound, count in zip(self.bounds + (float("inf"),), snapshot["buckets"])
+        ]
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return lines
+
+
+class Histogram(_Family):
+    """Distribution of observations over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    """Metrics and scrape-time collectors rendered by /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Family] = {}
+        self._collectors: Dict[str, Callable[[], List[Tuple[str, str, str, Samples]]]] = {}
+
+    def register(self, metric: _Family) -> _Family:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def add_collector(self, name: str, collect: Callable[[], List[Tuple[str, str, str, Samples]]]):
+        """
+        Add (or replace) a collector called on every scrape.
+
+        ``collect()`` returns (metric name, type, help, samples) tuples for
+        values that already live elsewhere, such as cache counters.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text format"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+
+        # Collectors may report the same metric name (one sample set each)
+        collected: Dict[str, Tuple[str, str, Samples]] = {}
+        for name, collect in sorted(self._collectors.items()):
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"⚠️  Metrics collector {name} failed: {e}")
+                continue
+            for metric_name, kind, documentation, samples in families:
+                entry = collected.setdefault(metric_name, (kind, documentation, []))
+                entry[2].extend(samples)
+        for metric_name, (kind, documentation, samples) in collected.items():
+            lines.append(f"# HELP {metric_name} {documentation}")
+            lines.append(f"# TYPE {metric_name} {kind}")
+            lines.extend(
+                f"{metric_name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples
+            )
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop every recorded value (collectors are kept)"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+# Process-wide registry served by /metrics
+metrics_registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "ap2_http_request_duration_seconds", "HTTP request latency",
+    ("service", "method", "route", "status")
+)
+HTTP_IN_FLIGHT = metrics_registry.gauge(
+    "ap2_http_requests_in_flight", "HTTP requests being served", ("service",)
+)
+MCP_CALL_SECONDS = metrics_registry.histogram(
+    "ap2_mcp_call_duration_seconds", "MCP tool call latency", ("tool", "outcome")
+)
+DB_STATEMENT_SECONDS = metrics_registry.histogram(
+    "ap2_db_statement_duration_seconds", "SQL statement execution time", ("verb",), buckets=DB_BUCKETS
+)
+JWT_SECONDS = metrics_registry.histogram(
+    "ap2_jwt_duration_seconds", "JWT signing and verification time", ("operation", "token")
+)
+
+
+def register_cache(name: str, cache, registry: Optional[MetricsRegistry] = None):
+    """Report a TTLCache's hits, misses, evictions, size and hit ratio"""
+    def collect():
+        labels = {"cache": name}
+        return [
+            ("ap2_cache_hits_total", "counter", "Cache lookups served from the cache", [(labels, cache.hits)]),
+            ("ap2_cache_misses_total", "counter", "Cache lookups that missed", [(labels, cache.misses)]),
+            ("ap2_cache_evictions_total", "counter", "Entries evicted to stay within max_size",
+             [(labels, cache.evictions)]),
+            ("ap2_cache_entries", "gauge", "Entries in the cache", [(labels, len(cache))]),
+            ("ap2_cache_hit_ratio", "gauge", "Fraction of lookups served from the cache",
+             [(labels, round(cache.hit_ratio, 6))]),
+        ]
+
+    (registry or metrics_registry).add_collector(f"cache:{name}", collect)
+
+
+@lru_cache(maxsize=2048)
+def _statement_verb(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is not None:
+        DB_STATEMENT_SECONDS.labels(_statement_verb(statement)).observe(time.perf_counter() - start)
+
+
+def instrument_statements(engine):
+    """Time every statement an engine runs into DB_STATEMENT_SECONDS (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
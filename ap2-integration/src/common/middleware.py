@@ -0,0 +1,258 @@
+"""
+HTTP middleware shared by the agents
+
+QueryStatsMiddleware tracks the SQL statements of every request (see
+src/database/query_stats.py) and reports them as response headers:
+
+    X-DB-Queries:   statements executed
+    X-DB-Time-Ms:   time spent in the database
+    X-DB-Repeated:  statement shapes repeated past QUERY_REPEAT_THRESHOLD (N+1)
+    Server-Timing:  db;dur=<ms>;desc="<n> queries" (shown by browser devtools)
+
+Per-endpoint totals go to ``query_stats_registry``. Requests with repeated
+shapes or more than SLOW_REQUEST_DB_MS of database time are logged with
+their slowest statements.
+
+install_metrics(app, service) adds MetricsMiddleware (latency histogram
+and in-flight gauge per service, see src/common/metrics.py) and serves
+the process's metrics at GET /metrics in the Prometheus text format.
+
+install_tracing(app, service) adds TracingMiddleware, which records a
+server span per request continuing the caller's W3C ``traceparent`` (see
+src/common/tracing.py), and a span per SQL statement.
+"""
+
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..database.engine import read_engine_for
+from ..database.query_stats import (
+    SLOW_REQUEST_DB_MS,
+    QueryStats,
+    QueryStatsRegistry,
+    instrument_engine,
+    query_stats_registry,
+    track_queries,
+)
+from .metrics import (
+    CONTENT_TYPE,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    MetricsRegistry,
+    Samples,
+    instrument_statements,
+    metrics_registry,
+)
+from .tracing import enabled as tracing_enabled, start_span, trace_statements, use_span
+
+# Longest SQL shape printed in warnings
+_LOG_SQL_CHARS = 160
+
+
+def _endpoint(scope: Scope) -> str:
+    """METHOD plus route template (e.g. GET /api/cart/item/{product_id})"""
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+def _log(endpoint: str, stats: QueryStats):
+    repeated = stats.repeated()
+    if not repeated and stats.total_ms <= SLOW_REQUEST_DB_MS:
+        return
+    label = "N+1 suspected" if repeated else "slow database time"
+    print(f"⚠️  {endpoint}: {label} ({stats.count} queries, {stats.total_ms:.1f} ms)")
+    for shape, count in repeated.items():
+        print(f"   ↻ x{count} {shape[:_LOG_SQL_CHARS]}")
+    for ms, shape in stats.slowest():
+        print(f"   ⏱️  {ms:.1f} ms {shape[:_LOG_SQL_CHARS]}")
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware adding per-request SQL statistics headers"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        engine=None,
+        registry: Optional[QueryStatsRegistry] = None
+    ):
+        self.app = app
+        self.registry = registry or query_stats_registry
+        if engine is None:
+            from ..database import engine
+        instrument_engine(engine)
+        instrument_engine(read_engine_for(engine))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_stats(message: Message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{stats.total_ms:.2f}"
+                    headers["X-DB-Repeated"] = str(len(stats.repeated()))
+                    headers.append(
+                        "Server-Timing", f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                endpoint = _endpoint(scope)
+                self.registry.observe(endpoint, stats)
+                _log(endpoint, stats)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and requests in flight"""
+
+    def __init__(self, app: ASGIApp, service: str):
+        self.app = app
+        self.service = service
+        self.in_flight = HTTP_IN_FLIGHT.labels(service)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        began = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(self.service, scope["method"], route, status).observe(
+                time.perf_counter() - began
+            )
+
+
+def _query_totals() -> list:
+    """query_stats_registry totals per endpoint as metric families"""
+    snapshot = query_stats_registry.snapshot()
+
+    def samples(key: str, scale: float = 1) -> Samples:
+        return [({"endpoint": endpoint}, totals[key] * scale) for endpoint, totals in snapshot.items()]
+
+    return [
+        ("ap2_endpoint_db_queries_total", "counter", "SQL statements run per endpoint", samples("queries")),
+        ("ap2_endpoint_db_seconds_total", "counter", "Database time per endpoint", samples("db_ms", 0.001)),
+        ("ap2_endpoint_n_plus_one_total", "counter", "Requests with repeated statement shapes (N+1)",
+         samples("n_plus_one")),
+    ]
+
+
+def install_metrics(app: FastAPI, service: str, engine=None, registry: Optional[MetricsRegistry] = None):
+    """Record the app's requests under ``service`` and serve GET /metrics"""
+    registry = registry or metrics_registry
+    if engine is None:
+        from ..database import engine
+    instrument_statements(engine)
+    instrument_statements(read_engine_for(engine))
+    registry.add_collector("query_stats", _query_totals)
+
+    app.add_middleware(MetricsMiddleware, service=service)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+class TracingMiddleware:
+    """ASGI middleware recording a server span per request (when TRACE_FILE is set)"""
+
+    def __init__(self, app: ASGIApp, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        span = start_span(
+            f"{scope['method']} {scope['path']}", self.service, traceparent, {"kind": "server"}
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message: Message):
+            if message["type"] == "http.response.start":
+                span.set("status", message["status"])
+                if message["status"] >= 500:
+                    span.status = "error"
+            await send(message)
+
+        with use_span(span):
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.name = f"{scope['method']} {route}"
+
+
+def install_tracing(app: FastAPI, service: str, engine=None):
+    """Record the app's requests and SQL statements as spans of ``service``"""
+    if engine is None:
+        from ..database import engine
+    trace_statements(engine)
+    trace_statements(read_engine_for(engine))
+    app.add_middleware(TracingMiddleware, service=service)
+
+
+def assert_query_budget(response, max_queries: int, max_repeated: int = 0) -> dict:
+    """
+    Check the SQL headers of a test client response against a budget.
+
+    Raises AssertionError if the request ran more than ``max_queries``
+    statements or repeated more than ``max_repeated`` statement shapes.
+
+    Returns:
+        {"queries": int, "db_ms": float, "repeated": int}
+    """
+    headers = response.headers
+    if "X-DB-Queries" not in headers:
+        raise AssertionError("Response has no X-DB-Queries header (QueryStatsMiddleware not installed?)")
+
+    stats = {
+        "queries": int(headers["X-DB-Queries"]),
+        "db_ms": float(headers["X-DB-Time-Ms"]),
+        "repeated": int(headers["X-DB-Repeated"]),
+    }
+    request = f"{response.request.method} {response.request.url.path}"
+    assert stats["queries"] <= max_queries, (
+        f"{request} ran {stats['queries']} queries (budget {max_queries})"
+    )
+    assert stats["repeated"] <= max_repeated, (
+        f"{request} repeated {stats['repeated']} statement shape(s) "
+        f"(budget {max_repeated}); see the N+1 warning in the captured output"
+    )
+    return stats
+
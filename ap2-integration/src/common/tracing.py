@@ -0,0 +1,318 @@
+"""
+Distributed tracing
+
+W3C trace context (``traceparent: 00-<trace id>-<span id>-<flags>``) carried
+across the agents: TracingMiddleware (src/common/middleware.py) continues
+the caller's trace for every request, ShoppingAgent sends the header on its
+httpx calls, and MCPClient passes it in the tool call's ``_meta`` so the MCP
+server can record its side. Spans wrap the checkout steps, signing,
+hashing, validation and SQL statements.
+
+Finished spans are appended to a JSONL file shared by every process
+(TRACE_FILE; tracing is off when unset), one object per line:
+
+    {"trace_id", "span_id", "parent_id", "name", "service", "start",
+     "duration_ms", "status", "attributes"}
+
+    with span("charge", service="shopping_agent") as current:
+        current.set("amount", 25.0)
+        headers = {"traceparent": current_traceparent()}
+
+scripts/trace_report.py renders the critical path of the slowest traces.
+With tracing off, span() costs one global check.
+"""
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+# Fraction of new traces recorded (continued traces follow the caller)
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+
+# Spans buffered before a write (a local root span always writes)
+EXPORT_BATCH = 64
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) of a traceparent header, or None if invalid"""
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    _, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, sampled
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "service", "attributes",
+        "status", "start", "_began", "duration_ms", "local_root",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        service: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        local_root: bool = False
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.start = time.time()
+        self._began = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.local_root = local_root
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        self.duration_ms = (time.perf_counter() - self._began) * 1000
+        if error is not None:
+            self.status = "error"
+            self.attributes.setdefault("error", f"{type(error).__name__}: {error}"[:200])
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlSpanExporter:
+    """
+    Appends finished spans to a JSONL file.
+
+    Lines are buffered and written with one O_APPEND write per batch, so
+    several processes can share the file without interleaving lines.
+    """
+
+    def __init__(self, path: Union[str, Path], batch: int = EXPORT_BATCH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch = batch
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._lines.append(line)
+            if span.local_root or len(self._lines) >= self.batch:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if self._lines and self._fd is not None:
+            os.write(self._fd, "".join(self._lines).encode())
+            self._lines = []
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+
+
+def configure(path: Optional[Union[str, Path]]) -> Optional[JsonlSpanExporter]:
+    """Export spans to ``path`` (None turns tracing off)"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = JsonlSpanExporter(path) if path else None
+    return _exporter
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header for an outgoing call, if a trace is active"""
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+def start_span(
+    name: str,
+    service: Optional[str] = None,
+    traceparent: Optional[str] = None,
+    attributes: Optional[Dict[str, Any]] = None
+) -> Optional[Span]:
+    """
+    New span, not made current (see span()).
+
+    The parent is the current span, else the remote caller in
+    ``traceparent``, else the span starts a new trace (subject to
+    TRACE_SAMPLE_RATIO). Returns None when nothing is recorded.
+    """
+    if _exporter is None:
+        return None
+    parent = _current.get()
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, service or parent.service, attributes)
+
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+        if not sampled:
+            return None
+        return Span(name, trace_id, parent_id, service or "unknown", attributes, local_root=True)
+
+    if TRACE_SAMPLE_RATIO < 1.0 and random.random() >= TRACE_SAMPLE_RATIO:
+        return None
+    return Span(name, f"{random.getrandbits(128):032x}", None, service or "unknown", attributes, local_root=True)
+
+
+@contextmanager
+def span(
+    name: str,
+    service: Optional[str] = None,
+    traceparent: Optional[str] = None,
+    **attributes: Any
+) -> Iterator[Optional[Span]]:
+    """Time the block as a span and make it the current one (yields None when not recording)"""
+    current = start_span(name, service, traceparent, attributes) if _exporter is not None else None
+    if current is None:
+        yield None
+        return
+    with use_span(current):
+        yield current
+
+
+@contextmanager
+def use_span(current: Span) -> Iterator[Span]:
+    """Make a started span the current one inside the block and end it on exit"""
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current.reset(token)
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording a client span per request and sending traceparent"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, service: str):
+        self.transport = transport
+        self.service = service
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with span(
+            f"{request.method} {request.url.path}", self.service, kind="client", peer=request.url.netloc.decode()
+        ) as current:
+            if current is not None:
+                request.headers["traceparent"] = current.traceparent
+            response = await self.transport.handle_async_request(request)
+            if current is not None:
+                current.set("status", response.status_code)
+            return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _exporter is not None and _current.get() is not None:
+        sql = " ".join(statement.split())
+        context._trace_span = start_span(f"db {sql.split(' ', 1)[0].upper()}", attributes={"sql": sql[:200]})
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = getattr(context, "_trace_span", None)
+    if current is not None:
+        context._trace_span = None
+        current.end()
+
+
+def trace_statements(engine):
+    """Record a span per SQL statement run inside a trace (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def read_spans(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Spans of a JSONL trace file (malformed lines skipped)"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def _close():
+    if _exporter is not None:
+        _exporter.close()
+
+
+configure(TRACE_FILE)
+atexit.register(_close)
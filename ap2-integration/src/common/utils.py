@@ -4,47 +4,68 @@ Common utilities for AP2 integration
 
 import hashlib
 import json
+import os
 import uuid
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 from typing import Any, Dict
 import jwt
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 
-# Generate RSA key pair for demo (in production, use proper key management)
-# Merchant's private key for signing CartMandates
-MERCHANT_PRIVATE_KEY = rsa.generate_private_key(
-    public_exponent=65537,
-    key_size=2048,
-    backend=default_backend()
-)
+from .metrics import JWT_SECONDS
+from .tracing import span
+
+# Demo key pairs (in production, use proper key management). They are kept
+# as PEM files in DEMO_KEYS_DIR so every process and uvicorn worker signs
+# and verifies with the same keys; the first process to start creates them.
+DEMO_KEYS_DIR = Path(os.getenv(
+    "DEMO_KEYS_DIR",
+    Path(__file__).resolve().parent.parent.parent.parent / "demo_keys"
+))
+
+
+def load_demo_key(name: str) -> bytes:
+    """Private key PEM of a demo signer, created once per DEMO_KEYS_DIR"""
+    path = DEMO_KEYS_DIR / f"{name}_private.pem"
+    if path.exists():
+        return path.read_bytes()
+
+    key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+        backend=default_backend()
+    )
+    pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    DEMO_KEYS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(pem)
+    tmp.chmod(0o600)
+    try:
+        # Workers starting together: the first link wins, the rest read it
+        os.link(tmp, path)
+    except FileExistsError:
+        pem = path.read_bytes()
+    finally:
+        tmp.unlink()
+    return pem
+
 
+# Merchant's private key for signing CartMandates
+MERCHANT_PRIVATE_PEM = load_demo_key("merchant")
+MERCHANT_PRIVATE_KEY = serialization.load_pem_private_key(MERCHANT_PRIVATE_PEM, password=None)
 MERCHANT_PUBLIC_KEY = MERCHANT_PRIVATE_KEY.public_key()
 
 # User's private key for signing PaymentMandates (simulating user's device)
-USER_PRIVATE_KEY = rsa.generate_private_key(
-    public_exponent=65537,
-    key_size=2048,
-    backend=default_backend()
-)
-
+USER_PRIVATE_PEM = load_demo_key("user")
+USER_PRIVATE_KEY = serialization.load_pem_private_key(USER_PRIVATE_PEM, password=None)
 USER_PUBLIC_KEY = USER_PRIVATE_KEY.public_key()
 
-# Convert keys to PEM format for JWT
-MERCHANT_PRIVATE_PEM = MERCHANT_PRIVATE_KEY.private_bytes(
-    encoding=serialization.Encoding.PEM,
-    format=serialization.PrivateFormat.PKCS8,
-    encryption_algorithm=serialization.NoEncryption()
-)
-
-USER_PRIVATE_PEM = USER_PRIVATE_KEY.private_bytes(
-    encoding=serialization.Encoding.PEM,
-    format=serialization.PrivateFormat.PKCS8,
-    encryption_algorithm=serialization.NoEncryption()
-)
-
-
 def generate_unique_id(prefix: str = "") -> str:
     """Generate a unique ID with optional prefix"""
     unique_id = str(uuid.uuid4())
@@ -92,7 +113,8 @@ def generate_merchant_signature(cart_id: str) -> str:
     }
     
     # Sign with RS256 algorithm using merchant's private key
-    token = jwt.encode(payload, MERCHANT_PRIVATE_PEM, algorithm="RS256")
+    with span("sign cart mandate"), JWT_SECONDS.labels("sign", "cart").time():
+        token = jwt.encode(payload, MERCHANT_PRIVATE_PEM, algorithm="RS256")
     return token
 
 
@@ -131,7 +153,8 @@ def generate_user_authorization(cart_hash: str, payment_hash: str) -> str:
     }
     
     # Sign with RS256 algorithm using user's private key
-    token = jwt.encode(payload, USER_PRIVATE_PEM, algorithm="RS256")
+    with span("sign user authorization"), JWT_SECONDS.labels("sign", "user").time():
+        token = jwt.encode(payload, USER_PRIVATE_PEM, algorithm="RS256")
     return token
 
 
@@ -159,12 +182,14 @@ def hash_object(obj: Dict[str, Any]) -> str:
 
 def hash_cart_mandate(cart_mandate: Dict[str, Any]) -> str:
     """Hash CartMandate contents"""
-    return hash_object(cart_mandate.get("contents", {}))
+    with span("hash cart mandate"):
+        return hash_object(cart_mandate.get("contents", {}))
 
 
 def hash_payment_mandate_contents(payment_contents: Dict[str, Any]) -> str:
     """Hash PaymentMandateContents"""
-    return hash_object(payment_contents)
+    with span("hash payment mandate"):
+        return hash_object(payment_contents)
 
 
 def validate_cart_mandate_structure(cart_mandate: Dict[str, Any]) -> bool:
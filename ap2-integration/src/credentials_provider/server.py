@@ -19,8 +19,11 @@ from src.common import (
     create_error_response,
     AP2_EXTENSION_URI
 )
+from src.common.middleware import install_metrics, install_tracing
 
 app = FastAPI(title="Pokemon Credentials Provider", version="1.0.0")
+install_metrics(app, "credentials_provider")
+install_tracing(app, "credentials_provider")
 
 # Mock payment methods (in production, fetch from real wallet/provider)
 MOCK_PAYMENT_METHODS = [
@@ -42,6 +45,11 @@ MOCK_PAYMENT_METHODS = [
     )
 ]
 
+# Module state each uvicorn worker keeps for itself (see src/common/launcher.py)
+WORKER_STATE = {
+    "MOCK_PAYMENT_METHODS": "read-only demo data",
+}
+
 
 @app.get("/.well-known/agent-card.json")
 async def get_agent_card():
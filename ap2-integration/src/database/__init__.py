@@ -1,14 +1,81 @@
 """Database module for Pokemon marketplace"""
 
-from .engine import engine, SessionLocal, get_db, init_db, get_db_stats
-from .models import Base, Pokemon, Transaction, TransactionItem, Cart, CartItem
-from .repository import PokemonRepository, TransactionRepository, CartRepository
+from .engine import (
+    engine,
+    read_engine,
+    SessionLocal,
+    ReadSessionLocal,
+    get_db,
+    get_read_db,
+    read_engine_for,
+    init_db,
+    ensure_indexes,
+    get_db_stats,
+)
+from .models import (
+    Base,
+    Pokemon,
+    Transaction,
+    TransactionItem,
+    Cart,
+    CartItem,
+    OutboxEvent,
+    DailyPokemonSales,
+    DailyRevenue,
+    InventoryReservation,
+    WorkerLease,
+    CatalogVersion,
+    PokemonType,
+    Merchant,
+    SignedCart,
+)
+from .repository import (
+    PokemonRepository,
+    TransactionRepository,
+    CartRepository,
+    SalesRollupRepository,
+    ReservationRepository,
+    LeaseRepository,
+    MerchantRepository,
+    SignedCartRepository,
+    InsufficientStockError,
+)
+from .catalog import CatalogEntry, CatalogSnapshot, catalog_snapshot, invalidate_catalog
+from .catalog_search import CatalogSearchEngine, catalog_search, POKEMON_TYPES, SORT_KEYS
+from .name_index import NameIndex, name_index
+from .sweeper import CartSweeper
+from .unit_of_work import UnitOfWork
+from .migrations import run_migrations, populate_pokemon_types
+from .importer import CatalogImporter, read_records
+from .synthetic import SyntheticDataGenerator
+from .archive import TransactionArchive, transaction_archive
+from .dialect import UnsupportedDatabaseError
+from .merchants import (
+    DEFAULT_MERCHANT_ID,
+    MerchantPartition,
+    MerchantRouter,
+    UnknownMerchantError,
+    merchant_router,
+    validate_merchant_id,
+)
+from .query_stats import (
+    QueryStats,
+    track_queries,
+    expect_queries,
+    instrument_engine,
+    query_stats_registry,
+)
 
 __all__ = [
     "engine",
+    "read_engine",
     "SessionLocal",
+    "ReadSessionLocal",
     "get_db",
+    "get_read_db",
+    "read_engine_for",
     "init_db",
+    "ensure_indexes",
     "get_db_stats",
     "Base",
     "Pokemon",
@@ -16,7 +83,53 @@ __all__ = [
     "TransactionItem",
     "Cart",
     "CartItem",
+    "OutboxEvent",
+    "DailyPokemonSales",
+    "DailyRevenue",
+    "InventoryReservation",
+    "WorkerLease",
+    "CatalogVersion",
+    "PokemonType",
+    "Merchant",
+    "SignedCart",
     "PokemonRepository",
     "TransactionRepository",
     "CartRepository",
+    "SalesRollupRepository",
+    "ReservationRepository",
+    "LeaseRepository",
+    "MerchantRepository",
+    "SignedCartRepository",
+    "InsufficientStockError",
+    "CatalogEntry",
+    "CatalogSnapshot",
+    "catalog_snapshot",
+    "invalidate_catalog",
+    "CatalogSearchEngine",
+    "catalog_search",
+    "POKEMON_TYPES",
+    "SORT_KEYS",
+    "NameIndex",
+    "name_index",
+    "CartSweeper",
+    "UnitOfWork",
+    "run_migrations",
+    "populate_pokemon_types",
+    "CatalogImporter",
+    "read_records",
+    "SyntheticDataGenerator",
+    "TransactionArchive",
+    "transaction_archive",
+    "UnsupportedDatabaseError",
+    "DEFAULT_MERCHANT_ID",
+    "MerchantPartition",
+    "MerchantRouter",
+    "UnknownMerchantError",
+    "merchant_router",
+    "validate_merchant_id",
+    "QueryStats",
+    "track_queries",
+    "expect_queries",
+    "instrument_engine",
+    "query_stats_registry",
 ]
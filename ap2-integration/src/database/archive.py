@@ -0,0 +1,325 @@
+"""
+Monthly archives of old transactions
+
+Completed transactions older than a cutoff are moved out of the hot
+database into one SQLite file per month of ``created_at``
+(``transactions-YYYY-MM.db``), so the hot ``transactions`` and
+``transaction_items`` tables only hold recent sales. Archive files have
+the same two tables (without foreign keys) and are opened read-only by
+TransactionRepository.get_by_id when a receipt is not in the hot table.
+
+    archive = transaction_archive(engine)
+    archive.archive(engine, before=datetime.now(timezone.utc) - timedelta(days=180))
+    archive.get("txn_...")   # detached Transaction with its items loaded
+
+Every database numbers ``transactions.id`` from 1, so each one archives
+into a directory of its own: with TRANSACTION_ARCHIVE_DIR set (shared by
+the main database and the merchant partitions), a subdirectory named
+after the database file.
+
+Archived rows are no longer counted by TransactionRepository.get_stats;
+SalesRollupRepository.rebuild reads them from the files (see connect).
+"""
+
+import os
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import (
+    Column,
+    Index,
+    MetaData,
+    Table,
+    bindparam,
+    create_engine,
+    delete,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from .dialect import UnsupportedDatabaseError, db_datetime, dialect_name
+from .engine import database_file
+from .models import Transaction, TransactionItem
+
+# Completed transactions older than this are archived by default
+ARCHIVE_AFTER_DAYS = int(os.getenv("TRANSACTION_ARCHIVE_AFTER_DAYS", 180))
+
+# Parent of the archive directories, one "<db name>" subdirectory per database
+# (default: "<db name>_archive" next to each db file)
+ARCHIVE_DIR = os.getenv("TRANSACTION_ARCHIVE_DIR")
+
+# Schema name of the archive file while attached to the hot database
+ARCHIVE_SCHEMA = "archive"
+
+_FILE_PREFIX = "transactions-"
+
+# Same columns as the hot tables; no foreign keys (pokemon is not in the file)
+_archive_metadata = MetaData()
+_ARCHIVE_TABLES = {
+    table.name: Table(
+        table.name,
+        _archive_metadata,
+        *(
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in table.columns
+        ),
+        schema=ARCHIVE_SCHEMA,
+    )
+    for table in (Transaction.__table__, TransactionItem.__table__)
+}
+Index(
+    "ux_archive_transaction_id",
+    _ARCHIVE_TABLES["transactions"].c.transaction_id,
+    unique=True,
+)
+Index(
+    "ix_archive_items_transaction_id",
+    _ARCHIVE_TABLES["transaction_items"].c.transaction_id,
+)
+
+
+class ArchiveMismatchError(RuntimeError):
+    """Raised when an archive file holds other rows under a batch's IDs (nothing is deleted)"""
+
+
+class TransactionArchive:
+    """Directory of monthly transaction archives"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._engines: Dict[str, Engine] = {}
+        self._listing_mtime: Optional[int] = None
+        self._months: List[str] = []
+
+    def path_for(self, month: str) -> Path:
+        """Archive file of a month ("2025-03")"""
+        return self.directory / f"{_FILE_PREFIX}{month}.db"
+
+    def months(self) -> List[str]:
+        """Archived months, newest first (rescanned when the directory changes)"""
+        try:
+            mtime = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if mtime != self._listing_mtime:
+            self._months = sorted(
+                (path.stem[len(_FILE_PREFIX):] for path in self.directory.glob(f"{_FILE_PREFIX}*.db")),
+                reverse=True,
+            )
+            self._listing_mtime = mtime
+        return self._months
+
+    def _reader(self, month: str) -> Engine:
+        """Read-only engine for one archive file"""
+        engine = self._engines.get(month)
+        if engine is None:
+            engine = create_engine(
+                f"sqlite:///file:{self.path_for(month)}?mode=ro&uri=true",
+                connect_args={"check_same_thread": False},
+            )
+            self._engines[month] = engine
+        return engine
+
+    def connect(self, month: str) -> Connection:
+        """Read-only connection to a month's file (same table names as the hot database)"""
+        return self._reader(month).connect()
+
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        """
+        Find an archived transaction, newest month first.
+
+        Returns a detached Transaction with its items loaded (read-only:
+        it is not part of any session of the hot database).
+        """
+        query = (
+            select(Transaction)
+            .options(selectinload(Transaction.items))
+            .where(Transaction.transaction_id == transaction_id)
+        )
+        for month in self.months():
+            with Session(self._reader(month)) as session:
+                transaction = session.scalars(query).one_or_none()
+            if transaction is not None:
+                return transaction
+        return None
+
+    def archive(
+        self,
+        engine: Engine,
+        before: datetime,
+        batch_size: int = 1000,
+        dry_run: bool = False
+    ) -> Dict[str, int]:
+        """
+        Move completed transactions created before ``before`` (and their
+        items) into the monthly archive files, one batch per DB transaction.
+
+        A batch is copied and deleted in the same transaction. Copies skip
+        receipts already in the file, so a batch interrupted after the
+        archive commit is simply moved again; hot rows are only deleted
+        once every one of them is in the file (see ArchiveMismatchError).
+
+        Returns:
+            Transactions moved per month ("2025-03": 120)
+        """
+        if dialect_name(engine) != "sqlite":
+            raise UnsupportedDatabaseError(f"Archiving needs a SQLite database, not {dialect_name(engine)}")
+
+        cutoff = db_datetime(engine, before)
+        moved: Dict[str, int] = {}
+        offset = 0  # moved rows disappear; a dry run has to page past them
+
+        while True:
+            # Oldest first along the (status, created_at) index
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(Transaction.id, Transaction.created_at)
+                    .where(Transaction.status == "completed", Transaction.created_at < cutoff)
+                    .order_by(Transaction.created_at, Transaction.id)
+                    .limit(batch_size)
+                    .offset(offset)
+                ).all()
+            if not rows:
+                break
+            if dry_run:
+                offset += len(rows)
+
+            by_month: Dict[str, List[int]] = {}
+            for row in rows:
+                by_month.setdefault(row.created_at.strftime("%Y-%m"), []).append(row.id)
+
+            for month, ids in by_month.items():
+                if not dry_run:
+                    self._move(engine, month, ids)
+                moved[month] = moved.get(month, 0) + len(ids)
+
+            if len(rows) < batch_size:
+                break
+
+        return moved
+
+    def _move(self, engine: Engine, month: str, ids: List[int]):
+        """Copy transactions and their items to a month's file, then delete them"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        ids_param = bindparam("ids", expanding=True)
+
+        with engine.connect() as conn:
+            # ATTACH is not allowed inside a transaction
+            conn.exec_driver_sql(
+                f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(self.path_for(month)),)
+            )
+            try:
+                _archive_metadata.create_all(conn)
+                for table, key, conflict in (
+                    ("transactions", "id", "(transaction_id)"),
+                    ("transaction_items", "transaction_id", ""),
+                ):
+                    columns = ", ".join(_sync_columns(conn, table))
+                    try:
+                        conn.execute(text(
+                            f"INSERT INTO {ARCHIVE_SCHEMA}.{table} ({columns}) "
+                            f"SELECT {columns} FROM main.{table} WHERE {key} IN :ids "
+                            f"ON CONFLICT {conflict} DO NOTHING"
+                        ).bindparams(ids_param), {"ids": ids})
+                    except IntegrityError as e:
+                        raise ArchiveMismatchError(
+                            f"{self.path_for(month)} holds other {table} under the same ids"
+                        ) from e
+                _check_copied(conn, ids, self.path_for(month))
+
+                items = TransactionItem.__table__
+                conn.execute(delete(items).where(items.c.transaction_id.in_(ids)))
+                conn.execute(delete(Transaction.__table__).where(Transaction.__table__.c.id.in_(ids)))
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+    def stats(self) -> Dict[str, int]:
+        """Archived transactions per month"""
+        counts = {}
+        for month in self.months():
+            with self._reader(month).connect() as conn:
+                counts[month] = conn.execute(text("SELECT COUNT(*) FROM transactions")).scalar()
+        return counts
+
+    def close(self):
+        """Dispose the read-only engines"""
+        for engine in self._engines.values():
+            engine.dispose()
+        self._engines.clear()
+
+
+def _sync_columns(conn: Connection, table: str) -> List[str]:
+    """
+    Add hot-table columns missing from the attached archive table (added
+    after the file was created).
+
+    Returns:
+        Column names of the hot table
+    """
+    inspector = inspect(conn)
+    hot = inspector.get_columns(table)
+    archived = {c["name"] for c in inspector.get_columns(table, schema=ARCHIVE_SCHEMA)}
+    for column in hot:
+        if column["name"] not in archived:
+            ddl = column["type"].compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {column['name']} {ddl}"))
+    return [column["name"] for column in hot]
+
+
+def _check_copied(conn: Connection, ids: List[int], path: Path):
+    """
+    Raise ArchiveMismatchError unless every transaction and item about to
+    be deleted is in the attached archive under the same id and receipt.
+    """
+    ids_param = bindparam("ids", expanding=True)
+    hot, archived = conn.execute(text(
+        f"SELECT COUNT(*), COUNT(a.id) FROM main.transactions m "
+        f"LEFT JOIN {ARCHIVE_SCHEMA}.transactions a "
+        f"ON a.id = m.id AND a.transaction_id = m.transaction_id "
+        f"WHERE m.id IN :ids"
+    ).bindparams(ids_param), {"ids": ids}).one()
+    hot_items, archived_items = conn.execute(text(
+        f"SELECT COUNT(*), COUNT(a.id) FROM main.transaction_items m "
+        f"LEFT JOIN {ARCHIVE_SCHEMA}.transaction_items a "
+        f"ON a.id = m.id AND a.transaction_id = m.transaction_id "
+        f"WHERE m.transaction_id IN :ids"
+    ).bindparams(ids_param), {"ids": ids}).one()
+    if archived != hot or archived_items != hot_items:
+        raise ArchiveMismatchError(
+            f"Only {archived}/{hot} transactions and {archived_items}/{hot_items} items "
+            f"are in {path}; nothing was deleted"
+        )
+
+
+# Archive per engine (tests and tools use several databases)
+_archives: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def archive_dir_for(engine: Engine) -> Optional[Path]:
+    """Archive directory of a database (None for in-memory or server databases)"""
+    path = database_file(engine)
+    if path is None:
+        return None
+    if ARCHIVE_DIR:
+        return Path(ARCHIVE_DIR) / path.stem
+    return path.with_name(f"{path.stem}_archive")
+
+
+def transaction_archive(bind) -> Optional[TransactionArchive]:
+    """Monthly archive of an engine or session (None if it has none)"""
+    engine = bind.get_bind() if isinstance(bind, Session) else bind
+    archive = _archives.get(engine)
+    if archive is None:
+        directory = archive_dir_for(engine)
+        if directory is None:
+            return None
+        archive = _archives[engine] = TransactionArchive(directory)
+    return archive
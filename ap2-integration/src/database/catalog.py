@@ -0,0 +1,149 @@
+"""
+In-memory catalog snapshot
+
+The catalog is small (151 Pokemon) and read on almost every request, so
+reads are served from an immutable snapshot held in memory and shared by
+all sessions on the same database (built on its read-only engine).
+Freshness is checked with a single read of ``catalog_version`` (the sum
+of its counter rows), which database triggers bump on every price or
+stock write (including writes from other processes).
+When the version moved, the snapshot is rebuilt with one query and
+swapped in; readers never take a lock.
+
+Snapshots hold committed data only. Code that changes stock must load
+the ORM row (``db.get(Pokemon, numero)``) instead.
+"""
+
+import json
+import weakref
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from .engine import read_engine_for
+from .models import CatalogVersion, Pokemon
+
+# Offline species data (project root): types and base stats of the 151
+# species, which never change
+SPECIES_PATH = Path(__file__).resolve().parent.parent.parent.parent / "pokemon-gen1-species.json"
+
+
+@lru_cache(maxsize=1)
+def load_species(path: Path = SPECIES_PATH) -> Dict[int, dict]:
+    """Species data keyed by numero ({} if the snapshot file is missing)"""
+    if not path.exists():
+        print(f"⚠️  Species data not found at {path}: type and stat filters disabled")
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {species["numero"]: species for species in json.load(f)}
+
+
+class CatalogEntry:
+    """Read-only catalog record with the same attributes as Pokemon"""
+
+    __slots__ = (
+        "numero",
+        "nombre",
+        "precio",
+        "en_venta",
+        "inventario_total",
+        "inventario_disponible",
+        "inventario_vendido",
+    )
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CatalogEntry is read-only (tried to set {name})")
+
+    def __repr__(self):
+        return f"<CatalogEntry {self.numero}: {self.nombre} (${self.precio})>"
+
+    @property
+    def is_available(self) -> bool:
+        """For sale with stock left"""
+        return bool(self.en_venta) and self.inventario_disponible > 0
+
+    def to_dict(self):
+        """Convert to dictionary (same format as Pokemon.to_dict)"""
+        return {
+            "numero": self.numero,
+            "nombre": self.nombre,
+            "precio": self.precio,
+            "enVenta": self.en_venta,
+            "inventario": {
+                "total": self.inventario_total,
+                "disponibles": self.inventario_disponible,
+                "vendidos": self.inventario_vendido,
+            }
+        }
+
+
+_COLUMNS = [getattr(Pokemon, name) for name in CatalogEntry.__slots__]
+
+
+class CatalogSnapshot:
+    """Immutable catalog indexed by numero and nombre"""
+
+    __slots__ = ("version", "entries", "by_numero", "by_nombre")
+
+    def __init__(self, version: Optional[int], rows: Iterable[Tuple]):
+        self.version = version
+        self.entries = tuple(CatalogEntry(*row) for row in rows)
+        self.by_numero: Dict[int, CatalogEntry] = {e.numero: e for e in self.entries}
+        self.by_nombre: Dict[str, CatalogEntry] = {e.nombre: e for e in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Current snapshot per engine (tests and tools use several databases)
+_snapshots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def catalog_snapshot(bind) -> CatalogSnapshot:
+    """
+    Get an up-to-date catalog snapshot for an engine or session.
+
+    Costs one read of the catalog_version rows while the catalog is
+    unchanged, and one extra query to rebuild after a write.
+    """
+    engine = read_engine_for(bind)
+
+    # Read committed state on a connection of its own, so rows flushed
+    # but not committed by the caller's session never get shared
+    with engine.connect() as conn:
+        # Version first: a write landing between the two reads only makes
+        # the snapshot look older than it is, forcing one extra rebuild
+        try:
+            version = conn.execute(select(func.sum(CatalogVersion.version))).scalar()
+        except OperationalError:
+            # No catalog_version table yet (database not migrated)
+            conn.rollback()
+            version = None
+
+        current = _snapshots.get(engine)
+        if current is not None and version is not None and current.version == version:
+            return current
+
+        rows = conn.execute(select(*_COLUMNS).order_by(Pokemon.numero)).all()
+
+    snapshot = CatalogSnapshot(version, rows)
+    if version is not None:
+        # Without the counter (database not migrated) never cache
+        _snapshots[engine] = snapshot
+    return snapshot
+
+
+def invalidate_catalog(bind=None):
+    """Drop cached snapshots (all engines if bind is None)"""
+    if bind is None:
+        _snapshots.clear()
+    else:
+        engine = read_engine_for(bind)
+        _snapshots.pop(engine, None)
@@ -0,0 +1,274 @@
+"""
+Columnar catalog search
+
+Keeps the catalog as NumPy columns (price, stock, on-sale flag, type
+bitmask, base stats) and answers compound filters with vectorized masks.
+Sorted queries select the top ``limit`` rows with argpartition instead
+of sorting every match.
+
+Types come from the ``pokemon_types`` table, like the type filter of
+PokemonRepository, so imported Pokemon are searchable by type too. Base
+stats come from the offline snapshot ``pokemon-gen1-species.json`` (zero
+for species it does not cover); price and stock come from the catalog
+snapshot (catalog.py). The columns are rebuilt whenever the catalog
+snapshot changes; type rows are written together with their Pokemon
+(see CatalogImporter), which moves the snapshot.
+"""
+
+import weakref
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from .engine import read_engine_for
+from .catalog import CatalogSnapshot, catalog_snapshot, load_species
+from .models import PokemonType
+
+# Bit i of a type mask is POKEMON_TYPES[i] (PokeAPI type names)
+POKEMON_TYPES = (
+    "normal", "fire", "water", "electric", "grass", "ice",
+    "fighting", "poison", "ground", "flying", "psychic", "bug",
+    "rock", "ghost", "dragon", "dark", "steel", "fairy",
+)
+TYPE_BITS = {name: 1 << i for i, name in enumerate(POKEMON_TYPES)}
+
+# Column order of the stats matrix (PokeAPI stat names)
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+
+# Accepted sort keys; prefix with "-" for descending
+SORT_KEYS = ("numero", "precio", "stock", "total") + STAT_NAMES
+
+
+def type_mask(types: Iterable[str]) -> int:
+    """Bitmask for type names; raises ValueError on an unknown type"""
+    mask = 0
+    for name in types:
+        bit = TYPE_BITS.get(name.strip().lower())
+        if bit is None:
+            raise ValueError(f"Unknown Pokemon type: {name}")
+        mask |= bit
+    return mask
+
+
+class CatalogSearchEngine:
+    """
+    Vectorized search over catalog columns.
+
+    All arrays are aligned by row. ``entries`` and ``type_names`` are only
+    needed to turn result rows into dicts (see records()).
+    """
+
+    def __init__(
+        self,
+        numero: np.ndarray,
+        precio: np.ndarray,
+        stock: np.ndarray,
+        en_venta: np.ndarray,
+        types: np.ndarray,
+        stats: np.ndarray,
+        entries: Optional[Sequence] = None,
+        type_names: Optional[Sequence[Tuple[str, ...]]] = None
+    ):
+        self.numero = numero
+        self.precio = precio
+        self.stock = stock
+        self.en_venta = en_venta
+        self.types = types
+        self.stats = stats
+        self.total = stats.sum(axis=1, dtype=np.int32)
+        self.entries = entries
+        self.type_names = type_names
+        self._row_by_numero: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: CatalogSnapshot,
+        species: Dict[int, dict],
+        pokemon_types: Optional[Dict[int, Tuple[str, ...]]] = None
+    ) -> "CatalogSearchEngine":
+        """
+        Build columns from a catalog snapshot plus species data.
+
+        ``pokemon_types`` maps numero to type names in slot order (see
+        load_pokemon_types); without it types come from the species data.
+        """
+        if pokemon_types is None:
+            pokemon_types = {numero: tuple(data["types"]) for numero, data in species.items()}
+        entries = snapshot.entries
+        count = len(entries)
+        types = np.zeros(count, dtype=np.uint32)
+        stats = np.zeros((count, len(STAT_NAMES)), dtype=np.int16)
+        type_names = []
+
+        for row, entry in enumerate(entries):
+            names = pokemon_types.get(entry.numero, ())
+            types[row] = type_mask(names)
+            type_names.append(names)
+            data = species.get(entry.numero)
+            if data is not None:
+                stats[row] = [data["stats"][name] for name in STAT_NAMES]
+
+        return cls(
+            numero=np.fromiter((e.numero for e in entries), dtype=np.int32, count=count),
+            precio=np.fromiter((e.precio for e in entries), dtype=np.float64, count=count),
+            stock=np.fromiter((e.inventario_disponible for e in entries), dtype=np.int32, count=count),
+            en_venta=np.fromiter((bool(e.en_venta) for e in entries), dtype=bool, count=count),
+            types=types,
+            stats=stats,
+            entries=entries,
+            type_names=type_names,
+        )
+
+    def __len__(self):
+        return len(self.numero)
+
+    def rows_for(self, numeros: Iterable[int]) -> np.ndarray:
+        """Row positions of the given numeros, in the same order (unknown skipped)"""
+        if self._row_by_numero is None:
+            self._row_by_numero = {int(n): row for row, n in enumerate(self.numero)}
+        rows = [self._row_by_numero.get(n) for n in numeros]
+        return np.array([r for r in rows if r is not None], dtype=np.intp)
+
+    def _sort_column(self, key: str) -> np.ndarray:
+        if key == "numero":
+            return self.numero
+        if key == "precio":
+            return self.precio
+        if key == "stock":
+            return self.stock
+        if key == "total":
+            return self.total
+        if key in STAT_NAMES:
+            return self.stats[:, STAT_NAMES.index(key)]
+        raise ValueError(f"Unknown sort key: {key} (use one of {', '.join(SORT_KEYS)})")
+
+    def search(
+        self,
+        types: Iterable[str] = (),
+        any_types: Iterable[str] = (),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        only_available: bool = False,
+        min_stats: Optional[Dict[str, int]] = None,
+        sort_by: Optional[str] = None,
+        limit: int = 151,
+        within: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Evaluate filters and return matching rows.
+
+        Args:
+            types: Types every result must have (e.g. fire AND flying)
+            any_types: Types of which a result needs at least one
+            min_price / max_price: Price bounds (inclusive)
+            only_available: For sale with stock left
+            min_stats: Minimum base stats, e.g. {"attack": 80, "total": 500}
+            sort_by: Sort key from SORT_KEYS, "-" prefix for descending;
+                None keeps catalog order (or the order of ``within``)
+            limit: Maximum rows returned
+            within: Only consider these rows (e.g. name matches from
+                rows_for(), best first)
+
+        Returns:
+            (row positions in result order, total number of matches)
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        required = type_mask(types)
+        if required:
+            mask &= (self.types & required) == required
+        wanted = type_mask(any_types)
+        if wanted:
+            mask &= (self.types & wanted) != 0
+        if min_price is not None:
+            mask &= self.precio >= min_price
+        if max_price is not None:
+            mask &= self.precio <= max_price
+        if only_available:
+            mask &= self.en_venta & (self.stock > 0)
+        for name, minimum in (min_stats or {}).items():
+            mask &= self._sort_column(name) >= minimum
+
+        rows = np.flatnonzero(mask) if within is None else within[mask[within]]
+        total = len(rows)
+        limit = max(0, min(limit, total))
+
+        if sort_by is None:
+            return rows[:limit], total
+
+        descending = sort_by.startswith("-")
+        keys = self._sort_column(sort_by.lstrip("-"))[rows].astype(np.float64)
+        if descending:
+            keys = -keys
+        return rows[self._top_k(keys, limit)], total
+
+    @staticmethod
+    def _top_k(keys: np.ndarray, k: int) -> np.ndarray:
+        """
+        Positions of the k smallest keys, sorted; ties keep row order.
+
+        argpartition finds the k-th key in O(n); only the rows below it
+        plus the first tied rows are sorted.
+        """
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(keys):
+            kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+            below = np.flatnonzero(keys < kth)
+            ties = np.flatnonzero(keys == kth)[:k - len(below)]
+            chosen = np.sort(np.concatenate([below, ties]))
+        else:
+            chosen = np.arange(len(keys))
+        return chosen[np.argsort(keys[chosen], kind="stable")]
+
+    def records(self, rows: Iterable[int]) -> List[Dict]:
+        """Result rows as catalog dicts plus types and base stats"""
+        if self.entries is None:
+            raise ValueError("Search engine was built without catalog entries")
+        results = []
+        for row in rows:
+            record = self.entries[row].to_dict()
+            record["types"] = list(self.type_names[row])
+            record["stats"] = dict(zip(STAT_NAMES, self.stats[row].tolist()))
+            results.append(record)
+        return results
+
+
+def load_pokemon_types(engine) -> Optional[Dict[int, Tuple[str, ...]]]:
+    """Type names per numero from pokemon_types (None if not migrated yet)"""
+    pokemon_types: Dict[int, Tuple[str, ...]] = {}
+    with engine.connect() as conn:
+        try:
+            rows = conn.execute(
+                select(PokemonType.pokemon_numero, PokemonType.type_name)
+                .order_by(PokemonType.pokemon_numero, PokemonType.slot)
+            )
+        except OperationalError:
+            return None
+        for numero, type_name in rows:
+            pokemon_types[numero] = pokemon_types.get(numero, ()) + (type_name,)
+    return pokemon_types
+
+
+# (snapshot, engine) per database engine; rebuilt when the snapshot changes
+_engines: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def catalog_search(bind) -> CatalogSearchEngine:
+    """Get a search engine for the current catalog of an engine or session"""
+    engine = read_engine_for(bind)
+    snapshot = catalog_snapshot(engine)
+
+    cached = _engines.get(engine)
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+
+    search_engine = CatalogSearchEngine.from_snapshot(
+        snapshot, load_species(), load_pokemon_types(engine)
+    )
+    _engines[engine] = (snapshot, search_engine)
+    return search_engine
@@ -0,0 +1,250 @@
+"""
+Dialect helpers
+
+Small layer over SQLAlchemy dialect differences so repositories and the
+engine setup do not hard-code SQLite:
+
+- engine_options(): pool and connect arguments per backend
+- read_only_url()/read_engine_options(): the read-only side of a database
+- SQLite pragmas applied to every new connection
+- db_datetime()/db_now(): timestamps in the form the backend compares
+- supports_row_locks(): whether SELECT ... FOR UPDATE locks rows
+- upsert(): INSERT ... ON CONFLICT for SQLite and PostgreSQL
+- check_database(): startup check that the backend has what the code needs
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from sqlalchemy.engine import URL
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, StaticPool
+
+# Pool settings for pooled backends (SQLite files and server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Seconds before a server connection is replaced (-1: never)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+# Own pool of the read-only engine (catalog, search, reports), sized for
+# read bursts so they never take connections from checkout writes
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 10))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", 20))
+
+# Seconds a SQLite writer waits for the database lock before "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 15))
+
+# Pragmas for every SQLite connection, including engines made by tests and tools
+SQLITE_PRAGMAS = {"foreign_keys": "ON"}
+
+# Extra pragmas for SQLite files opened through engine_options(): WAL lets
+# readers run while one connection writes
+SQLITE_FILE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+}
+
+# Pragmas for read-only SQLite connections: refuse writes even where the
+# file itself is writable
+SQLITE_READ_PRAGMAS = {"query_only": "ON"}
+
+# Backends with INSERT ... ON CONFLICT (see upsert())
+UPSERT_DIALECTS = ("sqlite", "postgresql")
+
+
+class UnsupportedDatabaseError(RuntimeError):
+    """Raised when the configured database cannot do what was asked (a configuration error)"""
+
+
+def dialect_name(bind) -> str:
+    """Dialect name of a session, engine, connection or dialect (e.g. "sqlite")"""
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    return getattr(bind, "dialect", bind).name
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    """In-memory SQLite URL (":memory:" or a mode=memory URI)"""
+    database = url.database or ""
+    return (
+        url.get_backend_name() == "sqlite"
+        and (database in ("", ":memory:") or url.query.get("mode") == "memory")
+    )
+
+
+def is_sqlite_private_memory(url: URL) -> bool:
+    """Plain ":memory:" SQLite (not a shared-cache URI): one connection holds the database"""
+    return is_sqlite_memory(url) and url.query.get("cache") != "shared"
+
+
+def apply_sqlite_pragmas(dbapi_conn, pragmas: Dict[str, Any]):
+    """Set pragmas on a raw sqlite3 connection"""
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def on_connect(dbapi_conn, connection_record):
+    """Per-connection setup for any engine (no-op outside SQLite)"""
+    if isinstance(dbapi_conn, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_conn, SQLITE_PRAGMAS)
+
+
+def on_file_connect(dbapi_conn, connection_record):
+    """Per-connection setup for SQLite files opened through engine_options()"""
+    if isinstance(dbapi_conn, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_conn, SQLITE_FILE_PRAGMAS)
+
+
+def on_read_connect(dbapi_conn, connection_record):
+    """Per-connection setup for read-only SQLite engines"""
+    if isinstance(dbapi_conn, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_conn, SQLITE_READ_PRAGMAS)
+
+
+def engine_options(url: URL) -> Dict[str, Any]:
+    """
+    create_engine() arguments for a URL.
+
+    - SQLite file: QueuePool sized by DB_POOL_SIZE/DB_MAX_OVERFLOW,
+      shared across threads, waiting SQLITE_BUSY_TIMEOUT for the lock
+    - SQLite ":memory:": a single connection (each new connection would
+      be a new, empty database); only for single-session tools, the
+      repositories refuse it (see check_database)
+    - SQLite shared-cache memory URI: pooled, never recycled (the data
+      lives as long as one connection is open); readers may run in
+      several threads, but only one writer at a time (no busy wait)
+    - Other backends: pooled with pre-ping and DB_POOL_RECYCLE
+    """
+    if url.get_backend_name() == "sqlite":
+        options: Dict[str, Any] = {
+            "connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+        }
+        if is_sqlite_private_memory(url):
+            options["poolclass"] = StaticPool
+            return options
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=-1,
+        )
+        if is_sqlite_memory(url):
+            options["poolclass"] = QueuePool
+        return options
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def read_only_url(url: URL) -> Optional[URL]:
+    """
+    URL opening the same database read-only, or None where a second
+    engine would not see the same data (SQLite memory databases).
+
+    SQLite files become ``mode=ro`` URIs; server URLs are unchanged and
+    get read-only transactions from read_engine_options().
+    """
+    if url.get_backend_name() != "sqlite":
+        return url
+    if is_sqlite_memory(url):
+        return None
+    database = url.database
+    if not database.startswith("file:"):
+        database = f"file:{quote(database)}"
+    return url.set(database=database, query={**url.query, "mode": "ro", "uri": "true"})
+
+
+def read_engine_options(url: URL) -> Dict[str, Any]:
+    """create_engine() arguments for a read-only URL (own, larger pool)"""
+    options = engine_options(url)
+    options.update(pool_size=DB_READ_POOL_SIZE, max_overflow=DB_READ_MAX_OVERFLOW)
+    if url.get_backend_name() == "postgresql":
+        options["execution_options"] = {"postgresql_readonly": True}
+    return options
+
+
+def db_datetime(bind, moment: datetime) -> datetime:
+    """
+    A datetime in the form the backend compares timestamps: naive UTC on
+    SQLite (stored without offset), timezone-aware elsewhere.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    return moment.replace(tzinfo=None) if dialect_name(bind) == "sqlite" else moment
+
+
+def db_now(bind) -> datetime:
+    """Current UTC time for comparisons with stored timestamps"""
+    return db_datetime(bind, datetime.now(timezone.utc))
+
+
+def supports_row_locks(bind) -> bool:
+    """
+    Whether SELECT ... FOR UPDATE locks the selected rows. SQLite has no
+    row locks: its single database write lock already serializes writers.
+    """
+    return dialect_name(bind) != "sqlite"
+
+
+def upsert(db: Session, table):
+    """
+    Get an INSERT construct supporting ``on_conflict_do_update`` for the
+    session's dialect.
+
+    Usage:
+        stmt = upsert(db, MyModel.__table__).values(...)
+        stmt = stmt.on_conflict_do_update(index_elements=[...], set_={...})
+    """
+    name = dialect_name(db)
+
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise UnsupportedDatabaseError(
+            f"Upserts need one of {', '.join(UPSERT_DIALECTS)}, not {name}"
+        )
+
+    return insert(table)
+
+
+def check_database(bind):
+    """
+    Raise UnsupportedDatabaseError for a backend the repositories cannot
+    use (checked by init_db, so a bad DATABASE_URL fails at startup
+    instead of on the first checkout).
+
+    Plain ":memory:" SQLite is refused too: its only connection is shared
+    by every session, so a catalog snapshot read (which opens and closes
+    a connection of its own) would roll back the caller's open writes.
+    """
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    name = dialect_name(bind)
+    if name not in UPSERT_DIALECTS:
+        raise UnsupportedDatabaseError(
+            f"Unsupported database {name}: carts, rollups and imports need upserts "
+            f"({', '.join(UPSERT_DIALECTS)})"
+        )
+    url = getattr(bind, "url", None)
+    if url is not None and is_sqlite_private_memory(url):
+        raise UnsupportedDatabaseError(
+            "Plain in-memory SQLite is not supported (all sessions would share one "
+            "connection); use a shared-cache URI such as "
+            "sqlite:///file:market?mode=memory&cache=shared&uri=true"
+        )
@@ -0,0 +1,311 @@
+"""
+Streaming catalog importer
+
+Loads Pokemon listings from JSON arrays, NDJSON or CSV without reading
+the whole file into memory, and upserts them in executemany batches
+inside one transaction (all rows or none). A dry run compares the file
+against the database instead of writing.
+
+Accepted record shapes (JSON/NDJSON): the pokemon-gen1.json format
+(``enVenta``, nested ``inventario``) or flat column names. CSV files use
+the flat names: numero, nombre, precio, en_venta, inventario_total,
+inventario_disponible, inventario_vendido.
+"""
+
+import csv
+import json
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .dialect import upsert
+from .migrations import populate_pokemon_types
+from .models import Pokemon
+
+CATALOG_FIELDS = (
+    "numero",
+    "nombre",
+    "precio",
+    "en_venta",
+    "inventario_total",
+    "inventario_disponible",
+    "inventario_vendido",
+)
+
+FORMATS = ("json", "ndjson", "csv")
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Keep IN (...) lookups well under SQLite's bound parameter limit
+_LOOKUP_CHUNK = 900
+
+_SKIP_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_array(f, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, reading chunk by chunk"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    pos = _SKIP_SEPARATORS.match(buffer).end()
+    opened = False
+
+    while True:
+        if pos >= len(buffer):
+            more = f.read(chunk_size)
+            if not more:
+                raise ValueError("Unexpected end of file inside JSON array")
+            buffer, pos = buffer[pos:] + more, 0
+            pos = _SKIP_SEPARATORS.match(buffer, pos).end()
+            continue
+
+        if not opened:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array (use NDJSON for one object per line)")
+            opened = True
+            pos = _SKIP_SEPARATORS.match(buffer, pos + 1).end()
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Element cut by the chunk boundary: read more and retry
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        if end == len(buffer):
+            # A scalar ending exactly at the boundary may continue ("12|3")
+            more = f.read(chunk_size)
+            if more:
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+        yield value
+        pos = _SKIP_SEPARATORS.match(buffer, end).end()
+
+
+def iter_ndjson(f) -> Iterator[Any]:
+    """Yield one JSON value per non-empty line"""
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+
+
+def iter_csv(f) -> Iterator[Dict[str, str]]:
+    """Yield one dict per CSV row (header row required)"""
+    yield from csv.DictReader(f)
+
+
+def detect_format(path: Path) -> str:
+    """Format from the file extension"""
+    suffix = path.suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if suffix == ".csv":
+        return "csv"
+    return "json"
+
+
+def read_records(path: Path, fmt: Optional[str] = None) -> Iterator[Any]:
+    """Stream raw records from a catalog file"""
+    fmt = fmt or detect_format(path)
+    readers = {"json": iter_json_array, "ndjson": iter_ndjson, "csv": iter_csv}
+    if fmt not in readers:
+        raise ValueError(f"Unknown format: {fmt} (use one of {', '.join(FORMATS)})")
+
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        yield from readers[fmt](f)
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("", "1", "true", "yes", "y", "si", "sí"):
+            return True
+        if value in ("0", "false", "no", "n"):
+            return False
+        raise ValueError(f"Not a boolean: {value!r}")
+    return bool(value)
+
+
+def to_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a record (nested or flat) into pokemon column values"""
+    inventario = record.get("inventario") or {}
+    en_venta = record.get("enVenta", record.get("en_venta"))
+    try:
+        return {
+            "numero": int(record["numero"]),
+            "nombre": str(record["nombre"]).strip().lower(),
+            "precio": int(float(record["precio"])),
+            "en_venta": True if en_venta is None else _to_bool(en_venta),
+            "inventario_total": int(inventario.get("total", record.get("inventario_total", 0))),
+            "inventario_disponible": int(
+                inventario.get("disponibles", record.get("inventario_disponible", 0))
+            ),
+            "inventario_vendido": int(
+                inventario.get("vendidos", record.get("inventario_vendido", 0))
+            ),
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Invalid catalog record {record!r}: {e}") from e
+
+
+def batched_rows(records: Iterable[Any], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Normalize records and group them into lists of batch_size rows"""
+    batch = []
+    for index, record in enumerate(records, start=1):
+        try:
+            batch.append(to_row(record))
+        except ValueError as e:
+            raise ValueError(f"Record {index}: {e}") from e
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CatalogImporter:
+    """Bulk upserts and dry-run diffs of catalog records"""
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.db = db
+        self.batch_size = batch_size
+
+    def load(
+        self,
+        records: Iterable[Any],
+        replace: bool = False,
+        progress: Optional[Callable[[int, float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Upsert all records in one transaction.
+
+        Args:
+            records: Raw records (see read_records)
+            replace: Delete the current catalog first (same transaction)
+            progress: Called as progress(rows_so_far, elapsed_seconds)
+                after every batch
+
+        Returns:
+            Stats: rows, batches, deleted, type_rows, seconds, rows_per_second
+        """
+        start = time.perf_counter()
+        rows = batches = deleted = 0
+
+        try:
+            if replace:
+                deleted = self.db.execute(delete(Pokemon)).rowcount
+
+            stmt = upsert(self.db, Pokemon.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Pokemon.numero],
+                set_={
+                    **{field: stmt.excluded[field] for field in CATALOG_FIELDS[1:]},
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            )
+
+            for batch in batched_rows(records, self.batch_size):
+                # Last occurrence wins if a numero repeats within a batch
+                batch = list({row["numero"]: row for row in batch}.values())
+                self.db.execute(stmt, batch)
+                rows += len(batch)
+                batches += 1
+                if progress:
+                    progress(rows, time.perf_counter() - start)
+
+            type_rows = populate_pokemon_types(self.db.connection())
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "batches": batches,
+            "deleted": deleted,
+            "type_rows": type_rows,
+            "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed else 0.0,
+        }
+
+    def diff(
+        self,
+        records: Iterable[Any],
+        replace: bool = False,
+        sample_size: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Compare records with the database without writing anything.
+
+        Returns:
+            Counts of new / changed / unchanged rows, rows that would be
+            deleted (only with replace) and up to sample_size examples:
+            ("+", row) for new rows, ("~", numero, {field: (old, new)})
+            for changed ones
+        """
+        counts = {"new": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+        samples = []
+        seen = set()
+        columns = [getattr(Pokemon, field) for field in CATALOG_FIELDS]
+
+        for batch in batched_rows(records, self.batch_size):
+            numeros = [row["numero"] for row in batch]
+            existing = {}
+            for i in range(0, len(numeros), _LOOKUP_CHUNK):
+                chunk = numeros[i:i + _LOOKUP_CHUNK]
+                for current in self.db.execute(select(*columns).where(Pokemon.numero.in_(chunk))):
+                    existing[current.numero] = current
+
+            for row in batch:
+                seen.add(row["numero"])
+                current = existing.get(row["numero"])
+                if current is None:
+                    counts["new"] += 1
+                    if len(samples) < sample_size:
+                        samples.append(("+", row))
+                    continue
+
+                changes = {
+                    field: (getattr(current, field), row[field])
+                    for field in CATALOG_FIELDS[1:]
+                    if getattr(current, field) != row[field]
+                }
+                if changes:
+                    counts["changed"] += 1
+                    if len(samples) < sample_size:
+                        samples.append(("~", row["numero"], changes))
+                else:
+                    counts["unchanged"] += 1
+
+        if replace:
+            total = self.db.execute(select(func.count()).select_from(Pokemon)).scalar()
+            kept = 0
+            numeros = list(seen)
+            for i in range(0, len(numeros), _LOOKUP_CHUNK):
+                kept += self.db.execute(
+                    select(func.count()).select_from(Pokemon)
+                    .where(Pokemon.numero.in_(numeros[i:i + _LOOKUP_CHUNK]))
+                ).scalar()
+            counts["deleted"] = total - kept
+
+        self.db.rollback()
+        return {**counts, "samples": samples}
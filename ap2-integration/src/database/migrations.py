@@ -0,0 +1,237 @@
+"""
+Schema migrations
+
+create_all only creates missing tables. Changes to existing tables (new
+columns, backfills) are listed here as ordered, idempotent steps and
+recorded in ``schema_migrations`` once applied. init_db runs them on
+startup.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    String,
+    Table,
+    bindparam,
+    delete,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Connection
+
+from .catalog import load_species
+from .models import (
+    Base,
+    CartItem,
+    CatalogVersion,
+    Merchant,
+    Pokemon,
+    PokemonType,
+    SignedCart,
+    CATALOG_VERSION_TRIGGERS,
+)
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """Add a column unless it already exists (e.g. table made by create_all)"""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in existing:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def add_cart_totals(conn: Connection):
+    """Denormalized carts.item_count / carts.total_amount, backfilled"""
+    _add_column(conn, "carts", "item_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "carts", "total_amount", "FLOAT NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "UPDATE carts SET "
+        "item_count = (SELECT COUNT(*) FROM cart_items WHERE cart_items.cart_id = carts.id), "
+        "total_amount = (SELECT COALESCE(SUM(total_price), 0) FROM cart_items "
+        "WHERE cart_items.cart_id = carts.id)"
+    ))
+
+
+def add_catalog_version(conn: Connection):
+    """catalog_version row and the pokemon triggers that bump it"""
+    CatalogVersion.__table__.create(conn, checkfirst=True)
+    if not conn.execute(select(func.count()).select_from(CatalogVersion.__table__)).scalar():
+        conn.execute(insert(CatalogVersion.__table__).values(id=1, version=0))
+    for statement in CATALOG_VERSION_TRIGGERS.get(conn.dialect.name, []):
+        conn.execute(text(statement))
+
+
+def populate_pokemon_types(conn: Connection, species: Optional[Dict[int, dict]] = None) -> int:
+    """
+    Add type rows for every Pokemon that has none yet, from the offline
+    species data. Idempotent; run again after importing new Pokemon.
+    
+    Returns:
+        Rows inserted
+    """
+    species = load_species() if species is None else species
+    numeros = set(conn.execute(select(Pokemon.numero)).scalars())
+    typed = set(conn.execute(select(PokemonType.pokemon_numero).distinct()).scalars())
+    
+    rows = [
+        {"pokemon_numero": numero, "slot": slot, "type_name": type_name}
+        for numero in sorted(numeros - typed)
+        if numero in species
+        for slot, type_name in enumerate(species[numero]["types"], start=1)
+    ]
+    if rows:
+        conn.execute(insert(PokemonType.__table__), rows)
+    return len(rows)
+
+
+def add_pokemon_types(conn: Connection):
+    """pokemon_types table, filled for the Pokemon already in the catalog"""
+    PokemonType.__table__.create(conn, checkfirst=True)
+    populate_pokemon_types(conn)
+
+
+# Composite indexes behind the hot repository filters (declared on the models)
+HOT_QUERY_INDEXES = [
+    "ix_pokemon_available_precio",
+    "ix_transactions_status_created_at",
+    "ix_carts_status_expires_at",
+]
+
+# Single-column index -> composite index that starts with the same column.
+# Once the composite exists the old index only slows down writes.
+REDUNDANT_INDEXES = {
+    "ix_transactions_status": "ix_transactions_status_created_at",
+    "ix_carts_status": "ix_carts_status_expires_at",
+    "ix_cart_items_cart_id": "ux_cart_items_cart_pokemon",
+}
+
+
+def add_hot_query_indexes(conn: Connection):
+    """Composite indexes for hot filters; drop the indexes they supersede"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in HOT_QUERY_INDEXES:
+                index.create(conn, checkfirst=True)
+    
+    inspector = inspect(conn)
+    existing = {
+        index["name"]
+        for table in inspector.get_table_names()
+        for index in inspector.get_indexes(table)
+    }
+    for name, replacement in REDUNDANT_INDEXES.items():
+        # e.g. the unique cart_items index could not be built over duplicates
+        if name in existing and replacement in existing:
+            conn.execute(text(f"DROP INDEX {name}"))
+
+
+def add_merchants(conn: Connection):
+    """merchants registry (the default merchant needs no row)"""
+    Merchant.__table__.create(conn, checkfirst=True)
+
+
+def add_signed_carts(conn: Connection):
+    """signed_carts table (CartMandates were kept in merchant agent memory)"""
+    SignedCart.__table__.create(conn, checkfirst=True)
+
+
+def spread_catalog_version(conn: Connection):
+    """Reinstall the catalog triggers (PostgreSQL: one counter row per backend slot)"""
+    for statement in CATALOG_VERSION_TRIGGERS.get(conn.dialect.name, []):
+        conn.execute(text(statement))
+
+
+def unique_cart_items(conn: Connection):
+    """
+    Unique (cart_id, pokemon_numero) index that add_item upserts on.
+
+    Older databases may hold several lines for the same Pokemon in a cart:
+    they are merged into the oldest one (quantities and totals summed)
+    first. Creating the index is not wrapped, so any failure aborts the
+    migrations instead of leaving the upsert without its conflict target.
+    """
+    items = CartItem.__table__
+    duplicates = conn.execute(
+        select(
+            items.c.cart_id,
+            items.c.pokemon_numero,
+            func.min(items.c.id),
+            func.sum(items.c.quantity),
+            func.sum(items.c.total_price),
+        )
+        .group_by(items.c.cart_id, items.c.pokemon_numero)
+        .having(func.count() > 1)
+    ).all()
+    for cart_id, numero, keep, quantity, total_price in duplicates:
+        conn.execute(update(items).where(items.c.id == keep).values(quantity=quantity, total_price=total_price))
+        conn.execute(delete(items).where(
+            items.c.cart_id == cart_id, items.c.pokemon_numero == numero, items.c.id != keep
+        ))
+    if duplicates:
+        conn.execute(
+            text(
+                "UPDATE carts SET item_count = (SELECT COUNT(*) FROM cart_items "
+                "WHERE cart_items.cart_id = carts.id) WHERE id IN :ids"
+            ).bindparams(bindparam("ids", expanding=True)),
+            {"ids": sorted({row[0] for row in duplicates})}
+        )
+
+    for index in items.indexes:
+        if index.name == "ux_cart_items_cart_pokemon":
+            index.create(conn, checkfirst=True)
+    conn.execute(text("DROP INDEX IF EXISTS ix_cart_items_cart_id"))
+
+
+# (version, step) in the order they must run. Never reorder or edit a
+# released step; add a new one instead.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_cart_totals", add_cart_totals),
+    ("0002_catalog_version", add_catalog_version),
+    ("0003_pokemon_types", add_pokemon_types),
+    ("0004_hot_query_indexes", add_hot_query_indexes),
+    ("0005_merchants", add_merchants),
+    ("0006_signed_carts", add_signed_carts),
+    ("0007_catalog_version_slots", spread_catalog_version),
+    ("0008_unique_cart_items", unique_cart_items),
+]
+
+
+def run_migrations(bind) -> List[str]:
+    """
+    Apply pending migrations in one transaction.
+
+    Returns:
+        Versions applied by this call
+    """
+    applied_now = []
+
+    with bind.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+        for version, step in MIGRATIONS:
+            if version in applied:
+                continue
+            step(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=version,
+                applied_at=datetime.now(timezone.utc)
+            ))
+            applied_now.append(version)
+
+    return applied_now
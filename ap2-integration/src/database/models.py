@@ -5,6 +5,14 @@ Models:
 - Pokemon: Catalog and inventory
 - Transaction: Purchase history
 - TransactionItem: Items in each transaction
+- OutboxEvent: Transactional outbox for sales events
+- DailyPokemonSales / DailyRevenue: Incremental sales rollups
+- InventoryReservation: Time-limited stock holds during checkout
+- WorkerLease: Leases for background workers that must run in one process
+- CatalogVersion: Counter bumped on every catalog write (snapshot invalidation)
+- PokemonType: Type membership of each Pokemon (one row per type)
+- Merchant: Merchants hosted besides the default one (main database only)
+- SignedCart: CartMandates issued by the merchant agent
 """
 
 from sqlalchemy import (
@@ -13,10 +21,14 @@ from sqlalchemy import (
     String,
     Float,
     Boolean,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Text,
     JSON,
+    DDL,
+    event,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime, timezone
@@ -32,6 +44,10 @@ class Pokemon(Base):
     Replaces pokemon-gen1.json with database storage.
     """
     __tablename__ = "pokemon"
+    __table_args__ = (
+        # Availability filter: WHERE en_venta AND inventario_disponible > ? [AND precio ...]
+        Index("ix_pokemon_available_precio", "en_venta", "inventario_disponible", "precio"),
+    )
     
     # Primary key
     numero = Column(Integer, primary_key=True, index=True)
@@ -93,6 +109,11 @@ class Pokemon(Base):
             return True
         return False
     
+    def sell_reserved(self, quantity: int):
+        """Record a sale of stock already held by a reservation"""
+        self.inventario_vendido += quantity
+        self.updated_at = datetime.now(timezone.utc)
+    
     def increase_stock(self, quantity: int):
         """Increase available stock (e.g., for refunds)"""
         self.inventario_disponible += quantity
@@ -107,6 +128,10 @@ class Transaction(Base):
     Stores complete AP2 payment flow results.
     """
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Listing by status: WHERE status = ? ORDER BY created_at DESC
+        Index("ix_transactions_status_created_at", "status", "created_at"),
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -120,9 +145,8 @@ class Transaction(Base):
     status = Column(
         String(20),
         nullable=False,
-        default="pending",
-        index=True
-    )  # pending, completed, failed, refunded
+        default="pending"
+    )  # pending, completed, failed, refunded (indexed with created_at)
     
     # Amounts
     total_amount = Column(Float, nullable=False)
@@ -246,6 +270,10 @@ class Cart(Base):
     Stores active shopping carts with session tracking and expiration.
     """
     __tablename__ = "carts"
+    __table_args__ = (
+        # Drives the expiry sweep: WHERE status = ? AND expires_at < ?
+        Index("ix_carts_status_expires_at", "status", "expires_at"),
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -258,9 +286,8 @@ class Cart(Base):
     status = Column(
         String(20),
         nullable=False,
-        default="active",
-        index=True
-    )  # active, checkout, abandoned, expired, completed
+        default="active"
+    )  # active, checkout, abandoned, expired, completed (indexed with expires_at)
     
     # Timestamps
     created_at = Column(
@@ -281,15 +308,21 @@ class Cart(Base):
         index=True
     )  # Auto-expire after 24 hours
     
-    # Relationships
+    # Denormalized totals (kept in sync by CartRepository)
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_amount = Column(Float, nullable=False, default=0.0, server_default="0")
+    
+    # Relationships (items come in one extra SELECT ... IN per batch of carts)
     items = relationship(
         "CartItem",
         back_populates="cart",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="CartItem.id"
     )
     
     def __repr__(self):
-        return f"<Cart {self.session_id}: {self.status} ({len(self.items)} items)>"
+        return f"<Cart {self.session_id}: {self.status} ({self.item_count} items)>"
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -302,8 +335,8 @@ class Cart(Base):
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "expires_at": self.expires_at.isoformat() if self.expires_at else None,
             "items": [item.to_dict() for item in self.items],
-            "total_items": len(self.items),
-            "total_amount": sum(item.total_price for item in self.items),
+            "total_items": self.item_count,
+            "total_amount": self.total_amount,
         }
     
     def is_expired(self) -> bool:
@@ -328,6 +361,10 @@ class CartItem(Base):
     Links carts to specific Pokemon with quantities and price snapshots.
     """
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # One line per Pokemon per cart; conflict target of add_item's upsert
+        Index("ux_cart_items_cart_pokemon", "cart_id", "pokemon_numero", unique=True),
+    )
     
     # Primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -336,9 +373,8 @@ class CartItem(Base):
     cart_id = Column(
         Integer,
         ForeignKey("carts.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
-    )
+        nullable=False
+    )  # indexed by ux_cart_items_cart_pokemon
     pokemon_numero = Column(
         Integer,
         ForeignKey("pokemon.numero", ondelete="RESTRICT"),
@@ -394,3 +430,342 @@ class CartItem(Base):
         self.quantity = new_quantity
         self.total_price = self.quantity * self.unit_price
         self.updated_at = datetime.now(timezone.utc)
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox for sales events.
+    
+    Rows are written in the same DB transaction as the Transaction they
+    describe, then drained by the OutboxPublisher into the append-only
+    sales event log (see src/events).
+    """
+    __tablename__ = "sales_outbox"
+    
+    # Primary key (also the publishing order)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    
+    # Event info
+    event_type = Column(String(50), nullable=False)
+    aggregate_id = Column(String(100), nullable=False, index=True)  # transaction_id
+    payload = Column(JSON, nullable=False)
+    
+    # Timestamps
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    published_at = Column(DateTime(timezone=True), index=True)  # NULL = pending
+    
+    # Offset in the sales event log once published
+    log_offset = Column(Integer)
+    
+    def __repr__(self):
+        state = f"@{self.log_offset}" if self.published_at else "pending"
+        return f"<OutboxEvent {self.id}: {self.event_type} {self.aggregate_id} ({state})>"
+    
+    def to_dict(self):
+        """Convert to dictionary (the record written to the event log)"""
+        return {
+            "outbox_id": self.id,
+            "event_type": self.event_type,
+            "aggregate_id": self.aggregate_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "payload": self.payload,
+        }
+
+
+class DailyPokemonSales(Base):
+    """
+    Daily sales rollup per Pokemon.
+    
+    Maintained incrementally on each completed charge (see
+    SalesRollupRepository) and rebuildable from transactions.
+    """
+    __tablename__ = "daily_pokemon_sales"
+    
+    # Composite primary key: (day, pokemon_numero)
+    day = Column(Date, primary_key=True)
+    pokemon_numero = Column(Integer, primary_key=True)
+    
+    # Aggregates
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return (
+            f"<DailyPokemonSales {self.day} #{self.pokemon_numero}: "
+            f"{self.units_sold} units ${self.revenue}>"
+        )
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            "day": self.day.isoformat() if self.day else None,
+            "pokemon_numero": self.pokemon_numero,
+            "units_sold": self.units_sold,
+            "revenue": self.revenue,
+            "transaction_count": self.transaction_count,
+        }
+
+
+class DailyRevenue(Base):
+    """
+    Daily revenue rollup per currency.
+    
+    Maintained incrementally on each completed charge (see
+    SalesRollupRepository) and rebuildable from transactions.
+    """
+    __tablename__ = "daily_revenue"
+    
+    # Composite primary key: (day, currency)
+    day = Column(Date, primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    
+    # Aggregates
+    revenue = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DailyRevenue {self.day} {self.currency}: ${self.revenue}>"
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            "day": self.day.isoformat() if self.day else None,
+            "currency": self.currency,
+            "revenue": self.revenue,
+            "transaction_count": self.transaction_count,
+            "units_sold": self.units_sold,
+        }
+
+
+class InventoryReservation(Base):
+    """
+    Time-limited stock hold for a cart in checkout.
+    
+    Reserved quantity is taken out of Pokemon.inventario_disponible when the
+    hold is created, converted into a sale by TransactionRepository.create,
+    or given back when the hold is released or expires.
+    """
+    __tablename__ = "inventory_reservations"
+    
+    # Primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    
+    # Owner of the hold (e.g. "cart:42")
+    reservation_ref = Column(String(100), nullable=False, index=True)
+    
+    pokemon_numero = Column(
+        Integer,
+        ForeignKey("pokemon.numero", ondelete="CASCADE"),
+        nullable=False
+    )
+    quantity = Column(Integer, nullable=False)
+    
+    # Timestamps
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return (
+            f"<InventoryReservation {self.reservation_ref}: "
+            f"#{self.pokemon_numero} x{self.quantity}>"
+        )
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            "id": self.id,
+            "reservation_ref": self.reservation_ref,
+            "pokemon_numero": self.pokemon_numero,
+            "quantity": self.quantity,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
+class WorkerLease(Base):
+    """
+    Time-limited lease for a background worker.
+    
+    Lets every web process start the same worker while only the current
+    lease holder does the work (see LeaseRepository).
+    """
+    __tablename__ = "worker_leases"
+    
+    # Worker name (e.g. "cart-sweeper")
+    name = Column(String(100), primary_key=True)
+    
+    # Current holder (host:pid:nonce) and lease expiry
+    owner = Column(String(200), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<WorkerLease {self.name}: {self.owner} until {self.expires_at}>"
+
+
+class PokemonType(Base):
+    """
+    Type membership of a Pokemon (Pikachu: electric; Charizard: fire and
+    flying). Static for the 151 species; loaded from the offline species
+    data (see migrations.populate_pokemon_types).
+    """
+    __tablename__ = "pokemon_types"
+    __table_args__ = (
+        # Type filter: WHERE type_name = ? JOIN pokemon ON numero
+        Index("ix_pokemon_types_type_name", "type_name", "pokemon_numero"),
+    )
+    
+    pokemon_numero = Column(
+        Integer,
+        ForeignKey("pokemon.numero", ondelete="CASCADE"),
+        primary_key=True
+    )
+    # 1 = primary type, 2 = secondary type
+    slot = Column(Integer, primary_key=True)
+    type_name = Column(String(20), nullable=False)
+    
+    def __repr__(self):
+        return f"<PokemonType #{self.pokemon_numero} {self.slot}: {self.type_name}>"
+
+
+class CatalogVersion(Base):
+    """
+    Counter bumped by triggers on every write to the pokemon catalog
+    (price, stock, listing). The catalog version is the sum of the rows:
+    SQLite keeps a single row, PostgreSQL spreads bumps over
+    CATALOG_VERSION_SLOTS rows.
+    
+    Lets in-memory catalog snapshots check freshness with one tiny read
+    instead of reloading the catalog (see catalog.py).
+    """
+    __tablename__ = "catalog_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
+
+
+class Merchant(Base):
+    """
+    A merchant hosted on this deployment.
+    
+    Each merchant's catalog, inventory, carts and sales live in a
+    partition of their own (see merchants.py), so the key of a listing is
+    (merchant_id, numero). This registry stays in the main database and
+    maps the ``iss`` claim of cart signatures to the merchant's public key.
+    """
+    __tablename__ = "merchants"
+    
+    merchant_id = Column(String(50), primary_key=True)
+    name = Column(String(100), nullable=False)
+    issuer = Column(String(100), nullable=False, unique=True)
+    public_key = Column(Text, nullable=False)  # PEM (SubjectPublicKeyInfo)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    
+    def __repr__(self):
+        return f"<Merchant {self.merchant_id}: {self.name}>"
+    
+    def to_dict(self):
+        """Convert to dictionary (without the key)"""
+        return {
+            "merchant_id": self.merchant_id,
+            "name": self.name,
+            "issuer": self.issuer,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class SignedCart(Base):
+    """
+    A CartMandate issued by the merchant agent.
+    
+    Kept in the database (the merchant's partition) rather than in the
+    agent's memory so any worker can serve a cart another worker created.
+    """
+    __tablename__ = "signed_carts"
+    
+    cart_id = Column(String(100), primary_key=True)
+    mandate = Column(JSON, nullable=False)  # CartMandate.model_dump()
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        index=True
+    )
+    
+    def __repr__(self):
+        return f"<SignedCart {self.cart_id}>"
+
+
+# Columns whose changes invalidate catalog snapshots
+CATALOG_COLUMNS = (
+    "nombre",
+    "precio",
+    "en_venta",
+    "inventario_total",
+    "inventario_disponible",
+    "inventario_vendido",
+)
+
+_BUMP_CATALOG_VERSION = "UPDATE catalog_version SET version = version + 1 WHERE id = 1"
+
+# The bump holds its row lock until the sale commits, so on PostgreSQL a
+# single counter row would queue every concurrent stock write behind the
+# others. Each connection bumps the row of its backend instead (created
+# on first use); concurrent writers only wait for each other when their
+# backends share a slot. SQLite has one writer at a time anyway.
+CATALOG_VERSION_SLOTS = 16
+
+_BUMP_CATALOG_VERSION_SLOT = (
+    "INSERT INTO catalog_version (id, version) "
+    f"VALUES (1 + pg_backend_pid() % {CATALOG_VERSION_SLOTS}, 1) "
+    "ON CONFLICT (id) DO UPDATE SET version = catalog_version.version + 1"
+)
+
+# Trigger DDL per dialect. Triggers (rather than repository code) also
+# catch bulk UPDATEs, raw SQL and writes from other processes.
+CATALOG_VERSION_TRIGGERS = {
+    "sqlite": [
+        f"CREATE TRIGGER IF NOT EXISTS pokemon_catalog_insert AFTER INSERT ON pokemon "
+        f"BEGIN {_BUMP_CATALOG_VERSION}; END",
+        f"CREATE TRIGGER IF NOT EXISTS pokemon_catalog_delete AFTER DELETE ON pokemon "
+        f"BEGIN {_BUMP_CATALOG_VERSION}; END",
+        f"CREATE TRIGGER IF NOT EXISTS pokemon_catalog_update "
+        f"AFTER UPDATE OF {', '.join(CATALOG_COLUMNS)} ON pokemon "
+        f"BEGIN {_BUMP_CATALOG_VERSION}; END",
+    ],
+    "postgresql": [
+        "CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$ "
+        f"BEGIN {_BUMP_CATALOG_VERSION_SLOT}; RETURN NULL; END; $$ LANGUAGE plpgsql",
+        "CREATE OR REPLACE TRIGGER pokemon_catalog_version "
+        f"AFTER INSERT OR DELETE OR UPDATE OF {', '.join(CATALOG_COLUMNS)} ON pokemon "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()",
+    ],
+}
+
+for _dialect, _statements in CATALOG_VERSION_TRIGGERS.items():
+    for _statement in _statements:
+        event.listen(
+            Pokemon.__table__, "after_create",
+            DDL(_statement).execute_if(dialect=_dialect)
+        )
+
+event.listen(
+    CatalogVersion.__table__, "after_create",
+    DDL("INSERT INTO catalog_version (id, version) VALUES (1, 0)")
+)
@@ -0,0 +1,167 @@
+"""
+Pokemon name index
+
+In-memory index over ``Pokemon.nombre`` for search-as-you-type:
+- prefix lookups through a trie (names and their "-" separated parts,
+  so "mime" finds mr-mime)
+- typo-tolerant lookups through a trigram index ("pikchu" -> pikachu)
+- multi-term queries ("pika char") merged into one ranked list
+
+The index is rebuilt from the catalog snapshot only when names change.
+"""
+
+import re
+import weakref
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .engine import read_engine_for
+from .catalog import catalog_snapshot
+
+# Score tiers: every exact match ranks above every prefix match, which
+# ranks above every fuzzy match (fuzzy scores are in [0, 1])
+EXACT_SCORE = 4.0
+PREFIX_SCORE = 3.0
+PART_PREFIX_SCORE = 2.0
+
+DEFAULT_MIN_SIMILARITY = 0.3
+
+_SEPARATORS = re.compile(r"[\s,]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and drop characters that never appear in catalog names"""
+    return re.sub(r"[^a-z0-9\- ]", "", text.lower().replace(".", "").replace("'", ""))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of a word padded like pg_trgm ("  pi", ..., "hu ")"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Prefix trie plus trigram index over (numero, nombre) pairs"""
+
+    def __init__(self, names: Iterable[Tuple[int, str]]):
+        self.names: Dict[int, str] = {}
+        self.by_name: Dict[str, int] = {}
+        # Trie node: {"ids": set of numeros below, char: child node}
+        self.trie: Dict = {"ids": set()}
+        self.trigram_ids: Dict[str, Set[int]] = {}
+        self.trigram_counts: Dict[int, int] = {}
+
+        for numero, nombre in names:
+            nombre = nombre.lower()
+            self.names[numero] = nombre
+            self.by_name[nombre] = numero
+            for word in {nombre, *nombre.split("-")}:
+                self._insert(word, numero)
+            grams = trigrams(nombre)
+            self.trigram_counts[numero] = len(grams)
+            for gram in grams:
+                self.trigram_ids.setdefault(gram, set()).add(numero)
+
+    def _insert(self, word: str, numero: int):
+        node = self.trie
+        for char in word:
+            node = node.setdefault(char, {"ids": set()})
+            node["ids"].add(numero)
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, prefix: str) -> Set[int]:
+        """Numeros whose name (or a part of it) starts with prefix"""
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node["ids"]
+
+    def fuzzy(self, term: str, min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Dict[int, float]:
+        """Numeros with trigram similarity (Jaccard) >= min_similarity"""
+        grams = trigrams(term)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for numero in self.trigram_ids.get(gram, ()):
+                shared[numero] = shared.get(numero, 0) + 1
+
+        scores = {}
+        for numero, count in shared.items():
+            similarity = count / (len(grams) + self.trigram_counts[numero] - count)
+            if similarity >= min_similarity:
+                scores[numero] = similarity
+        return scores
+
+    def _score_term(self, term: str, min_similarity: float) -> Dict[int, float]:
+        scores = self.fuzzy(term, min_similarity)
+
+        for numero in self.prefix(term):
+            nombre = self.names[numero]
+            # Within a tier, the more of the name the prefix covers the
+            # better ("char" ranks charizard above charmander)
+            tier = PREFIX_SCORE if nombre.startswith(term) else PART_PREFIX_SCORE
+            scores[numero] = tier + len(term) / len(nombre)
+
+        numero = self.by_name.get(term)
+        if numero is not None:
+            scores[numero] = EXACT_SCORE
+        return scores
+
+    def lookup(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ) -> List[Tuple[int, float]]:
+        """
+        Ranked matches for a free-text query.
+
+        Terms are separated by spaces or commas; a number (or "#25")
+        matches that numero exactly. The whole query joined with "-" is
+        also tried, so "mr mime" finds mr-mime.
+
+        Returns:
+            (numero, score) pairs, best first
+        """
+        terms = [t for t in _SEPARATORS.split(normalize(query).replace("#", "")) if t]
+        if not terms:
+            return []
+        if len(terms) > 1:
+            terms.append("-".join(terms))
+
+        best: Dict[int, float] = {}
+        for term in terms:
+            if term.isdigit():
+                if int(term) in self.names:
+                    best[int(term)] = EXACT_SCORE
+                continue
+            for numero, score in self._score_term(term, min_similarity).items():
+                if score > best.get(numero, 0.0):
+                    best[numero] = score
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+# (names, index) per database engine; rebuilt only when names change
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def name_index(bind) -> NameIndex:
+    """Get the name index for the current catalog of an engine or session"""
+    engine = read_engine_for(bind)
+    snapshot = catalog_snapshot(engine)
+
+    cached = _indexes.get(engine)
+    if cached is not None and cached[0] is snapshot:
+        return cached[2]
+
+    names = tuple((entry.numero, entry.nombre) for entry in snapshot.entries)
+    if cached is not None and cached[1] == names:
+        index = cached[2]  # stock or price write: names unchanged
+    else:
+        index = NameIndex(names)
+    _indexes[engine] = (snapshot, names, index)
+    return index
@@ -0,0 +1,197 @@
+"""
+Per-request SQL statistics
+
+SQLAlchemy cursor events count statements, time them and group them by
+shape (SQL text with IN-lists and literals collapsed) for whatever unit of
+work is active in the current context, usually one HTTP request (see
+src/common/middleware.py). A shape that repeats within one request is the
+signature of an N+1 query pattern.
+
+    instrument_engine(engine)
+    with track_queries() as stats:
+        repo.get_cart_summary(session_id)
+    print(stats.count, stats.total_ms, stats.repeated())
+
+Statements outside track_queries() only cost a context variable lookup.
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A shape seen this many times in one request is reported as repeated (N+1)
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 5))
+
+# Requests spending longer than this in the database are logged
+SLOW_REQUEST_DB_MS = float(os.getenv("SLOW_REQUEST_DB_MS", 200))
+
+# Slowest statements kept per request
+SLOWEST_KEPT = 3
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_POSTCOMPILE = re.compile(r"\(?\s*__\[POSTCOMPILE_\w+\]\s*\)?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """SQL text with whitespace, IN-lists and literals normalized"""
+    shape = _SPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?...)", shape)
+    return _POSTCOMPILE.sub("(?...)", shape)
+
+
+class QueryStats:
+    """Statements run in one unit of work (usually one request)"""
+
+    __slots__ = ("count", "total_seconds", "shapes", "_slowest", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Dict[str, int] = {}
+        self._slowest: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+            if len(self._slowest) < SLOWEST_KEPT:
+                heapq.heappush(self._slowest, (seconds, shape))
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, shape))
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """(milliseconds, shape) of the slowest statements, slowest first"""
+        return [(seconds * 1000, shape) for seconds, shape in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Shapes run at least ``threshold`` times, most repeated first"""
+        threshold = QUERY_REPEAT_THRESHOLD if threshold is None else threshold
+        return dict(sorted(
+            ((shape, n) for shape, n in self.shapes.items() if n >= threshold),
+            key=lambda item: -item[1]
+        ))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_ms, 3),
+            "repeated": self.repeated(),
+            "slowest": [{"ms": round(ms, 3), "sql": shape} for ms, shape in self.slowest()],
+        }
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats of the unit of work active in this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Attribute statements run inside the block (and tasks/threads it starts) to new stats"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def expect_queries(max_queries: int, max_repeated: int = 0) -> Iterator[QueryStats]:
+    """
+    Track a block and assert it stays within a statement budget.
+
+    Raises AssertionError if more than ``max_queries`` statements ran or
+    more than ``max_repeated`` shapes repeated past the threshold.
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, (
+        f"{stats.count} queries (budget {max_queries}): {list(stats.shapes)}"
+    )
+    repeated = stats.repeated()
+    assert len(repeated) <= max_repeated, f"Repeated statements: {repeated}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_query_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Attach the statistics hooks to an engine (idempotent)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class QueryStatsRegistry:
+    """Running totals per endpoint, for stats/metrics endpoints"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, endpoint: str, stats: QueryStats):
+        repeated = bool(stats.repeated())
+        with self._lock:
+            totals = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "queries": 0, "db_ms": 0.0, "max_queries": 0, "n_plus_one": 0,
+            })
+            totals["requests"] += 1
+            totals["queries"] += stats.count
+            totals["db_ms"] += stats.total_ms
+            totals["max_queries"] = max(totals["max_queries"], stats.count)
+            totals["n_plus_one"] += repeated
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per endpoint plus average queries per request"""
+        with self._lock:
+            return {
+                endpoint: {
+                    **totals,
+                    "db_ms": round(totals["db_ms"], 3),
+                    "avg_queries": round(totals["queries"] / totals["requests"], 2),
+                }
+                for endpoint, totals in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+# Process-wide registry fed by QueryStatsMiddleware
+query_stats_registry = QueryStatsRegistry()
@@ -2,66 +2,152 @@
 Repository pattern for database access
 
 Provides clean interface for CRUD operations on Pokemon and Transactions.
+
+Queries follow the session they are given: a SessionLocal session for
+writes, a ReadSessionLocal one for read-only pages, reports and stats
+(writes on it fail). Catalog reads (snapshot lookups, type filters) always
+run on the read-only engine, as they only need committed data.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
+from sqlalchemy.orm import Session, contains_eager, lazyload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import desc, func, select, insert, delete, update, bindparam, or_
+from typing import List, Optional, Dict, Any, Iterable
+from datetime import date, datetime, timedelta, timezone
+
+from .models import (
+    Pokemon,
+    PokemonType,
+    Transaction,
+    TransactionItem,
+    Cart,
+    CartItem,
+    OutboxEvent,
+    DailyPokemonSales,
+    DailyRevenue,
+    InventoryReservation,
+    WorkerLease,
+    Merchant,
+    SignedCart,
+)
+from .dialect import db_now, supports_row_locks, upsert
+from .engine import read_engine_for
+from .catalog import CatalogEntry, catalog_snapshot
+from .archive import transaction_archive
+
+
+SALE_COMPLETED_EVENT = "sale.completed"
+
+DEFAULT_RESERVATION_TTL_SECONDS = 600
 
-from .models import Pokemon, Transaction, TransactionItem, Cart, CartItem
+# Cart statuses that are never reopened and can be purged after retention
+PURGEABLE_CART_STATUSES = ("expired", "abandoned")
+
+
+class InsufficientStockError(ValueError):
+    """Raised when stock cannot be reserved or sold for a Pokemon"""
+    
+    def __init__(self, pokemon_numero: int, requested: int):
+        self.pokemon_numero = pokemon_numero
+        self.requested = requested
+        super().__init__(
+            f"Insufficient stock for Pokemon #{pokemon_numero} (requested {requested})"
+        )
 
 
 class PokemonRepository:
     """Repository for Pokemon catalog and inventory operations"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, autocommit: bool = True):
         self.db = db
+        self.autocommit = autocommit
+    
+    def _commit(self):
+        """Commit now, or leave it to the unit of work"""
+        if self.autocommit:
+            self.db.commit()
+    
+    def _catalog_rows(self, query) -> List[Any]:
+        """Run a catalog query on the read-only engine (committed data, like the snapshot)"""
+        with read_engine_for(self.db).connect() as conn:
+            return conn.execute(query).all()
     
     def get_all(self, skip: int = 0, limit: int = 151) -> List[Pokemon]:
         """Get all Pokemon with pagination"""
         return self.db.query(Pokemon).offset(skip).limit(limit).all()
     
-    def get_by_numero(self, numero: int) -> Optional[Pokemon]:
-        """Get Pokemon by numero"""
-        return self.db.query(Pokemon).filter(Pokemon.numero == numero).first()
+    def get_by_numero(self, numero: int) -> Optional[CatalogEntry]:
+        """Get Pokemon by numero (read-only snapshot record)"""
+        return catalog_snapshot(self.db).by_numero.get(numero)
     
-    def get_by_nombre(self, nombre: str) -> Optional[Pokemon]:
-        """Get Pokemon by nombre"""
-        return self.db.query(Pokemon).filter(
-            Pokemon.nombre == nombre.lower()
-        ).first()
+    def get_by_nombre(self, nombre: str) -> Optional[CatalogEntry]:
+        """Get Pokemon by nombre (read-only snapshot record)"""
+        return catalog_snapshot(self.db).by_nombre.get(nombre.lower())
     
-    def get_available(self) -> List[Pokemon]:
+    def get_available(self) -> List[CatalogEntry]:
         """Get all Pokemon available for sale"""
-        return self.db.query(Pokemon).filter(
-            Pokemon.en_venta == True,
-            Pokemon.inventario_disponible > 0
-        ).all()
+        return [p for p in catalog_snapshot(self.db).entries if p.is_available]
     
     def search(
         self,
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
         only_available: bool = False,
-        limit: int = 151
-    ) -> List[Pokemon]:
-        """Search Pokemon with filters"""
-        query = self.db.query(Pokemon)
-        
-        if min_price is not None:
-            query = query.filter(Pokemon.precio >= min_price)
-        
-        if max_price is not None:
-            query = query.filter(Pokemon.precio <= max_price)
+        limit: int = 151,
+        type: Optional[str] = None
+    ) -> List[CatalogEntry]:
+        """Search Pokemon with filters (type: e.g. "fire")"""
+        snapshot = catalog_snapshot(self.db)
         
-        if only_available:
-            query = query.filter(
-                Pokemon.en_venta == True,
-                Pokemon.inventario_disponible > 0
+        if type is not None:
+            # One indexed join on pokemon_types; records from the snapshot
+            query = select(Pokemon.numero).join(
+                PokemonType, PokemonType.pokemon_numero == Pokemon.numero
+            ).where(PokemonType.type_name == type.lower())
+            if min_price is not None:
+                query = query.where(Pokemon.precio >= min_price)
+            if max_price is not None:
+                query = query.where(Pokemon.precio <= max_price)
+            if only_available:
+                query = query.where(
+                    Pokemon.en_venta == True,
+                    Pokemon.inventario_disponible > 0
+                )
+            # Index order (type_name, pokemon_numero) already sorts by numero
+            rows = self._catalog_rows(
+                query.order_by(PokemonType.pokemon_numero).limit(limit)
             )
+            return [snapshot.by_numero[n] for n, in rows if n in snapshot.by_numero]
         
-        return query.limit(limit).all()
+        results = []
+        for pokemon in snapshot.entries:
+            if len(results) >= limit:
+                break
+            if min_price is not None and pokemon.precio < min_price:
+                continue
+            if max_price is not None and pokemon.precio > max_price:
+                continue
+            if only_available and not pokemon.is_available:
+                continue
+            results.append(pokemon)
+        
+        return results
+    
+    def get_types(self) -> List[Dict[str, Any]]:
+        """Get every type in the catalog with its number of Pokemon"""
+        rows = self._catalog_rows(
+            select(PokemonType.type_name, func.count())
+            .group_by(PokemonType.type_name)
+            .order_by(PokemonType.type_name)
+        )
+        return [{"type": type_name, "count": count} for type_name, count in rows]
+    
+    def get_for_update(self, numero: int) -> Optional[Pokemon]:
+        """Get the Pokemon ORM row, for changing price or stock (row-locked where supported)"""
+        return self.db.get(
+            Pokemon, numero,
+            with_for_update=True if supports_row_locks(self.db) else None
+        )
     
     def decrease_stock(self, numero: int, quantity: int) -> bool:
         """
@@ -70,22 +156,22 @@ class PokemonRepository:
         Returns:
             True if successful, False if insufficient stock
         """
-        pokemon = self.get_by_numero(numero)
+        pokemon = self.get_for_update(numero)
         if not pokemon:
             return False
         
         success = pokemon.decrease_stock(quantity)
         if success:
-            self.db.commit()
+            self._commit()
         
         return success
     
     def increase_stock(self, numero: int, quantity: int):
         """Increase stock for a Pokemon (e.g., for refunds)"""
-        pokemon = self.get_by_numero(numero)
+        pokemon = self.get_for_update(numero)
         if pokemon:
             pokemon.increase_stock(quantity)
-            self.db.commit()
+            self._commit()
     
     def get_inventory_stats(self) -> Dict[str, Any]:
         """Get inventory statistics"""
@@ -122,7 +208,8 @@ class TransactionRepository:
         cart_mandate: Dict[str, Any],
         payment_mandate: Dict[str, Any],
         items: List[Dict[str, Any]],
-        status: str = "completed"
+        status: str = "completed",
+        reservation_ref: Optional[str] = None
     ) -> Transaction:
         """
         Create a new transaction with items.
@@ -134,9 +221,17 @@ class TransactionRepository:
             payment_mandate: Complete PaymentMandate dict
             items: List of items with pokemon_numero, quantity, unit_price
             status: Transaction status (default: completed)
+            reservation_ref: Inventory holds to convert into this sale
+                (see ReservationRepository). Reserved quantity is already
+                out of available stock; any part of the hold not sold is
+                given back.
         
         Returns:
             Created Transaction object
+        
+        Raises:
+            InsufficientStockError: If an item's unreserved quantity is not
+                in stock (nothing is written)
         """
         # Extract info from mandates
         payment_details = cart_mandate["contents"]["payment_request"]["details"]
@@ -171,10 +266,20 @@ class TransactionRepository:
         self.db.add(transaction)
         self.db.flush()  # Get transaction.id
         
+        reservations = ReservationRepository(self.db)
+        reserved = reservations.consume(reservation_ref) if reservation_ref else {}
+        
+        # Load every Pokemon row in one query; stock is changed on them
+        numeros = {item["pokemon_numero"] for item in items}
+        pokemon_rows = {
+            p.numero: p
+            for p in self.db.query(Pokemon).filter(Pokemon.numero.in_(numeros))
+        }
+        
         # Create transaction items
+        transaction_items = []
         for item in items:
-            pokemon_repo = PokemonRepository(self.db)
-            pokemon = pokemon_repo.get_by_numero(item["pokemon_numero"])
+            pokemon = pokemon_rows.get(item["pokemon_numero"])
             
             if not pokemon:
                 raise ValueError(f"Pokemon #{item['pokemon_numero']} not found")
@@ -189,20 +294,81 @@ class TransactionRepository:
             )
             
             self.db.add(transaction_item)
+            transaction_items.append(transaction_item)
             
-            # Decrease stock
-            pokemon_repo.decrease_stock(pokemon.numero, item["quantity"])
+            # Decrease stock (no intermediate commit: everything below is
+            # written atomically with the transaction row). Held units were
+            # already taken out of available stock at reservation time.
+            held = min(reserved.get(pokemon.numero, 0), item["quantity"])
+            if held:
+                reserved[pokemon.numero] -= held
+                pokemon.sell_reserved(held)
+            if item["quantity"] > held and not pokemon.decrease_stock(item["quantity"] - held):
+                self.db.rollback()
+                raise InsufficientStockError(pokemon.numero, item["quantity"] - held)
+        
+        reservations.restore_stock(reserved)
+        
+        # Outbox row and rollups for downstream consumers (same DB transaction)
+        if status == "completed":
+            self.db.add(OutboxEvent(
+                event_type=SALE_COMPLETED_EVENT,
+                aggregate_id=transaction_id,
+                payload=self._sale_event_payload(transaction, transaction_items)
+            ))
+            SalesRollupRepository(self.db).record_sale(transaction, transaction_items)
         
         self.db.commit()
         self.db.refresh(transaction)
         
         return transaction
     
+    @staticmethod
+    def _sale_event_payload(
+        transaction: Transaction,
+        transaction_items: List[TransactionItem]
+    ) -> Dict[str, Any]:
+        """Build the sale event payload from in-memory objects (no queries)"""
+        return {
+            "transaction_id": transaction.transaction_id,
+            "cart_id": transaction.cart_id,
+            "status": transaction.status,
+            "total_amount": transaction.total_amount,
+            "currency": transaction.currency,
+            "payment_method": transaction.payment_method,
+            "merchant_name": transaction.merchant_name,
+            "completed_at": (
+                transaction.completed_at.isoformat()
+                if transaction.completed_at else None
+            ),
+            "items": [
+                {
+                    "pokemon_numero": item.pokemon_numero,
+                    "pokemon_name": item.pokemon_name,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "total_price": item.total_price,
+                }
+                for item in transaction_items
+            ],
+        }
+    
     def get_by_id(self, transaction_id: str) -> Optional[Transaction]:
-        """Get transaction by ID"""
-        return self.db.query(Transaction).filter(
+        """
+        Get transaction by ID.
+        
+        Falls back to the monthly archives (see archive.py) when the hot
+        table misses; archived transactions come back detached, with
+        their items loaded.
+        """
+        transaction = self.db.query(Transaction).filter(
             Transaction.transaction_id == transaction_id
         ).first()
+        if transaction is None:
+            archive = transaction_archive(self.db)
+            if archive is not None:
+                transaction = archive.get(transaction_id)
+        return transaction
     
     def get_all(
         self,
@@ -210,8 +376,12 @@ class TransactionRepository:
         limit: int = 100,
         status: Optional[str] = None
     ) -> List[Transaction]:
-        """Get all transactions with pagination"""
-        query = self.db.query(Transaction).order_by(desc(Transaction.created_at))
+        """Get all transactions with pagination (items loaded in one extra query)"""
+        query = (
+            self.db.query(Transaction)
+            .options(selectinload(Transaction.items))
+            .order_by(desc(Transaction.created_at))
+        )
         
         if status:
             query = query.filter(Transaction.status == status)
@@ -243,24 +413,39 @@ class TransactionRepository:
 
 
 class CartRepository:
-    """Repository for shopping cart operations"""
+    """
+    Repository for shopping cart operations.
     
-    def __init__(self, db: Session):
+    Writes use single UPDATE/DELETE/upsert statements with RETURNING
+    instead of load-modify-refresh round trips. With autocommit=False
+    (see UnitOfWork) methods leave committing to the caller, so a whole
+    request costs one commit.
+    """
+    
+    def __init__(self, db: Session, autocommit: bool = True):
         self.db = db
+        self.autocommit = autocommit
+    
+    def _commit(self):
+        """Commit now, or leave it to the unit of work"""
+        if self.autocommit:
+            self.db.commit()
     
     def create_cart(self, session_id: str, user_id: Optional[str] = None, hours_to_expire: int = 24) -> Cart:
         """Create a new cart"""
-        from datetime import timedelta
-        
-        cart = Cart(
-            session_id=session_id,
-            user_id=user_id,
-            status="active",
-            expires_at=datetime.now(timezone.utc) + timedelta(hours=hours_to_expire)
-        )
-        self.db.add(cart)
-        self.db.commit()
-        self.db.refresh(cart)
+        cart = self.db.scalars(
+            insert(Cart)
+            .values(
+                session_id=session_id,
+                user_id=user_id,
+                status="active",
+                expires_at=datetime.now(timezone.utc) + timedelta(hours=hours_to_expire)
+            )
+            .returning(Cart)
+            .options(lazyload(Cart.items))
+        ).one()
+        set_committed_value(cart, "items", [])  # new cart: nothing to load
+        self._commit()
         return cart
     
     def get_cart_by_session(self, session_id: str) -> Optional[Cart]:
@@ -270,20 +455,123 @@ class CartRepository:
             Cart.status == "active"
         ).first()
     
-    def get_or_create_cart(self, session_id: str, user_id: Optional[str] = None) -> Cart:
-        """Get existing cart or create new one"""
-        cart = self.get_cart_by_session(session_id)
-        
-        if cart:
-            # Check if expired
-            if cart.is_expired():
-                cart.status = "expired"
-                self.db.commit()
-                # Create new cart
-                return self.create_cart(session_id, user_id)
+    def get_cart_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the active, unexpired cart of a session as a dict (see
+        Cart.to_dict) in a single query: items are joined in and totals
+        come from the denormalized columns.
+        """
+        now = db_now(self.db)
+        
+        cart = self.db.scalars(
+            select(Cart)
+            .outerjoin(Cart.items)
+            .options(contains_eager(Cart.items))
+            .where(
+                Cart.session_id == session_id,
+                Cart.status == "active",
+                Cart.expires_at > now
+            )
+            .order_by(CartItem.id)
+        ).unique().one_or_none()
+        
+        return cart.to_dict() if cart else None
+    
+    def get_or_create_cart(
+        self,
+        session_id: str,
+        user_id: Optional[str] = None,
+        hours_to_expire: int = 24
+    ) -> Cart:
+        """
+        Get the active cart for a session or create one.
+        
+        session_id is unique, so a session whose cart expired or was
+        checked out gets that row back as a fresh, empty cart.
+        """
+        cart = self.db.scalars(
+            select(Cart).where(Cart.session_id == session_id)
+        ).one_or_none()
+        
+        if cart is None:
+            return self.create_cart(session_id, user_id, hours_to_expire)
+        
+        if cart.status == "active" and not cart.is_expired():
             return cart
         
-        return self.create_cart(session_id, user_id)
+        # Recycle the row
+        now = datetime.now(timezone.utc)
+        self.db.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id == cart.id)
+            .execution_options(synchronize_session=False)
+        )
+        cart.status = "active"
+        cart.user_id = user_id
+        cart.created_at = now
+        cart.updated_at = now
+        cart.expires_at = now + timedelta(hours=hours_to_expire)
+        cart.item_count = 0
+        cart.total_amount = 0.0
+        set_committed_value(cart, "items", [])
+        self._commit()
+        return cart
+    
+    def _sync_totals(
+        self,
+        cart_id: int,
+        now: datetime,
+        added: Optional[CartItem] = None,
+        removed_ids: Iterable[int] = ()
+    ) -> bool:
+        """
+        Recompute a cart's denormalized totals and timestamp in one UPDATE.
+        
+        If the cart is loaded in this session its totals and items are
+        patched in place, so rendering it afterwards needs no query.
+        
+        Returns:
+            True if the cart exists
+        """
+        items = CartItem.__table__
+        row = self.db.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(
+                item_count=(
+                    select(func.count())
+                    .where(items.c.cart_id == Cart.id)
+                    .scalar_subquery()
+                ),
+                total_amount=(
+                    select(func.coalesce(func.sum(items.c.total_price), 0.0))
+                    .where(items.c.cart_id == Cart.id)
+                    .scalar_subquery()
+                ),
+                updated_at=now
+            )
+            .returning(Cart.item_count, Cart.total_amount)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            return False
+        
+        cart = self.db.identity_map.get(self.db.identity_key(Cart, cart_id))
+        if cart is not None:
+            set_committed_value(cart, "item_count", row.item_count)
+            # RETURNING gives the value before column affinity (may be int)
+            set_committed_value(cart, "total_amount", float(row.total_amount))
+            set_committed_value(cart, "updated_at", now)
+            
+            loaded = cart.__dict__.get("items")
+            if loaded is not None:
+                removed = set(removed_ids)
+                kept = [item for item in loaded if item.id not in removed]
+                if added is not None and added not in kept:
+                    kept.append(added)
+                set_committed_value(cart, "items", kept)
+        
+        return True
     
     def add_item(
         self,
@@ -292,135 +580,185 @@ class CartRepository:
         quantity: int = 1
     ) -> CartItem:
         """Add item to cart or update quantity if already exists"""
-        # Check if item already in cart
-        existing_item = self.db.query(CartItem).filter(
-            CartItem.cart_id == cart.id,
-            CartItem.pokemon_numero == pokemon.numero
-        ).first()
-        
-        if existing_item:
-            # Update quantity
-            existing_item.update_quantity(existing_item.quantity + quantity)
-            self.db.commit()
-            self.db.refresh(existing_item)
-            return existing_item
+        now = datetime.now(timezone.utc)
         
-        # Create new item
-        item = CartItem(
+        # Single upsert on (cart_id, pokemon_numero); existing lines keep
+        # their price snapshot
+        stmt = upsert(self.db, CartItem).values(
             cart_id=cart.id,
             pokemon_numero=pokemon.numero,
             pokemon_name=pokemon.nombre,
             quantity=quantity,
             unit_price=float(pokemon.precio),
-            total_price=float(pokemon.precio) * quantity
+            total_price=float(pokemon.precio) * quantity,
+            added_at=now,
+            updated_at=now
         )
-        self.db.add(item)
-        
-        # Update cart timestamp
-        cart.updated_at = datetime.now(timezone.utc)
+        new_quantity = CartItem.quantity + stmt.excluded.quantity
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.pokemon_numero],
+            set_={
+                "quantity": new_quantity,
+                "total_price": new_quantity * CartItem.unit_price,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        item = self.db.scalars(
+            stmt.returning(CartItem),
+            execution_options={"populate_existing": True}
+        ).one()
         
-        self.db.commit()
-        self.db.refresh(item)
+        self._sync_totals(cart.id, now, added=item)
+        self._commit()
         return item
     
     def update_item_quantity(self, item_id: int, quantity: int) -> Optional[CartItem]:
         """Update item quantity"""
-        item = self.db.query(CartItem).filter(CartItem.id == item_id).first()
-        
-        if not item:
-            return None
-        
         if quantity <= 0:
             # Remove item if quantity is 0 or negative
-            self.db.delete(item)
-            self.db.commit()
+            self.remove_item(item_id)
             return None
         
-        item.update_quantity(quantity)
-        
-        # Update cart timestamp
-        cart = item.cart
-        cart.updated_at = datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        item = self.db.scalars(
+            update(CartItem)
+            .where(CartItem.id == item_id)
+            .values(
+                quantity=quantity,
+                total_price=CartItem.unit_price * quantity,
+                updated_at=now
+            )
+            .returning(CartItem),
+            execution_options={"populate_existing": True}
+        ).one_or_none()
+        if item is None:
+            return None
         
-        self.db.commit()
-        self.db.refresh(item)
+        self._sync_totals(item.cart_id, now)
+        self._commit()
         return item
     
     def remove_item(self, item_id: int) -> bool:
         """Remove item from cart"""
-        item = self.db.query(CartItem).filter(CartItem.id == item_id).first()
-        
-        if not item:
+        cart_id = self.db.execute(
+            delete(CartItem)
+            .where(CartItem.id == item_id)
+            .returning(CartItem.cart_id)
+        ).scalar()
+        if cart_id is None:
             return False
         
-        # Update cart timestamp before deleting
-        cart = item.cart
-        cart.updated_at = datetime.now(timezone.utc)
-        
-        self.db.delete(item)
-        self.db.commit()
+        self._sync_totals(cart_id, datetime.now(timezone.utc), removed_ids=[item_id])
+        self._commit()
         return True
     
     def clear_cart(self, cart_id: int) -> bool:
         """Remove all items from cart"""
-        cart = self.db.query(Cart).filter(Cart.id == cart_id).first()
+        removed_ids = self.db.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id == cart_id)
+            .returning(CartItem.id)
+        ).scalars().all()
         
-        if not cart:
+        if not self._sync_totals(cart_id, datetime.now(timezone.utc), removed_ids=removed_ids):
             return False
         
-        # Delete all items
-        self.db.query(CartItem).filter(CartItem.cart_id == cart_id).delete()
-        
-        # Update cart timestamp
-        cart.updated_at = datetime.now(timezone.utc)
-        
-        self.db.commit()
+        self._commit()
         return True
     
+    def _set_status(self, cart_id: int, status: str) -> Optional[Cart]:
+        """Set cart status in one UPDATE ... RETURNING"""
+        cart = self.db.scalars(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(status=status, updated_at=datetime.now(timezone.utc))
+            .returning(Cart),
+            execution_options={"populate_existing": True}
+        ).one_or_none()
+        self._commit()
+        return cart
+    
     def mark_cart_as_checkout(self, cart_id: int) -> Optional[Cart]:
         """Mark cart as in checkout process"""
-        cart = self.db.query(Cart).filter(Cart.id == cart_id).first()
-        
-        if not cart:
-            return None
-        
-        cart.status = "checkout"
-        cart.updated_at = datetime.now(timezone.utc)
-        self.db.commit()
-        self.db.refresh(cart)
-        return cart
+        return self._set_status(cart_id, "checkout")
     
     def mark_cart_as_completed(self, cart_id: int) -> Optional[Cart]:
         """Mark cart as completed (after successful payment)"""
-        cart = self.db.query(Cart).filter(Cart.id == cart_id).first()
-        
-        if not cart:
-            return None
-        
-        cart.status = "completed"
-        cart.updated_at = datetime.now(timezone.utc)
-        self.db.commit()
-        self.db.refresh(cart)
-        return cart
+        return self._set_status(cart_id, "completed")
     
     def expire_old_carts(self, hours: int = 24) -> int:
-        """Expire carts older than specified hours"""
-        from datetime import timedelta
-        
-        # Use naive datetime for SQLite compatibility
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-        
-        # Convert to naive datetime for comparison with SQLite
-        now_naive = datetime.now(timezone.utc).replace(tzinfo=None)
+        """Expire active carts past their expiry or created more than `hours` ago"""
+        now = db_now(self.db)
+        cutoff = now - timedelta(hours=hours)
         
         expired_count = self.db.query(Cart).filter(
             Cart.status == "active",
-            Cart.expires_at < now_naive
+            or_(Cart.expires_at < now, Cart.created_at < cutoff)
         ).update({"status": "expired"}, synchronize_session=False)
         
         self.db.commit()
         return expired_count
     
+    def expire_due_carts(self, limit: int = 500) -> int:
+        """
+        Expire up to `limit` active carts past their expiry, oldest first.
+        
+        Walks the (status, expires_at) index, so the cost is proportional
+        to the batch rather than to the table.
+        """
+        now = db_now(self.db)
+        
+        ids = self.db.execute(
+            select(Cart.id)
+            .where(Cart.status == "active", Cart.expires_at < now)
+            .order_by(Cart.expires_at)
+            .limit(limit)
+        ).scalars().all()
+        if not ids:
+            return 0
+        
+        # Re-check status: a cart may have moved to checkout meanwhile
+        result = self.db.execute(
+            update(Cart)
+            .where(Cart.id.in_(ids), Cart.status == "active")
+            .values(status="expired", updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+    
+    def purge_expired_carts(self, older_than_days: int = 7, limit: int = 500) -> int:
+        """
+        Delete up to `limit` expired or abandoned carts (and their items)
+        whose expiry is more than `older_than_days` in the past.
+        """
+        cutoff = db_now(self.db) - timedelta(days=older_than_days)
+        
+        ids = self.db.execute(
+            select(Cart.id)
+            .where(
+                Cart.status.in_(PURGEABLE_CART_STATUSES),
+                Cart.expires_at < cutoff
+            )
+            .order_by(Cart.expires_at)
+            .limit(limit)
+        ).scalars().all()
+        if not ids:
+            return 0
+        
+        self.db.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.execute(
+            delete(Cart)
+            .where(Cart.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return len(ids)
+    
     def get_cart_stats(self) -> Dict[str, Any]:
         """Get cart statistics"""
         total_carts = self.db.query(func.count(Cart.id)).scalar()
@@ -440,3 +778,568 @@ class CartRepository:
             "abandoned_carts": abandoned_carts,
             "completed_carts": completed_carts,
         }
+
+
+class ReservationRepository:
+    """
+    Repository for inventory reservations (TTL stock holds at checkout).
+    
+    Reserving moves quantity out of Pokemon.inventario_disponible with a
+    conditional UPDATE, so concurrent checkouts cannot oversell and a
+    doomed checkout fails before any signing or payment round trips.
+    Holds are converted by TransactionRepository.create, released
+    explicitly, or released by release_expired once they time out.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def reserve(
+        self,
+        reservation_ref: str,
+        items: List[Dict[str, Any]],
+        ttl_seconds: int = DEFAULT_RESERVATION_TTL_SECONDS
+    ) -> List[InventoryReservation]:
+        """
+        Hold stock for all items, or for none of them.
+        
+        Existing holds with the same reservation_ref are released first,
+        so retrying a checkout does not reserve twice.
+        
+        Args:
+            reservation_ref: Owner of the holds (e.g. "cart:42")
+            items: List of items with pokemon_numero, quantity
+            ttl_seconds: Seconds until the holds expire
+        
+        Raises:
+            InsufficientStockError: If any item cannot be fully reserved
+        """
+        self._delete_holds(InventoryReservation.reservation_ref == reservation_ref)
+        
+        quantities: Dict[int, int] = {}
+        for item in items:
+            numero = item["pokemon_numero"]
+            quantities[numero] = quantities.get(numero, 0) + item["quantity"]
+        
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        reservations = []
+        
+        # Fixed order keeps row locking deterministic across checkouts
+        for numero, quantity in sorted(quantities.items()):
+            result = self.db.execute(
+                update(Pokemon)
+                .where(
+                    Pokemon.numero == numero,
+                    Pokemon.en_venta == True,
+                    Pokemon.inventario_disponible >= quantity
+                )
+                .values(
+                    inventario_disponible=Pokemon.inventario_disponible - quantity,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                self.db.rollback()
+                raise InsufficientStockError(numero, quantity)
+            
+            reservations.append(InventoryReservation(
+                reservation_ref=reservation_ref,
+                pokemon_numero=numero,
+                quantity=quantity,
+                expires_at=expires_at
+            ))
+        
+        self.db.add_all(reservations)
+        self.db.commit()
+        return reservations
+    
+    def get_holds(self, reservation_ref: str) -> List[InventoryReservation]:
+        """Get the active holds for a reservation"""
+        return self.db.query(InventoryReservation).filter(
+            InventoryReservation.reservation_ref == reservation_ref
+        ).all()
+    
+    def release(self, reservation_ref: str) -> int:
+        """
+        Release the holds for a reservation and give the stock back.
+        
+        Returns:
+            Number of units released
+        """
+        released = self._delete_holds(
+            InventoryReservation.reservation_ref == reservation_ref
+        )
+        self.db.commit()
+        return sum(released.values())
+    
+    def release_expired(self, batch_size: int = 500) -> int:
+        """
+        Release expired holds in batches, oldest first.
+        
+        Walks the expires_at index, so each batch only touches expired rows.
+        
+        Returns:
+            Number of holds released
+        """
+        now = db_now(self.db)
+        released = 0
+        
+        while True:
+            ids = self.db.execute(
+                select(InventoryReservation.id)
+                .where(InventoryReservation.expires_at < now)
+                .order_by(InventoryReservation.expires_at)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            
+            self._delete_holds(InventoryReservation.id.in_(ids))
+            self.db.commit()
+            released += len(ids)
+            
+            if len(ids) < batch_size:
+                break
+        
+        return released
+    
+    def consume(self, reservation_ref: str) -> Dict[int, int]:
+        """
+        Remove the holds for a reservation without giving stock back
+        (does not commit).
+        
+        Used by TransactionRepository.create to convert holds into a sale
+        in the same DB transaction.
+        
+        Returns:
+            Held quantity per pokemon_numero
+        """
+        return self._delete_holds(
+            InventoryReservation.reservation_ref == reservation_ref,
+            restore=False
+        )
+    
+    def restore_stock(self, quantities: Dict[int, int]):
+        """Add quantities back to available stock (does not commit)"""
+        params = [
+            {"b_numero": numero, "b_quantity": quantity}
+            for numero, quantity in quantities.items()
+            if quantity
+        ]
+        if not params:
+            return
+        
+        table = Pokemon.__table__
+        self.db.execute(
+            update(table)
+            .where(table.c.numero == bindparam("b_numero"))
+            .values(inventario_disponible=(
+                table.c.inventario_disponible + bindparam("b_quantity")
+            )),
+            params
+        )
+    
+    def _delete_holds(self, condition, restore: bool = True) -> Dict[int, int]:
+        """Delete matching holds atomically, returning quantity per Pokemon"""
+        rows = self.db.execute(
+            delete(InventoryReservation)
+            .where(condition)
+            .returning(
+                InventoryReservation.pokemon_numero,
+                InventoryReservation.quantity
+            )
+        ).all()
+        
+        quantities: Dict[int, int] = {}
+        for numero, quantity in rows:
+            quantities[numero] = quantities.get(numero, 0) + quantity
+        
+        if restore:
+            self.restore_stock(quantities)
+        return quantities
+
+
+class LeaseRepository:
+    """
+    Repository for background worker leases.
+    
+    A lease is a row per worker name holding its owner and an expiry.
+    Acquiring is a single upsert that only takes over the row if it is
+    already ours or has expired, so exactly one process holds it at a time.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def acquire(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Acquire or renew a lease.
+        
+        Returns:
+            True if `owner` holds the lease afterwards
+        """
+        now = db_now(self.db)
+        
+        table = WorkerLease.__table__
+        stmt = upsert(self.db, table).values(
+            name=name,
+            owner=owner,
+            expires_at=now + timedelta(seconds=ttl_seconds),
+        )
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"owner": stmt.excluded.owner, "expires_at": stmt.excluded.expires_at},
+            where=or_(table.c.owner == stmt.excluded.owner, table.c.expires_at < now)
+        ))
+        self.db.commit()
+        
+        holder = self.db.execute(
+            select(table.c.owner).where(table.c.name == name)
+        ).scalar()
+        return holder == owner
+    
+    def release(self, name: str, owner: str) -> bool:
+        """Release a lease held by `owner`"""
+        result = self.db.execute(
+            delete(WorkerLease)
+            .where(WorkerLease.name == name, WorkerLease.owner == owner)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+    
+    def get(self, name: str) -> Optional[WorkerLease]:
+        """Get the current lease for a worker"""
+        return self.db.get(WorkerLease, name)
+
+
+class MerchantRepository:
+    """Repository for the merchant registry (main database)"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def register(
+        self,
+        merchant_id: str,
+        name: str,
+        public_key: str,
+        issuer: Optional[str] = None
+    ) -> Merchant:
+        """
+        Register a merchant, or update its name and key (key rotation).
+        
+        Args:
+            issuer: ``iss`` claim of its cart signatures (default: merchant_id)
+        """
+        merchant = self.db.get(Merchant, merchant_id)
+        if merchant is None:
+            merchant = Merchant(merchant_id=merchant_id, issuer=issuer or merchant_id)
+            self.db.add(merchant)
+        elif issuer:
+            merchant.issuer = issuer
+        merchant.name = name
+        merchant.public_key = public_key
+        self.db.commit()
+        return merchant
+    
+    def get(self, merchant_id: str) -> Optional[Merchant]:
+        """Get a merchant by ID"""
+        return self.db.get(Merchant, merchant_id)
+    
+    def get_by_issuer(self, issuer: str) -> Optional[Merchant]:
+        """Get the merchant whose signatures carry this ``iss``"""
+        return self.db.query(Merchant).filter(Merchant.issuer == issuer).first()
+    
+    def get_all(self) -> List[Merchant]:
+        """All registered merchants"""
+        return self.db.query(Merchant).order_by(Merchant.merchant_id).all()
+
+
+class SignedCartRepository:
+    """Repository for CartMandates issued by the merchant agent"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def save(self, cart_id: str, mandate: Dict[str, Any]) -> SignedCart:
+        """Store an issued CartMandate (re-issuing a cart_id replaces it)"""
+        cart = self.db.get(SignedCart, cart_id)
+        if cart is None:
+            cart = SignedCart(cart_id=cart_id, mandate=mandate)
+            self.db.add(cart)
+        else:
+            cart.mandate = mandate
+        self.db.commit()
+        return cart
+    
+    def get(self, cart_id: str) -> Optional[Dict[str, Any]]:
+        """CartMandate by cart ID"""
+        cart = self.db.get(SignedCart, cart_id)
+        return cart.mandate if cart else None
+    
+    def get_all(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent CartMandates first"""
+        return list(self.db.execute(
+            select(SignedCart.mandate).order_by(desc(SignedCart.created_at)).limit(limit)
+        ).scalars())
+    
+    def count(self) -> int:
+        """Number of issued carts"""
+        return self.db.execute(select(func.count()).select_from(SignedCart)).scalar()
+
+
+class SalesRollupRepository:
+    """
+    Repository for daily sales rollups.
+    
+    Rollups are keyed by (day, pokemon_numero) and (day, currency), so
+    reporting queries read a few rows per day instead of scanning
+    transactions and transaction_items.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def record_sale(
+        self,
+        transaction: Transaction,
+        transaction_items: List[TransactionItem]
+    ):
+        """
+        Add a completed sale to the rollups (does not commit).
+        
+        Called by TransactionRepository.create so the rollups are updated
+        in the same DB transaction as the sale.
+        """
+        completed_at = transaction.completed_at or datetime.now(timezone.utc)
+        day = completed_at.date()
+        units = sum(item.quantity for item in transaction_items)
+        
+        self._add(DailyRevenue, [{
+            "day": day,
+            "currency": transaction.currency,
+            "revenue": transaction.total_amount,
+            "transaction_count": 1,
+            "units_sold": units,
+        }])
+        
+        # Merge repeated lines for the same Pokemon before upserting
+        per_pokemon: Dict[int, Dict[str, Any]] = {}
+        for item in transaction_items:
+            row = per_pokemon.setdefault(item.pokemon_numero, {
+                "day": day,
+                "pokemon_numero": item.pokemon_numero,
+                "units_sold": 0,
+                "revenue": 0.0,
+                "transaction_count": 1,
+            })
+            row["units_sold"] += item.quantity
+            row["revenue"] += item.total_price
+        
+        self._add(DailyPokemonSales, list(per_pokemon.values()))
+    
+    def _add(self, model, rows: List[Dict[str, Any]]):
+        """Upsert rollup rows, adding the counters to existing (day, key) rows"""
+        if not rows:
+            return
+        
+        table = model.__table__
+        stmt = upsert(self.db, table)
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(table.primary_key.columns),
+                set_={
+                    name: table.c[name] + stmt.excluded[name]
+                    for name in ("units_sold", "revenue", "transaction_count")
+                }
+            ),
+            rows
+        )
+    
+    def rebuild(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Dict[str, int]:
+        """
+        Recompute rollups from completed transactions (backfill).
+        
+        Reads the hot tables and every monthly archive file (archive.py),
+        so archived months are rebuilt with the rest.
+        
+        Args:
+            start: First day to rebuild (inclusive, default: all history)
+            end: Last day to rebuild (inclusive, default: all history)
+        
+        Returns:
+            Number of rollup rows in the range per table
+        """
+        sale_time = func.coalesce(Transaction.completed_at, Transaction.created_at)
+        sale_day = func.date(sale_time)
+        
+        def in_range(column, convert=lambda d: d):
+            conditions = []
+            if start is not None:
+                conditions.append(column >= convert(start))
+            if end is not None:
+                conditions.append(column <= convert(end))
+            return conditions
+        
+        # Clear the range first so a rebuild is idempotent
+        self.db.execute(delete(DailyRevenue).where(*in_range(DailyRevenue.day)))
+        self.db.execute(delete(DailyPokemonSales).where(*in_range(DailyPokemonSales.day)))
+        
+        # date() yields ISO strings on SQLite, so compare against ISO strings
+        day_filter = in_range(sale_day, date.isoformat)
+        
+        units_per_transaction = (
+            select(
+                TransactionItem.transaction_id,
+                func.sum(TransactionItem.quantity).label("units"),
+            )
+            .group_by(TransactionItem.transaction_id)
+            .subquery()
+        )
+        revenue_select = (
+            select(
+                sale_day,
+                Transaction.currency,
+                func.sum(Transaction.total_amount),
+                func.count(Transaction.id),
+                func.coalesce(func.sum(units_per_transaction.c.units), 0),
+            )
+            .outerjoin(
+                units_per_transaction,
+                units_per_transaction.c.transaction_id == Transaction.id
+            )
+            .where(Transaction.status == "completed", *day_filter)
+            .group_by(sale_day, Transaction.currency)
+        )
+        revenue_columns = ["day", "currency", "revenue", "transaction_count", "units_sold"]
+        self.db.execute(
+            DailyRevenue.__table__.insert().from_select(revenue_columns, revenue_select)
+        )
+        
+        sales_select = (
+            select(
+                sale_day,
+                TransactionItem.pokemon_numero,
+                func.sum(TransactionItem.quantity),
+                func.sum(TransactionItem.total_price),
+                func.count(func.distinct(Transaction.id)),
+            )
+            .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+            .where(Transaction.status == "completed", *day_filter)
+            .group_by(sale_day, TransactionItem.pokemon_numero)
+        )
+        sales_columns = ["day", "pokemon_numero", "units_sold", "revenue", "transaction_count"]
+        self.db.execute(
+            DailyPokemonSales.__table__.insert().from_select(sales_columns, sales_select)
+        )
+        
+        # Archived sales: same queries on each month's file, added on top
+        # (a sale completed after the cutoff day shares it with hot sales)
+        archive = transaction_archive(self.db)
+        for month in archive.months() if archive is not None else []:
+            # Sold on or after the month it was created in
+            if end is not None and month > end.strftime("%Y-%m"):
+                continue
+            with archive.connect(month) as conn:
+                for model, query, columns in (
+                    (DailyRevenue, revenue_select, revenue_columns),
+                    (DailyPokemonSales, sales_select, sales_columns),
+                ):
+                    rows = [dict(zip(columns, row)) for row in conn.execute(query)]
+                    for row in rows:
+                        row["day"] = date.fromisoformat(row["day"])
+                    self._add(model, rows)
+        
+        self.db.commit()
+        
+        return {
+            model.__tablename__: self.db.scalar(
+                select(func.count()).select_from(model).where(*in_range(model.day))
+            )
+            for model in (DailyRevenue, DailyPokemonSales)
+        }
+    
+    def revenue_by_day(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        currency: Optional[str] = None
+    ) -> List[DailyRevenue]:
+        """Get daily revenue rows in a date range (inclusive)"""
+        query = self.db.query(DailyRevenue)
+        
+        if start is not None:
+            query = query.filter(DailyRevenue.day >= start)
+        if end is not None:
+            query = query.filter(DailyRevenue.day <= end)
+        if currency:
+            query = query.filter(DailyRevenue.currency == currency.upper())
+        
+        return query.order_by(DailyRevenue.day, DailyRevenue.currency).all()
+    
+    def units_by_pokemon(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Get units sold and revenue per Pokemon in a date range, best sellers first"""
+        units = func.sum(DailyPokemonSales.units_sold).label("units_sold")
+        query = (
+            self.db.query(
+                DailyPokemonSales.pokemon_numero,
+                Pokemon.nombre,
+                units,
+                func.sum(DailyPokemonSales.revenue).label("revenue"),
+                func.sum(DailyPokemonSales.transaction_count).label("transaction_count"),
+            )
+            .outerjoin(Pokemon, Pokemon.numero == DailyPokemonSales.pokemon_numero)
+        )
+        
+        if start is not None:
+            query = query.filter(DailyPokemonSales.day >= start)
+        if end is not None:
+            query = query.filter(DailyPokemonSales.day <= end)
+        
+        rows = (
+            query.group_by(DailyPokemonSales.pokemon_numero, Pokemon.nombre)
+            .order_by(desc(units), DailyPokemonSales.pokemon_numero)
+            .limit(limit)
+            .all()
+        )
+        
+        return [
+            {
+                "pokemon_numero": row.pokemon_numero,
+                "pokemon_name": row.nombre,
+                "units_sold": row.units_sold,
+                "revenue": row.revenue,
+                "transaction_count": row.transaction_count,
+            }
+            for row in rows
+        ]
+    
+    def daily_units(
+        self,
+        pokemon_numero: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[DailyPokemonSales]:
+        """Get the daily sales series of a single Pokemon"""
+        query = self.db.query(DailyPokemonSales).filter(
+            DailyPokemonSales.pokemon_numero == pokemon_numero
+        )
+        
+        if start is not None:
+            query = query.filter(DailyPokemonSales.day >= start)
+        if end is not None:
+            query = query.filter(DailyPokemonSales.day <= end)
+        
+        return query.order_by(DailyPokemonSales.day).all()
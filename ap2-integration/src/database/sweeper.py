@@ -0,0 +1,104 @@
+"""
+Incremental cart expiry sweeper
+
+Expires active carts past their expiry and purges long-expired carts in
+bounded batches, each in its own short DB transaction. Every web process
+may start a sweeper; a worker lease makes sure only one of them sweeps at
+a time.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .repository import CartRepository, LeaseRepository
+
+
+class CartSweeper:
+    """
+    Background sweeper for expired carts.
+
+    Each tick expires at most `batch_size` due carts and purges at most
+    `batch_size` carts expired more than `retention_days` ago. When a tick
+    fills a batch the next one runs immediately, so a backlog is drained
+    in O(expired) work without long-held locks.
+    """
+
+    LEASE_NAME = "cart-sweeper"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 500,
+        retention_days: int = 7,
+        interval_seconds: float = 60.0,
+        owner: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = interval_seconds * 3
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.totals = {"ticks": 0, "expired": 0, "purged": 0}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def tick(self) -> Dict[str, Any]:
+        """Run one bounded sweep if this process holds the lease"""
+        with self.session_factory() as db:
+            if not LeaseRepository(db).acquire(self.LEASE_NAME, self.owner, self.lease_seconds):
+                return {"leader": False, "expired": 0, "purged": 0}
+
+            cart_repo = CartRepository(db)
+            expired = cart_repo.expire_due_carts(limit=self.batch_size)
+            purged = cart_repo.purge_expired_carts(
+                older_than_days=self.retention_days,
+                limit=self.batch_size
+            )
+
+        self.totals["ticks"] += 1
+        self.totals["expired"] += expired
+        self.totals["purged"] += purged
+        return {"leader": True, "expired": expired, "purged": purged}
+
+    def run(self):
+        """Sweep until stopped"""
+        while not self._stop_event.is_set():
+            backlog = False
+            try:
+                result = self.tick()
+                if result["expired"] or result["purged"]:
+                    print(
+                        f"🗑️  Expired {result['expired']} carts, "
+                        f"purged {result['purged']} old carts"
+                    )
+                backlog = (
+                    result["expired"] >= self.batch_size
+                    or result["purged"] >= self.batch_size
+                )
+            except Exception as e:
+                print(f"Error in cart sweep: {e}")
+
+            self._stop_event.wait(0 if backlog else self.interval_seconds)
+
+    def start(self):
+        """Start sweeping in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="cart-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the sweeper thread and hand the lease over"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        with self.session_factory() as db:
+            LeaseRepository(db).release(self.LEASE_NAME, self.owner)
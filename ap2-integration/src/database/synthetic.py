@@ -0,0 +1,514 @@
+"""
+Synthetic marketplace data
+
+Seeded generator for scale tests and benchmarks: N Pokemon listings (with
+type rows), M carts with items and K historical transactions with AP2
+CartMandate / PaymentMandate payloads. Rows are written with Core
+executemany inserts in batches, bypassing the ORM.
+
+The same seed and ``now`` always produce the same rows. Each entity type
+draws from its own random stream (seeded with its first key, so appending
+to an existing database does not repeat rows), and changing one count does
+not change the other tables. Mandate JWTs have the real header/claims layout and RS256
+signature length, but the signatures are random bytes (signing a million
+tokens would dominate the run); they do not verify.
+"""
+
+import base64
+import json
+import random
+import time
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, Boolean, DateTime, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from .catalog import load_species
+from .models import Cart, CartItem, Pokemon, PokemonType, Transaction, TransactionItem
+
+MERCHANT_NAME = "PokeMart - Primera Generación"
+PROCESSOR_URL = "http://localhost:8003/a2a/processor"
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# (value, weight) pairs
+CART_STATUSES = (("active", 55), ("checkout", 10), ("completed", 25), ("expired", 10))
+TRANSACTION_STATUSES = (("completed", 92), ("failed", 5), ("refunded", 3))
+CART_QUANTITIES = ((1, 70), (2, 20), (3, 7), (4, 3))
+TRANSACTION_QUANTITIES = ((1, 80), (2, 15), (3, 5))
+
+PAYMENT_METHODS = (
+    ("pm_visa_1234", "CARD"),
+    ("pm_mastercard_5678", "CARD"),
+    ("pm_amex_9012", "CARD"),
+)
+
+# SQLite settings used while generating (previous values are restored)
+BULK_PRAGMAS = {"synchronous": "OFF", "journal_mode": "MEMORY", "cache_size": -256 * 1024}
+
+# Base64url length of a 2048-bit RS256 signature
+_SIGNATURE_BYTES = 256
+
+ProgressCallback = Callable[[str, int, float], None]
+
+
+def _weighted(pairs: Sequence[Tuple[Any, int]]) -> Tuple[Any, ...]:
+    """Expand (value, weight) pairs so rng.choice() draws by weight (faster than choices())"""
+    return tuple(value for value, weight in pairs for _ in range(weight))
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_json(value: Dict[str, Any]) -> str:
+    return _b64url(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+_JWT_HEADER = _b64url_json({"alg": "RS256", "typ": "JWT"})
+
+# SQLAlchemy stores SQLite DateTimes as "YYYY-MM-DD HH:MM:SS.ffffff"
+# (offset dropped); isoformat + slice is ~3x faster than strftime
+_SQLITE_DATETIME_LENGTH = 26
+
+
+def _sqlite_converter(column_type) -> Optional[Callable[[Any], Any]]:
+    """Python value to the value SQLAlchemy would bind for this type on SQLite"""
+    if isinstance(column_type, DateTime):
+        return lambda value: (
+            None if value is None
+            else value.isoformat(" ", "microseconds")[:_SQLITE_DATETIME_LENGTH]
+        )
+    if isinstance(column_type, JSON):
+        return lambda value: None if value is None else json.dumps(value)
+    if isinstance(column_type, Boolean):
+        return lambda value: None if value is None else int(value)
+    return None
+
+
+def _executemany(conn: Connection, table, rows: List[Dict[str, Any]]):
+    """
+    Insert rows with one executemany.
+
+    On SQLite the values are converted here and passed to the driver as
+    tuples, skipping SQLAlchemy's per-row parameter processing (about half
+    the load time); other dialects use a Core insert.
+    """
+    if conn.dialect.name != "sqlite":
+        conn.execute(table.insert(), rows)
+        return
+
+    names = list(rows[0])
+    sql = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+    getter = itemgetter(*names)
+    converters = [
+        (position, converter)
+        for position, converter in enumerate(_sqlite_converter(table.c[name].type) for name in names)
+        if converter is not None
+    ]
+
+    params = []
+    for row in rows:
+        values = list(getter(row)) if len(names) > 1 else [getter(row)]
+        for position, converter in converters:
+            values[position] = converter(values[position])
+        params.append(tuple(values))
+    conn.exec_driver_sql(sql, params)
+
+
+class SyntheticDataGenerator:
+    """
+    Generates and bulk-inserts synthetic marketplace rows.
+
+    Args:
+        seed: Random seed
+        now: Reference time; history goes back ``days`` from here and
+            active carts expire after it (default: current UTC time)
+        days: Length of the transaction history
+        batch_size: Rows per executemany batch
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        now: Optional[datetime] = None,
+        days: int = 365,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        self.seed = seed
+        self.now = now or datetime.now(timezone.utc).replace(microsecond=0)
+        self.days = days
+        self.batch_size = batch_size
+        self.species = load_species()
+
+    def _rng(self, stream: str) -> random.Random:
+        return random.Random(f"{self.seed}:{stream}")
+
+    @staticmethod
+    def _hex_id(rng: random.Random) -> str:
+        return f"{rng.getrandbits(128):032x}"
+
+    def _past(self, rng: random.Random) -> datetime:
+        """Random time in the history window, weighted towards recent days"""
+        age = self.days * 86400 * (rng.random() ** 1.5)
+        return self.now - timedelta(seconds=int(age))
+
+    def _jwt(self, rng: random.Random, claims: Dict[str, Any]) -> str:
+        signature = _b64url(rng.getrandbits(_SIGNATURE_BYTES * 8).to_bytes(_SIGNATURE_BYTES, "big"))
+        return f"{_JWT_HEADER}.{_b64url_json(claims)}.{signature}"
+
+    # ------------------------------------------------------------------
+    # Row generators
+    # ------------------------------------------------------------------
+
+    def pokemon_rows(self, count: int, start: int = 1) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """Yield (pokemon row, pokemon_types rows) for numeros start..start+count-1"""
+        rng = self._rng(f"pokemon:{start}")
+        species_count = len(self.species)
+        created = self.now - timedelta(days=self.days)
+
+        for numero in range(start, start + count):
+            species = self.species[(numero - 1) % species_count + 1]
+            nombre = species["nombre"] if numero <= species_count else f"{species['nombre']}-{numero}"
+            base_total = sum(species["stats"].values())
+            total = rng.randint(0, 40)
+            sold = rng.randint(0, total)
+            yield (
+                {
+                    "numero": numero,
+                    "nombre": nombre[:50],
+                    "precio": max(1, int(base_total / 4 * rng.lognormvariate(0, 0.35))),
+                    "en_venta": rng.random() < 0.9,
+                    "inventario_total": total,
+                    "inventario_disponible": total - sold,
+                    "inventario_vendido": sold,
+                    "created_at": created,
+                    "updated_at": created,
+                },
+                [
+                    {"pokemon_numero": numero, "slot": slot, "type_name": type_name}
+                    for slot, type_name in enumerate(species["types"], start=1)
+                ],
+            )
+
+    def cart_rows(
+        self,
+        count: int,
+        catalog: Sequence[Tuple[int, str, int]],
+        first_id: int = 1
+    ) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """Yield (cart row, cart_items rows); catalog holds (numero, nombre, precio)"""
+        rng = self._rng(f"carts:{first_id}")
+        statuses = _weighted(CART_STATUSES)
+        quantities = _weighted(CART_QUANTITIES)
+        users = max(1, count // 3)
+
+        for cart_id in range(first_id, first_id + count):
+            status = rng.choice(statuses)
+            if status in ("active", "checkout"):
+                created = self.now - timedelta(seconds=rng.randint(0, 23 * 3600))
+            else:
+                created = self._past(rng)
+            expires = created + timedelta(hours=24)
+            updated = created + timedelta(seconds=rng.randint(0, 3600))
+
+            items = []
+            for numero, nombre, precio in rng.sample(catalog, min(len(catalog), rng.randint(1, 5))):
+                quantity = rng.choice(quantities)
+                items.append({
+                    "cart_id": cart_id,
+                    "pokemon_numero": numero,
+                    "quantity": quantity,
+                    "unit_price": float(precio),
+                    "total_price": float(quantity * precio),
+                    "pokemon_name": nombre,
+                    "added_at": created,
+                    "updated_at": updated,
+                })
+
+            yield (
+                {
+                    "id": cart_id,
+                    "session_id": f"session_{self._hex_id(rng)}",
+                    "user_id": f"user_{rng.randrange(users)}" if rng.random() < 0.6 else None,
+                    "status": status,
+                    "created_at": created,
+                    "updated_at": updated,
+                    "expires_at": expires,
+                    "item_count": len(items),
+                    "total_amount": sum(item["total_price"] for item in items),
+                },
+                items,
+            )
+
+    def transaction_rows(
+        self,
+        count: int,
+        catalog: Sequence[Tuple[int, str, int]],
+        first_id: int = 1
+    ) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """Yield (transaction row with mandates, transaction_items rows)"""
+        rng = self._rng(f"transactions:{first_id}")
+        statuses = _weighted(TRANSACTION_STATUSES)
+        quantities = _weighted(TRANSACTION_QUANTITIES)
+        payers = max(1, count // 5)
+
+        for transaction_pk in range(first_id, first_id + count):
+            created = self._past(rng)
+            status = rng.choice(statuses)
+            cart_id = f"cart_pokemon_{rng.getrandbits(32):08x}"
+            order_id = f"order_pokemon_{rng.getrandbits(32):08x}"
+            method_id, method_name = rng.choice(PAYMENT_METHODS)
+            payer_email = f"trainer{rng.randrange(payers)}@pokemon.com"
+
+            items = []
+            display_items = []
+            for numero, nombre, precio in rng.sample(catalog, min(len(catalog), rng.randint(1, 4))):
+                quantity = rng.choice(quantities)
+                items.append({
+                    "transaction_id": transaction_pk,
+                    "pokemon_numero": numero,
+                    "quantity": quantity,
+                    "unit_price": float(precio),
+                    "total_price": float(quantity * precio),
+                    "pokemon_name": nombre,
+                })
+                display_items.append({
+                    "label": f"{nombre.capitalize()} (x{quantity})",
+                    "amount": {"currency": "USD", "value": float(quantity * precio)},
+                })
+            total = {"label": "Total", "amount": {"currency": "USD", "value": sum(i["total_price"] for i in items)}}
+
+            issued = int(created.timestamp())
+            merchant_signature = self._jwt(rng, {
+                "iss": "PokeMart", "sub": cart_id, "iat": issued, "exp": issued + 3600,
+                "cart_id": cart_id, "merchant": MERCHANT_NAME,
+            })
+            cart_hash = f"{rng.getrandbits(256):064x}"
+            payment_hash = f"{rng.getrandbits(256):064x}"
+            user_authorization = self._jwt(rng, {
+                "iss": "user_device", "sub": payer_email, "iat": issued, "exp": issued + 900,
+                "cart_hash": cart_hash, "payment_hash": payment_hash,
+                "vc": {
+                    "type": ["VerifiableCredential", "PaymentAuthorization"],
+                    "credentialSubject": {
+                        "id": "did:example:user123", "cart_hash": cart_hash,
+                        "payment_hash": payment_hash, "consent": "explicit",
+                    },
+                },
+            })
+            timestamp = created.isoformat()
+
+            cart_mandate = {
+                "contents": {
+                    "id": cart_id,
+                    "user_cart_confirmation_required": False,
+                    "payment_request": {
+                        "method_data": [{
+                            "supported_methods": "CARD",
+                            "data": {"payment_processor_url": PROCESSOR_URL},
+                        }],
+                        "details": {"id": order_id, "displayItems": display_items, "total": total},
+                        "options": {"requestPayerEmail": True},
+                    },
+                    "cart_expiry": (created + timedelta(hours=1)).isoformat(),
+                    "merchant_name": MERCHANT_NAME,
+                },
+                "merchant_signature": merchant_signature,
+                "timestamp": timestamp,
+                "merchantName": MERCHANT_NAME,
+            }
+            payment_mandate = {
+                "payment_mandate_contents": {
+                    "payment_mandate_id": f"pm_{rng.getrandbits(32):08x}",
+                    "payment_details_id": order_id,
+                    "payment_details_total": total,
+                    "payment_response": {
+                        "request_id": order_id,
+                        "method_name": method_name,
+                        "details": {"token": f"tok_{method_id}_{rng.getrandbits(64):016x}"},
+                        "payer_email": payer_email,
+                    },
+                    "merchant_agent": "PokemonMerchantAgent",
+                    "credential_provider_agent": "PokemonCredentialsProvider",
+                    "risk_data": {
+                        "device_fingerprint": f"fp_{rng.getrandbits(32):08x}",
+                        "user_agent": "Pokemon-Shopping-Agent/1.0",
+                        "session_id": f"session_{rng.getrandbits(32):08x}",
+                        "risk_score": round(rng.betavariate(2, 10), 2),
+                        "timestamp": timestamp,
+                    },
+                },
+                "user_authorization": user_authorization,
+                "timestamp": timestamp,
+            }
+
+            yield (
+                {
+                    "id": transaction_pk,
+                    "transaction_id": f"txn_{self._hex_id(rng)}",
+                    "cart_id": cart_id,
+                    "payment_id": f"pay_{rng.getrandbits(48):012x}",
+                    "status": status,
+                    "total_amount": total["amount"]["value"],
+                    "currency": "USD",
+                    "payment_method": method_name,
+                    "payer_email": payer_email,
+                    "cart_mandate": cart_mandate,
+                    "payment_mandate": payment_mandate,
+                    "merchant_name": MERCHANT_NAME,
+                    "merchant_signature": merchant_signature,
+                    "user_authorization": user_authorization,
+                    "created_at": created,
+                    "completed_at": created + timedelta(seconds=rng.randint(1, 5)) if status != "failed" else None,
+                },
+                items,
+            )
+
+    # ------------------------------------------------------------------
+    # Bulk writes
+    # ------------------------------------------------------------------
+
+    def _insert(
+        self,
+        conn: Connection,
+        label: str,
+        rows: Iterator[Tuple[Dict, List[Dict]]],
+        parent_table,
+        child_table,
+        progress: Optional[ProgressCallback]
+    ) -> Tuple[int, int]:
+        """
+        Insert parent rows and their child rows in batches.
+
+        Secondary indexes of both tables are dropped first and rebuilt
+        after the load (same transaction): one sorted build is much cheaper
+        than a million random-key B-tree inserts. A unique index that no
+        longer holds fails the rebuild and rolls everything back.
+        """
+        start = time.perf_counter()
+        parents, children = [], []
+        parent_count = child_count = 0
+
+        indexes = [index for table in (parent_table, child_table) for index in table.indexes]
+        for index in indexes:
+            index.drop(conn, checkfirst=True)
+
+        def flush():
+            nonlocal parent_count, child_count
+            if parents:
+                _executemany(conn, parent_table, parents)
+            if children:
+                _executemany(conn, child_table, children)
+            parent_count += len(parents)
+            child_count += len(children)
+            parents.clear()
+            children.clear()
+            if progress:
+                progress(label, parent_count, time.perf_counter() - start)
+
+        for parent, child_rows in rows:
+            parents.append(parent)
+            children.extend(child_rows)
+            if len(parents) >= self.batch_size:
+                flush()
+        flush()
+
+        for index in indexes:
+            index.create(conn)
+        return parent_count, child_count
+
+    @staticmethod
+    def _next_id(conn: Connection, column) -> int:
+        return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+    def generate(
+        self,
+        engine: Engine,
+        pokemon: int = 0,
+        carts: int = 0,
+        transactions: int = 0,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Append synthetic rows to a database (tables must exist).
+
+        New Pokemon get numeros after the current maximum; carts and
+        transactions use the whole catalog (existing plus new). Everything
+        is written in one transaction.
+
+        Returns:
+            Row counts per table plus seconds and rows_per_second
+        """
+        start = time.perf_counter()
+        counts: Dict[str, int] = {}
+
+        sqlite = engine.dialect.name == "sqlite"
+        if sqlite:
+            with engine.connect() as conn:
+                pragmas = {
+                    name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                    for name in BULK_PRAGMAS
+                }
+
+        try:
+            with engine.begin() as conn:
+                if sqlite:
+                    # Bulk load: skip fsyncs, keep the rollback journal in
+                    # memory and give the index rebuilds a large page cache
+                    for name, value in BULK_PRAGMAS.items():
+                        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+
+                if pokemon:
+                    counts["pokemon"], counts["pokemon_types"] = self._insert(
+                        conn, "pokemon",
+                        self.pokemon_rows(pokemon, start=self._next_id(conn, Pokemon.numero)),
+                        Pokemon.__table__, PokemonType.__table__, progress
+                    )
+
+                if carts or transactions:
+                    catalog = [
+                        tuple(row) for row in conn.execute(
+                            select(Pokemon.numero, Pokemon.nombre, Pokemon.precio)
+                            .order_by(Pokemon.numero)
+                        )
+                    ]
+                    if not catalog:
+                        raise ValueError("Carts and transactions need Pokemon in the catalog")
+
+                if carts:
+                    counts["carts"], counts["cart_items"] = self._insert(
+                        conn, "carts",
+                        self.cart_rows(carts, catalog, first_id=self._next_id(conn, Cart.id)),
+                        Cart.__table__, CartItem.__table__, progress
+                    )
+
+                if transactions:
+                    counts["transactions"], counts["transaction_items"] = self._insert(
+                        conn, "transactions",
+                        self.transaction_rows(
+                            transactions, catalog, first_id=self._next_id(conn, Transaction.id)
+                        ),
+                        Transaction.__table__, TransactionItem.__table__, progress
+                    )
+        finally:
+            if sqlite:
+                # Pooled connections keep pragmas; put the previous ones back
+                with engine.connect() as conn:
+                    for name, value in pragmas.items():
+                        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+
+        elapsed = time.perf_counter() - start
+        rows = sum(counts.values())
+        return {
+            **counts,
+            "rows": rows,
+            "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed else 0.0,
+        }
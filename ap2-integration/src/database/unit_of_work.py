@@ -0,0 +1,55 @@
+"""
+Unit of work
+
+Request-scoped transaction for the repositories: statements run as the
+request goes, and a single commit at the end makes them durable.
+"""
+
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from .engine import SessionLocal
+from .repository import CartRepository, PokemonRepository
+
+
+class UnitOfWork:
+    """
+    One session and one commit per request.
+    
+    Repositories created here run with autocommit=False. Nothing is
+    committed until commit() is called; leaving the block without
+    committing (or with an exception) rolls everything back.
+    
+    Usage:
+        with UnitOfWork() as uow:
+            cart = uow.carts.get_or_create_cart(session_id)
+            uow.carts.add_item(cart, uow.pokemon.get_by_numero(25))
+            uow.commit()
+    """
+    
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self.session_factory = session_factory or SessionLocal
+        self.db: Optional[Session] = None
+    
+    def __enter__(self) -> "UnitOfWork":
+        self.db = self.session_factory()
+        self.carts = CartRepository(self.db, autocommit=False)
+        self.pokemon = PokemonRepository(self.db, autocommit=False)
+        return self
+    
+    def commit(self):
+        """Flush pending changes and commit the request's transaction"""
+        self.db.commit()
+    
+    def rollback(self):
+        """Discard everything done in this unit of work"""
+        self.db.rollback()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is not None:
+                self.rollback()
+        finally:
+            # Closing also rolls back anything left uncommitted
+            self.db.close()
@@ -0,0 +1,25 @@
+"""Sales event log: transactional outbox publisher and local consumers"""
+
+import os
+from pathlib import Path
+
+from .log import SegmentedLog, LogRecord
+from .consumer import LogConsumer
+from .publisher import OutboxPublisher, LeasedOutboxPublisher
+
+
+def get_sales_log_dir() -> Path:
+    """Sales event log directory (SALES_EVENT_LOG_DIR or <repo>/sales_events)"""
+    from src.database.engine import BASE_DIR
+
+    return Path(os.getenv("SALES_EVENT_LOG_DIR", BASE_DIR / "sales_events"))
+
+
+__all__ = [
+    "SegmentedLog",
+    "LogRecord",
+    "LogConsumer",
+    "OutboxPublisher",
+    "LeasedOutboxPublisher",
+    "get_sales_log_dir",
+]
@@ -0,0 +1,206 @@
+"""
+Sales event log consumer
+
+Tails a SegmentedLog directory from a given offset using sequential reads.
+Consumers are independent of the writer (no locks, no DB access), so
+analytics, fulfilment or inventory sync can each keep their own position.
+
+Example:
+    consumer = LogConsumer(get_sales_log_dir(), group="analytics")
+    for event in consumer.tail(stop_event=stop):
+        handle(event)
+        consumer.commit()
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .log import LogRecord, list_segments, read_record, RECORD_HEADER
+
+
+class LogConsumer:
+    """Sequential reader for a segmented log"""
+
+    def __init__(
+        self,
+        directory,
+        offset: Optional[int] = None,
+        group: Optional[str] = None
+    ):
+        """
+        Args:
+            directory: Log directory
+            offset: Offset to start from. If None, resumes from the committed
+                offset of ``group`` (or 0 when there is none).
+            group: Optional consumer group name used by commit()/committed()
+        """
+        self.directory = Path(directory)
+        self.group = group
+        self._file = None
+        self._segment_base: Optional[int] = None
+
+        if offset is None:
+            offset = self.committed() or 0
+        self.seek(offset)
+
+    # ============================================
+    # Positioning
+    # ============================================
+
+    @property
+    def position(self) -> int:
+        """Offset of the next record that poll() will return"""
+        return self._position
+
+    def seek(self, offset: int):
+        """Move to ``offset`` (skips record payloads without reading them)"""
+        self._close_file()
+        self._position = offset
+
+        segments = list_segments(self.directory)
+        candidates = [s for s in segments if s[0] <= offset]
+        if not candidates:
+            if segments:
+                # Older segments were removed; start at the oldest available
+                self._open(*segments[0])
+                self._position = segments[0][0]
+            return
+
+        self._open(*candidates[-1])
+
+        while True:
+            start = self._file.tell()
+            header = self._file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                self._file.seek(start)
+                return
+            record_offset, length, _ = RECORD_HEADER.unpack(header)
+            if record_offset >= offset:
+                self._file.seek(start)
+                return
+            self._file.seek(length, os.SEEK_CUR)
+
+    def _open(self, base_offset: int, path: Path):
+        self._file = open(path, "rb")
+        self._segment_base = base_offset
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _has_newer_segment(self) -> bool:
+        return any(
+            base_offset > self._segment_base
+            for base_offset, _ in list_segments(self.directory)
+        )
+
+    def _next_segment(self) -> bool:
+        """Advance to the segment after the current one, if it exists"""
+        for base_offset, path in list_segments(self.directory):
+            if self._segment_base is None or base_offset > self._segment_base:
+                self._close_file()
+                self._open(base_offset, path)
+                return True
+        return False
+
+    # ============================================
+    # Reading
+    # ============================================
+
+    def poll(self, max_records: int = 500) -> List[LogRecord]:
+        """
+        Read up to ``max_records`` records from the current position.
+
+        Returns an empty list when caught up with the writer.
+        """
+        records: List[LogRecord] = []
+
+        if self._file is None and not self._next_segment():
+            return records
+
+        while len(records) < max_records:
+            record = read_record(self._file)
+            if record is None:
+                # End of segment (or record still being written). Only move
+                # on if a newer segment exists, i.e. this one is sealed and
+                # fully flushed; re-read once to pick up a late tail.
+                if not self._has_newer_segment():
+                    break
+                record = read_record(self._file)
+                if record is None:
+                    self._next_segment()
+                    continue
+
+            if record.offset < self._position:
+                continue
+            records.append(record)
+            self._position = record.offset + 1
+
+        return records
+
+    def events(self, max_records: int = 500) -> List[Dict[str, Any]]:
+        """poll() and decode JSON payloads, adding the log offset"""
+        return [
+            {**json.loads(record.value), "offset": record.offset}
+            for record in self.poll(max_records)
+        ]
+
+    def tail(
+        self,
+        poll_interval: float = 0.5,
+        stop_event: Optional[threading.Event] = None,
+        decode: Callable[[bytes], Any] = json.loads
+    ) -> Iterator[Any]:
+        """Yield decoded records forever (until ``stop_event`` is set)"""
+        stop_event = stop_event or threading.Event()
+
+        while not stop_event.is_set():
+            batch = self.poll()
+            if not batch:
+                stop_event.wait(poll_interval)
+                continue
+            for record in batch:
+                # Keep position() in step with what was handed out, so that
+                # commit() inside the loop never skips unprocessed records
+                self._position = record.offset + 1
+                yield decode(record.value)
+
+    # ============================================
+    # Committed offsets
+    # ============================================
+
+    def _offset_path(self) -> Path:
+        if not self.group:
+            raise ValueError("Consumer group required to commit offsets")
+        return self.directory / "consumers" / f"{self.group}.offset"
+
+    def committed(self) -> Optional[int]:
+        """Last committed offset for this group (None if never committed)"""
+        if not self.group:
+            return None
+        path = self._offset_path()
+        if not path.exists():
+            return None
+        return int(path.read_text().strip())
+
+    def commit(self, offset: Optional[int] = None):
+        """Atomically persist ``offset`` (default: current position)"""
+        path = self._offset_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(str(self._position if offset is None else offset))
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Close the open segment file"""
+        self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,245 @@
+"""
+Segmented append-only log
+
+Local, Kafka-style log of sales events. Records are appended to segment
+files named after the offset of their first record
+(``00000000000000000000.seg``, ``00000000000000052113.seg``, ...) and a new
+segment is rolled once the active one grows past ``max_segment_bytes``.
+Segments are not ``*.log`` files: log cleanups (such as the repository's
+pre-commit hook) would delete them. A writer renames segments left with
+the old ``.log`` suffix when it opens the directory.
+
+Each record on disk is::
+
+    offset (u64) | length (u32) | crc32 (u32) | payload (length bytes)
+
+Offsets are dense and monotonically increasing across segments, so readers
+can resume from any offset and then read sequentially.
+"""
+
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+RECORD_HEADER = struct.Struct(">QII")
+SEGMENT_SUFFIX = ".seg"
+LEGACY_SEGMENT_SUFFIX = ".log"
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+class LogRecord(NamedTuple):
+    """A single record read from the log"""
+    offset: int
+    value: bytes
+
+
+def segment_name(base_offset: int) -> str:
+    """File name of the segment starting at ``base_offset``"""
+    return f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory: Path) -> List[Tuple[int, Path]]:
+    """List ``(base_offset, path)`` of all segments, oldest first"""
+    segments = []
+    for suffix in (SEGMENT_SUFFIX, LEGACY_SEGMENT_SUFFIX):
+        for path in Path(directory).glob(f"*{suffix}"):
+            try:
+                segments.append((int(path.stem), path))
+            except ValueError:
+                continue
+    return sorted(segments)
+
+
+def rename_legacy_segments(directory: Path):
+    """Give segments written with the old ``.log`` suffix the current one"""
+    for path in Path(directory).glob(f"*{LEGACY_SEGMENT_SUFFIX}"):
+        if path.stem.isdigit():
+            path.rename(path.with_suffix(SEGMENT_SUFFIX))
+
+
+def read_record(f) -> Optional[LogRecord]:
+    """
+    Read the next record from an open segment file.
+
+    Returns:
+        The record, or None if the end of the file (or a partially written
+        record) was reached. The file position is left at the start of the
+        incomplete record in that case.
+    """
+    start = f.tell()
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        f.seek(start)
+        return None
+
+    offset, length, crc = RECORD_HEADER.unpack(header)
+    value = f.read(length)
+    if len(value) < length or zlib.crc32(value) != crc:
+        f.seek(start)
+        return None
+
+    return LogRecord(offset, value)
+
+
+def scan_segment(path: Path) -> Tuple[Optional[int], int]:
+    """
+    Scan a segment to find its last valid offset.
+
+    Returns:
+        (last_offset or None if empty, byte position after the last valid record)
+    """
+    last_offset = None
+    with open(path, "rb") as f:
+        while True:
+            record = read_record(f)
+            if record is None:
+                return last_offset, f.tell()
+            last_offset = record.offset
+
+
+class SegmentedLog:
+    """
+    Append-only writer for a segmented log directory.
+
+    Only one writer per directory is supported; any number of LogConsumer
+    instances may read concurrently.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        fsync: bool = True
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_base = 0
+        self._segment_size = 0
+        self._next_offset = 0
+
+        self._recover()
+
+    def _recover(self):
+        """Open the active segment, truncating any torn trailing record"""
+        rename_legacy_segments(self.directory)
+        segments = list_segments(self.directory)
+        if not segments:
+            self._open_segment(0)
+            return
+
+        base_offset, path = segments[-1]
+        last_offset, valid_size = scan_segment(path)
+
+        if path.stat().st_size != valid_size:
+            with open(path, "r+b") as f:
+                f.truncate(valid_size)
+
+        self._segment_base = base_offset
+        self._next_offset = base_offset if last_offset is None else last_offset + 1
+        self._file = open(path, "ab")
+        self._segment_size = valid_size
+
+    def _open_segment(self, base_offset: int):
+        if self._file:
+            self._file.close()
+        path = self.directory / segment_name(base_offset)
+        self._file = open(path, "ab")
+        self._segment_base = base_offset
+        self._segment_size = self._file.tell()
+
+    @property
+    def next_offset(self) -> int:
+        """Offset that the next appended record will get"""
+        return self._next_offset
+
+    def append(self, value: bytes) -> int:
+        """Append a single record. Returns its offset."""
+        return self.append_batch([value])[0]
+
+    def append_batch(self, values: Iterable[bytes]) -> List[int]:
+        """
+        Append records with a single write/flush (and fsync if enabled).
+
+        Returns:
+            Offsets assigned to the records, in order
+        """
+        with self._lock:
+            if self._file is None:
+                raise ValueError("Log is closed")
+
+            offsets = []
+            chunks = []
+            pending = 0
+
+            for value in values:
+                if self._segment_size + pending >= self.max_segment_bytes and pending:
+                    self._write(chunks, pending)
+                    chunks, pending = [], 0
+                if self._segment_size >= self.max_segment_bytes:
+                    self._open_segment(self._next_offset)
+
+                offset = self._next_offset
+                chunks.append(RECORD_HEADER.pack(offset, len(value), zlib.crc32(value)))
+                chunks.append(value)
+                pending += RECORD_HEADER.size + len(value)
+                offsets.append(offset)
+                self._next_offset += 1
+
+            if pending:
+                self._write(chunks, pending)
+
+            return offsets
+
+    def _write(self, chunks: List[bytes], size: int):
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._segment_size += size
+
+    def segments(self) -> List[Tuple[int, Path]]:
+        """List ``(base_offset, path)`` of all segments"""
+        return list_segments(self.directory)
+
+    def read(self, offset: int = 0, max_records: int = 1000) -> List[LogRecord]:
+        """Convenience read (see LogConsumer for tailing)"""
+        from .consumer import LogConsumer
+
+        consumer = LogConsumer(self.directory, offset=offset)
+        try:
+            return consumer.poll(max_records)
+        finally:
+            consumer.close()
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        from .consumer import LogConsumer
+
+        consumer = LogConsumer(self.directory)
+        try:
+            while True:
+                batch = consumer.poll()
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            consumer.close()
+
+    def close(self):
+        """Close the active segment"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,288 @@
+"""
+Outbox publisher
+
+Drains pending rows of the ``sales_outbox`` table into the sales event log.
+Rows are appended in outbox order and then marked as published with their
+log offset. Delivery is at-least-once: if the process dies between the
+append and the DB commit, the same rows are appended again on restart, so
+consumers should de-duplicate on ``outbox_id``.
+
+Each merchant partition has an outbox of its own; its publisher tags the
+records with ``merchant_id`` (de-duplicate on merchant_id + outbox_id).
+Records without it come from the default merchant.
+
+A SegmentedLog has a single writer, so servers run LeasedOutboxPublisher:
+every worker starts one, and only the holder of a worker lease opens the
+log and drains the outboxes of all merchants.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from src.database.merchants import merchant_router
+from src.database.models import OutboxEvent
+from src.database.repository import LeaseRepository, MerchantRepository
+from .log import SegmentedLog
+
+
+class OutboxPublisher:
+    """Streams committed outbox rows to a SegmentedLog"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        log: SegmentedLog,
+        batch_size: int = 500,
+        merchant_id: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.log = log
+        self.merchant_id = merchant_id
+        self.batch_size = batch_size
+        self.published_total = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish_once(self) -> int:
+        """
+        Publish one batch of pending outbox rows.
+
+        Returns:
+            Number of events appended to the log
+        """
+        db = self.session_factory()
+        try:
+            pending = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not pending:
+                return 0
+
+            offsets = self.log.append_batch(
+                json.dumps(self._record(event), separators=(",", ":")).encode()
+                for event in pending
+            )
+
+            now = datetime.now(timezone.utc)
+            db.execute(
+                update(OutboxEvent),
+                [
+                    {"id": event.id, "published_at": now, "log_offset": offset}
+                    for event, offset in zip(pending, offsets)
+                ]
+            )
+            db.commit()
+
+            self.published_total += len(pending)
+            return len(pending)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record(self, event: OutboxEvent) -> dict:
+        """Log record of an outbox row"""
+        record = event.to_dict()
+        if self.merchant_id is not None:
+            record["merchant_id"] = self.merchant_id
+        return record
+
+    def publish_pending(self) -> int:
+        """Publish until the outbox is drained. Returns events published."""
+        total = 0
+        while True:
+            published = self.publish_once()
+            total += published
+            if published < self.batch_size:
+                return total
+
+    def pending_count(self) -> int:
+        """Number of outbox rows not yet published"""
+        with self.session_factory() as db:
+            return db.query(OutboxEvent).filter(
+                OutboxEvent.published_at.is_(None)
+            ).count()
+
+    def run(self, poll_interval: float = 1.0):
+        """Publish in a loop until stop() is called"""
+        while not self._stop_event.is_set():
+            try:
+                if self.publish_pending() == 0:
+                    self._stop_event.wait(poll_interval)
+            except Exception as e:
+                print(f"Error in outbox publisher: {e}")
+                self._stop_event.wait(poll_interval)
+
+    def start(self, poll_interval: float = 1.0):
+        """Start the publisher in a background daemon thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.run,
+            args=(poll_interval,),
+            name=f"outbox-publisher-{self.merchant_id}" if self.merchant_id else "outbox-publisher",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class LeasedOutboxPublisher:
+    """
+    Sales log writer shared by every worker of a deployment.
+
+    Each tick renews the "sales-event-log" lease; the holder opens the log
+    (recovering a torn tail left by a previous writer) and publishes the
+    main outbox and those of all registered merchants. The others keep the
+    log closed and take over once the holder's lease expires.
+
+    A backlog can take longer to drain than the lease lasts, so the holder
+    renews it between batches once a third of it has passed, and closes
+    the log and stops as soon as a renewal fails: another worker may have
+    taken over, and the log must never have two writers.
+    """
+
+    LEASE_NAME = "sales-event-log"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        log_dir: Path,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 15.0,
+        owner: Optional[str] = None,
+        batch_size: int = 500
+    ):
+        self.session_factory = session_factory
+        self.log_dir = Path(log_dir)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.log: Optional[SegmentedLog] = None
+        self.published_total = 0
+        self._renewed_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def leader(self) -> bool:
+        """Whether this worker currently writes the log"""
+        return self.log is not None
+
+    def tick(self) -> Dict[str, Any]:
+        """Publish every pending outbox row while this worker holds the lease"""
+        with self.session_factory() as db:
+            if not self._acquire(db):
+                return {"leader": False, "published": 0}
+            router = merchant_router(db)
+            merchant_ids = [merchant.merchant_id for merchant in MerchantRepository(db).get_all()]
+
+        if self.log is None:
+            self.log = SegmentedLog(self.log_dir)
+            print(f"📤 Writing the sales event log ({self.log_dir})")
+
+        publishers = [OutboxPublisher(self.session_factory, self.log, self.batch_size)]
+        for merchant_id in merchant_ids:
+            partition = router.partition(merchant_id)
+            publishers.append(OutboxPublisher(
+                partition.SessionLocal, self.log, self.batch_size, merchant_id=merchant_id
+            ))
+
+        published = 0
+        for publisher in publishers:
+            while True:
+                if not self._keep_lease():
+                    self.published_total += published
+                    return {"leader": False, "published": published}
+                count = publisher.publish_once()
+                published += count
+                if count < publisher.batch_size:
+                    break
+
+        self.published_total += published
+        return {"leader": True, "published": published}
+
+    def _acquire(self, db: Session) -> bool:
+        """Take or renew the lease (closing the log if another worker holds it)"""
+        if LeaseRepository(db).acquire(self.LEASE_NAME, self.owner, self.lease_seconds):
+            self._renewed_at = time.monotonic()
+            return True
+        self._close_log()
+        return False
+
+    def _keep_lease(self) -> bool:
+        """Renew the lease once a third of it has passed; False if it was lost"""
+        if time.monotonic() - self._renewed_at < self.lease_seconds / 3:
+            return True
+        with self.session_factory() as db:
+            return self._acquire(db)
+
+    def pending_count(self) -> int:
+        """Number of rows of the main outbox not yet published"""
+        with self.session_factory() as db:
+            return db.query(OutboxEvent).filter(
+                OutboxEvent.published_at.is_(None)
+            ).count()
+
+    def stats(self) -> Dict[str, Any]:
+        """Writer state for the processor stats"""
+        log = self.log
+        return {
+            "leader": log is not None,
+            "next_offset": log.next_offset if log is not None else None,
+            "published": self.published_total,
+            "pending": self.pending_count(),
+        }
+
+    def run(self):
+        """Publish until stopped"""
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in outbox publisher: {e}")
+            self._stop_event.wait(self.poll_interval)
+
+    def start(self):
+        """Start publishing in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="outbox-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the thread, close the log and hand the lease over"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close_log()
+        with self.session_factory() as db:
+            LeaseRepository(db).release(self.LEASE_NAME, self.owner)
+
+    def _close_log(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
@@ -8,10 +8,9 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
 
-from src.merchant_agent.server import app
+from src.common.launcher import serve
 
 if __name__ == "__main__":
-    import uvicorn
     from dotenv import load_dotenv
     
     # Load environment variables
@@ -19,9 +18,5 @@ if __name__ == "__main__":
     
     port = int(os.getenv("MERCHANT_AGENT_PORT", 8001))
     
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=port,
-        log_level="info"
-    )
+    # WORKERS, UVICORN_LOOP and UVICORN_HTTP select workers, loop and parser
+    serve("src.merchant_agent.server:app", port=port)
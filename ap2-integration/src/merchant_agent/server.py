@@ -4,7 +4,7 @@ Merchant Agent - AP2 Protocol Implementation
 This agent handles:
 - Cart creation and management
 - CartMandate generation and signing
-- Product catalog queries (via MCP)
+- Product catalog queries (local catalog search; product details via MCP)
 - Integration with payment processor
 """
 
@@ -36,6 +36,23 @@ from src.common import (
     get_mcp_client,
     AP2_EXTENSION_URI
 )
+from src.common.launcher import warm_up
+from src.common.merchant_keys import get_merchant_keyring
+from src.common.middleware import QueryStatsMiddleware, install_metrics, install_tracing
+from src.database import (
+    DEFAULT_MERCHANT_ID,
+    MerchantPartition,
+    MerchantRepository,
+    ReadSessionLocal,
+    SignedCartRepository,
+    UnknownMerchantError,
+    UnsupportedDatabaseError,
+    catalog_search,
+    catalog_snapshot,
+    engine,
+    merchant_router,
+    name_index,
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -43,15 +60,96 @@ app = FastAPI(
     description="AP2 Protocol Merchant Agent for Pokemon marketplace",
     version="1.0.0"
 )
-
-# In-memory cart storage
-# In production, use a real database
-carts: Dict[str, CartMandate] = {}
+app.add_middleware(QueryStatsMiddleware)
+install_metrics(app, "merchant_agent")
+install_tracing(app, "merchant_agent")
 
 # Configuration
 MERCHANT_NAME = "PokeMart - Primera Generación"
 PAYMENT_PROCESSOR_URL = "http://localhost:8003/a2a/processor"
 
+# Module state each uvicorn worker keeps for itself (see src/common/launcher.py).
+# Issued carts are stored in the database (signed_carts).
+WORKER_STATE = {}
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Check the merchant partitions, then load the catalog indexes and signing keys"""
+    merchant_router(engine).check_configuration()
+    warm_up(signing_keys=True)
+
+
+def get_partition(merchant_id: Optional[str]) -> MerchantPartition:
+    """Partition of the merchant named in a request (400/404 if invalid/unknown, 503 if partitions are not configured)"""
+    try:
+        return merchant_router(engine).partition(merchant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownMerchantError:
+        raise HTTPException(status_code=404, detail=f"Merchant {merchant_id} not found")
+    except UnsupportedDatabaseError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def build_partition_cart(partition: MerchantPartition, items: List[Dict[str, Any]]) -> CartMandate:
+    """
+    CartMandate of a hosted merchant, priced from its own catalog and
+    signed with its own key (the MCP server only knows the default merchant).
+    Labels carry the numero and quantity ("Pikachu #25 (x2)").
+    """
+    with partition.ReadSessionLocal() as db:
+        snapshot = catalog_snapshot(db)
+    with ReadSessionLocal() as db:
+        merchant = MerchantRepository(db).get(partition.merchant_id)
+    
+    display_items = []
+    total = 0.0
+    for item in items:
+        entry = snapshot.by_numero.get(int(item["product_id"]))
+        quantity = int(item.get("quantity", 1))
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Pokemon #{item['product_id']} not found in catalog")
+        if not entry.en_venta:
+            raise HTTPException(status_code=409, detail=f"Pokemon {entry.nombre} is not available for sale")
+        if quantity > entry.inventario_disponible:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Only {entry.inventario_disponible} {entry.nombre} available, requested {quantity}"
+            )
+        value = entry.precio * quantity
+        total += value
+        display_items.append(DisplayItem(
+            label=f"{entry.nombre.capitalize()} #{entry.numero} (x{quantity})",
+            amount=PaymentAmount(currency="USD", value=value)
+        ))
+    
+    cart_id = generate_cart_id()
+    return CartMandate(
+        contents=CartContents(
+            id=cart_id,
+            user_cart_confirmation_required=False,
+            merchant_name=merchant.name,
+            payment_request=PaymentRequest(
+                method_data=[PaymentMethodData(
+                    supported_methods="CARD",
+                    data={"payment_processor_url": PAYMENT_PROCESSOR_URL}
+                )],
+                details=PaymentDetails(
+                    id=generate_order_id(),
+                    displayItems=display_items,
+                    total=DisplayItem(label="Total", amount=PaymentAmount(currency="USD", value=total))
+                ),
+                options=PaymentOptions()
+            )
+        ),
+        merchant_signature=get_merchant_keyring().sign_cart(
+            partition.merchant_id, merchant.issuer, cart_id, merchant.name
+        ),
+        timestamp=get_current_timestamp(),
+        merchantName=merchant.name
+    )
+
 
 # ============================================
 # AgentCard Endpoint (A2A Discovery)
@@ -121,7 +219,8 @@ async def create_cart(request: Dict[str, Any]):
             "items": [
                 {"product_id": "25", "quantity": 1},
                 ...
-            ]
+            ],
+            "merchant_id": "kanto-shop"  // optional, default merchant
         }
     
     Returns:
@@ -133,44 +232,55 @@ async def create_cart(request: Dict[str, Any]):
         if not items:
             raise HTTPException(status_code=400, detail="No items provided")
         
-        # Use MCP to create the cart
-        async with get_mcp_client() as mcp:
-            cart_mandate_dict = await mcp.create_pokemon_cart(items)
-        
-        # Convert dict to CartMandate model for validation
-        cart_mandate = CartMandate(**cart_mandate_dict)
+        partition = get_partition(request.get("merchant_id"))
+        if partition.merchant_id == DEFAULT_MERCHANT_ID:
+            # Use MCP to create the cart
+            async with get_mcp_client() as mcp:
+                cart_mandate_dict = await mcp.create_pokemon_cart(items)
+            
+            # Convert dict to CartMandate model for validation
+            cart_mandate = CartMandate(**cart_mandate_dict)
+        else:
+            cart_mandate = build_partition_cart(partition, items)
         
-        # Store cart
+        # Store cart (in its merchant's partition, visible to every worker)
         cart_id = cart_mandate.contents.id
-        carts[cart_id] = cart_mandate
+        with partition.SessionLocal() as db:
+            SignedCartRepository(db).save(cart_id, cart_mandate.model_dump())
         
         print(f"✅ Created cart {cart_id} with {len(items)} items")
         
         # Return as dict (FastAPI will serialize to JSON)
         return cart_mandate.model_dump()
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error creating cart: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/a2a/merchant_agent/cart/{cart_id}")
-async def get_cart(cart_id: str):
+async def get_cart(cart_id: str, merchant_id: Optional[str] = None):
     """
     Retrieve a cart by ID.
     
     Returns:
         CartMandate if found, 404 if not
     """
-    if cart_id not in carts:
+    with get_partition(merchant_id).ReadSessionLocal() as db:
+        cart = SignedCartRepository(db).get(cart_id)
+    if cart is None:
         raise HTTPException(status_code=404, detail=f"Cart {cart_id} not found")
     
-    return carts[cart_id].model_dump()
+    return cart
 
 
 @app.get("/a2a/merchant_agent/carts")
-async def list_carts():
-    """List all carts (for debugging)"""
+async def list_carts(merchant_id: Optional[str] = None, limit: int = 100):
+    """List the most recent carts (for debugging)"""
+    with get_partition(merchant_id).ReadSessionLocal() as db:
+        carts = [CartMandate(**cart) for cart in SignedCartRepository(db).get_all(limit)]
     return {
         "carts": [
             {
@@ -179,7 +289,7 @@ async def list_carts():
                 "items": len(cart.contents.payment_request.details.displayItems),
                 "timestamp": cart.timestamp
             }
-            for cart in carts.values()
+            for cart in carts
         ]
     }
 
@@ -195,24 +305,49 @@ async def search_pokemon(request: Dict[str, Any]):
     
     Request body:
         {
-            "type": "fire",          // optional
-            "minPrice": 10,          // optional
-            "maxPrice": 100,         // optional
-            "onlyAvailable": true,   // optional
-            "limit": 10              // optional
+            "query": "pika",             // optional, name prefix/typos/number
+            "type": "fire",              // optional, "fire,flying" = both
+            "anyType": ["fire", "water"], // optional, at least one
+            "minPrice": 10,              // optional
+            "maxPrice": 100,             // optional
+            "onlyAvailable": true,       // optional
+            "minStats": {"attack": 80},  // optional, stat or "total"
+            "sortBy": "-attack",         // optional, "-" = descending
+            "limit": 10,                 // optional
+            "merchant_id": "kanto-shop"  // optional, default merchant
         }
     """
+    partition = get_partition(request.get("merchant_id"))
     try:
-        async with get_mcp_client() as mcp:
-            results = await mcp.search_pokemon(
-                type=request.get("type"),
-                min_price=request.get("minPrice"),
-                max_price=request.get("maxPrice"),
-                only_available=request.get("onlyAvailable", False),
-                limit=request.get("limit", 10)
-            )
+        type_filter = request.get("type")
+        with partition.ReadSessionLocal() as db:
+            search = catalog_search(db)
+            index = name_index(db)
+        
+        within = None
+        if request.get("query"):
+            matches = index.lookup(str(request["query"]), limit=len(search))
+            within = search.rows_for(numero for numero, _ in matches)
         
-        return create_success_response(results)
+        rows, total = search.search(
+            types=type_filter.split(",") if type_filter else (),
+            any_types=request.get("anyType") or (),
+            min_price=request.get("minPrice"),
+            max_price=request.get("maxPrice"),
+            only_available=request.get("onlyAvailable", False),
+            min_stats=request.get("minStats"),
+            sort_by=request.get("sortBy"),
+            limit=request.get("limit", 10),
+            within=within
+        )
+        results = search.records(rows)
+        
+        return create_success_response({
+            "total": total,
+            "showing": len(results),
+            "filters": request,
+            "results": results
+        })
         
     except Exception as e:
         return create_error_response(str(e))
@@ -235,6 +370,12 @@ async def get_product(product_id: str):
 # Health Check
 # ============================================
 
+def carts_count() -> int:
+    """Carts issued by the default merchant"""
+    with ReadSessionLocal() as db:
+        return SignedCartRepository(db).count()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -242,7 +383,7 @@ async def health_check():
         "status": "healthy",
         "service": "merchant_agent",
         "version": "1.0.0",
-        "carts_count": len(carts)
+        "carts_count": carts_count()
     }
 
 
@@ -7,10 +7,14 @@ Validates mandates and executes payment transactions.
 
 from fastapi import FastAPI, HTTPException, Depends
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from datetime import date
+import re
 import sys
 import os
 
+import jwt
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
 
 from src.common import (
@@ -22,29 +26,132 @@ from src.common import (
     validate_cart_mandate_structure,
     validate_payment_mandate_structure,
     validate_user_authorization,
+    validate_merchant_signature,
+    DEFAULT_MERCHANT_ISSUER,
     JWTValidationError,
+    TTLCache,
     AP2_EXTENSION_URI
 )
 from src.database import (
     init_db,
+    engine,
     get_db,
+    get_read_db,
+    SessionLocal,
+    DEFAULT_MERCHANT_ID,
+    InsufficientStockError,
+    MerchantPartition,
+    UnknownMerchantError,
+    UnsupportedDatabaseError,
+    merchant_router,
     TransactionRepository,
     PokemonRepository,
-    get_db_stats
+    SalesRollupRepository,
+    get_db_stats,
+    query_stats_registry
 )
+from src.common.launcher import warm_up
+from src.common.metrics import register_cache
+from src.common.middleware import QueryStatsMiddleware, install_metrics, install_tracing
+from src.events import LeasedOutboxPublisher, get_sales_log_dir
 
 app = FastAPI(title="Pokemon Payment Processor", version="1.0.0")
+app.add_middleware(QueryStatsMiddleware)
+install_metrics(app, "payment_processor")
+install_tracing(app, "payment_processor")
+
+# Background publisher: sales outboxes -> append-only sales event log.
+# Every worker runs one; only the lease holder writes the log.
+outbox_publisher: LeasedOutboxPublisher = None
+
+# Quantity suffix of a display item label ("Pikachu #25 (x2)")
+QUANTITY_LABEL = re.compile(r"\(x(\d+)\)")
+
+# Module state each uvicorn worker keeps for itself (see src/common/launcher.py)
+WORKER_STATE = {
+    "outbox_publisher": "one per worker; only the lease holder writes the sales log",
+    "receipt_cache": "read-through cache; the database is the source of truth",
+}
+
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and start the outbox publisher"""
+    global outbox_publisher
+    
     init_db()
+    merchant_router(engine).check_configuration()
     print("✅ Payment Processor initialized with database")
+    warm_up(catalog=False)
+    
+    outbox_publisher = LeasedOutboxPublisher(
+        SessionLocal,
+        get_sales_log_dir(),
+        poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", 1.0))
+    )
+    outbox_publisher.start()
+    print(f"📤 Outbox publisher started (log: {outbox_publisher.log_dir})")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the outbox publisher and close the event log"""
+    if outbox_publisher:
+        outbox_publisher.stop()
+
+
+def get_partition(merchant_id: Optional[str]) -> MerchantPartition:
+    """Partition of a merchant (400/404 if invalid/unknown, 503 if partitions are not configured)"""
+    try:
+        return merchant_router(engine).partition(merchant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownMerchantError:
+        raise HTTPException(status_code=404, detail=f"Merchant {merchant_id} not found")
+    except UnsupportedDatabaseError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def get_merchant_read_db(merchant_id: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """Read session of the merchant in the ``merchant_id`` query parameter"""
+    if merchant_id is None or merchant_id == DEFAULT_MERCHANT_ID:
+        yield db
+        return
+    merchant_db = get_partition(merchant_id).ReadSessionLocal()
+    try:
+        yield merchant_db
+    finally:
+        merchant_db.close()
 
 
-# Transaction history (keeping for backward compatibility, but using DB now)
-transactions: Dict[str, Dict[str, Any]] = {}
+def cart_merchant(cart_mandate: Dict[str, Any]) -> Optional[str]:
+    """
+    merchant_id of a cart signed by a hosted merchant, verified against its
+    registered key (403 if invalid); None for the default merchant.
+    """
+    signature = cart_mandate.get("merchant_signature") or ""
+    try:
+        issuer = jwt.decode(signature, options={"verify_signature": False}).get("iss")
+    except jwt.PyJWTError:
+        issuer = None
+    if issuer in (None, DEFAULT_MERCHANT_ISSUER):
+        return None
+    try:
+        payload = validate_merchant_signature(cart_mandate, verify=True)
+    except JWTValidationError as e:
+        raise HTTPException(status_code=403, detail=f"Invalid merchant signature: {e}")
+    return payload["merchant_id"]
+
+
+# Bounded receipt cache in front of TransactionRepository.get_by_id, keyed by
+# (merchant_id, transaction_id). The database is the source of truth; this
+# only keeps recent receipts hot.
+receipt_cache = TTLCache(
+    max_size=int(os.getenv("RECEIPT_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.getenv("RECEIPT_CACHE_TTL_SECONDS", 3600)),
+)
+register_cache("receipts", receipt_cache)
 
 
 @app.get("/.well-known/agent-card.json")
@@ -73,7 +180,7 @@ async def get_agent_card():
 
 
 @app.post("/a2a/processor/charge")
-async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db)):
+async def charge_payment(request: Dict[str, Any], request_db: Session = Depends(get_db)):
     """
     Process a payment using CartMandate and PaymentMandate.
     
@@ -84,9 +191,11 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
         {
             "cart_mandate": {...},
             "payment_mandate": {...},
-            "risk_data": {...}  # optional
+            "risk_data": {...},  # optional
+            "reservation_ref": "cart:42"  # optional, inventory holds to convert
         }
     """
+    db = request_db
     try:
         cart_mandate = request.get("cart_mandate")
         payment_mandate = request.get("payment_mandate")
@@ -101,6 +210,13 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
         validate_cart_mandate_structure(cart_mandate)
         validate_payment_mandate_structure(payment_mandate)
         
+        # Carts of hosted merchants are charged in their own partition
+        merchant_id = cart_merchant(cart_mandate)
+        if merchant_id is not None:
+            partition = get_partition(merchant_id)
+            db = partition.SessionLocal()
+            request_db.close()
+        
         # Validate user authorization JWT signature
         print("\n🔍 Validating user authorization...")
         try:
@@ -136,10 +252,10 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
                 numero_str = label.split("#")[-1].split()[0]
                 numero = int(numero_str)
                 
-                # Get quantity from somewhere (default 1 for now)
-                # In a real system, this would come from cart_mandate details
-                quantity = 1
-                unit_price = display_item["amount"]["value"]
+                # Quantity from the label when present (amount is the line total)
+                match = QUANTITY_LABEL.search(label)
+                quantity = int(match.group(1)) if match else 1
+                unit_price = display_item["amount"]["value"] / quantity
                 
                 items.append({
                     "pokemon_numero": numero,
@@ -158,13 +274,17 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
                 cart_mandate=cart_mandate,
                 payment_mandate=payment_mandate,
                 items=items,
-                status="completed"
+                status="completed",
+                reservation_ref=request.get("reservation_ref")
             )
             
             print(f"✅ Transaction saved to database: {txn_id}")
             print(f"   Amount: ${db_transaction.total_amount}")
             print(f"   Items: {len(db_transaction.items)}")
             
+        except InsufficientStockError as e:
+            print(f"❌ {e}")
+            raise HTTPException(status_code=409, detail=str(e))
         except Exception as db_error:
             print(f"❌ Database error: {db_error}")
             # Rollback and raise
@@ -174,7 +294,6 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
                 detail=f"Database error: {db_error}"
             )
         
-        # Keep in memory for backward compatibility
         transaction = {
             "transaction_id": txn_id,
             "cart_id": cart_id,
@@ -182,10 +301,12 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
             "currency": total["currency"],
             "status": "completed",
             "payment_method": payment_mandate["payment_mandate_contents"]["payment_response"]["method_name"],
-            "payment_id": db_transaction.id
+            "payment_id": db_transaction.id,
+            "merchant_id": merchant_id or DEFAULT_MERCHANT_ID
         }
         
-        transactions[txn_id] = transaction
+        # Warm the receipt cache (items are already loaded at this point)
+        receipt_cache.set((merchant_id or DEFAULT_MERCHANT_ID, txn_id), db_transaction.to_dict())
         
         print(f"✅ Payment processed: {txn_id} for ${total['value']}")
         
@@ -206,21 +327,34 @@ async def charge_payment(request: Dict[str, Any], db: Session = Depends(get_db))
         import traceback
         traceback.print_exc()
         return create_error_response(str(e), {"status": "failed"})
+    finally:
+        if db is not request_db:
+            db.close()
 
 
 @app.get("/a2a/processor/transaction/{txn_id}")
-async def get_transaction(txn_id: str, db: Session = Depends(get_db)):
-    """Get transaction details from database"""
+async def get_transaction(
+    txn_id: str,
+    merchant_id: Optional[str] = None,
+    db: Session = Depends(get_merchant_read_db)
+):
+    """Get transaction details (receipt cache first, then the merchant's database)"""
+    # Receipts are cached per merchant: a route only serves its own partition's
+    key = (merchant_id or DEFAULT_MERCHANT_ID, txn_id)
+    receipt = receipt_cache.get(key)
+    if receipt is not None:
+        return create_success_response(receipt)
+    
     transaction_repo = TransactionRepository(db)
     db_transaction = transaction_repo.get_by_id(txn_id)
     
     if not db_transaction:
-        # Try in-memory transactions (backward compatibility)
-        if txn_id in transactions:
-            return create_success_response(transactions[txn_id])
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    return create_success_response(db_transaction.to_dict())
+    receipt = db_transaction.to_dict()
+    receipt_cache.set(key, receipt)
+    
+    return create_success_response(receipt)
 
 
 @app.get("/a2a/processor/transactions")
@@ -228,7 +362,7 @@ async def list_transactions(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_merchant_read_db)
 ):
     """List all transactions from database"""
     transaction_repo = TransactionRepository(db)
@@ -241,7 +375,7 @@ async def list_transactions(
 
 
 @app.get("/a2a/processor/stats")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: Session = Depends(get_merchant_read_db)):
     """Get transaction and inventory statistics"""
     transaction_repo = TransactionRepository(db)
     pokemon_repo = PokemonRepository(db)
@@ -254,11 +388,64 @@ async def get_stats(db: Session = Depends(get_db)):
         "database": db_stats,
         "transactions": transaction_stats,
         "inventory": inventory_stats,
+        "receipt_cache": receipt_cache.stats(),
+        "queries": query_stats_registry.snapshot(),
+        "event_log": outbox_publisher.stats() if outbox_publisher else None,
+    })
+
+
+@app.get("/a2a/processor/reports/revenue")
+async def revenue_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    currency: Optional[str] = None,
+    db: Session = Depends(get_merchant_read_db)
+):
+    """Daily revenue per currency (from rollup tables)"""
+    rollup_repo = SalesRollupRepository(db)
+    days = rollup_repo.revenue_by_day(start=start, end=end, currency=currency)
+    
+    return create_success_response({
+        "days": [d.to_dict() for d in days],
+        "total_revenue": sum(d.revenue for d in days),
+        "total_transactions": sum(d.transaction_count for d in days),
+    })
+
+
+@app.get("/a2a/processor/reports/pokemon")
+async def pokemon_sales_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = 20,
+    db: Session = Depends(get_merchant_read_db)
+):
+    """Units sold and revenue per Pokemon (from rollup tables)"""
+    rollup_repo = SalesRollupRepository(db)
+    
+    return create_success_response({
+        "pokemon": rollup_repo.units_by_pokemon(start=start, end=end, limit=limit),
+    })
+
+
+@app.get("/a2a/processor/reports/pokemon/{numero}")
+async def pokemon_daily_report(
+    numero: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_merchant_read_db)
+):
+    """Daily sales series for one Pokemon (from rollup tables)"""
+    rollup_repo = SalesRollupRepository(db)
+    days = rollup_repo.daily_units(numero, start=start, end=end)
+    
+    return create_success_response({
+        "pokemon_numero": numero,
+        "days": [d.to_dict() for d in days],
     })
 
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: Session = Depends(get_read_db)):
     """Health check with database connection test"""
     try:
         # Test database connection
@@ -269,7 +456,8 @@ async def health_check(db: Session = Depends(get_db)):
             "status": "healthy",
             "service": "payment_processor",
             "database": "connected",
-            "transactions_count_memory": len(transactions),
+            "receipt_cache": receipt_cache.stats(),
+            "queries": query_stats_registry.snapshot(),
         }
     except Exception as e:
         return {
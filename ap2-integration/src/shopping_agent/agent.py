@@ -35,15 +35,53 @@ from src.common import (
     validate_merchant_signature,
     JWTValidationError,
 )
+from src.common.tracing import TracingTransport, enabled as tracing_enabled
+
+# How calls reach the other agents: "http" (separate servers, default) or
+# "asgi" (their apps in this process through httpx.ASGITransport, as in
+# python -m src.all_agents)
+AGENT_TRANSPORT = os.getenv("AGENT_TRANSPORT", "http")
+AGENT_TRANSPORTS = ("http", "asgi")
+
+
+def in_process_apps(agent: "ShoppingAgent") -> Dict[str, Any]:
+    """The agent apps of this process, by the base URL the agent calls"""
+    from src.merchant_agent.server import app as merchant_app
+    from src.credentials_provider.server import app as credentials_app
+    from src.payment_processor.server import app as processor_app
+    
+    return {
+        agent.merchant_url: merchant_app,
+        agent.credentials_provider_url: credentials_app,
+        agent.payment_processor_url: processor_app,
+    }
 
 
 class ShoppingAgent:
     """Shopping Agent that orchestrates Pokemon purchases using AP2"""
     
-    def __init__(self):
+    def __init__(self, transport: str = AGENT_TRANSPORT):
+        if transport not in AGENT_TRANSPORTS:
+            raise ValueError(f"Unknown AGENT_TRANSPORT: {transport} (use one of {', '.join(AGENT_TRANSPORTS)})")
         self.merchant_url = "http://localhost:8001"
         self.credentials_provider_url = "http://localhost:8002"
         self.payment_processor_url = "http://localhost:8003"
+        self.transport = transport
+        self.apps: Dict[str, Any] = in_process_apps(self) if transport == "asgi" else {}
+    
+    def _client(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Client for one agent: in-process ASGI calls if its app is here, else
+        HTTP. With tracing on, calls carry the current trace (traceparent)
+        and are recorded as client spans.
+        """
+        app = self.apps.get(base_url)
+        options = {} if app is None else {"transport": httpx.ASGITransport(app=app), "base_url": base_url}
+        if tracing_enabled():
+            options["transport"] = TracingTransport(
+                options.get("transport") or httpx.AsyncHTTPTransport(), "shopping_agent"
+            )
+        return httpx.AsyncClient(**options)
     
     def get_mcp_client(self):
         """Get MCP client context manager"""
@@ -63,7 +101,7 @@ class ShoppingAgent:
         """Create CartMandate via merchant agent"""
         print(f"\n🛒 Creating cart with {len(items)} items...")
         
-        async with httpx.AsyncClient() as client:
+        async with self._client(self.merchant_url) as client:
             response = await client.post(
                 f"{self.merchant_url}/a2a/merchant_agent/create_cart",
                 json={"items": items}
@@ -99,7 +137,7 @@ class ShoppingAgent:
         """Get available payment methods from credentials provider"""
         print("\n💳 Fetching payment methods...")
         
-        async with httpx.AsyncClient() as client:
+        async with self._client(self.credentials_provider_url) as client:
             response = await client.get(
                 f"{self.credentials_provider_url}/a2a/credentials_provider/payment_methods"
             )
@@ -116,7 +154,7 @@ class ShoppingAgent:
         
     async def tokenize_payment_method(self, payment_method_id: str) -> str:
         """Get payment token from credentials provider"""
-        async with httpx.AsyncClient() as client:
+        async with self._client(self.credentials_provider_url) as client:
             response = await client.post(
                 f"{self.credentials_provider_url}/a2a/credentials_provider/tokenize",
                 json={"payment_method_id": payment_method_id}
@@ -181,19 +219,24 @@ class ShoppingAgent:
     async def process_payment(
         self,
         cart_mandate: Dict[str, Any],
-        payment_mandate: Dict[str, Any]
+        payment_mandate: Dict[str, Any],
+        reservation_ref: Optional[str] = None
     ) -> Dict[str, Any]:
         """Send mandates to payment processor"""
         print("\n💰 Processing payment...")
         
-        async with httpx.AsyncClient() as client:
+        payload = {
+            "cart_mandate": cart_mandate,
+            "payment_mandate": payment_mandate,
+            "risk_data": mock_risk_data()
+        }
+        if reservation_ref:
+            payload["reservation_ref"] = reservation_ref
+        
+        async with self._client(self.payment_processor_url) as client:
             response = await client.post(
                 f"{self.payment_processor_url}/a2a/processor/charge",
-                json={
-                    "cart_mandate": cart_mandate,
-                    "payment_mandate": payment_mandate,
-                    "risk_data": mock_risk_data()
-                }
+                json=payload
             )
             response.raise_for_status()
             result = response.json()
@@ -5,6 +5,8 @@ Shopping Agent Web UI - Interactive interface for Pokemon purchases with AP2
 import asyncio
 import sys
 import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
@@ -15,15 +17,53 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-import uvicorn
 
 from src.shopping_agent.agent import ShoppingAgent
-from src.database import SessionLocal, PokemonRepository, CartRepository, Pokemon
+from src.database import (
+    SessionLocal,
+    ReadSessionLocal,
+    PokemonRepository,
+    CartRepository,
+    ReservationRepository,
+    InsufficientStockError,
+    CartSweeper,
+    UnitOfWork,
+    Pokemon,
+    catalog_search,
+    name_index,
+)
 from src.common.session import get_or_create_session_id, get_session_id
+from src.common.launcher import serve, warm_up
+from src.common.middleware import QueryStatsMiddleware, install_metrics, install_tracing
+from src.common.tracing import span
 
 app = FastAPI(title="Pokemon Shopping Agent", version="1.0.0")
+app.add_middleware(QueryStatsMiddleware)
+install_metrics(app, "shopping_agent")
+install_tracing(app, "shopping_agent")
 agent = ShoppingAgent()
 
+# Same image PokeAPI returns as sprites.front_default
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{numero}.png"
+
+# Inventory holds taken at checkout (released by the sweeper on expiry)
+RESERVATION_TTL_SECONDS = int(os.getenv("RESERVATION_TTL_SECONDS", 600))
+RESERVATION_SWEEP_INTERVAL_SECONDS = float(os.getenv("RESERVATION_SWEEP_INTERVAL_SECONDS", 30))
+
+# Cart expiry sweeper (started in every process, runs in the lease holder only)
+cart_sweeper = CartSweeper(
+    SessionLocal,
+    batch_size=int(os.getenv("CART_SWEEP_BATCH_SIZE", 500)),
+    retention_days=int(os.getenv("CART_RETENTION_DAYS", 7)),
+    interval_seconds=float(os.getenv("CART_SWEEP_INTERVAL_SECONDS", 60)),
+)
+
+# Module state each uvicorn worker keeps for itself (see src/common/launcher.py)
+WORKER_STATE = {
+    "agent": "client configuration only (agent URLs and transport)",
+    "cart_sweeper": "one per worker; only the lease holder sweeps",
+}
+
 
 # Dependency to get database session
 def get_db():
@@ -34,6 +74,21 @@ def get_db():
         db.close()
 
 
+# Dependency for read-only endpoints (catalog pages, search)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency to get a unit of work (one commit per request)
+def get_uow():
+    with UnitOfWork() as uow:
+        yield uow
+
+
 class SearchRequest(BaseModel):
     query: Optional[str] = None
     type: Optional[str] = None
@@ -1073,12 +1128,10 @@ async def root():
 
 
 @app.get("/api/types")
-async def get_types():
-    """Get all Pokemon types"""
+async def get_types(db: Session = Depends(get_read_db)):
+    """Get all Pokemon types in the catalog (from pokemon_types, no PokeAPI call)"""
     try:
-        async with agent.get_mcp_client() as mcp:
-            result = await mcp.list_pokemon_types()
-        return result
+        return [row["type"] for row in PokemonRepository(db).get_types()]
     except Exception as e:
         import traceback
         print(f"Error in get_types: {e}")
@@ -1093,79 +1146,54 @@ async def search_pokemon(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     only_available: bool = True,
-    limit: int = 20
+    sort: Optional[str] = None,
+    limit: int = 20,
+    db: Session = Depends(get_read_db)
 ):
-    """Search Pokemon"""
+    """
+    Search Pokemon.
+    
+    ``query`` matches names by prefix or with typos ("pika", "charzard",
+    "mr mime") or a number ("25"); results keep relevance order unless
+    ``sort`` is given. ``type`` accepts several comma-separated types
+    (all must match); ``sort`` is one of SORT_KEYS, prefixed with "-"
+    for descending.
+    """
     try:
-        # If query is provided, search for exact Pokemon first
+        # Filters run on the local columnar engine (no MCP); a name query
+        # narrows the candidates to name index matches, best first
+        search = catalog_search(db)
+        within = None
         if query:
-            async with agent.get_mcp_client() as mcp:
-                try:
-                    # Try to get exact Pokemon by name or number
-                    pokemon_info = await mcp.get_pokemon_info(query)
-                    price_info = await mcp.get_pokemon_price(query)
-                    
-                    # Return single Pokemon if found
-                    formatted = [{
-                        'number': price_info.get('numero'),
-                        'name': pokemon_info.get('name'),
-                        'price': price_info.get('precio'),
-                        'stock': price_info.get('inventario', {}).get('disponibles', 0),
-                        'types': pokemon_info.get('types', []),
-                        'sprite': pokemon_info.get('sprites', {}).get('front_default', '')
-                    }]
-                    return formatted
-                except:
-                    # If exact match fails, fall through to general search
-                    pass
-        
-        # General search with filters
-        filters = {}
-        if type:
-            filters['type'] = type
-        if min_price is not None:
-            filters['min_price'] = min_price
-        if max_price is not None:
-            filters['max_price'] = max_price
-        filters['only_available'] = only_available
-        filters['limit'] = limit
-        
-        async with agent.get_mcp_client() as mcp:
-            response = await mcp.search_pokemon(**filters)
-        
-        # Extract results from the response structure
-        if isinstance(response, dict) and 'results' in response:
-            results = response['results']
-        else:
-            results = response if isinstance(response, list) else []
-        
-        # Format results and fetch sprites
-        formatted = []
-        async with agent.get_mcp_client() as mcp:
-            for p in results:
-                pokemon_id = p.get('numero') or p.get('id')
-                pokemon_name = p.get('nombre') or p.get('name')
-                
-                # Get sprite from PokeAPI
-                sprite = ''
-                if pokemon_id:
-                    try:
-                        pokemon_info = await mcp.get_pokemon_info(str(pokemon_id))
-                        sprite = pokemon_info.get('sprites', {}).get('front_default', '')
-                    except:
-                        # If PokeAPI fails, use placeholder
-                        sprite = f'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png'
-                
-                formatted.append({
-                    'number': pokemon_id,
-                    'name': pokemon_name,
-                    'price': p.get('precio') or p.get('price', 0),
-                    'stock': p.get('inventario', {}).get('disponibles', 0) if 'inventario' in p else p.get('stock', 0),
-                    'types': p.get('types', []),
-                    'sprite': sprite
-                })
+            matches = name_index(db).lookup(query, limit=len(search))
+            within = search.rows_for(numero for numero, _ in matches)
         
-        return formatted
+        try:
+            rows, _ = search.search(
+                types=type.split(",") if type else (),
+                min_price=min_price,
+                max_price=max_price,
+                only_available=only_available,
+                sort_by=sort,
+                limit=limit,
+                within=within
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return [
+            {
+                'number': p['numero'],
+                'name': p['nombre'],
+                'price': p['precio'],
+                'stock': p['inventario']['disponibles'],
+                'types': p['types'],
+                'sprite': SPRITE_URL.format(numero=p['numero'])
+            }
+            for p in search.records(rows)
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Error in search_pokemon: {e}")
@@ -1178,22 +1206,18 @@ async def add_to_cart(
     request_data: PurchaseRequest,
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    uow: UnitOfWork = Depends(get_uow)
 ):
     """Add Pokemon to cart (with database persistence)"""
     try:
         # Get or create session
         session_id = get_or_create_session_id(request, response)
         
-        # Get repositories
-        cart_repo = CartRepository(db)
-        pokemon_repo = PokemonRepository(db)
-        
         # Get or create cart for this session
-        cart = cart_repo.get_or_create_cart(session_id)
+        cart = uow.carts.get_or_create_cart(session_id)
         
         # Get Pokemon from database
-        pokemon = pokemon_repo.get_by_numero(int(request_data.pokemon_id))
+        pokemon = uow.pokemon.get_by_numero(int(request_data.pokemon_id))
         if not pokemon:
             raise HTTPException(status_code=404, detail=f"Pokemon {request_data.pokemon_id} not found")
         
@@ -1204,7 +1228,11 @@ async def add_to_cart(
             raise HTTPException(status_code=400, detail=f"Insufficient stock for {pokemon.nombre}")
         
         # Add to cart
-        cart_item = cart_repo.add_item(cart, pokemon, request_data.quantity)
+        uow.carts.add_item(cart, pokemon, request_data.quantity)
+        cart_dict = cart.to_dict()
+        
+        # Commit before calling MCP so the write lock is not held meanwhile
+        uow.commit()
         
         # Get Pokemon info for response (with sprite)
         async with agent.get_mcp_client() as mcp:
@@ -1213,8 +1241,8 @@ async def add_to_cart(
         return {
             "status": "success",
             "message": f"Added {pokemon.nombre.capitalize()} to cart",
-            "cart_items": len(cart.items),
-            "cart": cart.to_dict(),
+            "cart_items": cart_dict["total_items"],
+            "cart": cart_dict,
             "sprite": pokemon_info.get('sprites', {}).get('front_default', '')
         }
     except HTTPException:
@@ -1230,15 +1258,17 @@ async def add_to_cart(
 async def get_cart(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    uow: UnitOfWork = Depends(get_uow)
 ):
     """Get current shopping cart from database"""
     try:
         session_id = get_or_create_session_id(request, response)
-        cart_repo = CartRepository(db)
         
-        cart = cart_repo.get_or_create_cart(session_id)
-        cart_dict = cart.to_dict()
+        # One query for the usual case; create (or recycle) the cart otherwise
+        cart_dict = uow.carts.get_cart_summary(session_id)
+        if cart_dict is None:
+            cart_dict = uow.carts.get_or_create_cart(session_id).to_dict()
+            uow.commit()
         
         # Get sprite URLs for items
         items_with_sprites = []
@@ -1257,7 +1287,7 @@ async def get_cart(
             "items": items_with_sprites,
             "total": cart_dict['total_amount'],
             "item_count": cart_dict['total_items'],
-            "session_id": cart.session_id,
+            "session_id": cart_dict['session_id'],
             "expires_at": cart_dict['expires_at']
         }
     except Exception as e:
@@ -1270,7 +1300,7 @@ async def get_cart(
 @app.delete("/api/cart/clear")
 async def clear_cart(
     request: Request,
-    db: Session = Depends(get_db)
+    uow: UnitOfWork = Depends(get_uow)
 ):
     """Clear shopping cart"""
     try:
@@ -1278,11 +1308,11 @@ async def clear_cart(
         if not session_id:
             return {"status": "success", "message": "No cart to clear"}
         
-        cart_repo = CartRepository(db)
-        cart = cart_repo.get_cart_by_session(session_id)
+        cart = uow.carts.get_cart_by_session(session_id)
         
         if cart:
-            cart_repo.clear_cart(cart.id)
+            uow.carts.clear_cart(cart.id)
+            uow.commit()
         
         return {"status": "success", "message": "Cart cleared"}
     except Exception as e:
@@ -1296,7 +1326,7 @@ async def clear_cart(
 async def remove_from_cart(
     product_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    uow: UnitOfWork = Depends(get_uow)
 ):
     """Remove item from cart"""
     try:
@@ -1304,8 +1334,7 @@ async def remove_from_cart(
         if not session_id:
             raise HTTPException(status_code=400, detail="No active cart session")
         
-        cart_repo = CartRepository(db)
-        cart = cart_repo.get_cart_by_session(session_id)
+        cart = uow.carts.get_cart_by_session(session_id)
         
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found")
@@ -1314,18 +1343,19 @@ async def remove_from_cart(
         item_found = False
         for item in cart.items:
             if str(item.pokemon_numero) == product_id:
-                cart_repo.remove_item(item.id)
+                uow.carts.remove_item(item.id)
                 item_found = True
                 break
         
         if not item_found:
             raise HTTPException(status_code=404, detail=f"Item {product_id} not in cart")
         
-        # Get updated cart
-        updated_cart = cart_repo.get_cart_by_session(session_id)
+        # remove_item already patched the loaded cart's items and totals
+        cart_dict = cart.to_dict()
+        uow.commit()
         return {
             "status": "success",
-            "cart": updated_cart.to_dict() if updated_cart else {"items": [], "total_amount": 0}
+            "cart": cart_dict
         }
     except HTTPException:
         raise
@@ -1339,9 +1369,14 @@ async def remove_from_cart(
 @app.post("/api/cart/checkout")
 async def checkout_cart(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Checkout current cart using AP2 protocol"""
+    """
+    Checkout current cart using AP2 protocol.
+    
+    The Server-Timing header has the duration of each AP2 step (ms).
+    """
     try:
         session_id = get_session_id(request)
         if not session_id:
@@ -1353,38 +1388,32 @@ async def checkout_cart(
         if not cart or len(cart.items) == 0:
             raise HTTPException(status_code=400, detail="Cart is empty")
         
-        # Mark cart as checkout
-        cart_repo.mark_cart_as_checkout(cart.id)
-        
-        # Convert cart to items format for AP2
-        items = [
-            {"product_id": str(item.pokemon_numero), "quantity": item.quantity}
-            for item in cart.items
-        ]
-        
-        # Create cart mandate
-        cart_mandate = await agent.create_cart(items)
-        
-        # Get payment methods
-        payment_methods = await agent.get_payment_methods()
-        default_method = next(
-            (m for m in payment_methods if m["is_default"]),
-            payment_methods[0]
-        )
-        
-        # Tokenize payment method
-        payment_token = await agent.tokenize_payment_method(default_method["id"])
-        
-        # Create payment mandate
-        payment_mandate = agent.create_payment_mandate(
-            cart_mandate=cart_mandate,
-            payment_token=payment_token,
-            payment_method_name=default_method["type"],
-            user_email="trainer@pokemon.com"
-        )
+        # Reserve stock before any signing, so doomed checkouts fail fast
+        timings = AP2StepTimer()
+        reservation_repo = ReservationRepository(db)
+        reservation_ref = f"cart:{cart.id}"
+        try:
+            with timings.step("reserve"):
+                reservation_repo.reserve(
+                    reservation_ref,
+                    [
+                        {"pokemon_numero": item.pokemon_numero, "quantity": item.quantity}
+                        for item in cart.items
+                    ],
+                    ttl_seconds=RESERVATION_TTL_SECONDS
+                )
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         
-        # Process payment
-        receipt = await agent.process_payment(cart_mandate, payment_mandate)
+        try:
+            receipt, cart_mandate, payment_mandate = await _checkout_reserved_cart(
+                cart, cart_repo, reservation_ref, timings
+            )
+        except Exception:
+            # Holds already converted by the processor are gone, so this
+            # only gives back stock for checkouts that did not charge
+            reservation_repo.release(reservation_ref)
+            raise
         
         # Get cart info before clearing
         cart_dict = cart.to_dict()
@@ -1394,6 +1423,7 @@ async def checkout_cart(
         # Mark cart as completed after successful purchase
         cart_repo.mark_cart_as_completed(cart.id)
         
+        response.headers["Server-Timing"] = timings.header()
         return {
             "status": receipt.get("status", "completed"),
             "payment_id": receipt.get("payment_id"),
@@ -1410,10 +1440,75 @@ async def checkout_cart(
         print(f"Error in checkout_cart: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
-        import traceback
-        print(f"Error in checkout_cart: {e}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _checkout_reserved_cart(
+    cart,
+    cart_repo: CartRepository,
+    reservation_ref: str,
+    timings: "AP2StepTimer"
+):
+    """Run the AP2 flow for a cart whose stock is already reserved"""
+    # Mark cart as checkout
+    cart_repo.mark_cart_as_checkout(cart.id)
+    
+    # Convert cart to items format for AP2
+    items = [
+        {"product_id": str(item.pokemon_numero), "quantity": item.quantity}
+        for item in cart.items
+    ]
+    
+    # Create cart mandate
+    with timings.step("cart_mandate"):
+        cart_mandate = await agent.create_cart(items)
+    
+    # Get payment methods
+    with timings.step("payment_methods"):
+        payment_methods = await agent.get_payment_methods()
+    default_method = next(
+        (m for m in payment_methods if m["is_default"]),
+        payment_methods[0]
+    )
+    
+    # Tokenize payment method
+    with timings.step("tokenize"):
+        payment_token = await agent.tokenize_payment_method(default_method["id"])
+    
+    # Create payment mandate
+    with timings.step("payment_mandate"):
+        payment_mandate = agent.create_payment_mandate(
+            cart_mandate=cart_mandate,
+            payment_token=payment_token,
+            payment_method_name=default_method["type"],
+            user_email="trainer@pokemon.com"
+        )
+    
+    # Process payment (the processor converts the holds into the sale)
+    with timings.step("charge"):
+        receipt = await agent.process_payment(
+            cart_mandate, payment_mandate, reservation_ref=reservation_ref
+        )
+    return receipt, cart_mandate, payment_mandate
+
+
+class AP2StepTimer:
+    """Durations of the checkout steps, for the Server-Timing header (and a span each)"""
+    
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+    
+    @contextmanager
+    def step(self, name: str):
+        began = time.perf_counter()
+        try:
+            with span(f"ap2 {name}", step=name):
+                yield
+        finally:
+            self.durations[name] = (time.perf_counter() - began) * 1000
+    
+    def header(self) -> str:
+        """Server-Timing value, e.g. cart_mandate;dur=12.3, charge;dur=40.1"""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.durations.items())
 
 
 @app.post("/api/purchase")
@@ -1451,32 +1546,46 @@ async def health():
     return {"status": "ok", "message": "Pokemon Shopping Agent is running"}
 
 
-# Background task for cart expiration
+# Background tasks for cart and reservation expiry
 import threading
-import time
 
-def cart_cleanup_worker():
-    """Background worker to expire old carts"""
+def reservation_sweeper_worker():
+    """Background worker to release expired inventory holds"""
     while True:
         try:
-            time.sleep(3600)  # Run every hour
+            time.sleep(RESERVATION_SWEEP_INTERVAL_SECONDS)
             db = SessionLocal()
             try:
-                cart_repo = CartRepository(db)
-                expired_count = cart_repo.expire_old_carts(hours=24)
-                if expired_count > 0:
-                    print(f"🗑️  Expired {expired_count} old carts")
+                released = ReservationRepository(db).release_expired()
+                if released > 0:
+                    print(f"📦 Released {released} expired inventory holds")
             finally:
                 db.close()
         except Exception as e:
-            print(f"Error in cart cleanup: {e}")
+            print(f"Error in reservation sweep: {e}")
 
 
 def start_cleanup_worker():
-    """Start background cleanup worker"""
-    worker_thread = threading.Thread(target=cart_cleanup_worker, daemon=True)
-    worker_thread.start()
-    print("🧹 Cart cleanup worker started (runs every hour)")
+    """Start background cleanup workers"""
+    cart_sweeper.start()
+    print(f"🧹 Cart sweeper started (runs every {cart_sweeper.interval_seconds:g}s)")
+    
+    sweeper_thread = threading.Thread(target=reservation_sweeper_worker, daemon=True)
+    sweeper_thread.start()
+    print(f"📦 Reservation sweeper started (runs every {RESERVATION_SWEEP_INTERVAL_SECONDS:g}s)")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Warm up and start the cleanup workers (in every uvicorn worker)"""
+    warm_up()
+    start_cleanup_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Hand the cart sweeper lease over"""
+    cart_sweeper.stop()
 
 
 def main():
@@ -1491,15 +1600,8 @@ def main():
     print("Presiona Ctrl+C para detener el servidor")
     print("=" * 60)
     
-    # Start background cleanup worker
-    start_cleanup_worker()
-    
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
-        log_level="info"
-    )
+    # Migrations run once in prepare(); the cleanup workers start with each worker
+    serve("src.shopping_agent.web_ui:app", port=8000)
 
 
 if __name__ == "__main__":
@@ -3,12 +3,14 @@
 import { Server } from "@modelcontextprotocol/sdk/server/index.js";
 import { StdioServerTransport } from "@modelcontextprotocol/sdk/server/stdio.js";
 import {
+  CallToolRequest,
   CallToolRequestSchema,
+  CallToolResult,
   ListToolsRequestSchema,
   Tool,
 } from "@modelcontextprotocol/sdk/types.js";
 import { z } from "zod";
-import { readFile, writeFile, mkdir } from "fs/promises";
+import { readFile, writeFile, mkdir, appendFile } from "fs/promises";
 import { existsSync } from "fs";
 import { fileURLToPath } from "url";
 import { dirname, join } from "path";
@@ -189,9 +191,49 @@ async function loadPokemonPrices(): Promise<PokemonPrice[]> {
   }
 }
 
+// PokeAPI base URL (POKEAPI_BASE_URL points it at a local stand-in, e.g.
+// ap2-integration/benchmarks/fake_pokeapi.py for offline load tests)
+const POKEAPI_BASE_URL = (process.env.POKEAPI_BASE_URL || "https://pokeapi.co/api/v2").replace(/\/$/, "");
+
+// Trazas (W3C trace context): el cliente MCP de Python envía `traceparent` en
+// el _meta de cada llamada. Con TRACE_FILE, cada tool call se escribe como span
+// en el mismo JSONL que usan los agentes (ap2-integration/src/common/tracing.py)
+const TRACE_FILE = process.env.TRACE_FILE;
+const TRACEPARENT = /^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/;
+
+async function traceToolCall<T>(name: string, traceparent: unknown, call: () => Promise<T>): Promise<T> {
+  const match = typeof traceparent === "string" ? TRACEPARENT.exec(traceparent.trim().toLowerCase()) : null;
+  if (!TRACE_FILE || !match || !(parseInt(match[3], 16) & 1)) {
+    return call();
+  }
+  const start = Date.now();
+  const began = performance.now();
+  let status = "error";
+  try {
+    const result = await call();
+    status = (result as { isError?: boolean }).isError ? "error" : "ok";
+    return result;
+  } finally {
+    const span = {
+      trace_id: match[1],
+      span_id: crypto.randomBytes(8).toString("hex"),
+      parent_id: match[2],
+      name: `tool ${name}`,
+      service: "mcp_server",
+      start: start / 1000,
+      duration_ms: Math.round((performance.now() - began) * 1000) / 1000,
+      status,
+      attributes: { tool: name, kind: "server" },
+    };
+    await appendFile(TRACE_FILE, JSON.stringify(span) + "\n").catch((error) =>
+      console.error("Error writing trace span:", error)
+    );
+  }
+}
+
 // Función para hacer peticiones a PokeAPI
 async function fetchPokeAPI(endpoint: string): Promise<any> {
-  const response = await fetch(`https://pokeapi.co/api/v2/${endpoint}`);
+  const response = await fetch(`${POKEAPI_BASE_URL}/${endpoint}`);
   if (!response.ok) {
     throw new Error(`PokeAPI error: ${response.statusText}`);
   }
@@ -527,8 +569,12 @@ server.setRequestHandler(ListToolsRequestSchema, async () => {
   };
 });
 
-// Handler para ejecutar las tools
-server.setRequestHandler(CallToolRequestSchema, async (request) => {
+// Handler para ejecutar las tools (con TRACE_FILE, cada llamada es un span)
+server.setRequestHandler(CallToolRequestSchema, async (request) =>
+  traceToolCall(request.params.name, request.params._meta?.traceparent, () => callTool(request))
+);
+
+async function callTool(request: CallToolRequest): Promise<CallToolResult> {
   const { name, arguments: args } = request.params;
 
   try {
@@ -837,7 +883,7 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
       isError: true,
     };
   }
-});
+}
 
 // Iniciar el servidor
 async function main() {
@@ -62,6 +62,14 @@ cd ..
 echo -e "${GREEN}✓ AP2 Integration instalado${NC}"
 echo ""
 
+# La base de datos no está en el repositorio: crearla con el catálogo de pokemon-gen1.json
+if [ ! -f "pokemon_marketplace.db" ]; then
+    echo -e "${YELLOW}🗄️  Creando pokemon_marketplace.db con el catálogo...${NC}"
+    (cd ap2-integration && python3 scripts/migrate_json_to_db.py)
+    echo -e "${GREEN}✓ Base de datos creada${NC}"
+    echo ""
+fi
+
 # Configurar .env si no existen
 echo -e "${YELLOW}🔑 Configurando archivos .env...${NC}"
 
@@ -0,0 +1,76 @@
+"""
+Shared pytest fixtures
+
+The test modules also run as plain scripts (``python tests/test_x.py``);
+fixtures here are only used where a test is written for pytest. Helpers
+that script-style tests need too (temporary databases) are plain
+functions that those modules import from here.
+"""
+
+import atexit
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common.middleware import assert_query_budget
+from src.database import Base
+
+_temp_dirs: List[Path] = []
+_temp_engines: List[Engine] = []
+
+
+def temp_dir(prefix: str = "test_") -> Path:
+    """Temporary directory removed after the current test (or at exit)"""
+    directory = Path(tempfile.mkdtemp(prefix=prefix))
+    _temp_dirs.append(directory)
+    return directory
+
+
+def temp_session_factory(prefix: str = "test_", **engine_kwargs) -> sessionmaker:
+    """
+    Session factory over an empty SQLite database with the full schema,
+    in a temp_dir(). The engine is ``factory.kw["bind"]``.
+    """
+    engine = create_engine(f"sqlite:///{temp_dir(prefix) / 'test.db'}", **engine_kwargs)
+    _temp_engines.append(engine)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def remove_temp_dirs():
+    """Dispose the temporary engines and delete the temporary directories"""
+    while _temp_engines:
+        _temp_engines.pop().dispose()
+    while _temp_dirs:
+        shutil.rmtree(_temp_dirs.pop(), ignore_errors=True)
+
+
+atexit.register(remove_temp_dirs)
+
+
+@pytest.fixture(autouse=True)
+def temp_databases():
+    """Remove the temp_dir()s and temp_session_factory()s a test created"""
+    yield
+    remove_temp_dirs()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Assert SQL budgets per endpoint from QueryStatsMiddleware headers.
+
+    Usage:
+        def test_types(query_budget):
+            query_budget(client.get("/api/types"), max_queries=1)
+    """
+    return assert_query_budget
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test All Agents
+
+Tests the single-process mode (src/all_agents): AGENT_TRANSPORT selection
+in ShoppingAgent, and the combined app serving every agent under its mount
+path while the shopping agent checks out through in-process ASGI calls.
+Uses a temporary SQLite database.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.shopping_agent.agent import ShoppingAgent
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+
+CHECKOUT_SCRIPT = """
+import asyncio
+from fastapi.testclient import TestClient
+from src.all_agents.server import app
+from src.common import generate_merchant_signature
+from src.database import SessionLocal, Pokemon
+from src.shopping_agent import web_ui
+
+with TestClient(app) as client:
+    print([client.get(path).status_code for path in ("/merchant/health", "/credentials/health", "/processor/health", "/")])
+    with SessionLocal() as db:
+        db.add(Pokemon(numero=25, nombre="pikachu", precio=25, en_venta=True,
+                       inventario_total=5, inventario_disponible=5, inventario_vendido=0))
+        db.commit()
+
+    agent = web_ui.agent
+    amount = {"currency": "USD", "value": 25}
+    cart = {
+        "contents": {
+            "id": "cart_all_agents", "user_cart_confirmation_required": False,
+            "merchant_name": "PokeMart - Primera Generación",
+            "payment_request": {
+                "method_data": [{"supported_methods": "CARD", "data": {}}],
+                "details": {"id": "order_all_agents", "displayItems": [{"label": "Pikachu #25", "amount": amount}],
+                            "total": {"label": "Total", "amount": amount}},
+            },
+        },
+        "merchant_signature": generate_merchant_signature("cart_all_agents"),
+        "timestamp": "2025-01-01T00:00:00+00:00",
+    }
+
+    async def checkout():
+        methods = await agent.get_payment_methods()
+        token = await agent.tokenize_payment_method(methods[0]["id"])
+        return await agent.process_payment(cart, agent.create_payment_mandate(cart, token, "CARD"))
+
+    receipt = asyncio.run(checkout())
+    print(agent.transport, receipt["status"], client.get("/processor/a2a/processor/transaction/" + receipt["transaction_id"]).status_code)
+    with SessionLocal() as db:
+        print(db.get(Pokemon, 25).inventario_disponible)
+"""
+
+
+def test_transport_selection():
+    """Test 1: AGENT_TRANSPORT picks HTTP or in-process calls"""
+    print("\n" + "=" * 60)
+    print("Test 1: Transport Selection")
+    print("=" * 60)
+
+    http = ShoppingAgent(transport="http")
+    assert http.apps == {} and http._client(http.merchant_url)._transport.__class__.__name__ == "AsyncHTTPTransport"
+    print("   ✓ http: calls go over the network")
+
+    asgi = ShoppingAgent(transport="asgi")
+    assert set(asgi.apps) == {asgi.merchant_url, asgi.credentials_provider_url, asgi.payment_processor_url}
+    assert asgi._client(asgi.payment_processor_url)._transport.__class__.__name__ == "ASGITransport"
+    print("   ✓ asgi: each agent URL maps to its app in this process")
+
+    try:
+        ShoppingAgent(transport="grpc")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unknown transports should be refused")
+    print("✅ Transport selection")
+    return True
+
+
+def test_single_process_checkout():
+    """Test 2: Combined app serves every agent; checkout runs in-process"""
+    print("\n" + "=" * 60)
+    print("Test 2: Single-Process Checkout")
+    print("=" * 60)
+
+    tmp = Path(tempfile.mkdtemp(prefix="all_agents_test_"))
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp / 'test.db'}",
+        SALES_EVENT_LOG_DIR=str(tmp / "sales_events"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", CHECKOUT_SCRIPT],
+        cwd=AP2_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.strip().splitlines()
+    assert "[200, 200, 200, 200]" in lines, lines
+    print("   ✓ /merchant, /credentials, /processor and the web UI answer on one port")
+    assert lines[-2] == "asgi completed 200" and lines[-1] == "4", lines[-2:]
+    assert (tmp / "sales_events").exists()
+    print("✅ Checkout through in-process agents (stock 5 -> 4, processor startup hooks ran)")
+    return True
+
+
+def main():
+    """Run all single-process tests"""
+    tests = [
+        ("Transport Selection", test_transport_selection),
+        ("Single-Process Checkout", test_single_process_checkout),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
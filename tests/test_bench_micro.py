@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test Microbenchmarks
+
+Tests the microbenchmark suite (benchmarks/bench_micro.py): per-call
+statistics of calibrated rounds, every case running on its fixed inputs,
+and the baseline comparison failing only on regressions beyond the
+threshold and the noise.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+sys.path.insert(0, str(AP2_DIR))
+sys.path.insert(0, str(AP2_DIR / "benchmarks"))
+
+from bench_micro import compare, measure, run_suite
+
+
+def test_measure():
+    """Test 1: Calibrated rounds and per-call statistics"""
+    print("\n" + "=" * 60)
+    print("Test 1: Measure")
+    print("=" * 60)
+
+    stats = measure(lambda: time.sleep(0.001), rounds=5, round_ms=10, warmup_ms=5)
+    assert stats["rounds"] == 5 and stats["loops"] >= 1
+    assert 1000 <= stats["min_us"] <= stats["median_us"] < 5000, stats
+    assert stats["iqr_us"] >= 0
+    print(f"✅ sleep(1 ms): median {stats['median_us']:.0f} µs over {stats['loops']} loops per round")
+    return True
+
+
+def test_suite_cases():
+    """Test 2: Every case runs on its fixed inputs"""
+    print("\n" + "=" * 60)
+    print("Test 2: Suite Cases")
+    print("=" * 60)
+
+    args = argparse.Namespace(filter=None, rounds=2, round_ms=1, warmup_ms=0)
+    results = run_suite(args, Path(tempfile.mkdtemp(prefix="bench_micro_test_")))
+    expected = {
+        "hash_object(cart contents)", "generate_merchant_signature", "generate_user_authorization",
+        "JWTValidator.validate_merchant_signature", "JWTValidator.validate_user_authorization",
+        "CartRepository.add_item", "TransactionRepository.create",
+        "CartMandate(**dict)", "CartMandate.model_dump",
+    }
+    assert expected <= set(results), set(results)
+    assert all(r["median_us"] > 0 for r in results.values())
+    print(f"✅ {len(results)} cases measured")
+    return True
+
+
+def test_baseline_compare():
+    """Test 3: Regressions beyond threshold and noise fail --compare"""
+    print("\n" + "=" * 60)
+    print("Test 3: Baseline Compare")
+    print("=" * 60)
+
+    baseline = {
+        "fast": {"median_us": 10.0, "iqr_us": 0.5},
+        "noisy": {"median_us": 10.0, "iqr_us": 8.0},
+        "gone": {"median_us": 10.0, "iqr_us": 0.5},
+    }
+    current = {
+        "fast": {"median_us": 14.0, "iqr_us": 0.5},
+        "noisy": {"median_us": 16.0, "iqr_us": 1.0},
+        "new": {"median_us": 1.0, "iqr_us": 0.1},
+    }
+    rows = {row[0]: row for row in compare(baseline, current, threshold=0.25)}
+    assert set(rows) == {"fast", "noisy"}
+    assert rows["fast"][4] and round(rows["fast"][3], 2) == 0.4
+    assert not rows["noisy"][4]
+    assert not compare(baseline, current, threshold=0.5)[0][4]
+    print("   ✓ +40% flagged; +60% within the IQR and unmatched cases ignored")
+
+    path = Path(tempfile.mkdtemp(prefix="bench_micro_test_")) / "baseline.json"
+    path.write_text(json.dumps({"results": {"hash_object(cart contents)": {"median_us": 0.01, "iqr_us": 0}}}))
+    command = [
+        sys.executable, str(AP2_DIR / "benchmarks" / "bench_micro.py"), "--filter", "hash_object(cart",
+        "--rounds", "3", "--round-ms", "5", "--warmup-ms", "0", "--baseline", str(path),
+    ]
+    failed = subprocess.run(command + ["--compare"], capture_output=True, text=True, timeout=120)
+    assert failed.returncode == 1 and "regressed" in failed.stdout, failed.stdout + failed.stderr
+
+    saved = subprocess.run(command + ["--save"], capture_output=True, text=True, timeout=120)
+    assert saved.returncode == 0, saved.stderr
+    passed = subprocess.run(
+        command[:-4] + ["--threshold", "1.0", "--compare"] + command[-2:],
+        capture_output=True, text=True, timeout=120
+    )
+    assert passed.returncode == 0, passed.stdout + passed.stderr
+    print("✅ --compare exits 1 on a regression and 0 against its own baseline")
+    return True
+
+
+def main():
+    """Run all microbenchmark suite tests"""
+    tests = [
+        ("Measure", test_measure),
+        ("Suite Cases", test_suite_cases),
+        ("Baseline Compare", test_baseline_compare),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
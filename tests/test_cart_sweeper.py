@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Test Cart Sweeper
+
+Tests the incremental cart expiry sweeper: the (status, expires_at) index,
+bounded batches, purging of old expired carts, the worker lease that keeps
+it to one process, and the `hours` parameter of expire_old_carts.
+Uses a temporary SQLite database.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Base,
+    Pokemon,
+    Cart,
+    CartItem,
+    CartRepository,
+    LeaseRepository,
+    CartSweeper,
+    ensure_indexes,
+)
+from conftest import temp_session_factory
+
+
+def make_session_factory():
+    """Create a temporary database with one Pokemon"""
+    factory = temp_session_factory("cart_sweeper_test_")
+
+    with factory() as db:
+        db.add(Pokemon(
+            numero=25, nombre="pikachu", precio=25,
+            inventario_total=10, inventario_disponible=10, inventario_vendido=0
+        ))
+        db.commit()
+
+    return factory
+
+
+def add_carts(db, prefix: str, count: int, expires_delta: timedelta, status: str = "active"):
+    """Add `count` carts with one item each, expiring at now + expires_delta"""
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        cart = Cart(session_id=f"{prefix}_{i}", status=status, expires_at=now + expires_delta)
+        cart.items.append(CartItem(
+            pokemon_numero=25, pokemon_name="pikachu",
+            quantity=1, unit_price=25.0, total_price=25.0
+        ))
+        db.add(cart)
+    db.commit()
+
+
+def count_status(db, status: str) -> int:
+    return db.query(Cart).filter(Cart.status == status).count()
+
+
+def test_sweep_uses_index():
+    """Test 1: The sweep query is served by the (status, expires_at) index"""
+    print("\n" + "=" * 60)
+    print("Test 1: Sweep Index")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM carts "
+            "WHERE status = 'active' AND expires_at < '2030-01-01' "
+            "ORDER BY expires_at LIMIT 500"
+        )).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    print(f"📋 {details}")
+    assert "ix_carts_status_expires_at" in details
+    assert "TEMP B-TREE" not in details, "Sweep should not sort"
+    print("✅ Sweep walks the composite index")
+
+    # Databases created before the index existed get it from ensure_indexes
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_carts_status_expires_at"))
+    ensure_indexes(Base.metadata, bind=engine)
+    names = {index["name"] for index in inspect(engine).get_indexes("carts")}
+    assert "ix_carts_status_expires_at" in names
+    print("✅ ensure_indexes adds the index to an existing table")
+    return True
+
+
+def test_bounded_batches():
+    """Test 2: Each tick expires at most one batch of due carts"""
+    print("\n" + "=" * 60)
+    print("Test 2: Bounded Batches")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        add_carts(db, "due", 12, timedelta(minutes=-5))
+        add_carts(db, "live", 3, timedelta(hours=1))
+        add_carts(db, "paying", 2, timedelta(minutes=-5), status="checkout")
+
+    sweeper = CartSweeper(factory, batch_size=5)
+    expired = [sweeper.tick()["expired"] for _ in range(4)]
+    assert expired == [5, 5, 2, 0], expired
+    print(f"✅ Expired per tick: {expired}")
+
+    with factory() as db:
+        assert count_status(db, "expired") == 12
+        assert count_status(db, "active") == 3
+        assert count_status(db, "checkout") == 2
+    print("✅ Live and in-checkout carts untouched")
+    return True
+
+
+def test_purge_old_expired():
+    """Test 3: Carts expired past retention are deleted with their items"""
+    print("\n" + "=" * 60)
+    print("Test 3: Purge Old Expired Carts")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        add_carts(db, "ancient", 4, timedelta(days=-30), status="expired")
+        add_carts(db, "abandoned", 1, timedelta(days=-30), status="abandoned")
+        add_carts(db, "recent", 2, timedelta(days=-1), status="expired")
+        add_carts(db, "sold", 1, timedelta(days=-30), status="completed")
+
+    sweeper = CartSweeper(factory, batch_size=3, retention_days=7)
+    purged = [sweeper.tick()["purged"] for _ in range(3)]
+    assert purged == [3, 2, 0], purged
+    print(f"✅ Purged per tick: {purged}")
+
+    with factory() as db:
+        remaining = sorted(c.session_id.split("_")[0] for c in db.query(Cart).all())
+        assert remaining == ["recent", "recent", "sold"], remaining
+        assert db.query(CartItem).count() == 3, "Items of purged carts must go too"
+    print("✅ Recent and completed carts kept, orphan items removed")
+    return True
+
+
+def test_single_leader():
+    """Test 4: Only the lease holder sweeps"""
+    print("\n" + "=" * 60)
+    print("Test 4: Single Leader")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        add_carts(db, "due", 3, timedelta(minutes=-5))
+
+    first = CartSweeper(factory, owner="web-1")
+    second = CartSweeper(factory, owner="web-2")
+
+    assert first.tick() == {"leader": True, "expired": 3, "purged": 0}
+    assert second.tick()["leader"] is False
+    print("✅ Second process skipped while the lease is held")
+
+    first.stop()
+    assert second.tick()["leader"] is True
+    print("✅ Lease handed over on stop")
+
+    # A crashed holder's lease is taken over once it expires
+    with factory() as db:
+        leases = LeaseRepository(db)
+        assert leases.acquire("stale-worker", "crashed", ttl_seconds=-1)
+        assert leases.acquire("stale-worker", "web-1", ttl_seconds=60)
+        assert not leases.acquire("stale-worker", "web-2", ttl_seconds=60)
+    print("✅ Expired lease taken over, live lease respected")
+    return True
+
+
+def test_expire_old_carts_hours():
+    """Test 5: expire_old_carts honours its `hours` parameter"""
+    print("\n" + "=" * 60)
+    print("Test 5: expire_old_carts(hours)")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        add_carts(db, "old", 2, timedelta(hours=1))
+        add_carts(db, "new", 2, timedelta(hours=1))
+        old_time = datetime.now(timezone.utc) - timedelta(hours=5)
+        for cart in db.query(Cart).filter(Cart.session_id.like("old_%")):
+            cart.created_at = old_time
+        db.commit()
+
+        repo = CartRepository(db)
+        assert repo.expire_old_carts(hours=6) == 0
+        assert repo.expire_old_carts(hours=4) == 2
+        assert count_status(db, "active") == 2
+    print("✅ Only carts older than `hours` were expired")
+    return True
+
+
+def main():
+    """Run all cart sweeper tests"""
+    tests = [
+        ("Sweep Index", test_sweep_uses_index),
+        ("Bounded Batches", test_bounded_batches),
+        ("Purge Old Expired Carts", test_purge_old_expired),
+        ("Single Leader", test_single_leader),
+        ("expire_old_carts(hours)", test_expire_old_carts_hours),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test Cart Totals
+
+Tests the denormalized carts.item_count / carts.total_amount columns,
+eager item loading for Cart.to_dict, the single-query cart summary and
+the migration that adds and backfills the totals on existing databases.
+Uses a temporary SQLite database.
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy import event, inspect, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import Pokemon, Cart, CartItem, CartRepository, run_migrations
+from conftest import temp_session_factory
+
+
+def make_session_factory(pokemon_count: int = 3):
+    """Create a temporary database with a few Pokemon"""
+    factory = temp_session_factory("cart_totals_test_")
+
+    with factory() as db:
+        for numero in range(1, pokemon_count + 1):
+            db.add(Pokemon(
+                numero=numero, nombre=f"pokemon{numero}", precio=10 * numero,
+                inventario_total=100, inventario_disponible=100, inventario_vendido=0
+            ))
+        db.commit()
+
+    return factory
+
+
+def count_statements(engine):
+    """Start counting statements on an engine; returns the running list"""
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+    return statements
+
+
+def actual_totals(db, cart_id: int):
+    """Totals computed from cart_items"""
+    items = db.query(CartItem).filter(CartItem.cart_id == cart_id).all()
+    return len(items), sum(item.total_price for item in items)
+
+
+def test_totals_stay_consistent():
+    """Test 1: Every cart write keeps the denormalized totals in sync"""
+    print("\n" + "=" * 60)
+    print("Test 1: Totals Stay Consistent")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        repo = CartRepository(db)
+        cart = repo.get_or_create_cart("session_totals")
+        cart_id = cart.id
+
+        steps = [
+            lambda: repo.add_item(cart, db.get(Pokemon, 1), 2),
+            lambda: repo.add_item(cart, db.get(Pokemon, 2), 1),
+            lambda: repo.add_item(cart, db.get(Pokemon, 1), 3),
+            lambda: repo.update_item_quantity(cart.items[1].id, 4),
+            lambda: repo.remove_item(cart.items[0].id),
+            lambda: repo.clear_cart(cart_id),
+        ]
+        for step in steps:
+            step()
+            db.expire_all()
+            stored = db.get(Cart, cart_id)
+            expected = actual_totals(db, cart_id)
+            assert (stored.item_count, stored.total_amount) == expected, (
+                f"{(stored.item_count, stored.total_amount)} != {expected}"
+            )
+            print(f"   ✓ item_count={stored.item_count} total_amount={stored.total_amount}")
+
+    print("✅ Totals match cart_items after every write")
+    return True
+
+
+def test_to_dict_without_lazy_loads():
+    """Test 2: A large cart renders with no per-call queries"""
+    print("\n" + "=" * 60)
+    print("Test 2: to_dict Without Lazy Loads")
+    print("=" * 60)
+
+    factory = make_session_factory(pokemon_count=150)
+    with factory() as db:
+        repo = CartRepository(db)
+        cart = repo.get_or_create_cart("session_large")
+        for numero in range(1, 151):
+            repo.add_item(cart, db.get(Pokemon, numero), 1)
+
+    engine = factory.kw["bind"]
+    statements = count_statements(engine)
+
+    with factory() as db:
+        cart = CartRepository(db).get_cart_by_session("session_large")
+        loaded = len(statements)
+        first = cart.to_dict()
+        second = cart.to_dict()
+        repr(cart)
+        assert len(statements) == loaded, statements[loaded:]
+    print(f"📊 Load: {loaded} statements (cart + items), to_dict x2 + repr: 0")
+    assert loaded == 2
+    assert first == second
+    assert first["total_items"] == 150
+    assert first["total_amount"] == sum(10 * n for n in range(1, 151))
+
+    statements.clear()
+    with factory() as db:
+        summary = CartRepository(db).get_cart_summary("session_large")
+    assert len(statements) == 1
+    assert summary == first
+    print("✅ get_cart_summary returns the same dict in one query")
+    return True
+
+
+def test_migration_backfills_totals():
+    """Test 3: Existing databases get the columns and a backfill"""
+    print("\n" + "=" * 60)
+    print("Test 3: Migration Backfill")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    with factory() as db:
+        repo = CartRepository(db)
+        cart = repo.get_or_create_cart("session_old")
+        repo.add_item(cart, db.get(Pokemon, 3), 2)
+        repo.add_item(cart, db.get(Pokemon, 1), 1)
+
+    # Recreate the pre-migration schema
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE carts DROP COLUMN item_count"))
+        conn.execute(text("ALTER TABLE carts DROP COLUMN total_amount"))
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+
+    assert run_migrations(engine)[0] == "0001_cart_totals"
+    columns = {c["name"] for c in inspect(engine).get_columns("carts")}
+    assert {"item_count", "total_amount"} <= columns
+
+    with factory() as db:
+        cart = CartRepository(db).get_cart_by_session("session_old")
+        assert (cart.item_count, cart.total_amount) == (2, 70.0)
+    print("✅ Columns added and backfilled")
+
+    assert run_migrations(engine) == []
+    print("✅ Second run is a no-op")
+    return True
+
+
+def main():
+    """Run all cart totals tests"""
+    tests = [
+        ("Totals Stay Consistent", test_totals_stay_consistent),
+        ("to_dict Without Lazy Loads", test_to_dict_without_lazy_loads),
+        ("Migration Backfill", test_migration_backfills_totals),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Test Cart Unit of Work
+
+Tests the unit-of-work mode of CartRepository: the statement and commit
+budget of each web_ui cart endpoint, upserts on repeated adds, recycling
+of a session's cart after checkout, and rollback of uncommitted work.
+Uses a temporary SQLite database.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Pokemon, Cart, CartItem, CartRepository, UnitOfWork, catalog_snapshot
+)
+from conftest import temp_session_factory
+
+
+class StatementCounter:
+    """Count SQL statements and commits issued on an engine"""
+
+    def __init__(self, engine):
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split()[0].upper())
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = []
+        self.commits = 0
+
+    def __str__(self):
+        return f"{len(self.statements)} statements {self.statements}, {self.commits} commit(s)"
+
+
+def make_session_factory():
+    """Create a temporary database with Pikachu and Charmander"""
+    factory = temp_session_factory("cart_uow_test_")
+    engine = factory.kw["bind"]
+
+    with factory() as db:
+        for numero, nombre, precio in [(4, "charmander", 100), (25, "pikachu", 25)]:
+            db.add(Pokemon(
+                numero=numero, nombre=nombre, precio=precio,
+                inventario_total=10, inventario_disponible=10, inventario_vendido=0
+            ))
+        db.commit()
+
+    # Warm the catalog snapshot so budgets don't include its first build
+    catalog_snapshot(engine)
+    return factory, StatementCounter(engine)
+
+
+# Repository calls made by each web_ui endpoint, in the same order
+
+def add_to_cart_request(factory, session_id: str, numero: int, quantity: int = 1):
+    """POST /api/cart/add"""
+    with UnitOfWork(factory) as uow:
+        cart = uow.carts.get_or_create_cart(session_id)
+        pokemon = uow.pokemon.get_by_numero(numero)
+        uow.carts.add_item(cart, pokemon, quantity)
+        cart_dict = cart.to_dict()
+        uow.commit()
+        return cart_dict
+
+
+def get_cart_request(factory, session_id: str):
+    """GET /api/cart"""
+    with UnitOfWork(factory) as uow:
+        cart_dict = uow.carts.get_cart_summary(session_id)
+        if cart_dict is None:
+            cart_dict = uow.carts.get_or_create_cart(session_id).to_dict()
+            uow.commit()
+        return cart_dict
+
+
+def remove_from_cart_request(factory, session_id: str, numero: int):
+    """DELETE /api/cart/item/{product_id}"""
+    with UnitOfWork(factory) as uow:
+        cart = uow.carts.get_cart_by_session(session_id)
+        item = next(i for i in cart.items if i.pokemon_numero == numero)
+        uow.carts.remove_item(item.id)
+        cart_dict = cart.to_dict()
+        uow.commit()
+        return cart_dict
+
+
+def clear_cart_request(factory, session_id: str):
+    """DELETE /api/cart/clear"""
+    with UnitOfWork(factory) as uow:
+        cart = uow.carts.get_cart_by_session(session_id)
+        uow.carts.clear_cart(cart.id)
+        uow.commit()
+
+
+def test_endpoint_statement_budget():
+    """Test 1: Each cart endpoint stays within its statement budget"""
+    print("\n" + "=" * 60)
+    print("Test 1: Statement Budget per Endpoint")
+    print("=" * 60)
+
+    factory, counter = make_session_factory()
+
+    counter.reset()
+    add_to_cart_request(factory, "session_a", 25)
+    print(f"📊 add (new cart):      {counter}")
+    # SELECT cart, INSERT cart RETURNING, SELECT catalog version,
+    # upsert item RETURNING, UPDATE cart totals RETURNING
+    assert len(counter.statements) == 5
+    assert counter.commits == 1
+
+    counter.reset()
+    cart_dict = add_to_cart_request(factory, "session_a", 4)
+    print(f"📊 add (existing cart): {counter}")
+    # SELECT cart, SELECT items, SELECT catalog version, upsert item RETURNING,
+    # UPDATE cart totals RETURNING; to_dict needs no further query
+    assert len(counter.statements) == 5
+    assert counter.commits == 1
+    assert (cart_dict["total_items"], cart_dict["total_amount"]) == (2, 125.0)
+
+    counter.reset()
+    cart_dict = get_cart_request(factory, "session_a")
+    print(f"📊 get cart:            {counter}")
+    # SELECT cart JOIN items
+    assert len(counter.statements) == 1
+    assert counter.commits == 0
+    assert [i["pokemon_numero"] for i in cart_dict["items"]] == [25, 4]
+
+    counter.reset()
+    cart_dict = remove_from_cart_request(factory, "session_a", 4)
+    print(f"📊 remove item:         {counter}")
+    # SELECT cart, SELECT items, DELETE item RETURNING, UPDATE cart totals RETURNING
+    assert len(counter.statements) == 4
+    assert counter.commits == 1
+    assert [i["pokemon_numero"] for i in cart_dict["items"]] == [25]
+    assert cart_dict["total_amount"] == 25.0
+    assert isinstance(cart_dict["total_amount"], float)
+
+    counter.reset()
+    clear_cart_request(factory, "session_a")
+    print(f"📊 clear cart:          {counter}")
+    # SELECT cart, SELECT items, DELETE items RETURNING, UPDATE cart totals RETURNING
+    assert len(counter.statements) == 4
+    assert counter.commits == 1
+
+    print("✅ One commit and at most 5 statements per request")
+    return True
+
+
+def test_upsert_merges_quantities():
+    """Test 2: Adding the same Pokemon twice updates one line"""
+    print("\n" + "=" * 60)
+    print("Test 2: Upsert Merges Quantities")
+    print("=" * 60)
+
+    factory, _ = make_session_factory()
+    add_to_cart_request(factory, "session_b", 25, quantity=2)
+    add_to_cart_request(factory, "session_b", 25, quantity=3)
+
+    with factory() as db:
+        items = db.query(CartItem).all()
+        assert len(items) == 1
+        assert items[0].quantity == 5
+        assert items[0].total_price == 125.0
+
+        # Plain (autocommit) repositories see the same result
+        repo = CartRepository(db)
+        updated = repo.update_item_quantity(items[0].id, 2)
+        assert (updated.quantity, updated.total_price) == (2, 50.0)
+        assert repo.update_item_quantity(items[0].id, 0) is None
+        assert db.query(CartItem).count() == 0
+    print("✅ Single line with merged quantity and total")
+    return True
+
+
+def test_cart_recycled_after_checkout():
+    """Test 3: A session gets a fresh cart after checking out"""
+    print("\n" + "=" * 60)
+    print("Test 3: Cart Recycled After Checkout")
+    print("=" * 60)
+
+    factory, _ = make_session_factory()
+    add_to_cart_request(factory, "session_c", 25)
+
+    with factory() as db:
+        repo = CartRepository(db)
+        cart = repo.get_cart_by_session("session_c")
+        cart_id = cart.id
+        completed = repo.mark_cart_as_completed(cart_id)
+        assert completed.status == "completed"
+
+    # Previously this raised an IntegrityError on carts.session_id
+    add_to_cart_request(factory, "session_c", 4)
+
+    with factory() as db:
+        carts = db.query(Cart).all()
+        assert len(carts) == 1 and carts[0].id == cart_id
+        assert carts[0].status == "active"
+        assert [i.pokemon_numero for i in carts[0].items] == [4]
+
+        # Expired carts are recycled the same way
+        carts[0].expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.commit()
+        cart = CartRepository(db).get_or_create_cart("session_c")
+        assert cart.id == cart_id and cart.items == []
+        assert not cart.is_expired()
+    print("✅ Session row reused as an empty active cart")
+    return True
+
+
+def test_rollback_without_commit():
+    """Test 4: Leaving a unit of work without committing discards it"""
+    print("\n" + "=" * 60)
+    print("Test 4: Rollback Without Commit")
+    print("=" * 60)
+
+    factory, _ = make_session_factory()
+    try:
+        with UnitOfWork(factory) as uow:
+            cart = uow.carts.get_or_create_cart("session_d")
+            uow.carts.add_item(cart, uow.pokemon.get_by_numero(25), 1)
+            raise RuntimeError("MCP call failed")
+    except RuntimeError:
+        pass
+
+    with UnitOfWork(factory) as uow:
+        uow.carts.get_or_create_cart("session_e")
+        # no commit
+
+    with factory() as db:
+        assert db.query(Cart).count() == 0
+        assert db.query(CartItem).count() == 0
+    print("✅ Nothing persisted without commit()")
+    return True
+
+
+def main():
+    """Run all cart unit-of-work tests"""
+    tests = [
+        ("Statement Budget per Endpoint", test_endpoint_statement_budget),
+        ("Upsert Merges Quantities", test_upsert_merges_quantities),
+        ("Cart Recycled After Checkout", test_cart_recycled_after_checkout),
+        ("Rollback Without Commit", test_rollback_without_commit),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
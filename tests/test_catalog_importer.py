@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test Catalog Importer
+
+Tests the streaming catalog importer behind scripts/migrate_json_to_db.py:
+JSON/NDJSON/CSV readers, batched upserts in one transaction, all-or-nothing
+failures, dry-run diffs and the non-interactive CLI. Uses temporary SQLite
+databases.
+"""
+
+import csv
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "ap2-integration"))
+
+from src.database import Pokemon, PokemonType, CatalogImporter, read_records
+from src.database.importer import CATALOG_FIELDS, iter_json_array, to_row
+from conftest import temp_dir, temp_session_factory
+
+CATALOG = ROOT / "pokemon-gen1.json"
+
+
+def make_session_factory():
+    """Create an empty temporary database"""
+    return temp_session_factory("importer_test_")
+
+
+def catalog_rows(db):
+    return [
+        tuple(getattr(p, field) for field in CATALOG_FIELDS)
+        for p in db.query(Pokemon).order_by(Pokemon.numero)
+    ]
+
+
+def test_readers():
+    """Test 1: Streaming JSON, NDJSON and CSV give the same rows"""
+    print("\n" + "=" * 60)
+    print("Test 1: Readers")
+    print("=" * 60)
+
+    with open(CATALOG, encoding="utf-8") as f:
+        expected = json.load(f)
+    with open(CATALOG, encoding="utf-8") as f:
+        assert list(iter_json_array(f, chunk_size=7)) == expected
+    assert list(iter_json_array(io.StringIO("[1, 23 , 456]"), chunk_size=2)) == [1, 23, 456]
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+    print("   ✓ JSON array streamed with 7-character chunks")
+
+    tmp = temp_dir("importer_files_")
+    rows = [to_row(record) for record in expected]
+    (tmp / "catalog.ndjson").write_text(
+        "\n".join(json.dumps(record) for record in expected) + "\n\n", encoding="utf-8"
+    )
+    with open(tmp / "catalog.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    for name in ("catalog.ndjson", "catalog.csv"):
+        assert [to_row(r) for r in read_records(tmp / name)] == rows
+        print(f"   ✓ {name}")
+
+    for bad in ('{"numero": 1}', "[1, 2"):
+        try:
+            list(iter_json_array(io.StringIO(bad)))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} should be rejected")
+    print("✅ Same rows from every format; malformed arrays rejected")
+    return True
+
+
+def test_batched_upsert():
+    """Test 2: One statement per batch; re-imports update in place"""
+    print("\n" + "=" * 60)
+    print("Test 2: Batched Upsert")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    inserts = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement)
+        if statement.startswith("INSERT INTO pokemon ") else None
+    )
+
+    with factory() as db:
+        stats = CatalogImporter(db, batch_size=50).load(read_records(CATALOG))
+        assert stats["rows"] == 151 and stats["batches"] == 4
+        assert len(inserts) == 4, len(inserts)
+        assert stats["type_rows"] > 151
+        assert db.query(PokemonType).filter_by(pokemon_numero=6).count() == 2
+        print(f"   ✓ {stats['rows']} rows, {len(inserts)} INSERT statements, "
+              f"{stats['rows_per_second']:,.0f} rows/s")
+
+        first = catalog_rows(db)
+        updates = [
+            {"numero": 25, "nombre": "Pikachu", "precio": 999, "en_venta": "false",
+             "inventario_total": 3, "inventario_disponible": 1, "inventario_vendido": 2},
+            {"numero": 25, "nombre": "pikachu", "precio": 111, "en_venta": "true",
+             "inventario_total": 3, "inventario_disponible": 1, "inventario_vendido": 2},
+        ]
+        stats = CatalogImporter(db).load(updates)
+        assert stats["rows"] == 1 and stats["type_rows"] == 0
+        assert db.query(Pokemon).count() == 151
+        pikachu = db.get(Pokemon, 25)
+        assert (pikachu.precio, pikachu.en_venta, pikachu.inventario_disponible) == (111, True, 1)
+        assert [row for row in catalog_rows(db) if row[0] != 25] == [r for r in first if r[0] != 25]
+    print("✅ Re-import updated one row without duplicates (last occurrence wins)")
+    return True
+
+
+def test_failure_writes_nothing():
+    """Test 3: An invalid record aborts the whole import"""
+    print("\n" + "=" * 60)
+    print("Test 3: Failure Writes Nothing")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with open(CATALOG, encoding="utf-8") as f:
+        records = json.load(f)
+    records.insert(120, {"numero": 999, "nombre": "missingno", "precio": "free"})
+
+    with factory() as db:
+        try:
+            CatalogImporter(db, batch_size=10).load(records)
+        except ValueError as e:
+            assert "Record 121" in str(e)
+            print(f"   ✓ {str(e)[:70]}...")
+        else:
+            raise AssertionError("Invalid record should fail the import")
+        assert db.query(Pokemon).count() == 0
+    print("✅ No rows written after a failure in batch 13")
+    return True
+
+
+def test_dry_run_diff():
+    """Test 4: Dry run counts new, changed, unchanged and deleted rows"""
+    print("\n" + "=" * 60)
+    print("Test 4: Dry Run Diff")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with open(CATALOG, encoding="utf-8") as f:
+        records = json.load(f)
+
+    with factory() as db:
+        CatalogImporter(db).load(records[:100])
+        before = catalog_rows(db)
+
+        changed = [dict(r, precio=r["precio"] + 1) for r in records[:5]]
+        incoming = changed + records[5:90] + records[100:]
+        result = CatalogImporter(db, batch_size=16).diff(incoming, replace=True, sample_size=3)
+
+        assert (result["new"], result["changed"], result["unchanged"], result["deleted"]) == (51, 5, 85, 10)
+        assert result["samples"][0] == ("~", 1, {"precio": (records[0]["precio"], records[0]["precio"] + 1)})
+        assert len(result["samples"]) == 3
+        assert catalog_rows(db) == before
+    print(f"✅ {result['new']} new, {result['changed']} changed, {result['unchanged']} unchanged, "
+          f"{result['deleted']} deleted; database untouched")
+    return True
+
+
+def test_cli():
+    """Test 5: The script runs without prompts against a target database"""
+    print("\n" + "=" * 60)
+    print("Test 5: CLI")
+    print("=" * 60)
+
+    tmp = temp_dir("importer_cli_")
+    script = ROOT / "ap2-integration" / "scripts" / "migrate_json_to_db.py"
+    target = tmp / "cli.db"
+
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, str(script), *args], stdin=subprocess.DEVNULL,
+            capture_output=True, text=True, timeout=120
+        )
+
+    dry = run(str(CATALOG), "--db", str(target), "--dry-run")
+    assert dry.returncode == 0, dry.stderr
+    assert "New:       151" in dry.stdout
+
+    done = run(str(CATALOG), "--db", str(target), "--batch-size", "40")
+    assert done.returncode == 0, done.stderr
+    assert "Upserted 151 rows in 4 batches" in done.stdout
+    print(f"   ✓ {next(l for l in done.stdout.splitlines() if l.startswith('✅'))}")
+
+    missing = run(str(tmp / "nope.json"), "--db", str(target))
+    assert missing.returncode == 1
+    print("✅ Dry run, import and missing-file exit codes")
+    return True
+
+
+def main():
+    """Run all catalog importer tests"""
+    tests = [
+        ("Readers", test_readers),
+        ("Batched Upsert", test_batched_upsert),
+        ("Failure Writes Nothing", test_failure_writes_nothing),
+        ("Dry Run Diff", test_dry_run_diff),
+        ("CLI", test_cli),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
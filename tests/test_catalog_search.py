@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test Catalog Search
+
+Tests the columnar catalog search engine: compound filters against a
+brute-force reference, argpartition top-k against a full sort (ties
+included), rebuilds after catalog writes, types read from the pokemon_types table
+and the result format used by the web UI and merchant agent. Uses a temporary SQLite database.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import Pokemon, PokemonType, PokemonRepository, catalog_search, populate_pokemon_types
+from src.database.catalog_search import CatalogSearchEngine, STAT_NAMES, load_species
+from conftest import temp_session_factory
+
+
+def make_session_factory():
+    """Create a temporary database with all 151 species"""
+    factory = temp_session_factory("catalog_search_test_")
+
+    rng = random.Random(25)
+    with factory() as db:
+        for numero, species in load_species().items():
+            db.add(Pokemon(
+                numero=numero, nombre=species["nombre"], precio=rng.randint(10, 600),
+                en_venta=rng.random() < 0.9,
+                inventario_total=10, inventario_disponible=rng.randint(0, 5), inventario_vendido=0
+            ))
+        db.commit()
+        populate_pokemon_types(db.connection())
+        db.commit()
+
+    return factory
+
+
+def reference_search(db, types=(), any_types=(), min_price=None, max_price=None,
+                     only_available=False, min_stats=None, sort_by=None, limit=151):
+    """Plain Python version of the same query"""
+    species = load_species()
+    matches = []
+    for pokemon in db.query(Pokemon).order_by(Pokemon.numero):
+        data = species[pokemon.numero]
+        stats = dict(data["stats"], total=sum(data["stats"].values()))
+        if not set(types) <= set(data["types"]):
+            continue
+        if any_types and not set(any_types) & set(data["types"]):
+            continue
+        if min_price is not None and pokemon.precio < min_price:
+            continue
+        if max_price is not None and pokemon.precio > max_price:
+            continue
+        if only_available and not (pokemon.en_venta and pokemon.inventario_disponible > 0):
+            continue
+        if any(stats[name] < minimum for name, minimum in (min_stats or {}).items()):
+            continue
+        keys = dict(stats, numero=pokemon.numero, precio=pokemon.precio,
+                    stock=pokemon.inventario_disponible)
+        matches.append((pokemon.numero, keys))
+
+    if sort_by:
+        key = sort_by.lstrip("-")
+        sign = -1 if sort_by.startswith("-") else 1
+        matches.sort(key=lambda m: sign * m[1][key])  # stable: ties by numero
+    return [numero for numero, _ in matches[:limit]], len(matches)
+
+
+def test_filters_match_reference():
+    """Test 1: Compound filters and sorts match a brute-force search"""
+    print("\n" + "=" * 60)
+    print("Test 1: Filters Match Reference")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    queries = [
+        dict(types=["fire"]),
+        dict(types=["water", "ice"], only_available=True),
+        dict(any_types=["dragon", "ghost", "psychic"], sort_by="-total", limit=5),
+        dict(min_price=100, max_price=300, sort_by="precio", limit=10),
+        dict(min_stats={"attack": 100, "speed": 80}, sort_by="-speed"),
+        dict(only_available=True, sort_by="stock", limit=7),
+        dict(types=["normal", "flying"], sort_by="-hp", limit=3),
+        dict(sort_by="-defense", limit=0),
+    ]
+    with factory() as db:
+        search = catalog_search(db)
+        assert len(search) == 151
+        for query in queries:
+            rows, total = search.search(**query)
+            got = [r["numero"] for r in search.records(rows)]
+            expected, expected_total = reference_search(db, **query)
+            assert (got, total) == (expected, expected_total), (query, got, expected)
+            print(f"   ✓ {query} -> {total} matches")
+
+        for bad in (dict(types=["lava"]), dict(sort_by="weight"), dict(min_stats={"luck": 1})):
+            try:
+                search.search(**bad)
+                assert False, f"{bad} should raise"
+            except ValueError:
+                pass
+    print("✅ Same results as the reference; bad input raises ValueError")
+    return True
+
+
+def test_top_k_with_ties():
+    """Test 2: argpartition top-k equals a stable full sort"""
+    print("\n" + "=" * 60)
+    print("Test 2: Top-k With Ties")
+    print("=" * 60)
+
+    rng = np.random.default_rng(7)
+    for trial in range(50):
+        keys = rng.integers(0, 5, rng.integers(1, 60)).astype(np.float64)
+        k = int(rng.integers(0, len(keys) + 2))
+        expected = np.argsort(keys, kind="stable")[:k]
+        assert np.array_equal(CatalogSearchEngine._top_k(keys, min(k, len(keys))), expected)
+    print("✅ 50 random key sets with heavy ties")
+    return True
+
+
+def test_rebuilt_after_writes():
+    """Test 3: The engine follows price and stock changes"""
+    print("\n" + "=" * 60)
+    print("Test 3: Rebuilt After Writes")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        first = catalog_search(db)
+        assert catalog_search(db) is first
+
+        pikachu = PokemonRepository(db).get_for_update(25)
+        pikachu.precio = 1
+        pikachu.en_venta = True
+        pikachu.inventario_disponible = 3
+        db.commit()
+
+        second = catalog_search(db)
+        assert second is not first
+        rows, _ = second.search(only_available=True, sort_by="precio", limit=1)
+        record = second.records(rows)[0]
+        assert record["nombre"] == "pikachu"
+        assert record["types"] == ["electric"]
+        assert list(record["stats"]) == list(STAT_NAMES)
+        assert record["inventario"]["disponibles"] == 3
+    print("✅ New columns after a commit; records carry types and stats")
+    return True
+
+
+def test_types_from_table():
+    """Test 4: Type filters follow pokemon_types, including imported Pokemon"""
+    print("\n" + "=" * 60)
+    print("Test 4: Types From pokemon_types")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        # A Pokemon outside the species data, imported with its types
+        db.add(Pokemon(
+            numero=152, nombre="chikorita", precio=90,
+            inventario_total=5, inventario_disponible=5, inventario_vendido=0
+        ))
+        db.add(PokemonType(pokemon_numero=152, slot=1, type_name="grass"))
+        # Type rows win over the species data (no gen-1 species is dark)
+        db.add(PokemonType(pokemon_numero=25, slot=2, type_name="dark"))
+        db.commit()
+
+        search = catalog_search(db)
+        rows, _ = search.search(types=["grass"])
+        chikorita = search.records(rows)[-1]
+        assert chikorita["nombre"] == "chikorita" and chikorita["types"] == ["grass"]
+        assert set(chikorita["stats"].values()) == {0}
+        print(f"   ✓ Imported #152 found by type (no species stats: {chikorita['stats']['hp']})")
+
+        rows, _ = search.search(types=["electric", "dark"])
+        assert [r["types"] for r in search.records(rows)] == [["electric", "dark"]]
+        assert [p.numero for p in PokemonRepository(db).search(type="dark")] == [25]
+    print("✅ Same types as PokemonRepository.search")
+    return True
+
+
+def main():
+    """Run all catalog search tests"""
+    tests = [
+        ("Filters Match Reference", test_filters_match_reference),
+        ("Top-k With Ties", test_top_k_with_ties),
+        ("Rebuilt After Writes", test_rebuilt_after_writes),
+        ("Types From pokemon_types", test_types_from_table),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Test Catalog Snapshot
+
+Tests the in-memory catalog snapshot behind PokemonRepository reads: one
+version check per read, invalidation on every kind of catalog write,
+isolation from uncommitted writes, parity with the SQL filters and the
+migration that installs the version counter on existing databases.
+Uses a temporary SQLite database.
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy import event, text, update
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Pokemon,
+    CatalogEntry,
+    PokemonRepository,
+    TransactionRepository,
+    ReservationRepository,
+    catalog_snapshot,
+    run_migrations,
+)
+from conftest import temp_session_factory
+
+
+def make_session_factory(pokemon_count: int = 20):
+    """Create a temporary database with a small catalog"""
+    factory = temp_session_factory("catalog_snapshot_test_")
+
+    with factory() as db:
+        for numero in range(1, pokemon_count + 1):
+            db.add(Pokemon(
+                numero=numero, nombre=f"pokemon{numero}", precio=10 * numero,
+                en_venta=numero % 5 != 0,
+                inventario_total=10, inventario_disponible=numero % 3, inventario_vendido=0
+            ))
+        db.commit()
+
+    return factory
+
+
+def count_statements(engine):
+    """Start counting statements on an engine; returns the running list"""
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+    )
+    return statements
+
+
+def test_reads_hit_snapshot():
+    """Test 1: Repeated reads cost one version check and share records"""
+    print("\n" + "=" * 60)
+    print("Test 1: Reads Hit the Snapshot")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    statements = count_statements(factory.kw["bind"])
+
+    with factory() as db:
+        repo = PokemonRepository(db)
+        first = repo.get_by_numero(7)
+        print(f"📊 Cold read: {len(statements)} statements")
+        assert len(statements) == 2  # version + rebuild
+
+        statements.clear()
+        for _ in range(10):
+            assert repo.get_by_numero(7) is first
+        assert repo.get_by_nombre("POKEMON7") is first
+        repo.get_available()
+        repo.search(max_price=100)
+        print(f"📊 13 warm reads: {len(statements)} statements")
+        assert len(statements) == 13
+        assert all("catalog_version" in s for s in statements)
+
+    assert isinstance(first, CatalogEntry)
+    try:
+        first.precio = 1
+        assert False, "CatalogEntry should be read-only"
+    except AttributeError:
+        pass
+    print("✅ Warm reads are dictionary lookups on shared read-only records")
+    return True
+
+
+def test_writes_invalidate_snapshot():
+    """Test 2: Every kind of catalog write is seen by the next read"""
+    print("\n" + "=" * 60)
+    print("Test 2: Writes Invalidate the Snapshot")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        repo = PokemonRepository(db)
+        assert repo.get_by_numero(4).inventario_disponible == 1
+
+        # ORM write through the repository
+        assert repo.decrease_stock(4, 1)
+        assert repo.get_by_numero(4).inventario_disponible == 0
+        print("   ✓ PokemonRepository.decrease_stock")
+
+        # Bulk Core UPDATE (reservations, restock)
+        ReservationRepository(db).restore_stock({4: 3})
+        db.commit()
+        assert repo.get_by_numero(4).inventario_disponible == 3
+        print("   ✓ Core UPDATE")
+
+        # Raw SQL price change
+        db.execute(text("UPDATE pokemon SET precio = 999 WHERE numero = 4"))
+        db.commit()
+        assert repo.get_by_numero(4).precio == 999
+        print("   ✓ Raw SQL")
+
+        # Insert and delete
+        db.add(Pokemon(numero=500, nombre="newmon", precio=1,
+                       inventario_total=1, inventario_disponible=1))
+        db.commit()
+        assert repo.get_by_nombre("newmon").numero == 500
+        db.execute(text("DELETE FROM pokemon WHERE numero = 500"))
+        db.commit()
+        assert repo.get_by_numero(500) is None
+        print("   ✓ INSERT / DELETE")
+
+    # Another session (as another process would) sees committed writes
+    with factory() as writer, factory() as reader:
+        reader_repo = PokemonRepository(reader)
+        before = reader_repo.get_by_numero(2)
+        writer.execute(update(Pokemon).where(Pokemon.numero == 2).values(precio=5))
+        writer.commit()
+        assert reader_repo.get_by_numero(2).precio == 5
+        assert before.precio == 20  # old snapshot records never change
+
+        # PostgreSQL bumps per-backend counter rows; the version is their sum
+        version = catalog_snapshot(reader).version
+        writer.execute(text("INSERT INTO catalog_version (id, version) VALUES (7, 1)"))
+        writer.commit()
+        assert catalog_snapshot(reader).version == version + 1
+    print("✅ Snapshot rebuilt after every committed write")
+    return True
+
+
+def test_uncommitted_writes_not_shared():
+    """Test 3: Flushed but uncommitted writes never reach the snapshot"""
+    print("\n" + "=" * 60)
+    print("Test 3: Uncommitted Writes Not Shared")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        repo = PokemonRepository(db)
+        pokemon = repo.get_for_update(8)
+        pokemon.precio = 1
+        db.flush()
+
+        with factory() as other:
+            assert PokemonRepository(other).get_by_numero(8).precio == 80
+        assert repo.get_by_numero(8).precio == 80
+        db.rollback()
+
+    with factory() as db:
+        assert PokemonRepository(db).get_by_numero(8).precio == 80
+    print("✅ Only committed state is cached")
+    return True
+
+
+def test_filters_match_sql():
+    """Test 4: get_available/search return what the SQL filters did"""
+    print("\n" + "=" * 60)
+    print("Test 4: Filters Match SQL")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        repo = PokemonRepository(db)
+        available_sql = [
+            p.numero for p in db.query(Pokemon).filter(
+                Pokemon.en_venta == True, Pokemon.inventario_disponible > 0
+            ).order_by(Pokemon.numero)
+        ]
+        assert [p.numero for p in repo.get_available()] == available_sql
+
+        cases = [
+            dict(min_price=50),
+            dict(max_price=60, only_available=True, limit=5),
+            dict(min_price=30, max_price=150, only_available=True),
+            dict(limit=3),
+        ]
+        for kwargs in cases:
+            query = db.query(Pokemon)
+            if "min_price" in kwargs:
+                query = query.filter(Pokemon.precio >= kwargs["min_price"])
+            if "max_price" in kwargs:
+                query = query.filter(Pokemon.precio <= kwargs["max_price"])
+            if kwargs.get("only_available"):
+                query = query.filter(
+                    Pokemon.en_venta == True, Pokemon.inventario_disponible > 0
+                )
+            expected = [p.numero for p in query.order_by(Pokemon.numero).limit(kwargs.get("limit", 151))]
+            assert [p.numero for p in repo.search(**kwargs)] == expected, kwargs
+            print(f"   ✓ search({kwargs}) -> {len(expected)} results")
+
+        assert repo.get_by_numero(3).to_dict() == db.get(Pokemon, 3).to_dict()
+    print("✅ Same results and dict format as the ORM")
+    return True
+
+
+def test_transaction_loads_rows_once():
+    """Test 5: TransactionRepository.create loads all Pokemon in one query"""
+    print("\n" + "=" * 60)
+    print("Test 5: Transaction Loads Rows Once")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    statements = count_statements(factory.kw["bind"])
+    items = [
+        {"pokemon_numero": numero, "quantity": 1, "unit_price": 10.0 * numero}
+        for numero in (1, 2, 4, 7, 8)
+    ]
+    cart_mandate = {
+        "contents": {"payment_request": {"details": {
+            "total": {"amount": {"value": 220.0, "currency": "USD"}}
+        }}},
+        "merchantName": "PokeMart",
+    }
+    payment_mandate = {"payment_mandate_contents": {"payment_response": {
+        "method_name": "CARD", "payer_email": "ash@example.com"
+    }}}
+
+    with factory() as db:
+        TransactionRepository(db).create("txn_1", "cart_1", cart_mandate, payment_mandate, items)
+    pokemon_selects = [s for s in statements if s.startswith("SELECT") and "FROM pokemon" in s]
+    print(f"📊 SELECTs on pokemon: {len(pokemon_selects)}")
+    assert len(pokemon_selects) == 1
+
+    with factory() as db:
+        assert PokemonRepository(db).get_by_numero(7).inventario_disponible == 0
+    print("✅ One query for five line items; stock change visible")
+    return True
+
+
+def test_migration_installs_counter():
+    """Test 6: Existing databases get the counter and triggers"""
+    print("\n" + "=" * 60)
+    print("Test 6: Migration Installs Counter")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    with engine.begin() as conn:
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(text(f"DROP TRIGGER pokemon_catalog_{trigger}"))
+        conn.execute(text("DROP TABLE catalog_version"))
+        conn.execute(text("DELETE FROM schema_migrations"))
+
+    with factory() as db:
+        # Without the counter reads still work, just uncached
+        assert PokemonRepository(db).get_by_numero(1).precio == 10
+
+    assert "0002_catalog_version" in run_migrations(engine)
+    with factory() as db:
+        repo = PokemonRepository(db)
+        version = catalog_snapshot(db).version
+        assert repo.decrease_stock(1, 1)
+        assert catalog_snapshot(db).version == version + 1
+        assert repo.get_by_numero(1).inventario_disponible == 0
+    assert run_migrations(engine) == []
+    print("✅ Counter and triggers installed once")
+    return True
+
+
+def main():
+    """Run all catalog snapshot tests"""
+    tests = [
+        ("Reads Hit the Snapshot", test_reads_hit_snapshot),
+        ("Writes Invalidate the Snapshot", test_writes_invalidate_snapshot),
+        ("Uncommitted Writes Not Shared", test_uncommitted_writes_not_shared),
+        ("Filters Match SQL", test_filters_match_sql),
+        ("Transaction Loads Rows Once", test_transaction_loads_rows_once),
+        ("Migration Installs Counter", test_migration_installs_counter),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -126,8 +126,8 @@ def test_stock_management():
             print("❌ Failed to decrease stock")
             return False
         
-        db.refresh(pikachu)
-        new_stock = pikachu.inventario_disponible
+        # Snapshot records are immutable: read the new state back
+        new_stock = repo.get_by_numero(25).inventario_disponible
         print(f"✅ Stock decreased: {original_stock} -> {new_stock}")
         
         if new_stock != original_stock - 1:
@@ -136,8 +136,7 @@ def test_stock_management():
         
         # Increase stock (refund)
         repo.increase_stock(25, 1)
-        db.refresh(pikachu)
-        restored_stock = pikachu.inventario_disponible
+        restored_stock = repo.get_by_numero(25).inventario_disponible
         print(f"✅ Stock restored: {new_stock} -> {restored_stock}")
         
         if restored_stock != original_stock:
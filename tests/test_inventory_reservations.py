@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Test Inventory Reservations
+
+Tests TTL stock holds taken at checkout: all-or-nothing reservation,
+conversion into a sale by TransactionRepository.create, explicit release,
+the expiry sweep, and concurrent checkouts competing for the last units.
+Uses a temporary SQLite database.
+"""
+
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Pokemon,
+    InventoryReservation,
+    Transaction,
+    TransactionRepository,
+    ReservationRepository,
+    InsufficientStockError,
+)
+from conftest import temp_session_factory
+
+
+def make_session_factory(stock: int = 10):
+    """Create a temporary database with Pikachu and Charmander in stock"""
+    factory = temp_session_factory("reservations_test_")
+
+    with factory() as db:
+        for numero, nombre, precio in [(4, "charmander", 100), (25, "pikachu", 25)]:
+            db.add(Pokemon(
+                numero=numero, nombre=nombre, precio=precio,
+                inventario_total=stock, inventario_disponible=stock, inventario_vendido=0
+            ))
+        db.commit()
+
+    return factory
+
+
+def stock(db, numero: int):
+    """(disponible, vendido) for a Pokemon, read fresh from the DB"""
+    db.expire_all()
+    pokemon = db.get(Pokemon, numero)
+    return pokemon.inventario_disponible, pokemon.inventario_vendido
+
+
+def create_sale(db, txn_id: str, items, reservation_ref=None):
+    """Create a completed transaction with the given (numero, qty, price) items"""
+    total = sum(qty * price for _, qty, price in items)
+    cart_mandate = {
+        "contents": {
+            "id": f"cart_{txn_id}",
+            "payment_request": {
+                "details": {
+                    "id": "order_test",
+                    "total": {"label": "Total", "amount": {"currency": "USD", "value": total}},
+                    "displayItems": []
+                }
+            }
+        },
+        "merchantName": "Test Merchant",
+    }
+    payment_mandate = {
+        "payment_mandate_contents": {"payment_response": {"method_name": "CARD"}},
+    }
+    return TransactionRepository(db).create(
+        transaction_id=txn_id,
+        cart_id=f"cart_{txn_id}",
+        cart_mandate=cart_mandate,
+        payment_mandate=payment_mandate,
+        items=[
+            {"pokemon_numero": numero, "quantity": qty, "unit_price": price}
+            for numero, qty, price in items
+        ],
+        reservation_ref=reservation_ref,
+    )
+
+
+def test_reserve_all_or_nothing():
+    """Test 1: Reservations hold stock and fail without partial holds"""
+    print("\n" + "=" * 60)
+    print("Test 1: All-or-Nothing Reservation")
+    print("=" * 60)
+
+    factory = make_session_factory(stock=5)
+    with factory() as db:
+        repo = ReservationRepository(db)
+        repo.reserve("cart:1", [
+            {"pokemon_numero": 25, "quantity": 2},
+            {"pokemon_numero": 4, "quantity": 1},
+        ])
+        assert stock(db, 25) == (3, 0)
+        assert stock(db, 4) == (4, 0)
+        print("✅ Stock held for cart:1")
+
+        # Retrying the same checkout replaces the holds instead of stacking them
+        repo.reserve("cart:1", [{"pokemon_numero": 25, "quantity": 3}])
+        assert stock(db, 25) == (2, 0)
+        assert stock(db, 4) == (5, 0)
+        assert [(h.pokemon_numero, h.quantity) for h in repo.get_holds("cart:1")] == [(25, 3)]
+        print("✅ Re-reserving replaces previous holds")
+
+        try:
+            repo.reserve("cart:2", [
+                {"pokemon_numero": 4, "quantity": 1},
+                {"pokemon_numero": 25, "quantity": 3},
+            ])
+            assert False, "Expected InsufficientStockError"
+        except InsufficientStockError as e:
+            assert e.pokemon_numero == 25
+            print(f"✅ Rejected: {e}")
+
+        assert stock(db, 4) == (5, 0), "Failed reservation must not hold any item"
+        assert repo.get_holds("cart:2") == []
+        print("✅ No partial holds left behind")
+    return True
+
+
+def test_convert_on_charge():
+    """Test 2: A charge converts holds into sold stock exactly once"""
+    print("\n" + "=" * 60)
+    print("Test 2: Convert Holds on Charge")
+    print("=" * 60)
+
+    factory = make_session_factory(stock=10)
+    with factory() as db:
+        repo = ReservationRepository(db)
+        repo.reserve("cart:7", [
+            {"pokemon_numero": 25, "quantity": 3},
+            {"pokemon_numero": 4, "quantity": 2},
+        ])
+
+        # Charge fewer Charmander than were held: the rest goes back
+        create_sale(db, "txn_res_1", [(25, 3, 25.0), (4, 1, 100.0)], reservation_ref="cart:7")
+        assert stock(db, 25) == (7, 3)
+        assert stock(db, 4) == (9, 1)
+        assert db.query(InventoryReservation).count() == 0
+        print("✅ Holds converted, unsold remainder released")
+
+        # Releasing after conversion is a no-op
+        assert repo.release("cart:7") == 0
+        assert stock(db, 25) == (7, 3)
+
+        # Charges without a reservation keep the direct decrement
+        create_sale(db, "txn_res_2", [(25, 1, 25.0)])
+        assert stock(db, 25) == (6, 4)
+        print("✅ Unreserved charges still decrement stock")
+
+        # ...and fail without writing anything when stock runs short
+        try:
+            create_sale(db, "txn_res_3", [(4, 1, 100.0), (25, 7, 25.0)])
+            assert False, "Expected InsufficientStockError"
+        except InsufficientStockError as e:
+            assert (e.pokemon_numero, e.requested) == (25, 7)
+            print(f"✅ Rejected: {e}")
+        assert stock(db, 25) == (6, 4)
+        assert stock(db, 4) == (9, 1)
+        assert db.query(Transaction).filter_by(transaction_id="txn_res_3").count() == 0
+        print("✅ Oversold charge rolled back")
+    return True
+
+
+def test_release_and_sweep():
+    """Test 3: Explicit release and the expiry sweep give stock back"""
+    print("\n" + "=" * 60)
+    print("Test 3: Release and Expiry Sweep")
+    print("=" * 60)
+
+    factory = make_session_factory(stock=10)
+    with factory() as db:
+        repo = ReservationRepository(db)
+        repo.reserve("cart:1", [{"pokemon_numero": 25, "quantity": 2}])
+        assert repo.release("cart:1") == 2
+        assert stock(db, 25) == (10, 0)
+        print("✅ Released cart:1")
+
+        for i in range(5):
+            repo.reserve(f"cart:expired:{i}", [{"pokemon_numero": 25, "quantity": 1}])
+        repo.reserve("cart:live", [{"pokemon_numero": 4, "quantity": 4}])
+        assert stock(db, 25) == (5, 0)
+
+        past = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=1)
+        db.query(InventoryReservation).filter(
+            InventoryReservation.reservation_ref.like("cart:expired:%")
+        ).update({"expires_at": past}, synchronize_session=False)
+        db.commit()
+
+        assert repo.release_expired(batch_size=2) == 5
+        assert stock(db, 25) == (10, 0)
+        assert stock(db, 4) == (6, 0), "Live holds must survive the sweep"
+        assert repo.release_expired() == 0
+        print("✅ Sweep released 5 expired holds in batches of 2")
+    return True
+
+
+def test_concurrent_checkouts():
+    """Test 4: Concurrent reservations never oversell"""
+    print("\n" + "=" * 60)
+    print("Test 4: Concurrent Checkouts")
+    print("=" * 60)
+
+    factory = make_session_factory(stock=3)
+    results = []
+    lock = threading.Lock()
+
+    def checkout(i: int):
+        with factory() as db:
+            try:
+                ReservationRepository(db).reserve(
+                    f"cart:{i}", [{"pokemon_numero": 25, "quantity": 1}]
+                )
+                outcome = True
+            except InsufficientStockError:
+                outcome = False
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 3, results
+    with factory() as db:
+        assert stock(db, 25) == (0, 0)
+        assert db.query(InventoryReservation).count() == 3
+    print(f"✅ 3 of 10 concurrent checkouts reserved, 7 failed fast")
+    return True
+
+
+def main():
+    """Run all inventory reservation tests"""
+    tests = [
+        ("All-or-Nothing Reservation", test_reserve_all_or_nothing),
+        ("Convert Holds on Charge", test_convert_on_charge),
+        ("Release and Expiry Sweep", test_release_and_sweep),
+        ("Concurrent Checkouts", test_concurrent_checkouts),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test Load Harness
+
+Tests the offline load-testing pieces: the fake PokeAPI answering what the
+MCP server reads, the AP2 step timings of the checkout (Server-Timing) and
+their parsing, latency summaries, and the comparison of saved results.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+sys.path.insert(0, str(AP2_DIR))
+sys.path.insert(0, str(AP2_DIR / "benchmarks"))
+
+from fake_pokeapi import create_app
+from loadtest import compare, parse_server_timing, summarize
+from src.shopping_agent.web_ui import AP2StepTimer
+
+
+def test_fake_pokeapi():
+    """Test 1: PokeAPI stand-in serves the fields the MCP server reads"""
+    print("\n" + "=" * 60)
+    print("Test 1: Fake PokeAPI")
+    print("=" * 60)
+
+    client = TestClient(create_app())
+    pikachu = client.get("/api/v2/pokemon/pikachu").json()
+    assert pikachu["id"] == 25 and client.get("/api/v2/pokemon/25").json() == pikachu
+    assert [t["type"]["name"] for t in pikachu["types"]] == ["electric"]
+    assert {s["stat"]["name"] for s in pikachu["stats"]} >= {"hp", "attack", "speed"}
+    assert pikachu["sprites"]["front_default"].endswith("/pokemon/25.png")
+    assert client.get("/api/v2/pokemon/missingno").status_code == 404
+    print("   ✓ /pokemon/{id or name}: types, stats, sprites")
+
+    types = [t["name"] for t in client.get("/api/v2/type").json()["results"]]
+    assert "fire" in types and "shadow" not in types
+    fire = [p["pokemon"]["name"] for p in client.get("/api/v2/type/fire").json()["pokemon"]]
+    assert "charmander" in fire and "pikachu" not in fire
+    print(f"✅ /type lists {len(types)} types; /type/fire lists {len(fire)} Pokemon")
+    return True
+
+
+def test_step_timings():
+    """Test 2: Checkout step durations round-trip through Server-Timing"""
+    print("\n" + "=" * 60)
+    print("Test 2: AP2 Step Timings")
+    print("=" * 60)
+
+    timer = AP2StepTimer()
+    with timer.step("cart_mandate"):
+        time.sleep(0.01)
+    try:
+        with timer.step("charge"):
+            raise RuntimeError("declined")
+    except RuntimeError:
+        pass
+    header = timer.header()
+    timings = parse_server_timing(header)
+    assert list(timings) == ["cart_mandate", "charge"] and timings["cart_mandate"] >= 10, header
+    assert parse_server_timing("") == {} and parse_server_timing("cache, db;dur=2.5;desc=x") == {"db": 2.5}
+    print(f"✅ {header}")
+    return True
+
+
+def test_summaries_and_compare():
+    """Test 3: Percentile summaries and result comparison"""
+    print("\n" + "=" * 60)
+    print("Test 3: Summaries and Compare")
+    print("=" * 60)
+
+    summary = summarize([float(ms) for ms in range(1, 101)], errors=2)
+    assert summary["count"] == 100 and summary["errors"] == 2 and summary["max"] == 100
+    assert summary["p50"] == 50.5 and summary["p99"] == 99.01
+    assert summarize([]) == {"count": 0, "errors": 0}
+    print(f"   ✓ 1..100 ms: p50 {summary['p50']}, p95 {summary['p95']}, p99 {summary['p99']}")
+
+    def result(p50, rate):
+        return {
+            "endpoints": {"GET /api/cart": {"p50": p50, "p95": p50 * 2, "p99": p50 * 3}},
+            "ap2_steps": {"charge": {"p50": 10.0, "p95": 20.0, "p99": 30.0}},
+            "throughput": {"journeys_per_second": rate},
+        }
+
+    rows = {(section, name, metric): change for section, name, metric, _, _, change in compare(result(20.0, 4.0), result(10.0, 5.0))}
+    assert rows[("endpoints", "GET /api/cart", "p50")] == -50
+    assert rows[("ap2_steps", "charge", "p99")] == 0
+    assert rows[("throughput", "journeys", "per_s")] == 25
+    print("✅ Changes per endpoint, AP2 step and throughput")
+    return True
+
+
+def main():
+    """Run all load harness tests"""
+    tests = [
+        ("Fake PokeAPI", test_fake_pokeapi),
+        ("AP2 Step Timings", test_step_timings),
+        ("Summaries and Compare", test_summaries_and_compare),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
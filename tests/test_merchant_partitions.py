@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Test Merchant Partitions
+
+Tests multi-merchant hosting (src/database/merchants.py): one partition
+database per registered merchant with the same numero listed independently,
+per-merchant catalog snapshots and outbox records, cart signatures checked
+against the key registered for their issuer, and routing and
+configuration errors and LRU eviction of open partitions. Uses temporary SQLite databases.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import jwt
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common import JWTValidationError, JWTValidator, MerchantKeyring
+from src.database import (
+    DEFAULT_MERCHANT_ID,
+    Base,
+    Pokemon,
+    MerchantRepository,
+    MerchantRouter,
+    PokemonRepository,
+    TransactionRepository,
+    UnknownMerchantError,
+    UnsupportedDatabaseError,
+    catalog_snapshot,
+    merchant_router,
+    run_migrations,
+)
+from src.database.engine import make_engine, make_read_engine
+from src.events import OutboxPublisher, SegmentedLog
+
+
+def make_main(url=None):
+    """Main database with the merchant registry; returns (engine, directory)"""
+    directory = Path(tempfile.mkdtemp(prefix="merchant_partitions_test_"))
+    engine = make_engine(url or f"sqlite:///{directory / 'main.db'}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    make_read_engine(engine)
+    return engine, directory
+
+
+def register(engine, keyring, merchant_id, name=None):
+    """Register a merchant with its keyring key"""
+    with Session(engine) as db:
+        MerchantRepository(db).register(merchant_id, name or merchant_id, keyring.public_key_pem(merchant_id))
+
+
+def add_pikachu(partition, stock, price):
+    """List Pikachu (#25) in a merchant's partition"""
+    with partition.SessionLocal() as db:
+        db.add(Pokemon(
+            numero=25, nombre="pikachu", precio=price, en_venta=True,
+            inventario_total=stock, inventario_disponible=stock, inventario_vendido=0
+        ))
+        db.commit()
+
+
+def test_partition_isolation():
+    """Test 1: Same numero listed by two merchants, independently"""
+    print("\n" + "=" * 60)
+    print("Test 1: Partition Isolation")
+    print("=" * 60)
+
+    engine, directory = make_main()
+    keyring = MerchantKeyring(directory / "keys")
+    for merchant_id in ("kanto", "johto"):
+        register(engine, keyring, merchant_id)
+
+    router = merchant_router(engine)
+    assert router is merchant_router(Session(engine))
+    kanto, johto = router.partition("kanto"), router.partition("johto")
+    assert router.partition(None).engine is engine and router.partition(DEFAULT_MERCHANT_ID).engine is engine
+    assert kanto.engine.url.database == str(directory / "main_merchants" / "kanto.db")
+    assert kanto.read_engine.url.query["mode"] == "ro"
+    print(f"   ✓ Partitions: {sorted(p.name for p in (directory / 'main_merchants').iterdir())}")
+
+    add_pikachu(kanto, stock=5, price=30)
+    add_pikachu(johto, stock=50, price=20)
+
+    with kanto.SessionLocal() as db:
+        TransactionRepository(db).create(
+            transaction_id="txn_kanto", cart_id="cart_kanto",
+            cart_mandate={"contents": {"payment_request": {"details": {
+                "total": {"amount": {"value": 60, "currency": "USD"}}
+            }}}},
+            payment_mandate={"payment_mandate_contents": {"payment_response": {"method_name": "CARD"}}},
+            items=[{"pokemon_numero": 25, "quantity": 2, "unit_price": 30}]
+        )
+    with kanto.ReadSessionLocal() as a, johto.ReadSessionLocal() as b:
+        assert catalog_snapshot(a) is not catalog_snapshot(b)
+        assert PokemonRepository(a).get_by_numero(25).inventario_disponible == 3
+        assert PokemonRepository(b).get_by_numero(25).inventario_disponible == 50
+        assert PokemonRepository(b).get_by_numero(25).precio == 20
+        assert TransactionRepository(b).get_by_id("txn_kanto") is None
+    with Session(engine) as db:
+        assert db.get(Pokemon, 25) is None
+    print("   ✓ (kanto, 25) sold 2; (johto, 25) and the main catalog untouched")
+
+    log = SegmentedLog(directory / "sales_log")
+    assert OutboxPublisher(kanto.SessionLocal, log, merchant_id="kanto").publish_pending() == 1
+    record = json.loads(log.read(0)[0].value)
+    assert record["merchant_id"] == "kanto" and record["aggregate_id"] == "txn_kanto"
+    log.close()
+    print("✅ Separate stock, snapshots, transactions and tagged sales events")
+    return True
+
+
+def test_issuer_keys():
+    """Test 2: Cart signatures verified with the key of their issuer"""
+    print("\n" + "=" * 60)
+    print("Test 2: Issuer Keys")
+    print("=" * 60)
+
+    engine, directory = make_main()
+    keyring = MerchantKeyring(directory / "keys")
+    register(engine, keyring, "kanto", "Kanto Shop")
+    register(engine, keyring, "johto", "Johto Shop")
+    assert oct((directory / "keys" / "kanto_private.pem").stat().st_mode & 0o777) == "0o600"
+    assert MerchantKeyring(directory / "keys").public_key_pem("kanto") == keyring.public_key_pem("kanto")
+
+    def resolver(issuer):
+        with Session(engine) as db:
+            merchant = MerchantRepository(db).get_by_issuer(issuer)
+            return (merchant.merchant_id, merchant.public_key) if merchant else None
+
+    validator = JWTValidator(issuer_resolver=resolver)
+
+    def cart(signature, cart_id="cart_1"):
+        return {"contents": {"id": cart_id}, "merchant_signature": signature}
+
+    token = keyring.sign_cart("kanto", "kanto", "cart_1", "Kanto Shop")
+    assert jwt.get_unverified_header(token)["kid"] == "kanto"
+    payload = validator.validate_merchant_signature(cart(token))
+    assert payload["merchant_id"] == "kanto" and payload["iss"] == "kanto"
+    print("   ✓ Signature verified with the registered key of its issuer")
+
+    forgeries = {
+        "johto key, kanto issuer": keyring.sign_cart("johto", "kanto", "cart_1", "Kanto Shop"),
+        "kanto key, johto merchant_id": jwt.encode(
+            {**jwt.decode(token, options={"verify_signature": False}), "merchant_id": "johto"},
+            keyring.private_key_pem("kanto"), algorithm="RS256"
+        ),
+        "unknown issuer": keyring.sign_cart("kanto", "sinnoh", "cart_1", "Sinnoh"),
+        "other cart": keyring.sign_cart("kanto", "kanto", "cart_2", "Kanto Shop"),
+    }
+    for label, forged in forgeries.items():
+        try:
+            validator.validate_merchant_signature(cart(forged))
+        except JWTValidationError as e:
+            print(f"   ✓ Rejected {label}: {e}")
+        else:
+            raise AssertionError(f"{label} should be rejected")
+    print("✅ Only the issuer's own key validates its carts")
+    return True
+
+
+def test_routing_errors_and_lru():
+    """Test 3: Invalid and unknown merchants, LRU of open partitions"""
+    print("\n" + "=" * 60)
+    print("Test 3: Routing Errors and LRU")
+    print("=" * 60)
+
+    engine, directory = make_main()
+    keyring = MerchantKeyring(directory / "keys")
+    for merchant_id in ("kanto", "johto", "hoenn"):
+        register(engine, keyring, merchant_id)
+
+    router = MerchantRouter(engine, max_open=2)
+    for bad in ("Kanto", "../main", "", "x" * 51):
+        try:
+            router.partition(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} should be invalid")
+    try:
+        router.partition("sinnoh")
+    except UnknownMerchantError:
+        pass
+    else:
+        raise AssertionError("Unregistered merchants should not be routed")
+    assert not (directory / "main_merchants" / "sinnoh.db").exists()
+    print("   ✓ Invalid IDs raise ValueError, unregistered ones UnknownMerchantError")
+
+    # Server main database without MERCHANT_DATABASE_URL: a configuration error
+    unconfigured = MerchantRouter(engine)
+    unconfigured.url_template = None
+    for attempt in (unconfigured.check_configuration, lambda: unconfigured.partition("kanto")):
+        try:
+            attempt()
+        except UnsupportedDatabaseError as e:
+            assert "MERCHANT_DATABASE_URL" in str(e)
+        else:
+            raise AssertionError("Partitions without a URL template should be a configuration error")
+    assert unconfigured.partition(DEFAULT_MERCHANT_ID).engine is engine
+    MerchantRouter(engine).check_configuration()
+    print("   ✓ Missing MERCHANT_DATABASE_URL is reported as a configuration error")
+
+    kanto = router.partition("kanto")
+    add_pikachu(kanto, stock=7, price=10)
+    router.partition("johto")
+    router.partition("kanto")
+    router.partition("hoenn")
+    assert router.open_merchants() == ["kanto", "hoenn"]
+    router.partition("johto")
+    assert router.open_merchants() == ["hoenn", "johto"]
+    with router.read_session("kanto") as db:
+        assert PokemonRepository(db).get_by_numero(25).inventario_disponible == 7
+    print(f"   ✓ At most 2 open, least recently used disposed and reopened: {router.open_merchants()}")
+
+    # Memory main databases get memory partitions, never evicted
+    memory, _ = make_main("sqlite:///file:partitions_test?mode=memory&cache=shared&uri=true")
+    register(memory, keyring, "kanto")
+    register(memory, keyring, "johto")
+    memory_router = MerchantRouter(memory, max_open=1)
+    add_pikachu(memory_router.partition("kanto"), stock=3, price=10)
+    memory_router.partition("johto")
+    with memory_router.read_session("kanto") as db:
+        assert PokemonRepository(db).get_by_numero(25).inventario_disponible == 3
+    print("✅ Routing errors and partition LRU")
+    return True
+
+
+def main():
+    """Run all merchant partition tests"""
+    tests = [
+        ("Partition Isolation", test_partition_isolation),
+        ("Issuer Keys", test_issuer_keys),
+        ("Routing Errors and LRU", test_routing_errors_and_lru),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
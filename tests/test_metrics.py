@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Test Metrics
+
+Tests the Prometheus metrics (src/common/metrics.py): histogram buckets and
+per-thread shards, the text exposition of histograms, gauges and cache
+collectors, the /metrics endpoint of all four agents and MCP call outcomes.
+"""
+
+import asyncio
+import re
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common import TTLCache, utils
+from src.common.mcp_client import MCPClient
+from src.common.metrics import MCP_CALL_SECONDS, MetricsRegistry, register_cache
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def parse(text):
+    """{(name, labels as sorted tuple): value} of an exposition"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        pairs = tuple(sorted(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', labels or "")))
+        samples[(name, pairs)] = float(value)
+    return samples
+
+
+def test_histogram():
+    """Test 1: Buckets, sum and count, exact across threads"""
+    print("\n" + "=" * 60)
+    print("Test 1: Histogram")
+    print("=" * 60)
+
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Test latency", ("route",), buckets=(0.01, 0.1, 1.0))
+    child = latency.labels("/a")
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        child.observe(value)
+    snapshot = child.snapshot()
+    # Upper bounds are inclusive (le)
+    assert snapshot["buckets"] == [2, 3, 4, 5] and snapshot["count"] == 5, snapshot
+    assert abs(snapshot["sum"] - 3.565) < 1e-9
+    print("   ✓ Cumulative buckets with inclusive bounds")
+
+    def observe_many():
+        for _ in range(10000):
+            latency.labels("/b").observe(0.02)
+
+    threads = [threading.Thread(target=observe_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert latency.labels("/b").snapshot()["count"] == 80000
+    print("   ✓ 8 threads x 10000 observations, none lost")
+
+    samples = parse(registry.render())
+    assert samples[("test_seconds_bucket", (("le", "0.1"), ("route", "/a")))] == 3
+    assert samples[("test_seconds_bucket", (("le", "+Inf"), ("route", "/b")))] == 80000
+    assert samples[("test_seconds_count", (("route", "/a"),))] == 5
+    try:
+        latency.labels("/a", "extra")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Wrong label count should be refused")
+
+    registry.reset()
+    assert child.snapshot()["count"] == 0
+    print("✅ Histogram exposition")
+    return True
+
+
+def test_gauge_and_collectors():
+    """Test 2: Gauges, cache hit ratios and failing collectors"""
+    print("\n" + "=" * 60)
+    print("Test 2: Gauges and Collectors")
+    print("=" * 60)
+
+    registry = MetricsRegistry()
+    in_flight = registry.gauge("test_in_flight", "Requests in flight", ("service",))
+    in_flight.labels("a").inc()
+    in_flight.labels("a").inc()
+    in_flight.labels("a").dec()
+    assert in_flight.labels("a").value == 1
+
+    cache = TTLCache(max_size=2)
+    register_cache("receipts", cache, registry=registry)
+    cache.set("a", 1)
+    cache.get("a"), cache.get("a"), cache.get("b")
+
+    def broken():
+        raise RuntimeError("collector down")
+
+    registry.add_collector("broken", broken)
+    text = registry.render()
+    samples = parse(text)
+    assert samples[("test_in_flight", (("service", "a"),))] == 1
+    assert samples[("ap2_cache_hits_total", (("cache", "receipts"),))] == 2
+    assert samples[("ap2_cache_misses_total", (("cache", "receipts"),))] == 1
+    assert round(samples[("ap2_cache_hit_ratio", (("cache", "receipts"),))], 4) == 0.6667
+    assert "# TYPE ap2_cache_hits_total counter" in text
+    print("✅ Gauge, cache collector, and a failing collector skipped")
+    return True
+
+
+def test_agent_endpoints():
+    """Test 3: /metrics on the shopping agent, merchant, credentials and processor"""
+    print("\n" + "=" * 60)
+    print("Test 3: Agent Endpoints")
+    print("=" * 60)
+
+    from src.credentials_provider.server import app as credentials_app
+    from src.merchant_agent.server import app as merchant_app
+    from src.payment_processor.server import app as processor_app
+    from src.shopping_agent.web_ui import app as web_app
+
+    apps = {
+        "shopping_agent": (web_app, "/health"),
+        "merchant_agent": (merchant_app, "/health"),
+        "credentials_provider": (credentials_app, "/a2a/credentials_provider/payment_methods"),
+        "payment_processor": (processor_app, "/health"),
+    }
+    for service, (app, path) in apps.items():
+        client = TestClient(app)
+        assert client.get(path).status_code == 200, (service, path)
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        key = ("ap2_http_request_duration_seconds_count", tuple(sorted({
+            "service": service, "method": "GET", "route": path, "status": "200",
+        }.items())))
+        assert parse(response.text).get(key, 0) >= 1, f"{service}: no sample for {path}"
+        print(f"   ✓ {service}: GET {path} recorded")
+
+    utils.generate_user_authorization("cart_hash", "payment_hash")
+    samples = parse(TestClient(processor_app).get("/metrics").text)
+    assert samples[("ap2_jwt_duration_seconds_count", (("operation", "sign"), ("token", "user")))] >= 1
+    assert samples.get(("ap2_db_statement_duration_seconds_count", (("verb", "SELECT"),)), 0) >= 1
+    assert any(name == "ap2_endpoint_db_queries_total" for name, _ in samples)
+    assert ("ap2_cache_hit_ratio", (("cache", "receipts"),)) in samples
+    print("✅ JWT, SQL statement, per-endpoint and cache metrics exposed")
+    return True
+
+
+def test_mcp_outcome():
+    """Test 4: Failed MCP tool calls are counted as errors"""
+    print("\n" + "=" * 60)
+    print("Test 4: MCP Outcome")
+    print("=" * 60)
+
+    class Session:
+        """MCP session answering with a fixed result"""
+
+        def __init__(self, result):
+            self.result = result
+
+        async def call_tool(self, name, arguments, **kwargs):
+            return self.result
+
+    results = {
+        "ok": SimpleNamespace(content=[], is_error=False),
+        "error": SimpleNamespace(content=[], is_error=True),
+        "legacy error": SimpleNamespace(content=[], isError=True),
+    }
+    mcp = MCPClient("unused.js")
+    for label, result in results.items():
+        outcome = label.split()[-1]
+        before = MCP_CALL_SECONDS.labels("metrics_test", outcome).snapshot()["count"]
+        mcp.session = Session(result)
+        asyncio.run(mcp.call_tool("metrics_test", {}))
+        assert MCP_CALL_SECONDS.labels("metrics_test", outcome).snapshot()["count"] == before + 1, label
+        print(f"   ✓ {label} result -> outcome={outcome}")
+    print("✅ is_error (mcp 2.x) and isError both count as errors")
+    return True
+
+
+def main():
+    """Run all metrics tests"""
+    tests = [
+        ("Histogram", test_histogram),
+        ("Gauges and Collectors", test_gauge_and_collectors),
+        ("Agent Endpoints", test_agent_endpoints),
+        ("MCP Outcome", test_mcp_outcome),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
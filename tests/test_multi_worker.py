@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Test Multi-Worker
+
+Tests running the agents with several uvicorn workers (src/common/launcher.py):
+worker, loop and parser selection, the shared-nothing state audit of the
+server modules, the lease-gated sales log writer, and the state workers
+share through the database and local files (issued carts, demo keys).
+Uses temporary SQLite databases.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common import MerchantKeyring
+from src.common.launcher import audit_servers, audit_worker_state, resolve_http, resolve_loop, uvicorn_options
+from src.database import (
+    Base,
+    LeaseRepository,
+    MerchantRepository,
+    SignedCartRepository,
+    TransactionRepository,
+    merchant_router,
+    run_migrations,
+)
+from src.database.engine import make_engine
+from src.events import LeasedOutboxPublisher, SegmentedLog
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+
+UNDECLARED_MODULE = """
+WORKER_STATE = {"declared": "fine per worker"}
+declared = {}
+counts = {}
+LIMIT = 10
+NAMES = ("a", "b")
+client = None
+
+def connect():
+    global client
+    client = object()
+"""
+
+
+def make_db():
+    """Main database with migrations; returns (engine, directory)"""
+    directory = Path(tempfile.mkdtemp(prefix="multi_worker_test_"))
+    engine = make_engine(f"sqlite:///{directory / 'main.db'}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine, directory
+
+
+def record_sale(session_factory, transaction_id):
+    """Completed transaction (one sales_outbox row)"""
+    with session_factory() as db:
+        TransactionRepository(db).create(
+            transaction_id=transaction_id, cart_id=f"cart_{transaction_id}",
+            cart_mandate={"contents": {"payment_request": {"details": {
+                "total": {"amount": {"value": 10, "currency": "USD"}}
+            }}}},
+            payment_mandate={"payment_mandate_contents": {"payment_response": {"method_name": "CARD"}}},
+            items=[]
+        )
+
+
+def test_uvicorn_options():
+    """Test 1: WORKERS, UVICORN_LOOP and UVICORN_HTTP"""
+    print("\n" + "=" * 60)
+    print("Test 1: Uvicorn Options")
+    print("=" * 60)
+
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    assert resolve_loop("auto") == ("uvloop" if has_uvloop else "asyncio")
+    assert resolve_http("auto") == ("httptools" if has_httptools else "h11")
+    assert resolve_loop("asyncio") == "asyncio" and resolve_http("h11") == "h11"
+    print(f"   ✓ auto -> {resolve_loop()} loop, {resolve_http()} parser")
+
+    os.environ.update(WORKERS="4", UVICORN_LOOP="asyncio")
+    try:
+        options = uvicorn_options()
+        assert options == {"workers": 4, "loop": "asyncio", "http": resolve_http()}, options
+        assert uvicorn_options(workers=2)["workers"] == 2
+    finally:
+        del os.environ["WORKERS"], os.environ["UVICORN_LOOP"]
+    assert uvicorn_options()["workers"] == 1
+    print("   ✓ Settings from the environment, arguments take precedence")
+
+    for bad in ({"workers": 0}, {"loop": "trio"}, {"http": "h2"}):
+        try:
+            uvicorn_options(**bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad} should be refused")
+    print("✅ Uvicorn options")
+    return True
+
+
+def test_state_audit():
+    """Test 2: Server modules declare all their per-worker state"""
+    print("\n" + "=" * 60)
+    print("Test 2: State Audit")
+    print("=" * 60)
+
+    report = audit_servers()
+    assert report == {}, report
+    print("   ✓ Every server module declares its module state")
+
+    directory = Path(tempfile.mkdtemp(prefix="multi_worker_test_"))
+    path = directory / "undeclared_server.py"
+    path.write_text(UNDECLARED_MODULE)
+    spec = importlib.util.spec_from_file_location("undeclared_server", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    undeclared = audit_worker_state(module)
+    assert undeclared == {"counts": "dict", "client": "NoneType"}, undeclared
+    print(f"   ✓ Flags undeclared containers and rebound globals: {sorted(undeclared)}")
+    print("✅ State audit")
+    return True
+
+
+def test_leased_publisher():
+    """Test 3: One sales log writer among workers, with takeover"""
+    print("\n" + "=" * 60)
+    print("Test 3: Leased Outbox Publisher")
+    print("=" * 60)
+
+    engine, directory = make_db()
+    keyring = MerchantKeyring(directory / "keys")
+    with Session(engine) as db:
+        MerchantRepository(db).register("kanto", "Kanto", keyring.public_key_pem("kanto"))
+    kanto = merchant_router(engine).partition("kanto")
+
+    def session_factory():
+        return Session(engine)
+
+    log_dir = directory / "sales_events"
+    first = LeasedOutboxPublisher(session_factory, log_dir, lease_seconds=60)
+    second = LeasedOutboxPublisher(session_factory, log_dir, lease_seconds=60)
+
+    record_sale(session_factory, "txn_main_1")
+    record_sale(kanto.SessionLocal, "txn_kanto_1")
+    assert first.tick() == {"leader": True, "published": 2}
+    assert second.tick() == {"leader": False, "published": 0}
+    assert first.leader and not second.leader
+    print("   ✓ Lease holder drains the main and merchant outboxes; the other stands by")
+
+    first.stop()
+    assert not first.leader
+    record_sale(session_factory, "txn_main_2")
+    assert second.tick() == {"leader": True, "published": 1}
+    stats = second.stats()
+    assert stats["leader"] and stats["next_offset"] == 3 and stats["pending"] == 0, stats
+    second.stop()
+
+    log = SegmentedLog(log_dir)
+    records = [json.loads(record.value) for record in log.read(0)]
+    log.close()
+    assert [r["aggregate_id"] for r in records] == ["txn_main_1", "txn_kanto_1", "txn_main_2"]
+    assert [r.get("merchant_id") for r in records] == [None, "kanto", None]
+    print("   ✓ Takeover continues the same log (offsets 0-2, no duplicates)")
+
+    # Lease lost while draining a backlog: the holder stops after the batch in flight
+    for n in range(3, 6):
+        record_sale(session_factory, f"txn_main_{n}")
+    sessions = []
+
+    def stolen_after_first_batch():
+        sessions.append(None)
+        if len(sessions) == 2:  # the first batch's session (after the lease check)
+            with Session(engine) as db:
+                leases = LeaseRepository(db)
+                leases.release(LeasedOutboxPublisher.LEASE_NAME, draining.owner)
+                assert leases.acquire(LeasedOutboxPublisher.LEASE_NAME, "other-worker", 300)
+            draining._renewed_at = 0.0  # as if a third of the lease had passed
+        return Session(engine)
+
+    draining = LeasedOutboxPublisher(stolen_after_first_batch, log_dir, lease_seconds=60, batch_size=1)
+    assert draining.tick() == {"leader": False, "published": 1}
+    assert not draining.leader and draining.pending_count() == 2
+    print("✅ A lost lease stops the drain and closes the log before the next batch")
+    return True
+
+
+def test_shared_state():
+    """Test 4: Carts and demo keys are visible to every worker"""
+    print("\n" + "=" * 60)
+    print("Test 4: Shared State")
+    print("=" * 60)
+
+    engine, directory = make_db()
+    with Session(engine) as db:
+        SignedCartRepository(db).save("cart_1", {"contents": {"id": "cart_1"}})
+        SignedCartRepository(db).save("cart_2", {"contents": {"id": "cart_2"}})
+    with Session(engine) as db:
+        repo = SignedCartRepository(db)
+        assert repo.get("cart_1") == {"contents": {"id": "cart_1"}}
+        assert repo.get("cart_3") is None
+        assert repo.count() == 2 and len(repo.get_all(limit=1)) == 1
+    print("   ✓ Issued carts read back from the database")
+
+    # Two processes starting with the same key directory: same demo keys
+    script = (
+        "from src.common import utils; "
+        "print(utils.USER_PRIVATE_PEM == open(utils.DEMO_KEYS_DIR / 'user_private.pem', 'rb').read(), "
+        "utils.USER_PUBLIC_KEY.public_numbers().n % 1000003)"
+    )
+    env = dict(os.environ, DEMO_KEYS_DIR=str(directory / "demo_keys"))
+    outputs = [
+        subprocess.run(
+            [sys.executable, "-c", script], cwd=AP2_DIR, env=env,
+            capture_output=True, text=True, timeout=60, check=True
+        ).stdout.split()
+        for _ in range(2)
+    ]
+    assert outputs[0] == outputs[1] and outputs[0][0] == "True", outputs
+    assert oct((directory / "demo_keys" / "user_private.pem").stat().st_mode & 0o777) == "0o600"
+    print("✅ Demo keys created once and loaded by the next process")
+    return True
+
+
+def main():
+    """Run all multi-worker tests"""
+    tests = [
+        ("Uvicorn Options", test_uvicorn_options),
+        ("State Audit", test_state_audit),
+        ("Leased Outbox Publisher", test_leased_publisher),
+        ("Shared State", test_shared_state),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test Name Index
+
+Tests the prefix trie + trigram name index behind /api/search?query=:
+prefix, typo-tolerant, multi-term and number lookups, ranking tiers,
+lookup latency and rebuilds when the catalog changes. Uses a temporary
+SQLite database.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import Pokemon, PokemonRepository, NameIndex, name_index
+from src.database.catalog_search import load_species
+from conftest import temp_session_factory
+
+
+def make_session_factory():
+    """Create a temporary database with all 151 species"""
+    factory = temp_session_factory("name_index_test_")
+
+    with factory() as db:
+        for numero, species in load_species().items():
+            db.add(Pokemon(
+                numero=numero, nombre=species["nombre"], precio=100,
+                inventario_total=5, inventario_disponible=5, inventario_vendido=0
+            ))
+        db.commit()
+
+    return factory
+
+
+def names(index: NameIndex, query: str, limit: int = 5):
+    return [index.names[numero] for numero, _ in index.lookup(query, limit=limit)]
+
+
+def test_lookups():
+    """Test 1: Prefix, typo, multi-term and number lookups"""
+    print("\n" + "=" * 60)
+    print("Test 1: Lookups")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        index = name_index(db)
+
+    cases = {
+        "pikachu": "pikachu",        # exact
+        "PIKA": "pikachu",           # prefix, case-insensitive
+        "pikchu": "pikachu",         # missing letter
+        "charzard": "charizard",     # typo
+        "bulbsaur": "bulbasaur",     # typo
+        "mime": "mr-mime",           # prefix of a name part
+        "mr. mime": "mr-mime",       # multi-term joined with "-"
+        "25": "pikachu",             # numero
+        "#150": "mewtwo",
+    }
+    for query, expected in cases.items():
+        got = names(index, query)
+        assert got and got[0] == expected, (query, got)
+        print(f"   ✓ {query!r:<12} -> {got[:3]}")
+
+    both = names(index, "pika squirt", limit=10)
+    assert {"pikachu", "squirtle"} <= set(both[:2]), both
+    assert set(names(index, "nido", limit=10)) == {
+        "nidoran-f", "nidorina", "nidoqueen", "nidoran-m", "nidorino", "nidoking"
+    }
+    assert names(index, "xyzzy") == []
+    assert names(index, "  ,  ") == []
+    print("✅ All lookups return the expected best match")
+    return True
+
+
+def test_ranking_tiers():
+    """Test 2: Exact > prefix > name-part prefix > fuzzy"""
+    print("\n" + "=" * 60)
+    print("Test 2: Ranking Tiers")
+    print("=" * 60)
+
+    index = NameIndex([(1, "mew"), (2, "mewtwo"), (3, "mr-mew"), (4, "mewl"), (5, "meow")])
+    ranked = index.lookup("mew", limit=10)
+    assert [numero for numero, _ in ranked][:4] == [1, 4, 2, 3], ranked
+    assert ranked[0][1] > ranked[1][1] > ranked[2][1] > ranked[3][1]
+    print(f"   ✓ {[(index.names[n], round(s, 2)) for n, s in ranked]}")
+
+    assert all(score < 1.0 for numero, score in index.lookup("meuw", limit=10))
+    print("✅ Score tiers never overlap")
+    return True
+
+
+def test_lookup_latency():
+    """Test 3: Lookups take microseconds"""
+    print("\n" + "=" * 60)
+    print("Test 3: Lookup Latency")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        index = name_index(db)
+
+    queries = ["pika", "charzard", "mr mime", "nido", "25", "bulbsaur"]
+    runs = 2000
+    start = time.perf_counter()
+    for _ in range(runs):
+        for query in queries:
+            index.lookup(query)
+    per_lookup = (time.perf_counter() - start) / (runs * len(queries))
+    print(f"📊 {per_lookup * 1e6:.1f} µs per lookup")
+    assert per_lookup < 0.001
+    print("✅ Well under a millisecond")
+    return True
+
+
+def test_rebuilt_on_catalog_change():
+    """Test 4: Renames rebuild the index; stock writes reuse it"""
+    print("\n" + "=" * 60)
+    print("Test 4: Rebuilt on Catalog Change")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        repo = PokemonRepository(db)
+        first = name_index(db)
+
+        assert repo.decrease_stock(25, 1)
+        assert name_index(db) is first
+        print("   ✓ Stock write: same index")
+
+        repo.get_for_update(25).nombre = "pikachu-libre"
+        db.commit()
+        second = name_index(db)
+        assert second is not first
+        assert names(second, "libre") == ["pikachu-libre"]
+        print("   ✓ Rename: new index")
+
+        db.add(Pokemon(numero=152, nombre="chikorita", precio=1,
+                       inventario_total=1, inventario_disponible=1))
+        db.commit()
+        assert names(name_index(db), "chiko") == ["chikorita"]
+        print("   ✓ New Pokemon indexed")
+    print("✅ Index follows the catalog")
+    return True
+
+
+def main():
+    """Run all name index tests"""
+    tests = [
+        ("Lookups", test_lookups),
+        ("Ranking Tiers", test_ranking_tiers),
+        ("Lookup Latency", test_lookup_latency),
+        ("Rebuilt on Catalog Change", test_rebuilt_on_catalog_change),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
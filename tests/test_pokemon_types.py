@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test Pokemon Types
+
+Tests the local pokemon_types table: population from the offline species
+data, type-filtered PokemonRepository.search as one indexed join, the
+type list and the migration for existing databases. Uses a temporary
+SQLite database.
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Pokemon,
+    PokemonType,
+    PokemonRepository,
+    populate_pokemon_types,
+    run_migrations,
+)
+from src.database.catalog import load_species
+from conftest import temp_session_factory
+
+
+def make_session_factory(populate: bool = True):
+    """Create a temporary database with all 151 species"""
+    factory = temp_session_factory("pokemon_types_test_")
+    engine = factory.kw["bind"]
+
+    with factory() as db:
+        for numero, species in load_species().items():
+            db.add(Pokemon(
+                numero=numero, nombre=species["nombre"], precio=numero * 3,
+                en_venta=numero % 7 != 0,
+                inventario_total=5, inventario_disponible=numero % 4, inventario_vendido=0
+            ))
+        db.commit()
+
+    if populate:
+        with engine.begin() as conn:
+            populate_pokemon_types(conn)
+    return factory
+
+
+def test_populated_from_species():
+    """Test 1: One row per type, idempotent"""
+    print("\n" + "=" * 60)
+    print("Test 1: Populated From Species Data")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    expected = sum(len(s["types"]) for s in load_species().values())
+
+    with factory() as db:
+        assert db.query(PokemonType).count() == expected
+        charizard = db.query(PokemonType).filter_by(pokemon_numero=6).order_by(PokemonType.slot)
+        assert [(t.slot, t.type_name) for t in charizard] == [(1, "fire"), (2, "flying")]
+
+    with engine.begin() as conn:
+        assert populate_pokemon_types(conn) == 0
+    print(f"✅ {expected} rows; second run inserts nothing")
+
+    with factory() as db:
+        db.execute(text("DELETE FROM pokemon WHERE numero = 6"))
+        db.commit()
+        assert db.query(PokemonType).filter_by(pokemon_numero=6).count() == 0
+    print("✅ Rows deleted with their Pokemon")
+    return True
+
+
+def test_type_search_is_one_join():
+    """Test 2: search(type=...) is one indexed query matching the species data"""
+    print("\n" + "=" * 60)
+    print("Test 2: Type Search Is One Join")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    species = load_species()
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    )
+
+    with factory() as db:
+        repo = PokemonRepository(db)
+        repo.get_by_numero(1)  # warm the catalog snapshot
+        cases = [
+            dict(type="fire"),
+            dict(type="Water", only_available=True),
+            dict(type="flying", min_price=100, max_price=400, limit=4),
+            dict(type="dragon", limit=1),
+        ]
+        for kwargs in cases:
+            statements.clear()
+            results = repo.search(**kwargs)
+            queries = [s for s, _ in statements if "catalog_version" not in s]
+            assert len(queries) == 1 and "JOIN pokemon_types" in queries[0], queries
+            sql, params = next((s, p) for s, p in statements if "pokemon_types" in s)
+
+            type_name = kwargs["type"].lower()
+            expected = [
+                p.numero for p in db.query(Pokemon).order_by(Pokemon.numero)
+                if type_name in species[p.numero]["types"]
+                and p.precio >= kwargs.get("min_price", 0)
+                and p.precio <= kwargs.get("max_price", 10 ** 9)
+                and (not kwargs.get("only_available") or (p.en_venta and p.inventario_disponible > 0))
+            ][:kwargs.get("limit", 151)]
+            assert [p.numero for p in results] == expected, (kwargs, results)
+            print(f"   ✓ {kwargs} -> {len(results)} results in 1 query")
+
+        assert repo.search(type="shadow") == []
+
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+    print(f"📊 {plan}")
+    assert "ix_pokemon_types_type_name" in plan
+    assert "TEMP B-TREE" not in plan
+    print("✅ Filtered through ix_pokemon_types_type_name")
+    return True
+
+
+def test_type_list():
+    """Test 3: get_types lists every type with its count"""
+    print("\n" + "=" * 60)
+    print("Test 3: Type List")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        types = PokemonRepository(db).get_types()
+
+    counts = {}
+    for data in load_species().values():
+        for type_name in data["types"]:
+            counts[type_name] = counts.get(type_name, 0) + 1
+    assert types == [{"type": t, "count": counts[t]} for t in sorted(counts)]
+    print(f"✅ {len(types)} types, e.g. {types[0]}")
+    return True
+
+
+def test_migration_fills_existing_catalog():
+    """Test 4: Migrating an existing database creates and fills the table"""
+    print("\n" + "=" * 60)
+    print("Test 4: Migration Fills Existing Catalog")
+    print("=" * 60)
+
+    factory = make_session_factory(populate=False)
+    engine = factory.kw["bind"]
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE pokemon_types"))
+
+    assert "0003_pokemon_types" in run_migrations(engine)
+    with factory() as db:
+        assert len(PokemonRepository(db).search(type="electric")) == 9
+        assert db.query(PokemonType).count() == sum(
+            len(s["types"]) for s in load_species().values()
+        )
+    print("✅ Table created and filled from the species data")
+    return True
+
+
+def main():
+    """Run all Pokemon type tests"""
+    tests = [
+        ("Populated From Species Data", test_populated_from_species),
+        ("Type Search Is One Join", test_type_search_is_one_join),
+        ("Type List", test_type_list),
+        ("Migration Fills Existing Catalog", test_migration_fills_existing_catalog),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
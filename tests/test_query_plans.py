@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Test Query Plans
+
+Runs the repository methods on the hot paths against a synthetic
+database, captures the SQL they emit and checks its EXPLAIN QUERY PLAN:
+hot filters must use their composite index and no statement may fall back
+to a full table scan (aggregates over the whole table are listed
+explicitly). Also tests the 0004_hot_query_indexes migration on a
+database with the old single-column indexes, and 0008_unique_cart_items
+on one with duplicate cart lines. Uses temporary SQLite
+databases.
+"""
+
+import re
+import sys
+from pathlib import Path
+
+from sqlalchemy import delete, event, inspect, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Cart,
+    Pokemon,
+    Transaction,
+    PokemonRepository,
+    TransactionRepository,
+    CartRepository,
+    ReservationRepository,
+    catalog_snapshot,
+    run_migrations,
+)
+from src.database.migrations import schema_migrations
+from src.database.synthetic import SyntheticDataGenerator
+from conftest import temp_session_factory
+
+HOT_TABLES = {
+    "pokemon", "carts", "cart_items", "transactions",
+    "transaction_items", "inventory_reservations",
+}
+
+# "SCAN carts" (3.36+) or "SCAN TABLE carts"; "SCAN carts USING INDEX ..." is fine
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+
+def make_session_factory():
+    """Create a temporary database with a few thousand rows per table (snapshot warm)"""
+    factory = temp_session_factory("query_plans_test_")
+    engine = factory.kw["bind"]
+    SyntheticDataGenerator(seed=5).generate(engine, pokemon=3000, carts=3000, transactions=1500)
+
+    # The catalog snapshot loads the whole table once per catalog version
+    with factory() as db:
+        catalog_snapshot(db)
+    return factory
+
+
+def capture(engine, fn):
+    """Run fn and return the (statement, parameters) it executed"""
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+    return statements
+
+
+def query_plan(engine, statement: str, parameters=()) -> list:
+    """EXPLAIN QUERY PLAN detail lines of one statement"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(details: list) -> set:
+    """Hot tables read without an index"""
+    return {
+        match.group(1)
+        for detail in details
+        if (match := _FULL_SCAN.match(detail)) and match.group(1) in HOT_TABLES
+    }
+
+
+def plans_for(factory, fn):
+    """[(statement, plan details)] for the SQL a repository call runs"""
+    engine = factory.kw["bind"]
+    with factory() as db:
+        statements = capture(engine, lambda: fn(db))
+        db.rollback()
+    return [(statement, query_plan(engine, statement, parameters)) for statement, parameters in statements]
+
+
+def test_no_full_scans():
+    """Test 1: Repository methods never scan a hot table without an index"""
+    print("\n" + "=" * 60)
+    print("Test 1: No Full Scans")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        cart = db.query(Cart).filter(Cart.status == "active").first()
+        session_id, cart_id = cart.session_id, cart.id
+        item_id = cart.items[0].id
+        transaction_id = db.query(Transaction.transaction_id).first()[0]
+
+    def reserve_and_release(db):
+        repo = ReservationRepository(db)
+        repo.reserve("cart:plan", [{"pokemon_numero": 25, "quantity": 1}])
+        repo.release("cart:plan")
+        repo.release_expired()
+
+    # (label, call, tables it may scan: aggregates over every row)
+    methods = [
+        ("PokemonRepository.search(type, available)", lambda db: PokemonRepository(db).search(
+            type="fire", only_available=True, max_price=500, limit=20), set()),
+        ("PokemonRepository.get_inventory_stats", lambda db: PokemonRepository(db).get_inventory_stats(),
+            {"pokemon"}),
+        ("PokemonRepository.decrease_stock", lambda db: PokemonRepository(db, autocommit=False).decrease_stock(
+            25, 1), set()),
+        ("TransactionRepository.get_by_id", lambda db: TransactionRepository(db).get_by_id(
+            transaction_id).to_dict(), set()),
+        ("TransactionRepository.get_all", lambda db: TransactionRepository(db).get_all(limit=50), set()),
+        ("TransactionRepository.get_all(status)", lambda db: TransactionRepository(db).get_all(
+            status="completed", limit=50), set()),
+        ("TransactionRepository.get_stats", lambda db: TransactionRepository(db).get_stats(), set()),
+        ("CartRepository.get_cart_by_session", lambda db: CartRepository(db).get_cart_by_session(
+            session_id), set()),
+        ("CartRepository.get_cart_summary", lambda db: CartRepository(db).get_cart_summary(session_id), set()),
+        ("CartRepository.get_or_create_cart", lambda db: CartRepository(db, autocommit=False).get_or_create_cart(
+            session_id), set()),
+        ("CartRepository.add_item", lambda db: CartRepository(db, autocommit=False).add_item(
+            db.get(Cart, cart_id), db.get(Pokemon, 25), 2), set()),
+        ("CartRepository.update_item_quantity", lambda db: CartRepository(db, autocommit=False)
+            .update_item_quantity(item_id, 3), set()),
+        ("CartRepository.remove_item", lambda db: CartRepository(db, autocommit=False).remove_item(item_id), set()),
+        ("CartRepository.clear_cart", lambda db: CartRepository(db, autocommit=False).clear_cart(cart_id), set()),
+        ("CartRepository.expire_due_carts", lambda db: CartRepository(db).expire_due_carts(), set()),
+        ("CartRepository.purge_expired_carts", lambda db: CartRepository(db).purge_expired_carts(), set()),
+        ("CartRepository.get_cart_stats", lambda db: CartRepository(db).get_cart_stats(), set()),
+        ("ReservationRepository.reserve/release", reserve_and_release, set()),
+    ]
+
+    failures = []
+    for label, call, allowed in methods:
+        plans = plans_for(factory, call)
+        assert plans, f"{label} ran no SQL"
+        for statement, details in plans:
+            scanned = full_scans(details) - allowed
+            if scanned:
+                failures.append(f"{label}: full scan of {sorted(scanned)}\n  {statement}\n  {details}")
+        print(f"   ✓ {label}: {len(plans)} statement(s)")
+
+    assert not failures, "\n".join(failures)
+    print("✅ Every hot statement is driven by an index")
+    return True
+
+
+def test_composite_indexes_used():
+    """Test 2: Each hot filter walks its composite index"""
+    print("\n" + "=" * 60)
+    print("Test 2: Composite Indexes Used")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        session_id = db.query(Cart.session_id).filter(Cart.status == "active").first()[0]
+
+    def details(fn):
+        return " | ".join(d for _, plan in plans_for(factory, fn) for d in plan)
+
+    expected = [
+        ("carts by (session_id, status)",
+            lambda db: CartRepository(db).get_cart_by_session(session_id), "ix_carts_session_id"),
+        ("cart_items by (cart_id, pokemon_numero)",
+            lambda db: CartRepository(db).get_cart_summary(session_id), "ux_cart_items_cart_pokemon"),
+        ("transactions by (status, created_at)",
+            lambda db: TransactionRepository(db).get_all(status="completed", limit=20),
+            "ix_transactions_status_created_at"),
+        ("carts by (status, expires_at)",
+            lambda db: CartRepository(db).expire_due_carts(limit=10), "ix_carts_status_expires_at"),
+        ("pokemon by (en_venta, inventario_disponible, precio)",
+            lambda db: PokemonRepository(db).get_inventory_stats(), "ix_pokemon_available_precio"),
+    ]
+    for label, fn, index in expected:
+        plan = details(fn)
+        assert index in plan, f"{label}: expected {index}, got {plan}"
+        print(f"   ✓ {label}: {index}")
+
+    listing = details(lambda db: TransactionRepository(db).get_all(status="failed", limit=20))
+    assert "TEMP B-TREE" not in listing, f"Listing by status should not sort: {listing}"
+
+    engine = factory.kw["bind"]
+    available = " ".join(query_plan(engine,
+        "SELECT numero FROM pokemon WHERE en_venta = 1 AND inventario_disponible > 0 "
+        "AND precio BETWEEN 100 AND 200"))
+    assert "ix_pokemon_available_precio" in available, available
+    print("✅ Listing by status needs no sort; availability + price range is one index search")
+    return True
+
+
+def test_migration_adds_indexes():
+    """Test 3: 0004 adds composites to old databases and drops superseded indexes"""
+    print("\n" + "=" * 60)
+    print("Test 3: Migration Adds Indexes")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+
+    # Database as created before the composite indexes existed
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_transactions_status_created_at"))
+        conn.execute(text("DROP INDEX ix_pokemon_available_precio"))
+        conn.execute(text("CREATE INDEX ix_transactions_status ON transactions (status)"))
+        conn.execute(text("CREATE INDEX ix_carts_status ON carts (status)"))
+        conn.execute(text("CREATE INDEX ix_cart_items_cart_id ON cart_items (cart_id)"))
+
+    before = " ".join(d for _, plan in plans_for(
+        factory, lambda db: TransactionRepository(db).get_all(status="completed", limit=20)) for d in plan)
+    assert "TEMP B-TREE" in before
+    print(f"📋 Before: {before}")
+
+    assert "0004_hot_query_indexes" in run_migrations(engine)
+    indexes = {
+        index["name"]
+        for table in ("pokemon", "transactions", "carts", "cart_items")
+        for index in inspect(engine).get_indexes(table)
+    }
+    assert {"ix_pokemon_available_precio", "ix_transactions_status_created_at"} <= indexes
+    assert not indexes & {"ix_transactions_status", "ix_carts_status", "ix_cart_items_cart_id"}
+    print("   ✓ Composite indexes created; superseded single-column indexes dropped")
+
+    after = " ".join(d for _, plan in plans_for(
+        factory, lambda db: TransactionRepository(db).get_all(status="completed", limit=20)) for d in plan)
+    assert "ix_transactions_status_created_at" in after and "TEMP B-TREE" not in after
+    print(f"📋 After: {after}")
+
+    assert run_migrations(engine) == []
+    print("✅ Migration applied once")
+    return True
+
+
+def test_migration_merges_cart_lines():
+    """Test 4: 0008 merges duplicate cart lines before the unique index"""
+    print("\n" + "=" * 60)
+    print("Test 4: Migration Merges Cart Lines")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    run_migrations(engine)
+
+    # Database from before the unique index: 0004 ran while it was missing
+    # and kept the single-column index; one cart has the same Pokemon twice
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_cart_items_cart_pokemon"))
+        conn.execute(text("CREATE INDEX ix_cart_items_cart_id ON cart_items (cart_id)"))
+        conn.execute(delete(schema_migrations).where(schema_migrations.c.version == "0008_unique_cart_items"))
+        cart_id, numero = conn.execute(text("SELECT cart_id, pokemon_numero FROM cart_items LIMIT 1")).one()
+        conn.execute(text(
+            "INSERT INTO cart_items (cart_id, pokemon_numero, quantity, unit_price, total_price, "
+            "pokemon_name, added_at, updated_at) SELECT cart_id, pokemon_numero, 2, unit_price, "
+            "2 * unit_price, pokemon_name, added_at, updated_at FROM cart_items WHERE cart_id = :c"
+            " AND pokemon_numero = :n"
+        ), {"c": cart_id, "n": numero})
+        conn.execute(text("UPDATE carts SET item_count = item_count + 1 WHERE id = :c"), {"c": cart_id})
+
+    def line(conn):
+        return conn.execute(text(
+            "SELECT COUNT(*), SUM(quantity), ROUND(SUM(total_price), 2) FROM cart_items "
+            "WHERE cart_id = :c AND pokemon_numero = :n"
+        ), {"c": cart_id, "n": numero}).one()
+
+    with engine.connect() as conn:
+        count, quantity, total_price = line(conn)
+    assert count == 2
+
+    assert run_migrations(engine) == ["0008_unique_cart_items"]
+    with engine.connect() as conn:
+        assert tuple(line(conn)) == (1, quantity, total_price)
+        assert conn.execute(text(
+            "SELECT item_count = (SELECT COUNT(*) FROM cart_items WHERE cart_id = carts.id) "
+            "FROM carts WHERE id = :c"
+        ), {"c": cart_id}).scalar() == 1
+    indexes = {index["name"] for index in inspect(engine).get_indexes("cart_items")}
+    assert "ux_cart_items_cart_pokemon" in indexes and "ix_cart_items_cart_id" not in indexes
+    print(f"   ✓ 2 lines merged into 1 ({quantity} units); unique index created, old index dropped")
+
+    with factory() as db:
+        carts = CartRepository(db)
+        cart = db.get(Cart, cart_id)
+        carts.add_item(cart, db.get(Pokemon, numero), 1)
+    with engine.connect() as conn:
+        assert tuple(line(conn))[:2] == (1, quantity + 1)
+    print("✅ add_item upserts onto the merged line")
+    return True
+
+
+def main():
+    """Run all query plan tests"""
+    tests = [
+        ("No Full Scans", test_no_full_scans),
+        ("Composite Indexes Used", test_composite_indexes_used),
+        ("Migration Adds Indexes", test_migration_adds_indexes),
+        ("Migration Merges Cart Lines", test_migration_merges_cart_lines),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
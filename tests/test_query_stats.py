@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test Query Stats
+
+Tests per-request SQL instrumentation: statement shapes, N+1 detection,
+attribution through tasks and threads, the QueryStatsMiddleware headers
+and query budgets per endpoint. Uses temporary SQLite databases filled by
+the synthetic data generator.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common.middleware import assert_query_budget
+from src.database import (
+    Transaction,
+    TransactionRepository,
+    get_db,
+    get_read_db,
+    track_queries,
+    expect_queries,
+    instrument_engine,
+    query_stats_registry,
+    populate_pokemon_types,
+)
+from src.database.query_stats import statement_shape
+from src.database.synthetic import SyntheticDataGenerator
+from conftest import temp_session_factory
+
+NOW = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+
+def make_session_factory():
+    """Create an instrumented temporary database with synthetic sales"""
+    factory = temp_session_factory("query_stats_test_", connect_args={"check_same_thread": False})
+    engine = factory.kw["bind"]
+    SyntheticDataGenerator(seed=4, now=NOW).generate(engine, pokemon=151, transactions=40)
+    instrument_engine(engine)
+    return factory
+
+
+def test_shapes_and_repeats():
+    """Test 1: Shapes collapse literals; lazy loads are flagged as repeated"""
+    print("\n" + "=" * 60)
+    print("Test 1: Shapes and Repeats")
+    print("=" * 60)
+
+    assert statement_shape("SELECT * FROM pokemon WHERE numero IN (?, ?, ?)") == \
+        statement_shape("SELECT *\n  FROM pokemon WHERE numero IN (?, ?)") == \
+        "SELECT * FROM pokemon WHERE numero IN (?...)"
+    assert statement_shape("SELECT 1 FROM t WHERE name = 'x' LIMIT 10") == "SELECT ? FROM t WHERE name = ? LIMIT ?"
+    assert statement_shape("SELECT anon_1.id FROM pokemon_types_1") == "SELECT anon_1.id FROM pokemon_types_1"
+    print("   ✓ IN-lists, literals and whitespace normalized")
+
+    factory = make_session_factory()
+    with factory() as db:
+        with track_queries() as stats:
+            for transaction in db.query(Transaction).limit(20).all():
+                transaction.to_dict()  # lazy-loads items one transaction at a time
+        assert stats.count == 21, stats.count
+        repeated = stats.repeated()
+        assert list(repeated.values()) == [20] and "transaction_items" in next(iter(repeated))
+        assert len(stats.slowest()) == 3 and stats.total_ms > 0
+        print(f"   ✓ Lazy loop: {stats.count} queries, flagged x{list(repeated.values())[0]}")
+
+    with factory() as db:
+        with expect_queries(2) as stats:
+            transactions = TransactionRepository(db).get_all(limit=20)
+            assert all(t.to_dict()["items"] for t in transactions)
+        print(f"   ✓ get_all(limit=20) + to_dict: {stats.count} queries")
+
+        try:
+            with expect_queries(1):
+                for transaction in db.query(Transaction).limit(6).all():
+                    db.expire(transaction)
+                    transaction.items
+        except AssertionError as e:
+            print(f"   ✓ Over budget: {str(e)[:60]}...")
+        else:
+            raise AssertionError("Budget should have been exceeded")
+    print("✅ Repeated shapes detected and budgets enforced")
+    return True
+
+
+def test_attribution():
+    """Test 2: Statements from tasks and threads count for the active request only"""
+    print("\n" + "=" * 60)
+    print("Test 2: Attribution")
+    print("=" * 60)
+
+    factory = make_session_factory()
+
+    def lookup(numero):
+        with factory() as db:
+            db.get(Transaction, numero)
+
+    async def request(numeros):
+        with track_queries() as stats:
+            await asyncio.gather(*(asyncio.to_thread(lookup, n) for n in numeros))
+            await asyncio.sleep(0)
+        return stats
+
+    async def main():
+        return await asyncio.gather(request([1, 2, 3]), request([4]), request([]))
+
+    first, second, third = asyncio.run(main())
+    assert (first.count, second.count, third.count) == (3, 1, 0)
+    print("   ✓ Concurrent requests: 3, 1 and 0 statements")
+
+    with track_queries() as outer:
+        lookup(1)
+        with track_queries() as inner:
+            lookup(2)
+            lookup(3)
+        lookup(4)
+    assert (outer.count, inner.count) == (2, 2)
+    lookup(5)
+    print("✅ Nested blocks isolated; untracked statements ignored")
+    return True
+
+
+def test_endpoint_budgets(query_budget):
+    """Test 3: Middleware headers and per-endpoint query budgets"""
+    print("\n" + "=" * 60)
+    print("Test 3: Endpoint Budgets")
+    print("=" * 60)
+
+    from src.payment_processor.server import app
+
+    factory = make_session_factory()
+    with factory() as db:
+        populate_pokemon_types(db.connection())
+        db.commit()
+        transaction_id = db.query(Transaction.transaction_id).first()[0]
+
+    def override_get_db():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    query_stats_registry.reset()
+    try:
+        client = TestClient(app)
+        budgets = [
+            ("/a2a/processor/transactions?limit=40", 2),
+            (f"/a2a/processor/transaction/{transaction_id}", 2),
+            ("/a2a/processor/reports/revenue", 1),
+        ]
+        for url, budget in budgets:
+            response = client.get(url)
+            assert response.status_code == 200, response.text
+            stats = query_budget(response, max_queries=budget)
+            assert "db;dur=" in response.headers["Server-Timing"]
+            print(f"   ✓ {url}: {stats['queries']} queries, {stats['db_ms']:.2f} ms (budget {budget})")
+
+        try:
+            query_budget(client.get("/a2a/processor/transactions?limit=40"), max_queries=1)
+        except AssertionError as e:
+            print(f"   ✓ {e}")
+        else:
+            raise AssertionError("Budget should have been exceeded")
+    finally:
+        app.dependency_overrides.clear()
+
+    snapshot = query_stats_registry.snapshot()
+    listing = snapshot["GET /a2a/processor/transactions"]
+    assert listing["requests"] == 2 and listing["max_queries"] == 2 and listing["n_plus_one"] == 0
+    assert "GET /a2a/processor/transaction/{txn_id}" in snapshot
+    print("✅ Headers, budgets and per-endpoint totals")
+    return True
+
+
+def main():
+    """Run all query stats tests"""
+    tests = [
+        ("Shapes and Repeats", test_shapes_and_repeats),
+        ("Attribution", test_attribution),
+        ("Endpoint Budgets", lambda: test_endpoint_budgets(assert_query_budget)),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test Read/Write Split
+
+Tests the read-only engine paired with each read-write engine
+(src/database/engine.py): SQLite mode=ro + query_only connections with a
+pool of their own, catalog reads routed to it from any session, memory
+databases reading through the writer, and the default ReadSessionLocal.
+Uses temporary SQLite databases.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Base,
+    Pokemon,
+    PokemonRepository,
+    catalog_snapshot,
+    populate_pokemon_types,
+    read_engine_for,
+    run_migrations,
+)
+from src.database.dialect import DB_READ_MAX_OVERFLOW, DB_READ_POOL_SIZE
+from src.database.engine import make_engine, make_read_engine
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+
+
+def make_engines(url=None):
+    """Read-write engine with one Pokemon, and its read-only engine"""
+    if url is None:
+        url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='read_write_test_')) / 'test.db'}"
+    writer = make_engine(url)
+    Base.metadata.create_all(writer)
+    run_migrations(writer)
+    with writer.begin() as conn:
+        conn.execute(Pokemon.__table__.insert().values(
+            numero=25, nombre="pikachu", precio=25, en_venta=True,
+            inventario_total=10, inventario_disponible=10, inventario_vendido=0
+        ))
+        populate_pokemon_types(conn)
+    return writer, make_read_engine(writer)
+
+
+def count_statements(engine):
+    """List that collects every statement run on an engine"""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_read_engine_is_read_only():
+    """Test 1: Separate read-only engine with its own pool"""
+    print("\n" + "=" * 60)
+    print("Test 1: Read Engine Is Read-Only")
+    print("=" * 60)
+
+    writer, reader = make_engines()
+    assert reader is not writer and reader.url.query["mode"] == "ro"
+    assert reader.pool is not writer.pool
+    assert reader.pool.size() == DB_READ_POOL_SIZE and reader.pool._max_overflow == DB_READ_MAX_OVERFLOW
+    print(f"   ✓ Read engine on {reader.url.database} (pool {DB_READ_POOL_SIZE}+{DB_READ_MAX_OVERFLOW})")
+
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    read_factory = sessionmaker(bind=reader, autocommit=False, autoflush=False)
+    with read_factory() as db:
+        try:
+            PokemonRepository(db).decrease_stock(25, 1)
+        except OperationalError as e:
+            assert "readonly" in str(e)
+        else:
+            raise AssertionError("Writes on a read session should fail")
+    print("   ✓ Writes through a read session are refused")
+
+    # Readers see every committed write, and nothing uncommitted
+    write_factory = sessionmaker(bind=writer, autocommit=False, autoflush=False)
+    with write_factory() as db, read_factory() as reads:
+        PokemonRepository(db, autocommit=False).decrease_stock(25, 3)
+        db.flush()
+        assert reads.get(Pokemon, 25).inventario_disponible == 10
+        db.commit()
+        reads.rollback()
+        assert reads.get(Pokemon, 25).inventario_disponible == 7
+    print("✅ Read engine sees committed data only")
+    return True
+
+
+def test_catalog_reads_routed():
+    """Test 2: Catalog reads run on the read engine from any session"""
+    print("\n" + "=" * 60)
+    print("Test 2: Catalog Reads Routed")
+    print("=" * 60)
+
+    writer, reader = make_engines()
+    write_factory = sessionmaker(bind=writer, autocommit=False, autoflush=False)
+    written, read = count_statements(writer), count_statements(reader)
+
+    with write_factory() as db:
+        assert read_engine_for(db) is reader and read_engine_for(reader) is reader
+        repo = PokemonRepository(db)
+        assert repo.get_by_numero(25).nombre == "pikachu"
+        assert [p.numero for p in repo.search(type="electric")] == [25]
+        assert repo.get_types() == [{"type": "electric", "count": 1}]
+    assert written == [] and len(read) >= 3
+    print(f"   ✓ Snapshot, type search and type list: {len(read)} statements on the read engine, none on the writer")
+
+    with write_factory() as db:
+        assert catalog_snapshot(db) is catalog_snapshot(reader)
+        PokemonRepository(db).decrease_stock(25, 1)
+        assert catalog_snapshot(db).by_numero[25].inventario_disponible == 9
+    print("   ✓ One snapshot per database, refreshed after writes")
+
+    # A memory database cannot be opened twice: reads use the writer
+    memory, memory_reader = make_engines("sqlite:///file:read_split_test?mode=memory&cache=shared&uri=true")
+    assert memory_reader is memory and read_engine_for(memory) is memory
+    with sessionmaker(bind=memory)() as db:
+        assert PokemonRepository(db).get_types() == [{"type": "electric", "count": 1}]
+    print("✅ Memory databases read through their only engine")
+    return True
+
+
+def test_default_read_session():
+    """Test 3: ReadSessionLocal follows DATABASE_URL"""
+    print("\n" + "=" * 60)
+    print("Test 3: Default Read Session")
+    print("=" * 60)
+
+    db_path = Path(tempfile.mkdtemp(prefix="read_write_test_")) / "default.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_READ_POOL_SIZE="3")
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "from src.database import init_db, read_engine, ReadSessionLocal, get_db_stats; init_db(); "
+         "print(read_engine.url.query['mode'], read_engine.pool.size()); "
+         "print(get_db_stats()['pokemon_count'])"],
+        cwd=AP2_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.strip().splitlines()
+    assert lines[-2:] == ["ro 3", "0"], lines
+    print("✅ Default read engine opens the database file read-only")
+    return True
+
+
+def main():
+    """Run all read/write split tests"""
+    tests = [
+        ("Read Engine Is Read-Only", test_read_engine_is_read_only),
+        ("Catalog Reads Routed", test_catalog_reads_routed),
+        ("Default Read Session", test_default_read_session),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
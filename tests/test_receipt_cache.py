@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test Receipt Cache
+
+Tests the bounded TTL cache used by the payment processor in front of
+TransactionRepository.get_by_id.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    """Test 1: Hits and misses are counted"""
+    print("\n" + "=" * 60)
+    print("Test 1: Hit/Miss Counters")
+    print("=" * 60)
+
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set("txn_1", {"amount": 25})
+
+    assert cache.get("txn_1") == {"amount": 25}
+    assert cache.get("txn_missing") is None
+
+    stats = cache.stats()
+    print(f"📊 Stats: {stats}")
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+    print("✅ Counters are correct")
+    return True
+
+
+def test_size_bound_evicts_lru():
+    """Test 2: Cache never grows past max_size"""
+    print("\n" + "=" * 60)
+    print("Test 2: Size Bound (LRU Eviction)")
+    print("=" * 60)
+
+    cache = TTLCache(max_size=3, ttl_seconds=60)
+    for i in range(3):
+        cache.set(f"txn_{i}", i)
+
+    # Touch txn_0 so txn_1 becomes the least recently used
+    cache.get("txn_0")
+    cache.set("txn_3", 3)
+
+    assert len(cache) == 3
+    assert "txn_1" not in cache
+    assert cache.get("txn_0") == 0
+    assert cache.evictions == 1
+
+    for i in range(1000):
+        cache.set(f"bulk_{i}", i)
+    assert len(cache) == 3
+
+    print(f"✅ Size stays bounded at {len(cache)} after 1000 inserts")
+    return True
+
+
+def test_ttl_expiration():
+    """Test 3: Entries expire after ttl_seconds"""
+    print("\n" + "=" * 60)
+    print("Test 3: TTL Expiration")
+    print("=" * 60)
+
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=30, clock=clock)
+    cache.set("txn_old", "old")
+
+    clock.now = 10
+    cache.set("txn_new", "new")
+
+    clock.now = 31
+    assert cache.get("txn_old") is None
+    assert cache.get("txn_new") == "new"
+    assert cache.expirations == 1
+
+    clock.now = 100
+    removed = cache.purge_expired()
+    assert removed == 1
+    assert len(cache) == 0
+
+    print("✅ Expired entries are dropped")
+    return True
+
+
+def main():
+    """Run all receipt cache tests"""
+    tests = [
+        ("Hit/Miss Counters", test_hit_and_miss_counters),
+        ("Size Bound", test_size_bound_evicts_lru),
+        ("TTL Expiration", test_ttl_expiration),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except AssertionError as e:
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
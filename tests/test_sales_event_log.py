@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test Sales Event Log
+
+Tests the transactional outbox written by TransactionRepository.create,
+the segmented append-only log, the outbox publisher and the log consumer.
+Uses a temporary SQLite database and log directory.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import Pokemon, OutboxEvent, TransactionRepository
+from src.events import SegmentedLog, LogConsumer, OutboxPublisher
+from conftest import temp_dir, temp_session_factory
+
+
+def make_session_factory():
+    """Create a fresh temporary database with one Pokemon"""
+    factory = temp_session_factory("sales_events_test_")
+
+    with factory() as db:
+        db.add(Pokemon(
+            numero=25, nombre="pikachu", precio=25,
+            inventario_total=10, inventario_disponible=10, inventario_vendido=0
+        ))
+        db.commit()
+
+    return factory
+
+
+def create_sale(db, txn_id: str):
+    """Create a completed transaction for Pikachu"""
+    cart_mandate = {
+        "contents": {
+            "id": f"cart_{txn_id}",
+            "payment_request": {
+                "details": {
+                    "id": "order_test",
+                    "total": {"label": "Total", "amount": {"currency": "USD", "value": 25.0}},
+                    "displayItems": [
+                        {"label": "Pikachu #25", "amount": {"currency": "USD", "value": 25.0}}
+                    ]
+                }
+            }
+        },
+        "merchantName": "Test Merchant",
+        "merchant_signature": "test_signature",
+    }
+    payment_mandate = {
+        "payment_mandate_contents": {
+            "payment_response": {"method_name": "CARD", "payer_email": "test@example.com"}
+        },
+        "user_authorization": "test_auth",
+    }
+    return TransactionRepository(db).create(
+        transaction_id=txn_id,
+        cart_id=f"cart_{txn_id}",
+        cart_mandate=cart_mandate,
+        payment_mandate=payment_mandate,
+        items=[{"pokemon_numero": 25, "quantity": 1, "unit_price": 25.0}],
+    )
+
+
+def test_log_append_and_read():
+    """Test 1: Append records and read them back from any offset"""
+    print("\n" + "=" * 60)
+    print("Test 1: Segmented Log Append/Read")
+    print("=" * 60)
+
+    log_dir = temp_dir("sales_events_test_") / "log_basic"
+    with SegmentedLog(log_dir, max_segment_bytes=200, fsync=False) as log:
+        offsets = log.append_batch([f"event-{i}".encode() for i in range(50)])
+        assert offsets == list(range(50))
+        assert len(log.segments()) > 1, "Expected the log to roll segments"
+        print(f"✅ 50 records in {len(log.segments())} segments")
+
+    with LogConsumer(log_dir, offset=37) as consumer:
+        records = consumer.poll(100)
+    assert [r.offset for r in records] == list(range(37, 50))
+    assert records[0].value == b"event-37"
+    print("✅ Consumer resumed from offset 37")
+
+    # Reopening the writer continues the offset sequence
+    with SegmentedLog(log_dir, max_segment_bytes=200, fsync=False) as log:
+        assert log.append(b"event-50") == 50
+    print("✅ Writer recovered next offset after restart")
+    return True
+
+
+def test_log_recovers_torn_write():
+    """Test 2: A partially written trailing record is truncated on open"""
+    print("\n" + "=" * 60)
+    print("Test 2: Torn Write Recovery")
+    print("=" * 60)
+
+    log_dir = temp_dir("sales_events_test_") / "log_torn"
+    with SegmentedLog(log_dir, fsync=False) as log:
+        log.append_batch([b"a", b"b", b"c"])
+        segment_path = log.segments()[-1][1]
+
+    with open(segment_path, "ab") as f:
+        f.write(b"\x00\x00\x00")  # garbage half-header
+
+    with SegmentedLog(log_dir, fsync=False) as log:
+        assert log.next_offset == 3
+        log.append(b"d")
+
+    values = [r.value for r in LogConsumer(log_dir).poll()]
+    assert values == [b"a", b"b", b"c", b"d"], values
+    print("   ✓ Torn record discarded, log still readable")
+
+    # Segments written before the .seg suffix are read, then renamed by the writer
+    segment_path.rename(segment_path.with_suffix(".log"))
+    assert [r.value for r in LogConsumer(log_dir).poll()][-1] == b"d"
+    with SegmentedLog(log_dir, fsync=False) as log:
+        assert log.append(b"e") == 4
+    assert [path.suffix for path in log_dir.iterdir() if path.is_file()] == [".seg"]
+    print("✅ Old .log segments adopted (the pre-commit hook deletes *.log)")
+    return True
+
+
+def test_outbox_written_with_transaction():
+    """Test 3: Completed charges write an outbox row atomically"""
+    print("\n" + "=" * 60)
+    print("Test 3: Transactional Outbox")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        create_sale(db, "txn_outbox_1")
+        events = db.query(OutboxEvent).all()
+
+    assert len(events) == 1
+    event = events[0]
+    assert event.event_type == "sale.completed"
+    assert event.aggregate_id == "txn_outbox_1"
+    assert event.published_at is None
+    assert event.payload["items"][0]["pokemon_numero"] == 25
+    print(f"✅ Outbox row created: {event}")
+    return True
+
+
+def test_publisher_streams_to_log():
+    """Test 4: Publisher drains the outbox into the log, consumer tails it"""
+    print("\n" + "=" * 60)
+    print("Test 4: Outbox Publisher + Consumer")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    with factory() as db:
+        for i in range(5):
+            create_sale(db, f"txn_pub_{i}")
+
+    log = SegmentedLog(temp_dir("sales_events_test_") / "log_publisher", fsync=False)
+    publisher = OutboxPublisher(factory, log, batch_size=2)
+
+    assert publisher.publish_pending() == 5
+    assert publisher.pending_count() == 0
+    assert publisher.publish_pending() == 0
+
+    consumer = LogConsumer(log.directory, group="analytics")
+    events = consumer.events()
+    assert [e["aggregate_id"] for e in events] == [f"txn_pub_{i}" for i in range(5)]
+    assert [e["offset"] for e in events] == list(range(5))
+    consumer.commit()
+    print(f"✅ Published and consumed {len(events)} events")
+
+    with factory() as db:
+        create_sale(db, "txn_pub_5")
+    publisher.publish_pending()
+
+    resumed = LogConsumer(log.directory, group="analytics")
+    assert [e["aggregate_id"] for e in resumed.events()] == ["txn_pub_5"]
+    print("✅ Consumer group resumed from committed offset")
+
+    with factory() as db:
+        published = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+        assert [e.log_offset for e in published] == list(range(6))
+    log.close()
+    return True
+
+
+def main():
+    """Run all sales event log tests"""
+    tests = [
+        ("Log Append/Read", test_log_append_and_read),
+        ("Torn Write Recovery", test_log_recovers_torn_write),
+        ("Transactional Outbox", test_outbox_written_with_transaction),
+        ("Publisher + Consumer", test_publisher_streams_to_log),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
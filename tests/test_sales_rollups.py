@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test Sales Rollups
+
+Tests that daily revenue and per-Pokemon rollups are maintained on each
+completed charge and that a backfill rebuilds the same values.
+Uses a temporary SQLite database.
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Pokemon,
+    Transaction,
+    DailyRevenue,
+    DailyPokemonSales,
+    TransactionRepository,
+    SalesRollupRepository,
+)
+from conftest import temp_session_factory
+
+
+def make_session():
+    """Create a temporary database with a few Pokemon"""
+    factory = temp_session_factory("rollups_test_")
+    db = factory()
+
+    for numero, nombre, precio in [(1, "bulbasaur", 280), (4, "charmander", 100), (25, "pikachu", 25)]:
+        db.add(Pokemon(
+            numero=numero, nombre=nombre, precio=precio,
+            inventario_total=100, inventario_disponible=100, inventario_vendido=0
+        ))
+    db.commit()
+    return db
+
+
+def create_sale(db, txn_id: str, items, currency: str = "USD"):
+    """Create a completed transaction with the given (numero, qty, price) items"""
+    total = sum(qty * price for _, qty, price in items)
+    cart_mandate = {
+        "contents": {
+            "id": f"cart_{txn_id}",
+            "payment_request": {
+                "details": {
+                    "id": "order_test",
+                    "total": {"label": "Total", "amount": {"currency": currency, "value": total}},
+                    "displayItems": []
+                }
+            }
+        },
+        "merchantName": "Test Merchant",
+    }
+    payment_mandate = {
+        "payment_mandate_contents": {"payment_response": {"method_name": "CARD"}},
+    }
+    return TransactionRepository(db).create(
+        transaction_id=txn_id,
+        cart_id=f"cart_{txn_id}",
+        cart_mandate=cart_mandate,
+        payment_mandate=payment_mandate,
+        items=[
+            {"pokemon_numero": numero, "quantity": qty, "unit_price": price}
+            for numero, qty, price in items
+        ],
+    )
+
+
+def snapshot(db):
+    """Current rollup contents as comparable tuples"""
+    revenue = sorted(
+        (r.day, r.currency, r.revenue, r.transaction_count, r.units_sold)
+        for r in db.query(DailyRevenue).all()
+    )
+    sales = sorted(
+        (r.day, r.pokemon_numero, r.units_sold, r.revenue, r.transaction_count)
+        for r in db.query(DailyPokemonSales).all()
+    )
+    return revenue, sales
+
+
+def test_incremental_rollups():
+    """Test 1: Completed charges update the rollups incrementally"""
+    print("\n" + "=" * 60)
+    print("Test 1: Incremental Rollups")
+    print("=" * 60)
+
+    db = make_session()
+    create_sale(db, "txn_1", [(25, 2, 25.0)])
+    create_sale(db, "txn_2", [(25, 1, 25.0), (4, 1, 100.0)])
+    create_sale(db, "txn_3", [(1, 1, 280.0)], currency="EUR")
+
+    today = datetime.now(timezone.utc).date()
+    repo = SalesRollupRepository(db)
+
+    usd = repo.revenue_by_day(start=today, end=today, currency="usd")
+    assert len(usd) == 1
+    assert usd[0].revenue == 175.0
+    assert usd[0].transaction_count == 2
+    assert usd[0].units_sold == 4
+    print(f"✅ USD revenue today: {usd[0]}")
+
+    top = repo.units_by_pokemon(start=today, end=today)
+    assert top[0]["pokemon_numero"] == 25
+    assert top[0]["pokemon_name"] == "pikachu"
+    assert top[0]["units_sold"] == 3
+    assert top[0]["transaction_count"] == 2
+    print(f"✅ Best seller: {top[0]}")
+
+    series = repo.daily_units(4)
+    assert [(r.day, r.units_sold) for r in series] == [(today, 1)]
+    db.close()
+    return True
+
+
+def test_backfill_matches_incremental():
+    """Test 2: Backfill rebuilds the same rollups, including history"""
+    print("\n" + "=" * 60)
+    print("Test 2: Backfill")
+    print("=" * 60)
+
+    db = make_session()
+    create_sale(db, "txn_a", [(25, 2, 25.0), (25, 1, 25.0)])
+    create_sale(db, "txn_b", [(4, 3, 100.0)])
+    incremental = snapshot(db)
+
+    repo = SalesRollupRepository(db)
+    counts = repo.rebuild()
+    assert snapshot(db) == incremental, "Backfill differs from incremental rollups"
+    print(f"✅ Backfill matches incremental rollups ({counts})")
+
+    # Move one sale to last week and rebuild only that range
+    last_week = datetime.now(timezone.utc) - timedelta(days=7)
+    txn = db.query(Transaction).filter(Transaction.transaction_id == "txn_b").one()
+    txn.completed_at = last_week
+    db.commit()
+
+    repo.rebuild(start=last_week.date(), end=last_week.date())
+    days = {r.day for r in repo.revenue_by_day()}
+    assert last_week.date() in days
+    print("✅ Range backfill picked up historical sale")
+
+    # Full rebuild removes the stale row for txn_b on today's date
+    repo.rebuild()
+    today_rows = repo.revenue_by_day(start=date.today(), end=date.today())
+    assert sum(r.transaction_count for r in today_rows) == 1
+    print("✅ Full rebuild is idempotent")
+    db.close()
+    return True
+
+
+def main():
+    """Run all rollup tests"""
+    tests = [
+        ("Incremental Rollups", test_incremental_rollups),
+        ("Backfill", test_backfill_matches_incremental),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test Synthetic Data
+
+Tests the seeded scale-test generator (src/database/synthetic.py):
+determinism, consistency of carts/transactions and their AP2 mandates
+with the repositories, appending to an existing database and restoring
+indexes and pragmas after a bulk load. Uses temporary SQLite databases.
+"""
+
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import jwt
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.common.ap2_types import CartMandate, PaymentMandate
+from src.database import (
+    Cart,
+    Pokemon,
+    Transaction,
+    PokemonRepository,
+    TransactionRepository,
+    CartRepository,
+    SalesRollupRepository,
+)
+from src.database.synthetic import SyntheticDataGenerator
+from conftest import temp_session_factory
+
+NOW = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_engine():
+    """Create an empty temporary database"""
+    return temp_session_factory("synthetic_test_").kw["bind"]
+
+
+def dump(engine, table: str):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT * FROM {table} ORDER BY 1, 2")).all()
+
+
+def test_deterministic():
+    """Test 1: Same seed, same rows; streams are independent"""
+    print("\n" + "=" * 60)
+    print("Test 1: Deterministic")
+    print("=" * 60)
+
+    first, second, other = make_engine(), make_engine(), make_engine()
+    SyntheticDataGenerator(seed=7, now=NOW).generate(first, pokemon=300, carts=200, transactions=100)
+    SyntheticDataGenerator(seed=7, now=NOW).generate(second, pokemon=300, carts=200, transactions=100)
+    SyntheticDataGenerator(seed=7, now=NOW).generate(other, pokemon=300, carts=50, transactions=100)
+
+    for table in ("pokemon", "pokemon_types", "carts", "cart_items", "transactions", "transaction_items"):
+        assert dump(first, table) == dump(second, table), table
+    print("   ✓ Identical tables for the same seed and now")
+
+    for table in ("pokemon", "transactions", "transaction_items"):
+        assert dump(first, table) == dump(other, table), table
+    print("   ✓ Cart count does not change the other tables")
+
+    third = make_engine()
+    SyntheticDataGenerator(seed=8, now=NOW).generate(third, pokemon=300)
+    assert dump(first, "pokemon") != dump(third, "pokemon")
+    print("✅ Seeded and reproducible")
+    return True
+
+
+def test_consistent_with_repositories():
+    """Test 2: Totals add up and mandates parse as AP2 models"""
+    print("\n" + "=" * 60)
+    print("Test 2: Consistent With Repositories")
+    print("=" * 60)
+
+    engine = make_engine()
+    # Current time: the cart repository only returns unexpired carts
+    stats = SyntheticDataGenerator(seed=1).generate(
+        engine, pokemon=500, carts=300, transactions=200
+    )
+    assert (stats["pokemon"], stats["carts"], stats["transactions"]) == (500, 300, 200)
+    assert stats["rows"] == sum(v for k, v in stats.items() if k not in ("rows", "seconds", "rows_per_second"))
+
+    with engine.connect() as conn:
+        bad_carts = conn.execute(text(
+            "SELECT COUNT(*) FROM carts c WHERE item_count != (SELECT COUNT(*) FROM cart_items i WHERE i.cart_id = c.id)"
+            " OR abs(total_amount - (SELECT SUM(total_price) FROM cart_items i WHERE i.cart_id = c.id)) > 0.001"
+        )).scalar()
+        bad_transactions = conn.execute(text(
+            "SELECT COUNT(*) FROM transactions t WHERE abs(total_amount - "
+            "(SELECT SUM(total_price) FROM transaction_items i WHERE i.transaction_id = t.id)) > 0.001"
+        )).scalar()
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+    assert bad_carts == 0 and bad_transactions == 0
+    print("   ✓ Cart and transaction totals match their items; no dangling keys")
+
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with factory() as db:
+        transaction = db.query(Transaction).order_by(Transaction.id).first()
+        CartMandate(**transaction.cart_mandate)
+        PaymentMandate(**transaction.payment_mandate)
+        claims = jwt.decode(transaction.user_authorization, options={"verify_signature": False})
+        assert claims["vc"]["type"] == ["VerifiableCredential", "PaymentAuthorization"]
+        assert jwt.get_unverified_header(transaction.merchant_signature)["alg"] == "RS256"
+        assert TransactionRepository(db).get_by_id(transaction.transaction_id).items
+        print("   ✓ Mandates validate as CartMandate / PaymentMandate; JWTs decode")
+
+        cart = db.query(Cart).filter(Cart.status == "active").first()
+        summary = CartRepository(db).get_cart_summary(cart.session_id)
+        assert summary["total_items"] == len(summary["items"]) > 0
+        assert summary["total_amount"] == sum(item["total_price"] for item in summary["items"])
+
+        assert PokemonRepository(db).search(type="dragon", limit=3)
+        counts = SalesRollupRepository(db).rebuild()
+        assert counts["daily_revenue"] > 30
+    print(f"✅ Repositories read the data; rollups rebuilt ({counts['daily_revenue']} days)")
+    return True
+
+
+def test_append_restores_indexes_and_pragmas():
+    """Test 3: A second run appends; indexes and pragmas are put back"""
+    print("\n" + "=" * 60)
+    print("Test 3: Append Restores Indexes and Pragmas")
+    print("=" * 60)
+
+    engine = make_engine()
+    with engine.connect() as conn:
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")).all()
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+
+    generator = SyntheticDataGenerator(seed=2, now=NOW)
+    generator.generate(engine, pokemon=200, transactions=50)
+    generator.generate(engine, pokemon=100, carts=40, transactions=50)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")).all() == indexes
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == synchronous
+        assert conn.execute(text("SELECT COUNT(*), MAX(numero) FROM pokemon")).one() == (300, 300)
+        assert conn.execute(text("SELECT COUNT(*) FROM transactions")).scalar() == 100
+    print("   ✓ Rows appended after the existing keys; indexes and pragmas unchanged")
+
+    empty = make_engine()
+    try:
+        generator.generate(empty, carts=10)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Carts without a catalog should fail")
+    assert dump(empty, "carts") == []
+    print("✅ Failed runs write nothing")
+    return True
+
+
+def test_throughput():
+    """Test 4: Bulk rate for a mixed dataset"""
+    print("\n" + "=" * 60)
+    print("Test 4: Throughput")
+    print("=" * 60)
+
+    engine = make_engine()
+    start = time.perf_counter()
+    stats = SyntheticDataGenerator(seed=3, now=NOW).generate(
+        engine, pokemon=20000, carts=10000, transactions=2000
+    )
+    elapsed = time.perf_counter() - start
+    print(f"📊 {stats['rows']:,} rows in {elapsed:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(Pokemon).count() == 20000
+    assert stats["rows"] > 80000
+    print("✅ Generated")
+    return True
+
+
+def main():
+    """Run all synthetic data tests"""
+    tests = [
+        ("Deterministic", test_deterministic),
+        ("Consistent With Repositories", test_consistent_with_repositories),
+        ("Append Restores Indexes and Pragmas", test_append_restores_indexes_and_pragmas),
+        ("Throughput", test_throughput),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test Tracing
+
+Tests the distributed tracing (src/common/tracing.py): W3C traceparent
+parsing, span nesting and the JSONL exporter, propagation through the
+agents' middleware, ShoppingAgent's httpx calls and MCP tool calls, and the
+critical path computed by scripts/trace_report.py.
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+AP2_DIR = Path(__file__).parent.parent / "ap2-integration"
+sys.path.insert(0, str(AP2_DIR))
+sys.path.insert(0, str(AP2_DIR / "scripts"))
+
+from src.common import tracing
+from src.common.mcp_client import CALL_TOOL_META, MCPClient
+from trace_report import children_by_parent, critical_path, find_root
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+CALLER = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+def temp_trace_file() -> Path:
+    return Path(tempfile.mkdtemp(prefix="tracing_test_")) / "traces.jsonl"
+
+
+def test_spans():
+    """Test 1: traceparent parsing, nesting and export"""
+    print("\n" + "=" * 60)
+    print("Test 1: Spans")
+    print("=" * 60)
+
+    assert tracing.parse_traceparent(CALLER) == (TRACE_ID, "00f067aa0ba902b7", True)
+    assert tracing.parse_traceparent(f"00-{TRACE_ID}-00f067aa0ba902b7-00")[2] is False
+    for bad in (None, "", "00-abc-def-01", f"ff-{TRACE_ID}-00f067aa0ba902b7-01",
+                f"00-{'0' * 32}-00f067aa0ba902b7-01", f"00-{TRACE_ID}-zzzzzzzzzzzzzzzz-01"):
+        assert tracing.parse_traceparent(bad) is None, bad
+    print("   ✓ W3C traceparent parsing")
+
+    tracing.configure(None)
+    with tracing.span("off") as current:
+        assert current is None and tracing.current_traceparent() is None
+
+    path = temp_trace_file()
+    tracing.configure(path)
+    try:
+        with tracing.span("root", "shopping_agent") as root:
+            with tracing.span("child", step="sign") as child:
+                assert tracing.current_traceparent() == child.traceparent
+            try:
+                with tracing.span("failing"):
+                    raise ValueError("declined")
+            except ValueError:
+                pass
+        with tracing.span("remote", "merchant_agent", traceparent=CALLER) as remote:
+            pass
+        with tracing.span("unsampled", traceparent=f"00-{TRACE_ID}-00f067aa0ba902b7-00") as unsampled:
+            assert unsampled is None
+    finally:
+        tracing.configure(None)
+
+    spans = {span["name"]: span for span in tracing.read_spans(path)}
+    assert set(spans) == {"root", "child", "failing", "remote"}
+    assert spans["child"]["parent_id"] == root.span_id and spans["child"]["service"] == "shopping_agent"
+    assert spans["child"]["attributes"] == {"step": "sign"}
+    assert spans["failing"]["status"] == "error" and "declined" in spans["failing"]["attributes"]["error"]
+    assert spans["root"]["parent_id"] is None
+    assert spans["remote"]["trace_id"] == TRACE_ID and spans["remote"]["parent_id"] == "00f067aa0ba902b7"
+    assert remote.traceparent == f"00-{TRACE_ID}-{remote.span_id}-01"
+    print("✅ Nesting, errors, remote parents and unsampled callers")
+    return True
+
+
+def test_propagation():
+    """Test 2: Middleware, agent calls and MCP calls share the trace"""
+    print("\n" + "=" * 60)
+    print("Test 2: Propagation")
+    print("=" * 60)
+
+    from src.payment_processor.server import app as processor_app
+    from src.shopping_agent.agent import ShoppingAgent
+
+    class RecordingSession:
+        """MCP session returning an empty result and keeping the call's kwargs"""
+
+        def __init__(self):
+            self.calls = []
+
+        async def call_tool(self, name, arguments, **kwargs):
+            self.calls.append(kwargs)
+            return SimpleNamespace(content=[], is_error=False)
+
+    path = temp_trace_file()
+    tracing.configure(path)
+    try:
+        response = TestClient(processor_app).get("/health", headers={"traceparent": CALLER})
+        assert response.status_code == 200
+
+        mcp = MCPClient("unused.js")
+        mcp.session = RecordingSession()
+
+        async def checkout():
+            agent = ShoppingAgent(transport="asgi")
+            with tracing.span("POST /api/cart/checkout", "shopping_agent") as root:
+                await agent.get_payment_methods()
+                await mcp.call_tool("get_pokemon_product", {"product_id": "25"})
+            return root
+
+        root = asyncio.run(checkout())
+    finally:
+        tracing.configure(None)
+
+    spans = tracing.read_spans(path)
+    health = next(s for s in spans if s["name"] == "GET /health")
+    assert health["trace_id"] == TRACE_ID and health["parent_id"] == "00f067aa0ba902b7"
+    assert health["service"] == "payment_processor" and health["attributes"]["status"] == 200
+    statements = [s for s in spans if s["name"].startswith("db ") and s["parent_id"] == health["span_id"]]
+    assert statements, "SQL statements should be spans of the request"
+    print(f"   ✓ Processor continued the caller's trace ({len(statements)} SQL spans)")
+
+    trace = [s for s in spans if s["trace_id"] == root.trace_id]
+    calls = [s for s in trace if s["name"] == "GET /a2a/credentials_provider/payment_methods"]
+    client = next(s for s in calls if s["attributes"]["kind"] == "client")
+    server = next(s for s in calls if s["attributes"]["kind"] == "server")
+    assert client["service"] == "shopping_agent" and server["service"] == "credentials_provider"
+    assert client["parent_id"] == root.span_id and server["parent_id"] == client["span_id"]
+    print("   ✓ ShoppingAgent call -> credentials provider span in the same trace")
+
+    tool = next(s for s in trace if s["name"] == "mcp get_pokemon_product")
+    if CALL_TOOL_META:
+        assert mcp.session.calls == [{"meta": {"traceparent": f"00-{root.trace_id}-{tool['span_id']}-01"}}]
+    print("✅ MCP tool call span, traceparent sent in the request _meta")
+    return True
+
+
+def test_critical_path():
+    """Test 3: Critical path of a trace and the report CLI"""
+    print("\n" + "=" * 60)
+    print("Test 3: Critical Path")
+    print("=" * 60)
+
+    def span(span_id, parent_id, name, start_ms, duration_ms, service="shopping_agent"):
+        return {"trace_id": TRACE_ID, "span_id": span_id, "parent_id": parent_id, "name": name,
+                "service": service, "start": 1000 + start_ms / 1000, "duration_ms": duration_ms,
+                "status": "ok", "attributes": {}}
+
+    # checkout 0-100: cart 5-30 (merchant 10-28, sign 12-26) || payment methods 6-20, charge 40-95
+    spans = [
+        span("a", None, "POST /api/cart/checkout", 0, 100),
+        span("b", "a", "ap2 cart_mandate", 5, 25),
+        span("c", "b", "POST /a2a/merchant_agent/create_cart", 10, 18, "merchant_agent"),
+        span("d", "c", "sign cart mandate", 12, 14, "merchant_agent"),
+        span("e", "a", "ap2 payment_methods", 6, 14),
+        span("f", "a", "ap2 charge", 40, 55),
+        span("g", "f", "POST /a2a/processor/charge", 41, 53, "payment_processor"),
+    ]
+    root = find_root(spans)
+    path = critical_path(root, children_by_parent(spans))
+    names = [s["span_id"] for s, _ in path]
+    assert names == ["a", "b", "c", "d", "f", "g"], names
+    own = {s["span_id"]: round(ms, 3) for s, ms in path}
+    assert own == {"a": 20.0, "b": 7.0, "c": 4.0, "d": 14.0, "f": 2.0, "g": 53.0}, own
+    assert abs(sum(own.values()) - 100) < 1e-6
+    print("   ✓ Overlapping sibling left off the path; critical times add up to the root")
+
+    path_file = temp_trace_file()
+    path_file.write_text("".join(json.dumps(s) + "\n" for s in spans) + "not json\n")
+    result = subprocess.run(
+        [sys.executable, str(AP2_DIR / "scripts" / "trace_report.py"), str(path_file)],
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert "53.0 ms  53.0%  [payment_processor] POST /a2a/processor/charge" in result.stdout, result.stdout
+    missing = subprocess.run(
+        [sys.executable, str(AP2_DIR / "scripts" / "trace_report.py"), str(path_file), "--name", "search"],
+        capture_output=True, text=True, timeout=60
+    )
+    assert missing.returncode == 1
+    print("✅ trace_report.py attributes the checkout to the processor's charge")
+    return True
+
+
+def main():
+    """Run all tracing tests"""
+    tests = [
+        ("Spans", test_spans),
+        ("Propagation", test_propagation),
+        ("Critical Path", test_critical_path),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
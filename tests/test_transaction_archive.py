@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Test Transaction Archive
+
+Tests moving old completed transactions into monthly archive files
+(src/database/archive.py): what moves and what stays, transparent
+lookups through TransactionRepository.get_by_id, read-only archive
+readers, re-runs and dry runs, several databases sharing an archive
+directory, the archive_transactions.py script, and rollup backfills over
+archived months. Uses temporary SQLite
+databases.
+"""
+
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "ap2-integration"))
+
+from src.database import (
+    Base,
+    DailyPokemonSales,
+    DailyRevenue,
+    SalesRollupRepository,
+    Transaction,
+    TransactionRepository,
+    transaction_archive,
+)
+from src.database import archive as archive_module
+from src.database.archive import ArchiveMismatchError, TransactionArchive
+from src.database.synthetic import SyntheticDataGenerator
+from conftest import temp_dir, temp_session_factory
+
+SCRIPT = Path(__file__).parent.parent / "ap2-integration" / "scripts" / "archive_transactions.py"
+BACKFILL_SCRIPT = SCRIPT.with_name("backfill_sales_rollups.py")
+NOW = datetime(2025, 10, 1, tzinfo=timezone.utc)
+CUTOFF = NOW - timedelta(days=120)
+
+
+def make_session_factory(transactions: int = 600):
+    """Create a temporary database with a year of synthetic sales"""
+    factory = temp_session_factory("archive_test_")
+    engine = factory.kw["bind"]
+    SyntheticDataGenerator(seed=6, now=NOW).generate(engine, pokemon=151, transactions=transactions)
+    return factory
+
+
+def counts(engine, where: str = "1 = 1"):
+    with engine.connect() as conn:
+        return (
+            conn.execute(text(f"SELECT COUNT(*) FROM transactions WHERE {where}")).scalar(),
+            conn.execute(text(
+                f"SELECT COUNT(*) FROM transaction_items WHERE transaction_id IN "
+                f"(SELECT id FROM transactions WHERE {where})"
+            )).scalar(),
+        )
+
+
+def test_archive_moves_old_completed():
+    """Test 1: Old completed sales move to per-month files; the rest stays"""
+    print("\n" + "=" * 60)
+    print("Test 1: Archive Moves Old Completed")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    cutoff = CUTOFF.replace(tzinfo=None)
+    old = f"status = 'completed' AND created_at < '{cutoff}'"
+    total, total_items = counts(engine)
+    expected, expected_items = counts(engine, old)
+    assert 0 < expected < total
+
+    archive = transaction_archive(engine)
+    assert archive.directory == Path(engine.url.database).with_name("test_archive")
+    assert archive.archive(engine, CUTOFF, dry_run=True) and not archive.months()
+    print("   ✓ Dry run counts without writing")
+
+    moved = archive.archive(engine, CUTOFF, batch_size=50)
+    assert sum(moved.values()) == expected
+    assert counts(engine, old) == (0, 0)
+    assert counts(engine) == (total - expected, total_items - expected_items)
+    assert archive.months() == sorted(moved, reverse=True)
+    assert all(month < CUTOFF.strftime("%Y-%m~") for month in moved)
+    print(f"   ✓ {expected} transactions / {expected_items} items moved into {len(moved)} monthly files")
+
+    stats = archive.stats()
+    assert stats == moved
+    with archive._reader(archive.months()[0]).connect() as conn:
+        items = conn.execute(text("SELECT COUNT(*) FROM transaction_items")).scalar()
+        assert conn.execute(text("PRAGMA integrity_check")).scalar() == "ok"
+        assert items > 0
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+        assert "archive" not in {row[1] for row in conn.execute(text("PRAGMA database_list"))}
+    print("   ✓ Archive files intact; hot database consistent and detached")
+
+    assert archive.archive(engine, CUTOFF) == {}
+    print("✅ Re-running moves nothing")
+    return True
+
+
+def test_get_by_id_reads_archives():
+    """Test 2: get_by_id falls back to the read-only archives"""
+    print("\n" + "=" * 60)
+    print("Test 2: get_by_id Reads Archives")
+    print("=" * 60)
+
+    factory = make_session_factory()
+    engine = factory.kw["bind"]
+    with factory() as db:
+        oldest = (
+            db.query(Transaction)
+            .filter(Transaction.status == "completed")
+            .order_by(Transaction.created_at)
+            .first()
+        )
+        old_id, old_receipt = oldest.transaction_id, oldest.to_dict()
+        recent_id = db.query(Transaction.transaction_id).order_by(Transaction.created_at.desc()).first()[0]
+
+    archive = transaction_archive(engine)
+    archive.archive(engine, CUTOFF)
+
+    with factory() as db:
+        repo = TransactionRepository(db)
+        assert repo.get_by_id(recent_id) in db
+        archived = repo.get_by_id(old_id)
+        assert archived is not None and archived not in db
+        assert archived.to_dict() == old_receipt
+        assert repo.get_by_id("txn_missing") is None
+    print(f"   ✓ Hot hit, archive hit ({len(old_receipt['items'])} items, same receipt) and miss")
+
+    try:
+        with archive._reader(archive.months()[-1]).begin() as conn:
+            conn.execute(text("DELETE FROM transactions"))
+    except OperationalError as e:
+        assert "readonly" in str(e)
+    else:
+        raise AssertionError("Archive readers should be read-only")
+    print("   ✓ Archive files opened read-only")
+
+    # A later run adds a month the reader has not listed yet
+    with factory() as db:
+        newer = (
+            db.query(Transaction)
+            .filter(Transaction.status == "completed", Transaction.created_at < NOW.replace(tzinfo=None))
+            .order_by(Transaction.created_at.desc())
+            .first()
+        )
+        newer_id = newer.transaction_id
+    months_before = len(archive.months())
+    archive.archive(engine, NOW)
+    assert len(archive.months()) > months_before
+    with factory() as db:
+        assert TransactionRepository(db).get_by_id(newer_id).transaction_id == newer_id
+    print("✅ New archive files are picked up without a restart")
+    return True
+
+
+def test_reruns_and_script():
+    """Test 3: Interrupted batches, schema changes and the CLI"""
+    print("\n" + "=" * 60)
+    print("Test 3: Re-runs and Script")
+    print("=" * 60)
+
+    factory = make_session_factory(transactions=200)
+    engine = factory.kw["bind"]
+    archive = transaction_archive(engine)
+
+    # Batch committed to its archive but not deleted from the hot table:
+    # put archived rows back, as if the hot commit had been lost
+    first = archive.archive(engine, CUTOFF)
+    first_month = min(first)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (str(archive.path_for(first_month)),))
+        conn.exec_driver_sql("INSERT INTO main.transactions SELECT * FROM archive.transactions")
+        conn.exec_driver_sql("INSERT INTO main.transaction_items SELECT * FROM archive.transaction_items")
+        conn.commit()
+        conn.exec_driver_sql("DETACH DATABASE archive")
+
+    # Column added to the hot table after the archive file was created
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE transactions ADD COLUMN note VARCHAR(20)"))
+
+    moved = archive.archive(engine, CUTOFF)
+    assert moved == {first_month: first[first_month]}
+    with archive._reader(first_month).connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*), COUNT(DISTINCT transaction_id) FROM transactions")).one()
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(transactions)"))}
+    assert rows[0] == rows[1] == moved[first_month]
+    assert "note" in columns
+    print("   ✓ Already-copied rows are not duplicated; new columns are added")
+
+    factory = make_session_factory(transactions=200)
+    db_path = factory.kw["bind"].url.database
+    archive_dir = Path(db_path).parent / "elsewhere"
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), "--db", db_path, "--archive-dir", str(archive_dir),
+         "--before", "2025-06-01", "--vacuum"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Moved" in result.stdout and "vacuumed" in result.stdout
+    assert sorted(path.name for path in archive_dir.iterdir())[0].startswith("transactions-")
+    print(f"   ✓ CLI: {result.stdout.strip().splitlines()[-2]}")
+    print("✅ Safe to re-run")
+    return True
+
+
+def test_shared_archive_dir():
+    """Test 4: Databases sharing TRANSACTION_ARCHIVE_DIR keep their own archives"""
+    print("\n" + "=" * 60)
+    print("Test 4: Shared Archive Directory")
+    print("=" * 60)
+
+    # Main database and a merchant partition: both number transactions from 1
+    root = temp_dir("archive_shared_")
+    factories = {}
+    for name, txn_id in (("main", "txn_A"), ("merchant", "txn_B")):
+        engine = create_engine(f"sqlite:///{root / name}.db")
+        Base.metadata.create_all(engine)
+        factory = factories[txn_id] = sessionmaker(bind=engine)
+        with factory() as db:
+            db.add(Transaction(
+                transaction_id=txn_id, cart_id=f"cart_{txn_id}", status="completed",
+                total_amount=25.0, created_at=datetime(2025, 3, 10, tzinfo=timezone.utc)
+            ))
+            db.commit()
+            assert db.query(Transaction.id).scalar() == 1
+
+    shared = root / "archives"
+    archive_module.ARCHIVE_DIR = str(shared)
+    try:
+        for txn_id, factory in factories.items():
+            engine = factory.kw["bind"]
+            archive = transaction_archive(engine)
+            assert archive.directory == shared / Path(engine.url.database).stem
+            assert archive.archive(engine, CUTOFF) == {"2025-03": 1}
+    finally:
+        archive_module.ARCHIVE_DIR = None
+
+    for txn_id, factory in factories.items():
+        with factory() as db:
+            assert db.query(Transaction).count() == 0
+            assert TransactionRepository(db).get_by_id(txn_id).transaction_id == txn_id
+    print(f"   ✓ {sorted(path.name for path in shared.iterdir())} each hold their own 2025-03 file")
+
+    # One directory for both (e.g. --archive-dir): the clash is refused
+    # and the hot row stays
+    for txn_id, engine in (("txn_A2", factories["txn_A"].kw["bind"]), ("txn_B2", factories["txn_B"].kw["bind"])):
+        with Session(engine) as db:
+            db.add(Transaction(
+                id=2, transaction_id=txn_id, cart_id="cart", status="completed",
+                total_amount=25.0, created_at=datetime(2025, 3, 11, tzinfo=timezone.utc)
+            ))
+            db.commit()
+    same = TransactionArchive(root / "same")
+    assert same.archive(factories["txn_A"].kw["bind"], CUTOFF) == {"2025-03": 1}
+    try:
+        same.archive(factories["txn_B"].kw["bind"], CUTOFF)
+    except ArchiveMismatchError as e:
+        print(f"   ✓ Refused: {e}")
+    else:
+        raise AssertionError("Archiving over another database's rows should fail")
+    with factories["txn_B"]() as db:
+        assert [t.transaction_id for t in db.query(Transaction)] == ["txn_B2"]
+    assert same.get("txn_A2") is not None and same.get("txn_B2") is None
+    print("✅ No transaction is deleted unless it is in the archive")
+    return True
+
+
+def rollups(factory):
+    """Every rollup row, as comparable tuples"""
+    with factory() as db:
+        return (
+            [(r.day, r.currency, round(r.revenue, 2), r.transaction_count, r.units_sold)
+             for r in db.query(DailyRevenue).order_by(DailyRevenue.day, DailyRevenue.currency)],
+            [(r.day, r.pokemon_numero, r.units_sold, round(r.revenue, 2), r.transaction_count)
+             for r in db.query(DailyPokemonSales).order_by(DailyPokemonSales.day, DailyPokemonSales.pokemon_numero)],
+        )
+
+
+def test_backfill_keeps_archived_months():
+    """Test 5: Rebuilding rollups after archiving keeps the archived months"""
+    print("\n" + "=" * 60)
+    print("Test 5: Backfill Keeps Archived Months")
+    print("=" * 60)
+
+    factory = make_session_factory(transactions=300)
+    engine = factory.kw["bind"]
+    with factory() as db:
+        SalesRollupRepository(db).rebuild()
+    before = rollups(factory)
+
+    moved = transaction_archive(engine).archive(engine, CUTOFF)
+    assert moved
+    result = subprocess.run(
+        [sys.executable, str(BACKFILL_SCRIPT)],
+        cwd=BACKFILL_SCRIPT.parent.parent, capture_output=True, text=True,
+        env=dict(os.environ, DATABASE_URL=f"sqlite:///{engine.url.database}"),
+    )
+    assert result.returncode == 0, result.stderr
+    assert rollups(factory) == before
+    print(f"   ✓ Default backfill after archiving {sorted(moved)}: {len(before[0])} revenue rows unchanged")
+
+    # A range inside the archived months is rebuilt from the files alone
+    first_day = min(day for day, *_ in before[0])
+    with factory() as db:
+        SalesRollupRepository(db).rebuild(start=first_day, end=CUTOFF.date() - timedelta(days=30))
+    assert rollups(factory) == before
+    print("✅ Archived sales are read back from the monthly files")
+    return True
+
+
+def main():
+    """Run all transaction archive tests"""
+    tests = [
+        ("Archive Moves Old Completed", test_archive_moves_old_completed),
+        ("get_by_id Reads Archives", test_get_by_id_reads_archives),
+        ("Re-runs and Script", test_reruns_and_script),
+        ("Shared Archive Directory", test_shared_archive_dir),
+        ("Backfill Keeps Archived Months", test_backfill_keeps_archived_months),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            result = test_func()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"❌ {name} failed: {e}")
+            result = False
+        if not result:
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Total: {len(tests)} tests | Passed: {len(tests) - failed} | Failed: {failed}")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()